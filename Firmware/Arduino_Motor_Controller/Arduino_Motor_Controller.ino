@@ -1,6 +1,7 @@
 #include "DCDriver.h"
 #include "StepperDriver.h"
 #include "ShredderController.h"
+#include "Telemetry.h"
 
 // ================= USER CONFIGURATION =================
 
@@ -22,6 +23,12 @@
 #define CURRENT_LIMIT   800   // 0-1023 ADC
 #define USE_IMPACT_MODE true  // Enable Impact Hammer logic
 
+// --- Telemetry ---
+// true: binary TelemetryFrame every TELEMETRY_PERIOD ms (read it with
+// Firmware/shredder_host/telemetry.py); false: a text status line every second
+#define TELEMETRY_ENABLED true
+#define TELEMETRY_PERIOD  10    // ms, 100 frames/s = 2000 bytes/s at 115200 baud
+
 // ======================================================
 
 MotorInterface* driver = nullptr;
@@ -64,14 +71,27 @@ void loop() {
     if (controller) {
         controller->update();
 
-        // Optional: Print Status periodically
-        static unsigned long lastPrint = 0;
-        if (millis() - lastPrint > 1000) {
-            lastPrint = millis();
-            Serial.print("State: ");
-            Serial.print(controller->getState());
-            Serial.print(" Load: ");
-            Serial.println(driver->getLoad());
-        }
+        #if TELEMETRY_ENABLED
+            static unsigned long lastFrame = 0;
+            static uint8_t sequence = 0;
+            if (millis() - lastFrame >= TELEMETRY_PERIOD) {
+                lastFrame = millis();
+                TelemetryFrame frame;
+                controller->getTelemetry(&frame);
+                frame.sequence = sequence++;
+                uint8_t buffer[TELEMETRY_FRAME_SIZE];
+                Serial.write(buffer, encodeTelemetry(frame, buffer));
+            }
+        #else
+            // Optional: Print Status periodically
+            static unsigned long lastPrint = 0;
+            if (millis() - lastPrint > 1000) {
+                lastPrint = millis();
+                Serial.print("State: ");
+                Serial.print(controller->getState());
+                Serial.print(" Load: ");
+                Serial.println(driver->getLoad());
+            }
+        #endif
     }
 }
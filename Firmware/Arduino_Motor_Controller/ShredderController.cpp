@@ -10,6 +10,8 @@ ShredderController::ShredderController(MotorInterface* motor) {
     _motor = motor;
     _state = STATE_IDLE;
     _jamCount = 0;
+    _speed = 0;
+    _stateStartTime = 0;
 
     // Defaults
     _config.forwardSpeed = 100;
@@ -25,19 +27,37 @@ void ShredderController::setConfig(ShredderConfig config) {
     _config = config;
 }
 
+void ShredderController::setMotorSpeed(int speed) {
+    _speed = speed;
+    _motor->setSpeed(speed);
+}
+
 void ShredderController::start() {
     _state = STATE_FORWARD;
     _stateStartTime = millis();
     _runStartTime = millis();
-    _motor->setSpeed(_config.forwardSpeed);
+    setMotorSpeed(_config.forwardSpeed);
     _jamCount = 0;
 }
 
 void ShredderController::stop() {
     _state = STATE_IDLE;
+    _speed = 0;
     _motor->stop();
 }
 
+void ShredderController::getTelemetry(TelemetryFrame* frame) {
+    frame->state = _state;
+    frame->time = millis();
+    frame->stateStartTime = _stateStartTime;
+    frame->load = _motor->getLoad();
+    frame->speed = _speed;
+    frame->flags = 0;
+    if (_motor->isFaulted()) frame->flags |= TELEMETRY_FLAG_FAULTED;
+    if (_config.useImpactMode) frame->flags |= TELEMETRY_FLAG_IMPACT;
+    frame->jamCount = _jamCount;
+}
+
 void ShredderController::update() {
     unsigned long now = millis();
     _motor->update(); // Tick the motor driver
@@ -61,6 +81,7 @@ void ShredderController::update() {
                 if (_motor->getLoad() > _config.currentLimit || _motor->isFaulted()) {
                     _state = STATE_JAM_DETECTED;
                     _stateStartTime = now;
+                    _speed = 0;
                     _motor->stop();
                     _jamCount++;
                 }
@@ -73,11 +94,11 @@ void ShredderController::update() {
                 if (_config.useImpactMode) {
                     // Impact Strategy: Back up, then strike
                     _state = STATE_IMPACT_PREP_BACKOFF;
-                    _motor->setSpeed(-_config.reverseSpeed);
+                    setMotorSpeed(-_config.reverseSpeed);
                 } else {
                     // Standard Strategy: Reverse, then Forward
                     _state = STATE_REVERSE_CLEARING;
-                    _motor->setSpeed(-_config.reverseSpeed);
+                    setMotorSpeed(-_config.reverseSpeed);
                 }
                 _stateStartTime = now;
             }
@@ -86,7 +107,7 @@ void ShredderController::update() {
         case STATE_REVERSE_CLEARING:
             if (now - _stateStartTime > _config.reverseDuration) {
                 _state = STATE_FORWARD;
-                _motor->setSpeed(_config.forwardSpeed);
+                setMotorSpeed(_config.forwardSpeed);
                 _stateStartTime = now;
             }
             break;
@@ -96,7 +117,7 @@ void ShredderController::update() {
             if (now - _stateStartTime > _config.impactBackoffDuration) {
                 _state = STATE_IMPACT_STRIKE;
                 // Full speed forward for maximum inertia
-                _motor->setSpeed(100);
+                setMotorSpeed(100);
                 _stateStartTime = now;
             }
             break;
@@ -107,7 +128,7 @@ void ShredderController::update() {
             // Let's switch to FORWARD after a brief acceleration period
             if (now - _stateStartTime > 500) {
                 _state = STATE_FORWARD;
-                _motor->setSpeed(_config.forwardSpeed);
+                setMotorSpeed(_config.forwardSpeed);
                 _stateStartTime = now;
             }
             break;
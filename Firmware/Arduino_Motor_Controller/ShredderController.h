@@ -2,6 +2,7 @@
 #define SHREDDER_CONTROLLER_H
 
 #include "MotorInterface.h"
+#include "Telemetry.h"
 
 // Define States
 enum ShredderState {
@@ -33,6 +34,9 @@ private:
     unsigned long _stateStartTime;
     unsigned long _runStartTime;
     int _jamCount;
+    int _speed; // last speed sent to the motor, for telemetry
+
+    void setMotorSpeed(int speed);
 
 public:
     ShredderController(MotorInterface* motor);
@@ -43,6 +47,11 @@ public:
     void update(); // Main Loop Logic
 
     ShredderState getState() { return _state; }
+    int getJamCount() { return _jamCount; }
+    int getSpeed() { return _speed; }
+
+    // Snapshot for the telemetry stream (sequence is left to the sender)
+    void getTelemetry(TelemetryFrame* frame);
 };
 
 #endif
@@ -0,0 +1,37 @@
+#include "Telemetry.h"
+
+uint16_t telemetryChecksum(const uint8_t* data, size_t length) {
+    // Fletcher-16: cheap on an AVR and catches swapped bytes, unlike a plain sum
+    uint16_t sum1 = 0;
+    uint16_t sum2 = 0;
+    for (size_t i = 0; i < length; i++) {
+        sum1 = (sum1 + data[i]) % 255;
+        sum2 = (sum2 + sum1) % 255;
+    }
+    return (sum2 << 8) | sum1;
+}
+
+static void put16(uint8_t* out, uint16_t value) {
+    out[0] = value & 0xFF;
+    out[1] = (value >> 8) & 0xFF;
+}
+
+static void put32(uint8_t* out, uint32_t value) {
+    put16(out, value & 0xFFFF);
+    put16(out + 2, (value >> 16) & 0xFFFF);
+}
+
+size_t encodeTelemetry(const TelemetryFrame& frame, uint8_t* out) {
+    out[0] = TELEMETRY_SYNC_0;
+    out[1] = TELEMETRY_SYNC_1;
+    out[2] = frame.sequence;
+    out[3] = frame.state;
+    put32(out + 4, frame.time);
+    put32(out + 8, frame.stateStartTime);
+    put16(out + 12, frame.load);
+    out[14] = (uint8_t)frame.speed;
+    out[15] = frame.flags;
+    put16(out + 16, frame.jamCount);
+    put16(out + 18, telemetryChecksum(out + 2, 16));
+    return TELEMETRY_FRAME_SIZE;
+}
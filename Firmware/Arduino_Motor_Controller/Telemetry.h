@@ -0,0 +1,48 @@
+#ifndef TELEMETRY_H
+#define TELEMETRY_H
+
+#include <stdint.h>
+#include <stddef.h>
+
+// Binary telemetry frame, sent over Serial instead of the text status line.
+// Fixed 20 bytes, little endian, no padding (encoded field by field, so the
+// struct layout doesn't matter):
+//
+//   0  sync 0xA5 0x5A
+//   2  uint8  sequence        (wraps; a gap means dropped frames)
+//   3  uint8  state           (ShredderState)
+//   4  uint32 time            (millis())
+//   8  uint32 stateStartTime  (millis() when the state was entered)
+//  12  uint16 load            (MotorInterface::getLoad())
+//  14  int8   speed           (last commanded speed, -100..100)
+//  15  uint8  flags           (TELEMETRY_FLAG_*)
+//  16  uint16 jamCount        (jams since start())
+//  18  uint16 checksum        (Fletcher-16 of bytes 2..17)
+//
+// Firmware/shredder_host/telemetry.py parses it on the host.
+
+#define TELEMETRY_SYNC_0     0xA5
+#define TELEMETRY_SYNC_1     0x5A
+#define TELEMETRY_FRAME_SIZE 20
+
+#define TELEMETRY_FLAG_FAULTED 0x01 // MotorInterface::isFaulted()
+#define TELEMETRY_FLAG_IMPACT  0x02 // config.useImpactMode
+
+struct TelemetryFrame {
+    uint8_t sequence;
+    uint8_t state;
+    uint32_t time;
+    uint32_t stateStartTime;
+    uint16_t load;
+    int8_t speed;
+    uint8_t flags;
+    uint16_t jamCount;
+};
+
+// Checksum over `length` bytes
+uint16_t telemetryChecksum(const uint8_t* data, size_t length);
+
+// Writes the frame into `out` (TELEMETRY_FRAME_SIZE bytes), returns the size
+size_t encodeTelemetry(const TelemetryFrame& frame, uint8_t* out);
+
+#endif
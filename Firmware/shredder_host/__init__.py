@@ -0,0 +1,9 @@
+"""
+Host-side tools for the Arduino motor controller (../Arduino_Motor_Controller).
+
+controller.py replays motor load traces through a replica of
+ShredderController's jam recovery logic, for whole grids of ShredderConfig
+values at once. telemetry.py reads the controller's binary telemetry stream
+into a ring buffer and a memory-mapped store, with jam and duty statistics.
+"""
+from .controller import ShredderConfig, ShredderState, Replay, config_grid, replay, synthetic_loads, timeline
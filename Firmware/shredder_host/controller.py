@@ -0,0 +1,405 @@
+"""
+Host-side replica of ShredderController (Arduino_Motor_Controller/ShredderController.cpp),
+for replaying motor load traces through the jam recovery logic in bulk.
+
+    result = replay(loads, times)                    # one trace, firmware defaults
+    grid = config_grid(current_limit=[600, 700, 800], use_impact_mode=[False, True])
+    result = replay(loads, times, grid)              # (3, 2, traces)
+    result.duty_cycle, result.clear_rate
+
+The firmware calls start() once and then update() from loop(); update()
+reads the load (DCDriver::getLoad(), the raw 0-1023 current ADC) and
+isFaulted() and moves the state machine on. Here start() happens at the
+first sample and update() runs at every sample, so loads[k] is what
+getLoad() returned at times[k] (ms, millis()). The rules are the ones in
+update(), including that every delay is "more than" (`now - start > d`),
+that the 500 ms inrush mask restarts every time the controller goes back to
+STATE_FORWARD, and that runDuration counts from start(), not from the last
+jam. Times are unwrapped int64, which matches the firmware's 32 bit
+unsigned arithmetic for any trace shorter than 49 days.
+
+Rather than stepping every sample, replay() jumps from one state change to
+the next for every lane at once: each state only waits for a time (a
+searchsorted() on the sample times) or, in STATE_FORWARD, for the first
+sample over the current limit after the mask (a searchsorted() on the
+sorted flat indices of those samples). A lane is one config x one trace,
+so the work is one short vectorized step per state change rather than a
+Python loop per sample, and an 8 hour trace costs no more than its jams.
+
+The replay is open loop: the trace is what the motor did when it was
+recorded (or synthetic_loads()), not what it would do under a different
+config. A jam that clears only when the drum reverses still ends when the
+trace says it did. That's fine for comparing current limits and recovery
+strategies against the same load history, which is what this is for.
+"""
+from enum import IntEnum
+from typing import NamedTuple
+
+import numpy as np
+
+
+class ShredderState(IntEnum):
+    """ShredderController.h's enum, same values."""
+    IDLE = 0
+    FORWARD = 1
+    JAM_DETECTED = 2
+    REVERSE_CLEARING = 3
+    IMPACT_PREP_BACKOFF = 4
+    IMPACT_STRIKE = 5
+    PAUSED = 6
+
+
+class ShredderConfig(NamedTuple):
+    """
+    ShredderConfig from ShredderController.h, with the constructor's
+    defaults. Any field may be an array: replay() broadcasts them together
+    into a grid of configs (see config_grid()).
+    """
+    forward_speed: int = 100             # forwardSpeed, 0-100
+    reverse_speed: int = 50              # reverseSpeed, 0-100
+    current_limit: int = 800             # currentLimit, 0-1023 ADC
+    run_duration: int = 0                # runDuration, ms, 0 = infinite
+    reverse_duration: int = 2000         # reverseDuration, ms
+    use_impact_mode: bool = False        # useImpactMode
+    impact_backoff_duration: int = 1000  # impactBackoffDuration, ms
+
+
+# Fixed delays hard coded in update(), ms
+INRUSH_MASK = 500  # STATE_FORWARD ignores the load for this long after entering it
+JAM_PAUSE = 500    # STATE_JAM_DETECTED waits this long with the motor stopped
+STRIKE_TIME = 500  # STATE_IMPACT_STRIKE drives at full speed this long
+
+CLEAR_TIME = 2000  # ms of forward running after a recovery that counts as a cleared jam
+
+NUM_STATES = len(ShredderState)
+
+
+class Replay(NamedTuple):
+    """replay() results, shaped config shape + (traces,)."""
+    state_time: np.ndarray     # ms spent in each ShredderState, (..., NUM_STATES)
+    elapsed: np.ndarray        # ms from the first sample to the last
+    jams: np.ndarray           # times STATE_JAM_DETECTED was entered (_jamCount)
+    cleared: np.ndarray        # jams followed by CLEAR_TIME of forward running
+    failed: np.ndarray         # jams that jammed again sooner
+    final_state: np.ndarray    # state after the last sample
+    overload_time: np.ndarray  # ms driving forward with load over `stall_load` (0 if not given)
+    transition_ticks: np.ndarray  # (..., max changes) sample index of each state change, -1 padded
+    transition_states: np.ndarray # state entered at that sample, -1 padded
+
+    @property
+    def duty_cycle(self):
+        """Fraction of the time in STATE_FORWARD, i.e. shredding."""
+        return self.state_time[..., ShredderState.FORWARD] / np.maximum(self.elapsed, 1)
+
+    @property
+    def clear_rate(self):
+        """Cleared / decided jams (NaN if none were); jams still being recovered at the end don't count."""
+        decided = self.cleared + self.failed
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(decided > 0, self.cleared / decided, np.nan)
+
+    @property
+    def jams_per_hour(self):
+        return self.jams * 3.6e6 / np.maximum(self.elapsed, 1)
+
+
+def config_grid(**fields):
+    """
+    A ShredderConfig of arrays, one axis per field given as a list (in the
+    order given), the rest at the firmware defaults:
+
+        config_grid(current_limit=[600, 800], use_impact_mode=[False, True])  # shape (2, 2)
+    """
+    axes = [np.asarray(values) for values in fields.values()]
+    grids = np.meshgrid(*axes, indexing="ij") if axes else []
+    return ShredderConfig()._replace(**dict(zip(fields, grids)))
+
+
+def replay(loads, times=None, config=ShredderConfig(), faults=None, period=10,
+           clear_time=CLEAR_TIME, stall_load=None):
+    """
+    Runs ShredderController over load traces for every config.
+
+    loads: (traces, samples) or (samples,), getLoad() at each update().
+    times: millis() at each update(), (samples,) shared or (traces, samples),
+        non-decreasing; default every `period` ms from 0.
+    config: a ShredderConfig (fields may be arrays, broadcast together) or a
+        list of them.
+    faults: isFaulted() at each update(), like loads; default never.
+    clear_time: forward running (ms) after a recovery for the jam to count
+        as cleared.
+    stall_load: if given, Replay.overload_time adds up the time spent
+        driving forward (STATE_FORWARD, STATE_IMPACT_STRIKE) at a load above
+        it, masked or not - the time the motor was stalled under power.
+
+    Returns a Replay shaped config shape + (traces,), without the trace axis
+    for a single (samples,) trace.
+    """
+    loads = np.asarray(loads)
+    single = loads.ndim == 1
+    loads = np.atleast_2d(loads)
+    num_traces, num_samples = loads.shape
+    if num_samples == 0:
+        raise ValueError("replay() needs at least one sample")
+    if times is None:
+        times = np.arange(num_samples, dtype=np.int64) * period
+    times = np.atleast_2d(np.asarray(times, dtype=np.int64))
+    if times.shape[-1] != num_samples or times.shape[0] not in (1, num_traces):
+        raise ValueError(f"times {times.shape} doesn't match loads {loads.shape}")
+    if np.any(np.diff(times, axis=-1) < 0):
+        raise ValueError("times must not decrease")
+    if faults is not None:
+        faults = np.broadcast_to(np.asarray(faults, dtype=bool), loads.shape)
+
+    if not isinstance(config, ShredderConfig):
+        config = ShredderConfig(*(np.stack([np.asarray(getattr(c, field)) for c in config])
+                                  for field in ShredderConfig._fields))
+    fields = np.broadcast_arrays(*(np.asarray(value) for value in config))
+    config_shape = fields[0].shape
+    shape = config_shape + (num_traces,)
+    lanes = int(np.prod(shape))
+
+    def per_lane(values, dtype):
+        return np.broadcast_to(np.asarray(values, dtype=dtype)[..., None], shape).ravel()
+
+    config = ShredderConfig(*(per_lane(value, np.int64) for value in fields))
+    impact = config.use_impact_mode.astype(bool)
+    trace = np.broadcast_to(np.arange(num_traces), shape).ravel()
+    row = trace if times.shape[0] > 1 else np.zeros(lanes, dtype=int)
+
+    after = _time_search(times)
+    jam_search = _threshold_search(loads, faults, config.current_limit, trace)
+    overload = None if stall_load is None else _overload_prefix(loads, times, stall_load)
+
+    # Per lane state; `entry` is the sample whose update() entered the state
+    # (-1 before the first update), `since` the firmware's _stateStartTime.
+    index = np.arange(lanes)
+    start_time = times[row, 0]
+    end_time = times[row, -1]
+    state = np.full(lanes, ShredderState.FORWARD, dtype=np.int8)
+    entry = np.full(lanes, -1, dtype=np.int64)
+    since = start_time.copy()
+    entered = start_time.copy()     # for time accounting; == since except before the first sample
+    recovering = np.zeros(lanes, dtype=bool) # this forward run follows a jam
+    state_time = np.zeros((lanes, NUM_STATES), dtype=np.int64)
+    jams = np.zeros(lanes, dtype=np.int64)
+    cleared = np.zeros(lanes, dtype=np.int64)
+    failed = np.zeros(lanes, dtype=np.int64)
+    overload_time = np.zeros(lanes, dtype=np.int64)
+    ticks, states = [], []
+
+    active = index
+    while len(active):
+        lane_state, lane_entry, lane_since = state[active], entry[active], since[active]
+        lane_row, lane_config = row[active], ShredderConfig(*(f[active] for f in config))
+        wait = np.select(
+            [lane_state == ShredderState.JAM_DETECTED, lane_state == ShredderState.REVERSE_CLEARING,
+             lane_state == ShredderState.IMPACT_PREP_BACKOFF, lane_state == ShredderState.IMPACT_STRIKE],
+            [JAM_PAUSE, lane_config.reverse_duration, lane_config.impact_backoff_duration, STRIKE_TIME],
+            INRUSH_MASK)
+        # Next sample where `now - since > wait`: the state's own timer, or
+        # for STATE_FORWARD the end of the inrush mask
+        tick = after(lane_row, lane_since + wait, lane_entry + 1)
+        next_state = np.select(
+            [lane_state == ShredderState.FORWARD, lane_state == ShredderState.JAM_DETECTED,
+             lane_state == ShredderState.REVERSE_CLEARING, lane_state == ShredderState.IMPACT_PREP_BACKOFF],
+            [ShredderState.JAM_DETECTED,
+             np.where(impact[active], ShredderState.IMPACT_PREP_BACKOFF, ShredderState.REVERSE_CLEARING),
+             ShredderState.FORWARD, ShredderState.IMPACT_STRIKE],
+            ShredderState.FORWARD).astype(np.int8)
+
+        forward = lane_state == ShredderState.FORWARD
+        if forward.any():
+            # First sample over the limit once the mask is over, unless the
+            # run timeout comes first (it's checked first in update())
+            lanes_forward = active[forward]
+            jam_tick = jam_search(lanes_forward, tick[forward])
+            timed = lane_config.run_duration[forward] > 0
+            timeout = np.where(timed, after(lane_row[forward], start_time[lanes_forward] +
+                                            lane_config.run_duration[forward], lane_entry[forward] + 1),
+                               num_samples)
+            tick[forward] = np.minimum(jam_tick, timeout)
+            next_state[forward] = np.where(timeout <= jam_tick, ShredderState.IDLE, ShredderState.JAM_DETECTED)
+
+        ended = tick >= num_samples
+        tick = np.minimum(tick, num_samples - 1)
+        now = np.where(ended, end_time[active], times[lane_row, tick])
+        state_time[active, lane_state] += now - entered[active]
+        if overload is not None:
+            driving = forward | (lane_state == ShredderState.IMPACT_STRIKE)
+            first = np.maximum(lane_entry, 0)
+            overload_time[active] += np.where(driving, overload[trace[active], tick] -
+                                              overload[trace[active], first], 0)
+
+        # Outcome of the forward run that just ended, if it followed a jam
+        run = forward & recovering[active]
+        good = run & (now - entered[active] >= clear_time)
+        cleared[active[good]] += 1
+        failed[active[run & ~good & ~ended & (next_state == ShredderState.JAM_DETECTED)]] += 1
+
+        moving = ~ended
+        moved = active[moving]
+        new_state = next_state[moving]
+        ticks.append(np.stack((moved, tick[moving])))
+        states.append(new_state)
+        jams[moved] += new_state == ShredderState.JAM_DETECTED
+        recovering[moved] = np.where(new_state == ShredderState.FORWARD, True,
+                                     np.where(new_state == ShredderState.JAM_DETECTED, False, recovering[moved]))
+        state[moved] = new_state
+        entry[moved] = tick[moving]
+        since[moved] = now[moving]
+        entered[moved] = now[moving]
+        # Wherever a lane ended up, it stays there to the end of the trace
+        state[active[ended]] = lane_state[ended]
+        active = moved[new_state != ShredderState.IDLE]
+
+    # Time left in the final state (IDLE once timed out)
+    idle = state == ShredderState.IDLE
+    state_time[idle, ShredderState.IDLE] += end_time[idle] - entered[idle]
+
+    transition_ticks, transition_states = _pad_transitions(ticks, states, lanes)
+    results = []
+    for value in (state_time, end_time - start_time, jams, cleared, failed, state, overload_time,
+                  transition_ticks, transition_states):
+        value = value.reshape(shape + value.shape[1:])
+        results.append(np.take(value, 0, axis=len(config_shape)) if single else value)
+    return Replay(*results)
+
+
+def timeline(result, num_samples):
+    """The state after every update(), (..., num_samples) int8, from a Replay's transitions."""
+    ticks, states = result.transition_ticks, result.transition_states
+    timeline = np.full(ticks.shape[:-1] + (num_samples + 1,), -1, dtype=np.int8)
+    lanes = np.indices(ticks.shape)[:-1]
+    valid = ticks >= 0
+    timeline[tuple(index[valid] for index in lanes) + (ticks[valid],)] = states[valid]
+    timeline[..., 0] = np.where(timeline[..., 0] < 0, ShredderState.FORWARD, timeline[..., 0])
+    # Carry each state forward to the next change
+    position = np.where(timeline >= 0, np.arange(num_samples + 1), 0)
+    position = np.maximum.accumulate(position, axis=-1)
+    return np.take_along_axis(timeline, position, axis=-1)[..., :num_samples]
+
+
+def synthetic_loads(traces=1000, duration=600e3, period=10, base=250, noise=30,
+                    spike_rate=6.0, spike_load=(500, 950), spike_time=(50, 400),
+                    jam_rate=20.0, jam_load=1000, jam_time=3000, seed=None):
+    """
+    Made-up current traces, (traces, duration / period) ADC counts, for
+    replay() when there's no recording: a running load with noise, brief
+    spikes as chunks pass the knife (`spike_rate` per minute, a uniform
+    level and length in the given ranges) and jams (`jam_rate` per hour,
+    at `jam_load` for an exponentially distributed time, mean `jam_time`
+    ms). Overlaps add up; everything is clipped to the 10 bit ADC range.
+    """
+    rng = np.random.default_rng(seed)
+    samples = int(duration // period)
+    steps = np.zeros((traces, samples + 1), dtype=np.float32)
+    for rate, level, length in ((spike_rate / 60e3, lambda n: rng.uniform(*spike_load, n),
+                                 lambda n: rng.uniform(*spike_time, n)),
+                                (jam_rate / 3.6e6, lambda n: np.full(n, float(jam_load)),
+                                 lambda n: rng.exponential(jam_time, n))):
+        counts = rng.poisson(rate * duration, traces)
+        trace = np.repeat(np.arange(traces), counts)
+        count = len(trace)
+        begin = rng.integers(0, samples, count)
+        end = np.minimum(begin + np.maximum(length(count) // period, 1).astype(int), samples)
+        height = level(count) - base
+        np.add.at(steps, (trace, begin), height)
+        np.add.at(steps, (trace, end), -height)
+    loads = np.cumsum(steps[:, :samples], axis=-1, out=steps[:, :samples])
+    loads += base + noise * rng.standard_normal((traces, samples), dtype=np.float32)
+    return np.clip(np.rint(loads), 0, 1023).astype(np.int16)
+
+
+# =============================================================================
+# Searches
+# =============================================================================
+
+def _time_search(times):
+    """
+    after(rows, threshold, first): per lane, the first sample index >= first
+    whose time in times[rows] is > threshold (the firmware's `now - start >
+    d`), or the number of samples if there is none.
+    """
+    num_rows, num_samples = times.shape
+    low, high = times[:, 0], times[:, -1]
+    # All rows in one sorted array: row r's times shifted to start at r * stride
+    stride = int((high - low).max()) + 2
+    keys = (times - low[:, None] + np.arange(num_rows)[:, None] * stride).ravel()
+
+    def after(rows, threshold, first):
+        offset = rows * stride - low[rows]
+        clipped = np.clip(threshold, low[rows] - 1, high[rows])
+        found = np.searchsorted(keys, clipped + offset, side="right") - rows * num_samples
+        found = np.where(threshold >= high[rows], num_samples, found)
+        return np.maximum(found, first)
+
+    return after
+
+
+def _threshold_search(loads, faults, limits, trace, chunk=1 << 24):
+    """
+    jam(lanes, first): per lane, the first sample index >= first where
+    getLoad() > currentLimit or isFaulted(), or the number of samples.
+    """
+    num_samples = loads.shape[1]
+    lanes = len(trace)
+    step = max(1, chunk // num_samples)
+    hits = []
+    for begin in range(0, lanes, step):
+        chunk_lanes = np.arange(begin, min(begin + step, lanes))
+        over = loads[trace[chunk_lanes]] > limits[chunk_lanes, None]
+        if faults is not None:
+            over |= faults[trace[chunk_lanes]]
+        hits.append(np.flatnonzero(over) + begin * num_samples)
+    hits = np.concatenate(hits) # lane * num_samples + sample, sorted
+
+    def jam(lanes, first):
+        position = np.searchsorted(hits, lanes * num_samples + first)
+        found = hits[np.minimum(position, len(hits) - 1)] - lanes * num_samples if len(hits) else \
+            np.full(len(lanes), num_samples)
+        return np.where((position < len(hits)) & (found < num_samples), found, num_samples)
+
+    return jam
+
+
+def _overload_prefix(loads, times, stall_load):
+    """Per trace, ms of load over stall_load before each sample (a sample's load holds until the next)."""
+    dt = np.diff(np.broadcast_to(times, loads.shape), axis=-1)
+    over = np.where(loads[:, :-1] > stall_load, dt, 0)
+    return np.concatenate((np.zeros((len(loads), 1), dtype=np.int64), np.cumsum(over, axis=-1)), axis=-1)
+
+
+def _pad_transitions(ticks, states, lanes):
+    """Per lane (sample, state) lists from replay()'s rounds, -1 padded to the longest."""
+    if not ticks:
+        return np.full((lanes, 0), -1, dtype=np.int64), np.full((lanes, 0), -1, dtype=np.int8)
+    lane, tick = np.concatenate(ticks, axis=1)
+    state = np.concatenate(states)
+    order = np.argsort(lane, kind="stable") # rounds are in time order
+    lane, tick, state = lane[order], tick[order], state[order]
+    counts = np.bincount(lane, minlength=lanes)
+    column = np.arange(len(lane)) - np.repeat(np.cumsum(counts) - counts, counts)
+    width = int(counts.max()) if len(counts) else 0
+    padded_ticks = np.full((lanes, width), -1, dtype=np.int64)
+    padded_states = np.full((lanes, width), -1, dtype=np.int8)
+    padded_ticks[lane, column] = tick
+    padded_states[lane, column] = state
+    return padded_ticks, padded_states
+
+
+if __name__ == "__main__":
+    import time
+
+    loads = synthetic_loads(traces=500, duration=1200e3, seed=1) # 20 minutes each, 10 ms loop
+    grid = config_grid(current_limit=[600, 700, 800, 900], use_impact_mode=[False, True])
+    start = time.perf_counter()
+    result = replay(loads, config=grid, stall_load=900)
+    print(f"{loads.shape[0]} traces x {loads.shape[1]} samples x {grid.current_limit.size} configs "
+          f"in {time.perf_counter() - start:.2f} s")
+    print("limit  impact  duty   jams/h  cleared  stalled s/h")
+    for i, limit in enumerate(grid.current_limit[:, 0]):
+        for j, impact in enumerate(grid.use_impact_mode[0]):
+            print(f"{limit:5d}  {str(bool(impact)):6s}  {result.duty_cycle[i, j].mean():.3f}  "
+                  f"{result.jams_per_hour[i, j].mean():6.1f}  {np.nanmean(result.clear_rate[i, j]):7.2f}  "
+                  f"{(result.overload_time[i, j] / result.elapsed[i, j]).mean() * 3600:11.1f}")
@@ -0,0 +1,496 @@
+"""
+Telemetry from the motor controller: frame parsing, a ring buffer for live
+statistics and a memory-mapped column store for whole shifts.
+
+With TELEMETRY_ENABLED the sketch sends a 20 byte TelemetryFrame
+(Arduino_Motor_Controller/Telemetry.h) every 10 ms instead of the text
+status line:
+
+    ingester = Ingester(store=TelemetryStore("shift_01"))
+    ingester.run("/dev/ttyACM0")                 # needs pyserial
+    # or feed it bytes from anywhere:
+    ingester.feed(data)
+    ingester.stats(window=60e3)                  # last minute: Summary
+
+    store = TelemetryStore("shift_01", mode="r") # later
+    summarize(store), rolling(store, window=600e3)
+
+FrameParser.feed() takes whatever the serial port returned and handles it
+as one array: every sync pair is a candidate, all candidates are gathered
+into a (candidates, 20) byte matrix and checked with a vectorized
+Fletcher-16, so there's no Python loop per byte or per frame. Partial frames
+carry over to the next call; noise, text (the startup messages) and corrupt
+frames are skipped and counted. The firmware's 32 bit millis() is unwrapped
+into int64, and a reboot (time going backwards) continues the timeline
+rather than breaking it.
+
+Parsed frames become records (RECORD_DTYPE). The store keeps each field in
+its own flat file, memory mapped and grown in large steps, so reading one
+column of an 8 hour shift (2.9 million records at 100 Hz) touches only that
+column and nothing has to fit in memory at once.
+"""
+import json
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from .controller import NUM_STATES, ShredderState
+
+SYNC = (0xA5, 0x5A)
+FRAME_SIZE = 20
+FLAG_FAULTED = 0x01
+FLAG_IMPACT = 0x02
+
+# Wire format (Telemetry.h), little endian, packed
+FRAME_DTYPE = np.dtype([("sync", "<u2"), ("sequence", "u1"), ("state", "u1"), ("time", "<u4"),
+                        ("state_start", "<u4"), ("load", "<u2"), ("speed", "i1"), ("flags", "u1"),
+                        ("jams", "<u2"), ("checksum", "<u2")])
+assert FRAME_DTYPE.itemsize == FRAME_SIZE
+
+# Parsed frame: times unwrapped to int64 ms
+RECORD_DTYPE = np.dtype([("time", "<i8"), ("state_start", "<i8"), ("sequence", "u1"), ("state", "u1"),
+                         ("load", "<u2"), ("speed", "i1"), ("flags", "u1"), ("jams", "<u2")])
+
+IDLE_LOAD = 350        # ADC counts; a bit over the empty drum's load, so more is cutting (calibrate per machine)
+RING_CAPACITY = 360000 # records, an hour at 100 frames/s
+STORE_GROWTH = 360000  # records added to the store's files at a time
+
+
+def checksum(data):
+    """Fletcher-16 (Telemetry.cpp's telemetryChecksum()) of each row of `data` (rows x bytes)."""
+    data = np.asarray(data, dtype=np.int64)
+    # sum1 is the running sum mod 255 and sum2 the sum of those, so both
+    # come from one cumulative sum
+    running = np.cumsum(data, axis=-1)
+    return (((running.sum(axis=-1) % 255) << 8) | (running[..., -1] % 255)).astype(np.uint16)
+
+
+def encode(records):
+    """
+    Frames for `records` (RECORD_DTYPE) as the firmware sends them, e.g. to
+    replay a stored session or to test a reader.
+    """
+    records = np.asarray(records, dtype=RECORD_DTYPE)
+    frames = np.zeros(len(records), dtype=FRAME_DTYPE)
+    frames["sync"] = SYNC[0] | SYNC[1] << 8
+    for field in ("sequence", "state", "load", "speed", "flags", "jams"):
+        frames[field] = records[field]
+    frames["time"] = records["time"] % (1 << 32)
+    frames["state_start"] = records["state_start"] % (1 << 32)
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)
+    frames["checksum"] = checksum(raw[:, 2:18])
+    return frames.tobytes()
+
+
+class FrameParser:
+    """
+    Incremental TelemetryFrame parser: feed() it bytes as they arrive, get
+    the complete frames back as records. Counts `frames`, `dropped` (gaps in
+    the sequence numbers), `rejected` (sync bytes with a bad checksum) and
+    `skipped` (bytes that weren't part of a frame).
+    """
+
+    def __init__(self):
+        self._carry = b""
+        self._last_raw = None  # previous frame's raw time, sequence and unwrapped time
+        self._last_sequence = None
+        self._last_time = 0
+        self.frames = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.skipped = 0
+
+    def feed(self, data):
+        """Parses `data` (bytes) plus whatever was left over; returns the new records."""
+        buffer = np.frombuffer(self._carry + bytes(data), dtype=np.uint8)
+        size = len(buffer)
+        starts = np.flatnonzero((buffer[:-1] == SYNC[0]) & (buffer[1:] == SYNC[1]))
+        starts = starts[starts + FRAME_SIZE <= size]
+        raw = buffer[starts[:, None] + np.arange(FRAME_SIZE)]
+        good = checksum(raw[:, 2:18]) == (raw[:, 18].astype(np.uint16) | raw[:, 19].astype(np.uint16) << 8)
+        accepted = starts[good]
+        if len(accepted) > 1 and np.any(np.diff(accepted) < FRAME_SIZE):
+            # A frame whose payload happens to contain another valid frame's
+            # start; first come, first served (rare: it needs the checksum to match too)
+            keep, end = [], -1
+            for position, start in enumerate(accepted):
+                if start >= end:
+                    keep.append(position)
+                    end = start + FRAME_SIZE
+            accepted = accepted[keep]
+        raw = buffer[accepted[:, None] + np.arange(FRAME_SIZE)]
+
+        # Sync pairs inside accepted frames aren't rejections, just payload
+        bad = starts[~good]
+        inside = np.searchsorted(accepted, bad, side="right") - 1
+        inside = (inside >= 0) & (bad < accepted[np.maximum(inside, 0)] + FRAME_SIZE) if len(accepted) else \
+            np.zeros(len(bad), dtype=bool)
+        self.rejected += int(np.count_nonzero(~inside))
+
+        # Keep what could still be the start of a frame
+        end = int(accepted[-1]) + FRAME_SIZE if len(accepted) else 0
+        keep_from = max(end, size - (FRAME_SIZE - 1))
+        self.skipped += keep_from - FRAME_SIZE * len(accepted)
+        self._carry = buffer[keep_from:].tobytes()
+        self.frames += len(accepted)
+        return self._records(raw.copy().view(FRAME_DTYPE)[:, 0] if len(raw) else np.zeros(0, FRAME_DTYPE))
+
+    def _records(self, frames):
+        records = np.zeros(len(frames), dtype=RECORD_DTYPE)
+        if not len(frames):
+            return records
+        for field in ("sequence", "state", "load", "speed", "flags", "jams"):
+            records[field] = frames[field]
+
+        raw = frames["time"].astype(np.int64)
+        previous = np.concatenate(([raw[0] if self._last_raw is None else self._last_raw], raw[:-1]))
+        step = (raw - previous) % (1 << 32)
+        step[step >= 1 << 31] = 0 # went backwards: a reboot, not a wrap
+        start = raw[0] if self._last_raw is None else self._last_time
+        records["time"] = start + np.cumsum(step)
+        records["state_start"] = records["time"] - (raw - frames["state_start"].astype(np.int64)) % (1 << 32)
+
+        sequence = records["sequence"].astype(np.int64)
+        previous = np.concatenate(([sequence[0] - 1 if self._last_sequence is None else self._last_sequence],
+                                   sequence[:-1]))
+        self.dropped += int(((sequence - previous - 1) % 256).sum())
+        self._last_raw, self._last_time, self._last_sequence = raw[-1], records["time"][-1], sequence[-1]
+        return records
+
+
+class RingBuffer:
+    """The last `capacity` records, oldest overwritten first."""
+
+    def __init__(self, capacity=RING_CAPACITY, dtype=RECORD_DTYPE):
+        self._data = np.zeros(capacity, dtype=dtype)
+        self._next = 0 # where the next record goes
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def extend(self, records):
+        capacity = len(self._data)
+        records = records[-capacity:]
+        count = len(records)
+        first = min(count, capacity - self._next)
+        self._data[self._next:self._next + first] = records[:first]
+        self._data[:count - first] = records[first:]
+        self._next = (self._next + count) % capacity
+        self._count = min(self._count + count, capacity)
+
+    def view(self):
+        """The records in order, oldest first (a copy)."""
+        if self._count < len(self._data):
+            return self._data[:self._count].copy()
+        return np.roll(self._data, -self._next)
+
+    def since(self, time):
+        """The records from `time` (ms) on."""
+        records = self.view()
+        return records[np.searchsorted(records["time"], time):]
+
+
+# =============================================================================
+# Statistics
+# =============================================================================
+
+class Summary(NamedTuple):
+    duration: float          # ms covered
+    state_time: np.ndarray   # ms in each ShredderState
+    jams: int
+    jams_per_hour: float
+    duty_cycle: float        # fraction of the time in STATE_FORWARD
+    cutting_fraction: float  # ... of that, at a load over idle_load
+    throughput: float        # kg/h at `rate` kg per hour of cutting (NaN without one)
+
+
+def summarize(records, idle_load=IDLE_LOAD, rate=None):
+    """
+    Summary of a run of records (a RECORD_DTYPE array, a TelemetryStore or
+    anything indexable by field name). Each record's state and load count
+    until the next record.
+    """
+    time = np.asarray(records["time"])
+    state = np.asarray(records["state"])[:-1]
+    dt = np.diff(time)
+    duration = float(time[-1] - time[0]) if len(time) else 0.0
+    state_time = np.bincount(state, weights=dt, minlength=NUM_STATES)
+    cutting = float(dt[(state == ShredderState.FORWARD) & (np.asarray(records["load"])[:-1] > idle_load)].sum())
+    jams = int(_jam_increments(np.asarray(records["jams"])).sum())
+    hours = max(duration, 1.0) / 3.6e6
+    cutting_fraction = cutting / max(duration, 1.0)
+    return Summary(duration, state_time, jams, jams / hours, state_time[ShredderState.FORWARD] / max(duration, 1.0),
+                   cutting_fraction, np.nan if rate is None else rate * cutting_fraction)
+
+
+class Rolling(NamedTuple):
+    time: np.ndarray             # ms, end of each window
+    state_fraction: np.ndarray   # (windows, NUM_STATES)
+    jams_per_hour: np.ndarray
+    cutting_fraction: np.ndarray
+    throughput: np.ndarray       # kg/h, NaN without a rate
+
+
+def rolling(records, window=600e3, step=60e3, idle_load=IDLE_LOAD, rate=None):
+    """
+    Summary figures over a `window` ms wide window every `step` ms, from
+    cumulative sums (one pass over the records, however many windows).
+    """
+    time = np.asarray(records["time"])
+    if not len(time):
+        # Nothing recorded yet (a new store): no windows
+        return Rolling(time, np.zeros((0, NUM_STATES)), *np.zeros((3, 0)))
+    state = np.asarray(records["state"])
+    load = np.asarray(records["load"])
+    dt = np.diff(time, append=time[-1]).astype(float)
+
+    # Cumulative ms per state (and cutting, and jams) up to each record
+    weights = np.zeros((len(time), NUM_STATES + 2))
+    weights[np.arange(len(time)), state] = dt
+    weights[:, NUM_STATES] = dt * ((state == ShredderState.FORWARD) & (load > idle_load))
+    weights[1:, NUM_STATES + 1] = _jam_increments(np.asarray(records["jams"]))
+    cumulative = np.vstack((np.zeros(NUM_STATES + 2), np.cumsum(weights, axis=0)))
+
+    ends = np.arange(time[0] + window, time[-1] + step, step)
+    if not len(ends):
+        ends = np.array([time[-1]])
+    begin = np.searchsorted(time, ends - window)
+    end = np.searchsorted(time, ends)
+    totals = cumulative[end] - cumulative[begin]
+    span = np.maximum(totals[:, :NUM_STATES].sum(axis=1), 1.0)
+    cutting_fraction = totals[:, NUM_STATES] / span
+    return Rolling(ends, totals[:, :NUM_STATES] / span[:, None], totals[:, NUM_STATES + 1] * 3.6e6 / span,
+                   cutting_fraction, cutting_fraction * (np.nan if rate is None else rate))
+
+
+def _jam_increments(jams):
+    """New jams between records from the firmware's _jamCount (16 bits, back to 0 on start())."""
+    jams = jams.astype(np.int64)
+    change = np.diff(jams) % (1 << 16)
+    restarted = jams[1:] < jams[:-1]
+    return np.where(restarted & (change > 1 << 15), jams[1:], change)
+
+
+# =============================================================================
+# Storage
+# =============================================================================
+
+class TelemetryStore:
+    """
+    A directory of memory-mapped column files, one per RECORD_DTYPE field
+    (<field>.bin, raw little endian) plus meta.json with the record count.
+    Columns grow STORE_GROWTH records at a time. mode "a" appends (and
+    creates), "r" reads; store["load"] is a column, len(store) the count.
+    """
+
+    def __init__(self, path, mode="a", dtype=RECORD_DTYPE):
+        self.path = path
+        self.mode = mode
+        self.dtype = dtype
+        meta = os.path.join(path, "meta.json")
+        if os.path.exists(meta):
+            with open(meta) as f:
+                info = json.load(f)
+            self.dtype = np.dtype([(name, kind) for name, kind in info["columns"]])
+            self._count = info["count"]
+        elif mode == "r":
+            raise FileNotFoundError(f"no telemetry store at {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self._count = 0
+            self._write_meta()
+        self._columns = {}
+        self._capacity = 0
+        self._map(self._count)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, name):
+        return self._columns[name][:self._count]
+
+    def records(self, start=0, stop=None):
+        """Records start..stop as one RECORD_DTYPE array (a copy)."""
+        stop = self._count if stop is None else min(stop, self._count)
+        records = np.zeros(max(stop - start, 0), dtype=self.dtype)
+        for name in self.dtype.names:
+            records[name] = self._columns[name][start:stop]
+        return records
+
+    def append(self, records):
+        if self.mode == "r":
+            raise ValueError("the store is open read only")
+        count = len(records)
+        if not count:
+            return
+        if self._count + count > self._capacity:
+            self._map(self._count + count + STORE_GROWTH)
+        for name in self.dtype.names:
+            self._columns[name][self._count:self._count + count] = records[name]
+        self._count += count
+        self._write_meta()
+
+    def flush(self):
+        for column in self._columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+
+    def close(self):
+        if self.mode != "r":
+            self.flush()
+            # Trim the spare room
+            self._columns = {}
+            for name in self.dtype.names:
+                with open(self._file(name), "r+b") as f:
+                    f.truncate(self._count * self.dtype[name].itemsize)
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _map(self, capacity):
+        """(Re)maps every column with room for `capacity` records."""
+        self.flush()
+        self._columns = {}
+        for name in self.dtype.names:
+            kind = self.dtype[name]
+            path = self._file(name)
+            if self.mode != "r":
+                with open(path, "ab") as f:
+                    if f.tell() < capacity * kind.itemsize:
+                        f.truncate(capacity * kind.itemsize)
+            size = os.path.getsize(path) // kind.itemsize if os.path.exists(path) else 0
+            self._columns[name] = np.memmap(path, dtype=kind, mode="r" if self.mode == "r" else "r+",
+                                            shape=(size,)) if size else np.zeros(0, dtype=kind)
+        self._capacity = min(len(column) for column in self._columns.values())
+
+    def _write_meta(self):
+        meta = os.path.join(self.path, "meta.json")
+        with open(meta + ".tmp", "w") as f:
+            json.dump({"count": self._count,
+                       "columns": [(name, self.dtype[name].str) for name in self.dtype.names]}, f)
+        os.replace(meta + ".tmp", meta)
+
+
+# =============================================================================
+# Ingestion
+# =============================================================================
+
+class Ingester:
+    """Parser + ring buffer (+ store): feed() bytes, read stats() at any time."""
+
+    def __init__(self, store=None, capacity=RING_CAPACITY, idle_load=IDLE_LOAD, rate=None):
+        self.parser = FrameParser()
+        self.ring = RingBuffer(capacity)
+        self.store = store
+        self.idle_load = idle_load
+        self.rate = rate
+
+    def feed(self, data):
+        records = self.parser.feed(data)
+        if len(records):
+            self.ring.extend(records)
+            if self.store is not None:
+                self.store.append(records)
+        return records
+
+    def stats(self, window=60e3):
+        """Summary of the last `window` ms in the ring buffer (None before two frames)."""
+        if len(self.ring) < 2:
+            return None
+        records = self.ring.view()
+        return summarize(records[np.searchsorted(records["time"], records["time"][-1] - window):],
+                         self.idle_load, self.rate)
+
+    def run(self, port, baudrate=115200, report=10.0, window=60e3):
+        """Reads `port` until interrupted, printing stats() every `report` s."""
+        try:
+            import serial
+        except ImportError:
+            raise ImportError("reading a serial port needs pyserial: pip install pyserial") from None
+        import time
+
+        last = time.monotonic()
+        with serial.Serial(port, baudrate, timeout=0.1) as connection:
+            try:
+                while True:
+                    self.feed(connection.read(max(connection.in_waiting, 1)))
+                    if time.monotonic() - last >= report:
+                        last = time.monotonic()
+                        print(_report(self.stats(window), self.parser))
+            except KeyboardInterrupt:
+                pass
+        if self.store is not None:
+            self.store.close()
+
+
+def _report(summary, parser):
+    if summary is None:
+        return f"waiting for frames ({parser.skipped} bytes skipped)"
+    busiest = np.argsort(summary.state_time)[::-1][:3]
+    states = ", ".join(f"{ShredderState(i).name} {summary.state_time[i] / max(summary.duration, 1):.0%}"
+                       for i in busiest if summary.state_time[i] > 0)
+    return (f"{summary.duration / 1e3:6.0f} s: {states}; {summary.jams} jams ({summary.jams_per_hour:.0f}/h), "
+            f"cutting {summary.cutting_fraction:.0%}; frames {parser.frames}, dropped {parser.dropped}, "
+            f"rejected {parser.rejected}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Motor controller telemetry: read a port, or a synthetic shift")
+    parser.add_argument("port", nargs="?", help="serial port; without one, parses a synthetic 8 hour shift")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--store", help="directory to store the session in")
+    args = parser.parse_args()
+    if args.port:
+        Ingester(TelemetryStore(args.store) if args.store else None).run(args.port, args.baud)
+        sys.exit()
+
+    # The controller replayed over a synthetic shift, as it would have sent it
+    from .controller import replay, synthetic_loads, timeline
+
+    period = 10
+    loads = synthetic_loads(traces=1, duration=8 * 3.6e6, period=period, seed=3)[0]
+    result = replay(loads, period=period)
+    states = timeline(result, len(loads))
+    records = np.zeros(len(loads), dtype=RECORD_DTYPE)
+    records["time"] = np.arange(len(loads)) * period
+    records["sequence"] = np.arange(len(loads)) % 256
+    records["state"], records["load"] = states, loads
+    changed = np.flatnonzero(np.diff(states, prepend=-1))
+    records["state_start"] = records["time"][changed][np.searchsorted(changed, np.arange(len(loads)), "right") - 1]
+    records["jams"] = np.cumsum(np.diff(states, prepend=states[0]).astype(bool) & (states == ShredderState.JAM_DETECTED))
+    data = b"Shredder Controller Starting...\r\n" + encode(records)
+    print(f"{len(records)} frames, {len(data) / 1e6:.1f} MB (a shift at 115200 baud is "
+          f"{8 * 3600 * 11520 / 1e6:.0f} MB of line time)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        ingester = Ingester(TelemetryStore(os.path.join(directory, "shift")))
+        start = time.perf_counter()
+        for offset in range(0, len(data), 4096): # serial sized reads
+            ingester.feed(data[offset:offset + 4096])
+        ingester.store.close()
+        elapsed = time.perf_counter() - start
+        print(f"Parsed and stored in {elapsed:.2f} s ({len(data) / elapsed / 11520:.0f}x line rate)")
+        print(_report(ingester.stats(), ingester.parser))
+
+        store = TelemetryStore(os.path.join(directory, "shift"), mode="r")
+        start = time.perf_counter()
+        shift = summarize(store)
+        hourly = rolling(store, window=3.6e6, step=3.6e6)
+        print(f"Shift from the store ({time.perf_counter() - start:.2f} s): {shift.jams} jams "
+              f"({result.jams} in the replay), duty {shift.duty_cycle:.1%} ({result.duty_cycle:.1%}), "
+              f"cutting {shift.cutting_fraction:.1%}")
+        print("Hourly jams:", " ".join(f"{j:.0f}" for j in hourly.jams_per_hour))
@@ -0,0 +1,165 @@
+"""
+Tests for controller.py: replay() against a step-by-step reference that
+runs ShredderController::update() one sample at a time, on random traces
+and on the edge cases the vectorized search has to get right.
+
+    python3 -m pytest -q shredder_host/test_controller.py   (from Firmware/)
+"""
+import numpy as np
+import pytest
+
+from .controller import (CLEAR_TIME, INRUSH_MASK, JAM_PAUSE, NUM_STATES, STRIKE_TIME, ShredderConfig,
+                         ShredderState, config_grid, replay, timeline)
+
+FORWARD, JAM, REVERSE = ShredderState.FORWARD, ShredderState.JAM_DETECTED, ShredderState.REVERSE_CLEARING
+BACKOFF, STRIKE, IDLE = ShredderState.IMPACT_PREP_BACKOFF, ShredderState.IMPACT_STRIKE, ShredderState.IDLE
+
+
+def reference(loads, times, config=ShredderConfig(), faults=None, clear_time=CLEAR_TIME, stall_load=None):
+    """
+    ShredderController.cpp line by line: start() at the first sample, then
+    update() at every sample. Returns the state after each update() and the
+    Replay fields worked out from that.
+    """
+    state, since, run_start, jams = FORWARD, times[0], times[0], 0
+    states = []
+    for k, now in enumerate(times):
+        if state == FORWARD:
+            if config.run_duration > 0 and now - run_start > config.run_duration:
+                state = IDLE
+            elif now - since > INRUSH_MASK and (loads[k] > config.current_limit or (faults is not None and faults[k])):
+                state, since, jams = JAM, now, jams + 1
+        elif state == JAM:
+            if now - since > JAM_PAUSE:
+                state, since = (BACKOFF if config.use_impact_mode else REVERSE), now
+        elif state == REVERSE:
+            if now - since > config.reverse_duration:
+                state, since = FORWARD, now
+        elif state == BACKOFF:
+            if now - since > config.impact_backoff_duration:
+                state, since = STRIKE, now
+        elif state == STRIKE:
+            if now - since > STRIKE_TIME:
+                state, since = FORWARD, now
+        states.append(state)
+
+    # Sample k's state holds from times[k] to times[k + 1]
+    held = np.diff(times)
+    state_time = np.bincount(states[:-1], weights=held, minlength=NUM_STATES).astype(np.int64)
+    driving = np.isin(states[:-1], [FORWARD, STRIKE]) & (np.asarray(loads[:-1]) > stall_load) \
+        if stall_load is not None else np.zeros(len(held), dtype=bool)
+
+    # Each forward run that follows a recovery clears the jam or doesn't
+    cleared = failed = 0
+    previous, begin = FORWARD, None
+    for k, state in enumerate(states):
+        if state == FORWARD and previous in (REVERSE, STRIKE):
+            begin = times[k]
+        elif state != FORWARD and begin is not None:
+            cleared += times[k] - begin >= clear_time
+            failed += times[k] - begin < clear_time and state == JAM
+            begin = None
+        previous = state
+    if begin is not None:
+        cleared += times[-1] - begin >= clear_time
+
+    return dict(states=states, state_time=state_time, elapsed=times[-1] - times[0], jams=jams, cleared=cleared,
+                failed=failed, final_state=states[-1], overload_time=int(held[driving].sum()))
+
+
+def assert_matches(result, expected, num_samples):
+    assert list(timeline(result, num_samples)) == expected["states"]
+    for field in ("state_time", "elapsed", "jams", "cleared", "failed", "final_state", "overload_time"):
+        assert np.array_equal(getattr(result, field), expected[field]), field
+
+
+def random_trace(rng, samples):
+    """Loads with jams of random length, on a clock with jitter and repeated millis() values."""
+    times = np.cumsum(rng.choice([0, 0, 1, 9, 10, 10, 10, 11, 250], samples))
+    loads = rng.normal(300, 50, samples)
+    for begin in rng.integers(0, samples, rng.integers(0, 8)):
+        loads[begin:begin + rng.integers(1, 400)] = rng.choice([850, 1000])
+    faults = rng.random(samples) < 0.001
+    return np.clip(loads, 0, 1023).astype(int), times, faults
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_replay_matches_stepping_update(seed):
+    rng = np.random.default_rng(seed)
+    loads, times, faults = random_trace(rng, 3000)
+    grid = config_grid(current_limit=[700, 900], run_duration=[0, 15000], use_impact_mode=[False, True],
+                       reverse_duration=[300, 2000])
+    result = replay(loads, times, grid, faults=faults, stall_load=800)
+    for index in np.ndindex(result.jams.shape):
+        config = ShredderConfig(*(int(np.broadcast_to(field, result.jams.shape)[index]) for field in grid))
+        lane = type(result)(*(value[index] for value in result))
+        assert_matches(lane, reference(loads, times, config, faults, stall_load=800), len(times))
+
+
+def test_many_traces_at_once():
+    rng = np.random.default_rng(10)
+    traces = [random_trace(rng, 1000) for _ in range(5)]
+    loads, times, faults = (np.stack(parts) for parts in zip(*traces))
+    config = ShredderConfig(use_impact_mode=True, current_limit=750)
+    result = replay(loads, times, config, faults=faults, clear_time=500)
+    for k in range(len(traces)):
+        lane = type(result)(*(value[k] for value in result))
+        assert_matches(lane, reference(loads[k], times[k], config, faults[k], clear_time=500), 1000)
+
+
+def test_timeout_wins_over_a_jam_on_the_same_sample():
+    # At 1010 ms the run is over (1010 > 1000) and the load is over the limit: update() checks the timeout first
+    times = np.arange(0, 1100, 10)
+    loads = np.where(times >= 1010, 1000, 0)
+    result = replay(loads, times, ShredderConfig(run_duration=1000))
+    assert result.final_state == IDLE and result.jams == 0
+    assert list(result.transition_ticks) == [101] and list(result.transition_states) == [IDLE]
+    # A step earlier the jam comes first
+    result = replay(np.where(times >= 1000, 1000, 0), times, ShredderConfig(run_duration=1000))
+    assert list(result.transition_states) == [JAM] and result.jams == 1
+
+
+def test_repeated_timestamps():
+    # millis() doesn't move between some updates: the mask ends at the first sample past 500 ms, not the first
+    # sample after one at 500 ms
+    times = np.array([0, 500, 500, 501, 501, 1001, 1001, 1002, 3002, 3003, 3003])
+    loads = np.full(len(times), 1000)
+    result = replay(loads, times)
+    expected = reference(loads, times)
+    assert_matches(result, expected, len(times))
+    assert expected["states"] == [FORWARD] * 3 + [JAM] * 4 + [REVERSE] * 2 + [FORWARD] * 2
+    assert list(result.transition_ticks[:3]) == [3, 7, 9]
+
+
+def test_faults_count_as_jams_after_the_mask():
+    times = np.arange(0, 2000, 10)
+    faults = np.isin(times, [300, 800])
+    result = replay(np.zeros(len(times)), times, faults=faults)
+    assert result.jams == 1 and result.transition_ticks[0] == 80 # the fault at 300 ms is masked
+    assert_matches(result, reference(np.zeros(len(times)), times, faults=faults), len(times))
+
+
+def test_impact_mode_backs_off_then_strikes():
+    times = np.arange(0, 6000, 10)
+    loads = np.where((times >= 1000) & (times < 1100), 1000, 200)
+    config = ShredderConfig(use_impact_mode=True, impact_backoff_duration=700)
+    result = replay(loads, times, config)
+    # Jam at 1000, backoff at 1510, strike at 2220, forward again at 2730
+    assert list(result.transition_states) == [JAM, BACKOFF, STRIKE, FORWARD]
+    assert list(times[result.transition_ticks]) == [1000, 1510, 2220, 2730]
+    assert result.cleared == 1 and result.failed == 0
+    assert_matches(result, reference(loads, times, config), len(times))
+
+
+def test_state_time_adds_up_to_the_timeline():
+    rng = np.random.default_rng(20)
+    loads, times, faults = random_trace(rng, 5000)
+    grid = config_grid(use_impact_mode=[False, True], run_duration=[0, 40000])
+    result = replay(loads, times, grid, faults=faults)
+    states = timeline(result, len(times))
+    assert states.shape == (2, 2, len(times))
+    assert np.all(result.state_time.sum(axis=-1) == result.elapsed)
+    for index in np.ndindex(2, 2):
+        held = np.bincount(states[index][:-1], weights=np.diff(times), minlength=NUM_STATES)
+        assert np.array_equal(result.state_time[index], held)
+    assert result.duty_cycle == pytest.approx(result.state_time[..., FORWARD] / result.elapsed)
@@ -0,0 +1,193 @@
+"""
+Tests for telemetry.py: the wire format against Telemetry.h and the
+firmware's own test, parsing a stream cut up anyhow, millis() wraps and
+reboots, and the ring buffer and store.
+
+    python3 -m pytest -q shredder_host/test_telemetry.py   (from Firmware/)
+"""
+import os
+import re
+
+import numpy as np
+import pytest
+
+from . import telemetry
+from .controller import ShredderState
+from .telemetry import (FRAME_DTYPE, FRAME_SIZE, RECORD_DTYPE, FrameParser, RingBuffer, TelemetryStore, checksum,
+                        encode, rolling, summarize)
+
+FIRMWARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Arduino_Motor_Controller")
+
+
+def fletcher16(data):
+    """Telemetry.cpp's telemetryChecksum(), byte by byte."""
+    sum1 = sum2 = 0
+    for byte in data:
+        sum1 = (sum1 + byte) % 255
+        sum2 = (sum2 + sum1) % 255
+    return sum2 << 8 | sum1
+
+
+def make_records(count, start=0, period=10, seed=0):
+    rng = np.random.default_rng(seed)
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    records["time"] = start + np.arange(count) * period
+    records["state_start"] = records["time"] - rng.integers(0, 5000, count)
+    records["sequence"] = np.arange(count) % 256
+    records["state"] = rng.integers(0, len(ShredderState), count)
+    records["load"] = rng.integers(0, 1024, count)
+    records["speed"] = rng.integers(-100, 101, count)
+    records["flags"] = rng.integers(0, 4, count)
+    records["jams"] = np.arange(count) // 50
+    return records
+
+
+def parse(data, chunks=None):
+    parser = FrameParser()
+    if chunks is None:
+        chunks = [len(data)]
+    bounds = np.cumsum([0] + list(chunks))
+    records = np.concatenate([parser.feed(data[a:b]) for a, b in zip(bounds[:-1], bounds[1:])])
+    return records, parser
+
+
+def test_checksum_is_fletcher16():
+    assert checksum(np.frombuffer(b"abcde", dtype=np.uint8)) == 0xC8F0 # test_main.cpp's reference value
+    rows = np.random.default_rng(1).integers(0, 256, (200, 16))
+    assert list(checksum(rows)) == [fletcher16(row) for row in rows]
+
+
+def test_frame_layout_matches_telemetry_h():
+    with open(os.path.join(FIRMWARE, "Telemetry.h")) as f:
+        layout = re.findall(r"^//\s+(\d+)\s+(sync|u?int\d+)\s", f.read(), re.MULTILINE)
+    sizes = {"sync": 2, "uint8": 1, "int8": 1, "uint16": 2, "uint32": 4}
+    offsets = [FRAME_DTYPE.fields[name][1] for name in FRAME_DTYPE.names]
+    kinds = [FRAME_DTYPE[name] for name in FRAME_DTYPE.names]
+    assert [int(offset) for offset, _ in layout] == offsets
+    assert [sizes[kind] for _, kind in layout] == [kind.itemsize for kind in kinds]
+    assert [kind == "int8" for _, kind in layout] == [kind.kind == "i" for kind in kinds]
+    assert FRAME_DTYPE.itemsize == FRAME_SIZE == 20
+
+
+def test_encode_matches_the_firmware_test():
+    # The frame test_main.cpp encodes: reversing after one jam, at millis() 0x12345678
+    record = np.zeros(1, dtype=RECORD_DTYPE)
+    record[0] = (0x12345678, 0x12345678, 7, ShredderState.REVERSE_CLEARING, 600, -50, 0, 1)
+    frame = encode(record)
+    assert frame[:18] == bytes([0xA5, 0x5A, 7, 3, 0x78, 0x56, 0x34, 0x12, 0x78, 0x56, 0x34, 0x12,
+                                600 & 0xFF, 600 >> 8, 256 - 50, 0, 1, 0])
+    assert int.from_bytes(frame[18:], "little") == fletcher16(frame[2:18])
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_round_trip_through_noise_and_random_reads(seed):
+    rng = np.random.default_rng(seed)
+    records = make_records(3000, start=1000, seed=seed)
+    frames = [encode(records[k:k + 1]) for k in range(len(records))]
+    corrupted = set(rng.choice(len(frames), 40, replace=False).tolist())
+    pieces, junk = [b"Shredder Controller Starting...\r\n"], len(b"Shredder Controller Starting...\r\n")
+    for k, frame in enumerate(frames):
+        if k in corrupted:
+            frame = bytearray(frame)
+            frame[rng.integers(2, FRAME_SIZE)] ^= 1 << int(rng.integers(0, 8))
+            frame = bytes(frame)
+        pieces.append(frame)
+        if rng.random() < 0.05:
+            # Line noise, with no sync byte in it so it can't start a frame
+            noise = rng.integers(0, 0xA5, rng.integers(1, 30)).astype(np.uint8).tobytes()
+            pieces.append(noise)
+            junk += len(noise)
+    data = b"".join(pieces)
+    chunks = rng.integers(0, 64, len(data)) # including empty reads
+    chunks = chunks[np.cumsum(chunks) < len(data)]
+    parsed, parser = parse(data, list(chunks) + [len(data) - chunks.sum()])
+
+    kept = np.array([k not in corrupted for k in range(len(records))])
+    assert np.array_equal(parsed, records[kept])
+    assert parser.frames == kept.sum() and parser.dropped == len(corrupted)
+    assert parser.rejected == len(corrupted) and parser.skipped == junk + FRAME_SIZE * len(corrupted)
+
+
+def test_partial_frames_wait_for_the_rest():
+    data = encode(make_records(2))
+    parser = FrameParser()
+    assert len(parser.feed(data[:25])) == 1
+    assert len(parser.feed(data[25:39])) == 0
+    assert len(parser.feed(data[39:])) == 1 and parser.skipped == 0
+
+
+def test_millis_wrap():
+    records = make_records(500, start=(1 << 32) - 2000)
+    parsed, parser = parse(encode(records))
+    assert parsed["time"][-1] > 1 << 32
+    assert np.array_equal(parsed, records)
+
+
+def test_reboot_continues_the_timeline():
+    before, after = make_records(300, start=50000), make_records(200, start=0, seed=1)
+    after["sequence"] = (np.arange(200) + 300) % 256
+    parsed, parser = parse(encode(before) + encode(after))
+    # The first frame after the reboot lands on the last one before it, and time goes on from there
+    time = parsed["time"]
+    assert np.all(np.diff(time) >= 0) and time[300] == time[299]
+    assert np.array_equal(time[300:] - time[300], after["time"])
+    assert np.array_equal(parsed["time"] - parsed["state_start"],
+                          np.concatenate([before, after])["time"] - np.concatenate([before, after])["state_start"])
+    assert parser.dropped == 0
+
+
+def test_sequence_gaps_count_dropped_frames():
+    records = make_records(1000)
+    lost = np.zeros(1000, dtype=bool)
+    lost[[5, 6, 7, 300, 511, 512, 999]] = True
+    lost[600:900] = True # longer than the 8 bit sequence: only the remainder can be seen
+    data = encode(records[~lost])
+    parsed, parser = parse(data, [300, 5000, len(data) - 5300])
+    assert parser.dropped == 3 + 1 + 2 + 300 % 256 # the frame lost at the end isn't a gap yet
+    assert len(parsed) == (~lost).sum()
+
+
+@pytest.mark.parametrize("pieces", [[3, 4, 2], [7, 7, 7, 7], [25], [10, 1, 9], [0, 12]])
+def test_ring_buffer_wraps(pieces):
+    records = make_records(sum(pieces))
+    ring = RingBuffer(capacity=10)
+    offset = 0
+    for count in pieces:
+        ring.extend(records[offset:offset + count])
+        offset += count
+        assert len(ring) == min(offset, 10)
+        assert np.array_equal(ring.view(), records[max(offset - 10, 0):offset])
+    assert np.array_equal(ring.since(records["time"][offset - 3]), records[offset - 3:offset])
+
+
+def test_store_reopens(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "STORE_GROWTH", 100) # grow (and remap) several times
+    records = make_records(1000)
+    path = str(tmp_path / "shift")
+    with TelemetryStore(path) as store:
+        for begin in range(0, 600, 150):
+            store.append(records[begin:begin + 150])
+        assert len(store) == 600
+    assert os.path.getsize(os.path.join(path, "load.bin")) == 600 * 2 # spare room trimmed
+
+    with TelemetryStore(path) as store: # append to it again
+        store.append(records[600:])
+    store = TelemetryStore(path, mode="r")
+    assert len(store) == 1000 and np.array_equal(store.records(), records)
+    assert np.array_equal(store["load"], records["load"]) and np.array_equal(store.records(990, 2000), records[990:])
+    with pytest.raises(ValueError):
+        store.append(records)
+    with pytest.raises(FileNotFoundError):
+        TelemetryStore(str(tmp_path / "missing"), mode="r")
+
+
+def test_statistics_of_an_empty_store(tmp_path):
+    store = TelemetryStore(str(tmp_path / "new"))
+    summary = summarize(store)
+    assert summary.duration == 0 and summary.jams == 0 and summary.state_time.sum() == 0
+    windows = rolling(store)
+    assert len(windows.time) == 0 and windows.state_fraction.shape == (0, len(ShredderState))
+    empty = np.zeros(0, dtype=RECORD_DTYPE)
+    assert len(rolling(empty).jams_per_hour) == 0 and summarize(empty).duration == 0
+    # A single record is a zero length window
+    assert rolling(make_records(1)).state_fraction.sum() == 0
@@ -7,6 +7,7 @@
 #include "../Arduino_Motor_Controller/DCDriver.cpp"
 #include "../Arduino_Motor_Controller/StepperDriver.cpp"
 #include "../Arduino_Motor_Controller/ShredderController.cpp"
+#include "../Arduino_Motor_Controller/Telemetry.cpp"
 
 // Define global mock variables
 std::map<int, int> pinStates;
@@ -120,9 +121,70 @@ void test_impact_mode() {
     std::cout << "Impact Mode Test Passed!" << std::endl;
 }
 
+void test_telemetry_frame() {
+    std::cout << "Running Telemetry Frame Test..." << std::endl;
+
+    mock_millis = 0;
+    analogInputs.clear();
+    pinStates.clear();
+
+    DCDriver dc(3, 4, A0);
+    ShredderController controller(&dc);
+
+    ShredderConfig config;
+    config.forwardSpeed = 100;
+    config.reverseSpeed = 50;
+    config.currentLimit = 500;
+    config.runDuration = 0;
+    config.reverseDuration = 1000;
+    config.useImpactMode = false;
+    config.impactBackoffDuration = 1000;
+
+    controller.setConfig(config);
+    controller.start();
+
+    // Jam, then into reverse
+    mock_millis = 600;
+    analogInputs[A0] = 600;
+    controller.update();
+    mock_millis = 0x12345678; // past the pause; also exercises all four time bytes
+    controller.update();
+    assert(controller.getState() == STATE_REVERSE_CLEARING);
+
+    TelemetryFrame frame;
+    controller.getTelemetry(&frame);
+    frame.sequence = 7;
+    assert(frame.speed == -50);
+    assert(frame.jamCount == 1);
+
+    uint8_t buffer[TELEMETRY_FRAME_SIZE];
+    assert(encodeTelemetry(frame, buffer) == TELEMETRY_FRAME_SIZE);
+    assert(buffer[0] == 0xA5 && buffer[1] == 0x5A);
+    assert(buffer[2] == 7);
+    assert(buffer[3] == STATE_REVERSE_CLEARING);
+    // Little endian time and state start (both the reverse start)
+    assert(buffer[4] == 0x78 && buffer[5] == 0x56 && buffer[6] == 0x34 && buffer[7] == 0x12);
+    assert(buffer[8] == 0x78 && buffer[11] == 0x12);
+    assert(buffer[12] == (600 & 0xFF) && buffer[13] == (600 >> 8)); // load
+    assert((int8_t)buffer[14] == -50);
+    assert(buffer[15] == 0); // not faulted, no impact mode
+    assert(buffer[16] == 1 && buffer[17] == 0);
+
+    // Fletcher-16 reference value, and it catches a changed byte
+    const uint8_t abcde[] = {'a', 'b', 'c', 'd', 'e'};
+    assert(telemetryChecksum(abcde, 5) == 0xC8F0);
+    uint16_t checksum = buffer[18] | (buffer[19] << 8);
+    assert(checksum == telemetryChecksum(buffer + 2, 16));
+    buffer[12] ^= 0x01;
+    assert(checksum != telemetryChecksum(buffer + 2, 16));
+
+    std::cout << "Telemetry Frame Test Passed!" << std::endl;
+}
+
 int main() {
     test_dc_motor_jam_detection();
     test_impact_mode();
+    test_telemetry_frame();
     std::cout << "All Tests Passed." << std::endl;
     return 0;
 }
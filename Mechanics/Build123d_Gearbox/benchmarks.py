@@ -0,0 +1,288 @@
+"""
+Benchmarks for the geometry generators.
+
+Times cycloidal_disk() across resolutions and lobe counts, drum_disk()
+across tooth counts, gearbox_assembly() per motor type and
+full_machine_assembly() end to end, and records for each case:
+    - wall time (first build, and best of `repeat` builds),
+    - peak RSS of the process, and how much of it the build added,
+    - face, edge and solid counts of the result,
+    - the number of OCC booleans (build_stats.count_booleans()),
+    - STEP file size and export time.
+
+    python3 benchmarks.py --save benchmarks_baseline.json     # record a baseline
+    python3 benchmarks.py --compare benchmarks_baseline.json  # flag regressions
+    python3 benchmarks.py --filter 'drum_disk*' --repeat 3
+
+Every case runs in a fresh worker process with the part cache disabled, so
+neither cached parts nor shapes memoized by an earlier case (@shared_shape)
+hide any work, and peak RSS belongs to that case alone. The first build
+therefore includes building the shared cutters; "best" is the steady state.
+
+Results are JSON, keyed by case name. compare() flags a case when its time,
+peak RSS or STEP size grew by more than `threshold` (default 25 %) over the
+baseline, and reports changed face/edge/boolean counts, which are exact and
+machine independent. Times are only comparable on the same machine, so the
+baseline records where it was taken.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import NamedTuple
+
+BASELINE_FORMAT = 1
+THRESHOLD = 0.25   # relative growth flagged as a regression
+MIN_SECONDS = 0.05 # time differences below this are noise, whatever the ratio
+
+
+class Case(NamedTuple):
+    name: str
+    generator: str  # name in generators.GENERATORS
+    arguments: dict
+
+
+def cases():
+    """Every benchmark case, in run order."""
+    found = []
+    for resolution in (90, 360, 1440):
+        for num_lobes, num_pins in ((6, 7), (8, 9), (10, 11)):
+            found.append(Case(f"cycloidal_disk[res={resolution},n={num_lobes}]", "cycloidal-disk",
+                              dict(resolution=resolution, num_lobes=num_lobes, num_pins=num_pins)))
+    for num_teeth in (1, 2, 3, 4):
+        found.append(Case(f"drum_disk[teeth={num_teeth}]", "drum-disk", dict(num_teeth=num_teeth)))
+    for motor_type in ("NEMA23", "NEMA34", "WIPER"):
+        found.append(Case(f"gearbox_assembly[{motor_type}]", "gearbox", dict(motor_type=motor_type)))
+    found.append(Case("full_machine_assembly", "full-machine", dict(parallel=False)))
+    return found
+
+
+QUICK = ("cycloidal_disk[res=360,n=8]", "drum_disk[teeth=2]", "gearbox_assembly[NEMA23]")
+
+
+def select(patterns=None, quick=False):
+    """Cases whose name matches any of the fnmatch `patterns` (all if None), or the QUICK set."""
+    selected = cases()
+    if quick:
+        selected = [case for case in selected if case.name in QUICK]
+    if patterns:
+        selected = [case for case in selected
+                    if any(fnmatch.fnmatchcase(case.name, pattern) for pattern in patterns)]
+    return selected
+
+
+# =============================================================================
+# Running
+# =============================================================================
+def run(selected=None, repeat=1, step=True, progress=None):
+    """
+    Runs the cases (default: all of them), each in its own fresh process.
+    Returns {case name: result dict}. `progress(case, result)` is called as
+    each one finishes.
+    """
+    results = {}
+    context = get_context("spawn") # a clean interpreter: no memoized shapes, honest RSS
+    for case in selected if selected is not None else cases():
+        with ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_disable_cache) as pool:
+            result = pool.submit(run_case, case, repeat, step).result()
+        results[case.name] = result
+        if progress:
+            progress(case, result)
+    return results
+
+
+def _disable_cache():
+    os.environ["OPENSHREDDER_CACHE"] = "0" # read when part_cache is first imported
+
+
+def run_case(case, repeat=1, step=True):
+    """Builds one case `repeat` times in this process and measures it."""
+    import generators
+    from build_stats import count_booleans
+
+    function = generators.load(case.generator)
+    function = getattr(function, "uncached", function)
+    arguments = generators.bind(case.generator, case.arguments, use_options=False)
+    before = _current_rss()
+
+    times = []
+    for attempt in range(max(1, repeat)):
+        with count_booleans() as booleans:
+            start = time.perf_counter()
+            shape = function(**arguments)
+            times.append(time.perf_counter() - start)
+        if attempt == 0:
+            boolean_count = booleans.count
+
+    result = {
+        "first_s": times[0],
+        "best_s": min(times),
+        "builds": len(times),
+        "peak_rss_mb": _peak_rss() / 2**20,
+        "build_rss_mb": max(0.0, _peak_rss() - before) / 2**20,
+        "booleans": boolean_count,
+        "faces": len(shape.faces()),
+        "edges": len(shape.edges()),
+        "solids": len(shape.solids()),
+    }
+    if step:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "part.step")
+            start = time.perf_counter()
+            generators.export_shape(shape, path)
+            result["step_s"] = time.perf_counter() - start
+            result["step_bytes"] = os.path.getsize(path)
+        result["peak_rss_mb"] = _peak_rss() / 2**20
+    return result
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # kB on Linux
+
+
+def _current_rss():
+    """Current resident set size in bytes (the peak where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _peak_rss()
+
+
+# =============================================================================
+# Baselines
+# =============================================================================
+def machine():
+    """Where the numbers were taken; times only compare on the same machine."""
+    from importlib import metadata
+
+    try:
+        build123d = metadata.version("build123d")
+    except metadata.PackageNotFoundError:
+        build123d = "unknown"
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "build123d": build123d,
+    }
+
+
+def save(results, path):
+    """Writes `results` as a baseline, merged over the cases already in `path`."""
+    baseline = load(path) if os.path.exists(path) else {"results": {}}
+    baseline["results"].update(results)
+    baseline.update(format=BASELINE_FORMAT, machine=machine(), saved=time.time())
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("format") != BASELINE_FORMAT:
+        raise ValueError(f"{path} is not a benchmark baseline (format {BASELINE_FORMAT})")
+    return baseline
+
+
+class Finding(NamedTuple):
+    case: str
+    metric: str
+    baseline: float
+    current: float
+    regression: bool # False for a change that is only worth knowing about
+
+    def __str__(self):
+        change = f"{self.baseline:g} -> {self.current:g}"
+        if self.baseline:
+            change += f" ({100 * (self.current / self.baseline - 1):+.0f}%)"
+        return f"{'REGRESSION' if self.regression else 'changed'} {self.case} {self.metric}: {change}"
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Findings for `results` against a baseline's results: regressions in
+    time, memory or STEP size beyond `threshold`, and any change in the
+    exact counts (more booleans is a regression, other count changes mean
+    the geometry itself changed).
+    """
+    findings = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ("best_s", "first_s", "peak_rss_mb", "step_bytes"):
+            if metric not in current or metric not in previous:
+                continue
+            old, new = previous[metric], current[metric]
+            grew = new > old * (1 + threshold)
+            if metric.endswith("_s"):
+                grew = grew and new - old > MIN_SECONDS
+            if grew:
+                findings.append(Finding(name, metric, old, new, True))
+        for metric in ("booleans", "faces", "edges", "solids"):
+            old, new = previous.get(metric), current.get(metric)
+            if old is not None and new != old:
+                findings.append(Finding(name, metric, old, new, metric == "booleans" and new > old))
+    return findings
+
+
+def format_row(name, result):
+    line = (f"{name:<34} {result['best_s']:8.3f} s (first {result['first_s']:.3f})"
+            f" {result['peak_rss_mb']:7.0f} MB (+{result['build_rss_mb']:.0f})"
+            f" {result['booleans']:4d} bool {result['faces']:5d} faces {result['edges']:6d} edges")
+    if "step_bytes" in result:
+        line += f" {result['step_bytes'] / 1024:8.0f} kB STEP"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Benchmark the geometry generators")
+    parser.add_argument("--filter", action="append", metavar="PATTERN", help="only cases matching (fnmatch)")
+    parser.add_argument("--quick", action="store_true", help=f"only {', '.join(QUICK)}")
+    parser.add_argument("--repeat", type=int, default=1, help="builds per case (default 1)")
+    parser.add_argument("--no-step", action="store_true", help="skip the STEP export")
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="flag regressions against a baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"relative growth counted as a regression (default {THRESHOLD})")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args(argv)
+
+    selected = select(args.filter, args.quick)
+    if args.list or not selected:
+        for case in selected:
+            print(case.name)
+        return 0 if selected else 2
+
+    baseline = load(args.compare) if args.compare else None
+    results = run(selected, args.repeat, not args.no_step,
+                  progress=lambda case, result: print(format_row(case.name, result), flush=True))
+    if args.save:
+        save(results, args.save)
+        print(f"Saved to {args.save}")
+    if baseline is None:
+        return 0
+
+    if baseline["machine"] != machine():
+        print("Note: the baseline was taken on a different machine or setup; compare times with care")
+    findings = compare(results, baseline["results"], args.threshold)
+    for finding in findings:
+        print(finding)
+    regressions = sum(finding.regression for finding in findings)
+    print(f"{regressions} regression(s) against {args.compare}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
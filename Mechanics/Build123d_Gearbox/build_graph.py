@@ -0,0 +1,352 @@
+"""
+Incremental rebuild of the generated STEP/STL files.
+
+Each artifact (one generator call and the file(s) it writes) gets a
+fingerprint made of:
+    - the generator and its arguments,
+    - the source of the generator function and of everything it uses
+      (functions, constants and other generators, followed through the
+      local imports), compared as syntax trees so comment-only edits
+      don't count,
+    - the build123d version.
+
+make() rebuilds the artifacts whose fingerprint changed since the last
+build, or whose files are missing or were modified, and leaves the rest
+alone. Editing fixed_knife() rebuilds fixed_knife.step and the full
+machine, but not the gearbox or the drum disk.
+
+Stale artifacts are built in a process pool. An artifact whose generator
+uses another artifact's generator (the full machine uses the gearbox,
+the gearbox the cycloidal disk) waits for it, so shared sub-parts come out
+of the part cache instead of being built twice; the others run in
+parallel.
+
+Fingerprints are kept in a stamp file (STAMP_FILE) in the output directory.
+"""
+import ast
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import NamedTuple
+
+import generators
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+STAMP_FILE = ".openshredder-build.json"
+STL_DIR = os.path.join(os.path.dirname(_HERE), "STLs")
+
+
+class Artifact(NamedTuple):
+    name: str           # target name
+    generator: str      # name in generators.GENERATORS
+    arguments: dict     # overrides of the generator defaults
+    outputs: tuple      # files written, one per returned shape (relative to the output directory)
+    default: bool = True # built by make() without explicit targets
+
+
+ARTIFACTS = [
+    Artifact(name, name, {}, generator.outputs)
+    for name, generator in generators.GENERATORS.items()
+]
+# The checked-in meshes. Only the cycloid comes from a generator here; the
+# case, top, drive and output meshes are exported from gearbox.FCStd. The
+# build123d disk has a roller hole per lobe (8) where the FreeCAD macro
+# used 4, so this is only rebuilt when asked for by name.
+ARTIFACTS.append(Artifact(
+    "stl-gearbox-cycloid", "cycloidal-disk", {},
+    (os.path.join(STL_DIR, "gearbox-cycloid.stl"),), default=False
+))
+
+
+def get(name):
+    for artifact in ARTIFACTS:
+        if artifact.name == name:
+            return artifact
+    raise KeyError(f"Unknown target '{name}' (known: {', '.join(a.name for a in ARTIFACTS)})")
+
+
+# =============================================================================
+# Fingerprints
+# =============================================================================
+def fingerprint(artifact):
+    """Hex digest of everything that determines the artifact's files."""
+    module, function = _generator_symbol(artifact)
+    payload = {
+        "generator": artifact.generator,
+        "arguments": _canonical(generators.bind(artifact.generator, artifact.arguments, use_options=False)),
+        "outputs": [os.path.splitext(path)[1].lower() for path in artifact.outputs],
+        "source": source_digest(module, function),
+        "build123d": _library_version(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def source_digest(module, name):
+    """Digest of the syntax trees of `module.name` and everything it uses."""
+    digest = hashlib.sha256()
+    for symbol in sorted(symbol_closure(module, name)):
+        digest.update(repr(symbol).encode())
+        digest.update(_index(symbol[0]).dumps[symbol[1]].encode())
+    return digest.hexdigest()
+
+
+def symbol_closure(module, name):
+    """
+    (module, name) pairs of the top-level definitions `module.name` uses,
+    itself included, following imports of other modules in this directory.
+    Names from other libraries (build123d, math, ...) are not followed.
+    """
+    seen = set()
+    stack = [(module, name)]
+    while stack:
+        symbol = stack.pop()
+        if symbol in seen:
+            continue
+        index = _index(symbol[0])
+        if symbol[1] not in index.definitions:
+            continue
+        seen.add(symbol)
+        stack.extend(index.uses(symbol[1]))
+    return seen
+
+
+class _SourceIndex:
+    """Top-level definitions and local imports of one module, parsed with ast."""
+
+    def __init__(self, module):
+        path = os.path.join(_HERE, f"{module}.py")
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+
+        self.module = module
+        self.definitions = {} # name -> ast node
+        self.imports = {}     # local name -> (module, name or None for the module itself)
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.definitions[node.name] = node
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    for leaf in ast.walk(target):
+                        if isinstance(leaf, ast.Name):
+                            self.definitions[leaf.id] = node
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and _is_local(node.module):
+                for alias in node.names:
+                    self.imports[alias.asname or alias.name] = (node.module, alias.name)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if _is_local(alias.name):
+                        self.imports[alias.asname or alias.name] = (alias.name, None)
+        self.dumps = {name: ast.dump(node) for name, node in self.definitions.items()}
+
+    def uses(self, name):
+        """Symbols referenced by the definition of `name`."""
+        found = []
+        for node in ast.walk(self.definitions[name]):
+            if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+                target = self.imports.get(node.value.id)
+                if target and target[1] is None:
+                    found.append((target[0], node.attr)) # module.attribute
+            elif isinstance(node, ast.Name):
+                if node.id in self.definitions and node.id != name:
+                    found.append((self.module, node.id))
+                elif node.id in self.imports and self.imports[node.id][1] is not None:
+                    found.append(self.imports[node.id])
+        return found
+
+
+def _is_local(module):
+    return bool(module) and "." not in module and os.path.exists(os.path.join(_HERE, f"{module}.py"))
+
+
+def _index(module):
+    """Cached _SourceIndex of `module`, reparsed when the file changes."""
+    stat = os.stat(os.path.join(_HERE, f"{module}.py"))
+    return _cached_index(module, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_index(module, mtime, size):
+    return _SourceIndex(module)
+
+
+def _generator_symbol(artifact):
+    generator = generators.get(artifact.generator)
+    return generator.module, generator.function
+
+
+def _canonical(value):
+    # Same canonical form as the part cache keys
+    from part_cache import canonical
+    return canonical(value)
+
+
+def _library_version():
+    from part_cache import _library_version
+    return _library_version()
+
+
+# =============================================================================
+# Planning
+# =============================================================================
+def dependencies(artifact, candidates):
+    """
+    Artifacts among `candidates` whose generator `artifact`'s generator uses
+    (other calls of the same generator don't count).
+    """
+    closure = symbol_closure(*_generator_symbol(artifact))
+    own = _generator_symbol(artifact)
+    return [
+        other for other in candidates
+        if other.name != artifact.name and _generator_symbol(other) != own
+        and _generator_symbol(other) in closure
+    ]
+
+
+def plan(targets=None, output_dir=".", force=False):
+    """
+    Artifacts that need building, as a list of (artifact, reason).
+
+    `targets` are artifact names (default: every artifact with default=True).
+    """
+    artifacts = [get(name) for name in targets] if targets else [a for a in ARTIFACTS if a.default]
+    stamps = _read_stamps(output_dir)
+    stale = []
+    for artifact in artifacts:
+        reason = "forced" if force else _stale_reason(artifact, stamps.get(artifact.name), output_dir)
+        if reason:
+            stale.append((artifact, reason))
+    return stale
+
+
+def _stale_reason(artifact, stamp, output_dir):
+    paths = _output_paths(artifact, output_dir)
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        return f"missing {os.path.basename(missing[0])}"
+    if stamp is None:
+        return "never built"
+    if stamp.get("fingerprint") != fingerprint(artifact):
+        return "sources or parameters changed"
+    if stamp.get("files") != {path: _file_stamp(path) for path in paths}:
+        return "output modified"
+    return None
+
+
+def _output_paths(artifact, output_dir):
+    return [os.path.abspath(os.path.join(output_dir, path)) for path in artifact.outputs]
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# =============================================================================
+# Building
+# =============================================================================
+def make(targets=None, output_dir=".", max_workers=None, force=False, log=print):
+    """
+    Rebuilds stale artifacts (see plan()). Returns the names of the artifacts
+    built. Raises RuntimeError listing any that failed, after building all
+    the others.
+    """
+    stale = plan(targets, output_dir, force)
+    if not stale:
+        log("Everything is up to date")
+        return []
+    for artifact, reason in stale:
+        log(f"{artifact.name}: {reason}")
+
+    pending = {artifact.name: artifact for artifact, _ in stale}
+    # Taken before building, so an edit made during the build still counts next time
+    fingerprints = {name: fingerprint(artifact) for name, artifact in pending.items()}
+    waits_for = {
+        name: {other.name for other in dependencies(artifact, pending.values())}
+        for name, artifact in pending.items()
+    }
+    built, failed = [], {}
+
+    def finished(name, result):
+        if isinstance(result, BaseException):
+            failed[name] = result
+            log(f"{name}: failed ({result})")
+            return
+        _write_stamp(pending[name], fingerprints[name], output_dir)
+        built.append(name)
+        log(f"{name}: built in {result:.1f} s")
+
+    def ready():
+        done = set(built) | set(failed)
+        return [name for name in pending if name not in done and waits_for[name] <= done]
+
+    if max_workers == 1 or len(pending) == 1:
+        while len(built) + len(failed) < len(pending):
+            name = ready()[0]
+            try:
+                result = _build_artifact(pending[name], output_dir)
+            except Exception as error:
+                result = error
+            finished(name, result)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while len(built) + len(failed) < len(pending):
+                for name in ready():
+                    if name not in running.values():
+                        running[pool.submit(_build_artifact, pending[name], output_dir)] = name
+                complete, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in complete:
+                    name = running.pop(future)
+                    finished(name, future.exception() or future.result())
+
+    if failed:
+        raise RuntimeError(f"Failed to build: {', '.join(failed)}")
+    return built
+
+
+def _build_artifact(artifact, output_dir):
+    """Builds one artifact and writes its files; returns the time taken."""
+    start = time.perf_counter()
+    arguments = generators.bind(artifact.generator, artifact.arguments, use_options=False)
+    result = generators.load(artifact.generator)(**arguments)
+    shapes = result if isinstance(result, tuple) else (result,)
+    for shape, path in zip(shapes, _output_paths(artifact, output_dir)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        generators.export_shape(shape, path)
+    return time.perf_counter() - start
+
+
+def _stamp_path(output_dir):
+    return os.path.join(output_dir, STAMP_FILE)
+
+
+def _read_stamps(output_dir):
+    try:
+        with open(_stamp_path(output_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_stamp(artifact, digest, output_dir):
+    stamps = _read_stamps(output_dir)
+    paths = _output_paths(artifact, output_dir)
+    stamps[artifact.name] = {
+        "fingerprint": digest,
+        "files": {path: _file_stamp(path) for path in paths},
+        "built": time.time(),
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(stamps, f, indent=1, sort_keys=True)
+    os.replace(tmp, _stamp_path(output_dir))
+
+
+if __name__ == "__main__":
+    make()
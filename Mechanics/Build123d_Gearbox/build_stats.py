@@ -0,0 +1,395 @@
+"""
+Build statistics for the geometry generators.
+
+count_booleans() reports how many OCC boolean operations (cut, fuse,
+intersect, split) a build performed:
+
+    with count_booleans() as booleans:
+        disk = drum_disk.uncached(num_teeth=8)
+    print(booleans.count, dict(booleans.operations))
+
+Booleans are the main cost of most generators, so this is the number to
+watch when changing how a part is modelled. Use the `.uncached` generator
+(or OPENSHREDDER_CACHE=0) so that cached parts don't hide the work.
+
+trace() goes further and records every build123d operation performed in
+the block (primitives, extrude/revolve/loft, booleans, fillets, moves and
+rotations, exports) with its duration, the number of faces it was given
+and the line of the generator that called it:
+
+    with trace() as tracer:
+        machine = full_machine_assembly.uncached()
+        export_step(machine, "machine.step")
+    tracer.write_chrome_trace("machine.trace.json") # open in ui.perfetto.dev or chrome://tracing
+    print(tracer.summary())                         # flat hot spots, by self time
+
+Generator calls (@cached_part) and shared cutters (@shared_shape) show up
+as spans too, so operations nest under the part that needed them. Tracing
+is off unless a trace() block is active; work done in other processes
+(e.g. full_machine_assembly(parallel=True)) is not seen.
+"""
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple
+
+_counters = []
+_bool_op_users = 0       # count_booleans() and trace() blocks sharing the Shape._bool_op hook
+_original_bool_op = None
+
+
+class BooleanCounter:
+    """Boolean operations seen while a count_booleans() block was active."""
+
+    def __init__(self):
+        self.operations = Counter() # e.g. {"cut": 3, "fuse": 1}
+
+    @property
+    def count(self):
+        return sum(self.operations.values())
+
+    def __repr__(self):
+        return f"BooleanCounter(count={self.count}, operations={dict(self.operations)})"
+
+
+@contextlib.contextmanager
+def count_booleans():
+    """Counts kernel booleans performed inside the block. Blocks may be nested."""
+    counter = BooleanCounter()
+    _acquire_bool_op()
+    _counters.append(counter)
+    try:
+        yield counter
+    finally:
+        _counters.remove(counter)
+        _release_bool_op()
+
+
+def _acquire_bool_op():
+    """
+    Installs the Shape._bool_op hook on first use. count_booleans() and
+    trace() share the one hook (reference counted) rather than each wrapping
+    whatever is there, so their blocks may open and close in any order and
+    the original is always what gets put back.
+    """
+    global _bool_op_users, _original_bool_op
+    from build123d import Shape
+
+    if _bool_op_users == 0:
+        _original_bool_op = vars(Shape)["_bool_op"]
+        Shape._bool_op = _bool_op_hook(_original_bool_op)
+    _bool_op_users += 1
+
+
+def _release_bool_op():
+    global _bool_op_users, _original_bool_op
+    from build123d import Shape
+
+    _bool_op_users -= 1
+    if _bool_op_users == 0:
+        Shape._bool_op = _original_bool_op
+        _original_bool_op = None
+
+
+def _bool_op_hook(original):
+    """Shape._bool_op counting for count_booleans() and recording for trace(), named after the operation."""
+    @functools.wraps(original)
+    def _bool_op(self, args, tools, operation):
+        args, tools = list(args), list(tools)
+        # Shortcuts that never reach OCC aren't counted
+        if not (_counters or _tracers) or not _runs_kernel(args, tools, operation):
+            return original(self, args, tools, operation)
+        name = _operation_name(operation)
+        for counter in _counters:
+            counter.operations[name] += 1
+        if not _tracers:
+            return original(self, args, tools, operation)
+        with _recording(name, "boolean", _face_count(args + tools), {"tools": len(tools)}):
+            return original(self, args, tools, operation)
+    return _bool_op
+
+
+def _operation_name(operation):
+    """"BRepAlgoAPI_Cut" -> "cut", "BRepAlgoAPI_Common" -> "intersect"."""
+    name = type(operation).__name__.split("_")[-1].lower()
+    return {"common": "intersect", "splitter": "split"}.get(name, name)
+
+
+def _runs_kernel(args, tools, operation):
+    """
+    Mirrors the shortcuts in Shape._bool_op: a cut or fuse with nothing to
+    combine, or an intersection with an empty side, never reaches OCC.
+    """
+    if _operation_name(operation) == "split":
+        return True
+    has_args = any(shape.wrapped is not None for shape in args)
+    has_tools = any(shape.wrapped is not None for shape in tools)
+    return has_args and has_tools
+
+
+# =============================================================================
+# Operation tracing
+# =============================================================================
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_tracers = []
+_local = threading.local() # per-thread stack of open spans
+_patches = []              # (owner, attribute, original) to undo
+_wrappers = {}             # id(original) -> wrapper, and back
+
+
+class Event(NamedTuple):
+    name: str       # e.g. "extrude", "cut", "cycloidal_gear.cycloidal_disk"
+    category: str   # primitive, feature, boolean, fillet, transform, export, generator, shared
+    start: float    # s since the tracer started
+    duration: float # s
+    self_time: float# s, minus the spans nested in it
+    thread: int
+    depth: int
+    site: str       # "module.function:line" of the local code that called it
+    faces: int      # faces of the input shapes (-1 if not counted)
+    args: dict
+
+
+class Hotspot(NamedTuple):
+    name: str
+    category: str
+    site: str
+    calls: int
+    total: float     # s, including nested spans
+    self_time: float # s
+    longest: float   # s
+    faces: int       # input faces, summed over the calls
+
+
+class Tracer:
+    """Events recorded while a trace() block was active."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+
+    def chrome_trace(self):
+        """The events in Chrome trace event format (complete "X" events, microseconds)."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "openshredder build"}}]
+        for event in sorted(self.events, key=lambda event: event.start):
+            args = dict(event.args, site=event.site)
+            if event.faces >= 0:
+                args["faces_in"] = event.faces
+            events.append({
+                "name": event.name, "cat": event.category, "ph": "X", "pid": pid, "tid": event.thread,
+                "ts": round(event.start * 1e6, 3), "dur": round(event.duration * 1e6, 3), "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def hotspots(self, by_site=True):
+        """
+        Events aggregated per operation (and per calling line, with
+        `by_site`), largest self time first. Generator spans count only
+        their own overhead as self time, the operations they run are
+        listed on their own rows.
+        """
+        rows = {}
+        for event in self.events:
+            key = (event.name, event.category, event.site if by_site else "")
+            calls, total, self_time, longest, faces = rows.get(key, (0, 0.0, 0.0, 0.0, 0))
+            rows[key] = (calls + 1, total + event.duration, self_time + event.self_time,
+                         max(longest, event.duration), faces + max(event.faces, 0))
+        found = [Hotspot(*key, *values) for key, values in rows.items()]
+        found.sort(key=lambda row: row.self_time, reverse=True)
+        return found
+
+    def summary(self, limit=25, by_site=True):
+        """Text table of the top `limit` hot spots."""
+        rows = self.hotspots(by_site)
+        traced = sum(event.self_time for event in self.events)
+        lines = [f"{'self s':>8} {'%':>5} {'total s':>8} {'calls':>6} {'faces':>7}  operation"]
+        for row in rows[:limit]:
+            share = 100 * row.self_time / traced if traced else 0.0
+            where = f"  ({row.site})" if row.site else ""
+            lines.append(f"{row.self_time:8.3f} {share:5.1f} {row.total:8.3f} {row.calls:6d} {row.faces:7d}  "
+                         f"{row.category}:{row.name}{where}")
+        if len(rows) > limit:
+            lines.append(f"... {len(rows) - limit} more")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def trace():
+    """Records the build123d operations performed inside the block. Blocks may be nested."""
+    if not _tracers:
+        _install_tracing() # imports build123d, which shouldn't count as build time
+    tracer = Tracer()
+    _tracers.append(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracers.remove(tracer)
+        if not _tracers:
+            _uninstall_tracing()
+
+
+@contextlib.contextmanager
+def span(name, category, **args):
+    """
+    Records the block as one span when tracing is active (a no-op
+    otherwise). Yields the span's args dict, which the block may add to.
+    """
+    if not _tracers:
+        yield args
+        return
+    with _recording(name, category, -1, args):
+        yield args
+
+
+@contextlib.contextmanager
+def _recording(name, category, faces, args):
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    site = _caller()
+    frame = [0.0] # time spent in nested spans
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        duration = end - start
+        if stack:
+            stack[-1][0] += duration
+        for tracer in _tracers:
+            tracer.events.append(Event(name, category, start - tracer.origin, duration, duration - frame[0],
+                                       threading.get_ident(), len(stack), site, faces, args))
+
+
+def _caller():
+    """"module.function:line" of the innermost local (generator) frame on the stack."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        name = os.path.basename(path)
+        if os.path.dirname(os.path.abspath(path)) == _HERE and name not in ("build_stats.py", "part_cache.py") \
+                and not frame.f_code.co_name.startswith("<"):
+            return f"{name[:-3]}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return ""
+
+
+def _face_count(values):
+    """Faces of every build123d Shape among `values` (shapes or lists of shapes)."""
+    from OCP.TopAbs import TopAbs_FACE
+    from OCP.TopExp import TopExp_Explorer
+    from build123d import Shape
+
+    count = 0
+    for value in values:
+        shapes = value if isinstance(value, (list, tuple)) else [value]
+        for shape in shapes:
+            wrapped = getattr(shape, "wrapped", None) if isinstance(shape, Shape) else None
+            if wrapped is None:
+                continue
+            explorer = TopExp_Explorer(wrapped, TopAbs_FACE)
+            while explorer.More():
+                count += 1
+                explorer.Next()
+    return count
+
+
+def _scalar_args(kwargs):
+    """Keyword arguments worth showing in the trace (amount, taper, radius...)."""
+    return {key: value for key, value in kwargs.items() if isinstance(value, (bool, int, float, str))}
+
+
+def _traced(original, name, category, constructor=False):
+    """Wrapper recording calls of `original` while tracing is active."""
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        if not _tracers:
+            return original(*args, **kwargs)
+        inputs = list(args[1:] if constructor else args) + list(kwargs.values())
+        with _recording(name, category, _face_count(inputs), _scalar_args(kwargs)):
+            return original(*args, **kwargs)
+    return wrapper
+
+
+def _trace_targets():
+    """(owner, attribute, category) of everything trace() records."""
+    from build123d import Shape, exporters3d, objects_part, operations_generic, operations_part
+    from build123d.topology.three_d import Mixin3D
+
+    targets = []
+    for name in ("extrude", "revolve", "loft", "thicken", "section"):
+        targets.append((operations_part, name, "feature"))
+    for name in ("add", "sweep", "mirror", "offset", "split"):
+        targets.append((operations_generic, name, "feature"))
+    for name in ("fillet", "chamfer"):
+        targets.append((operations_generic, name, "fillet"))
+        targets.append((Mixin3D, name, "fillet"))
+    for name in ("moved", "move", "located", "locate", "rotate", "translate", "mirror", "scale"):
+        targets.append((Shape, name, "transform"))
+    for name in ("export_step", "export_stl", "export_brep", "export_gltf"):
+        targets.append((exporters3d, name, "export"))
+    for name, cls in vars(objects_part).items():
+        if isinstance(cls, type) and issubclass(cls, objects_part.BasePartObject) \
+                and cls is not objects_part.BasePartObject and "__init__" in vars(cls):
+            targets.append((cls, "__init__", "primitive"))
+    return targets
+
+
+def _install_tracing():
+    for owner, attribute, category in _trace_targets():
+        original = vars(owner)[attribute]
+        name = owner.__name__ if attribute == "__init__" else attribute
+        wrapper = _traced(original, name, category, constructor=attribute == "__init__")
+        _patch(owner, attribute, original, wrapper)
+    _acquire_bool_op()
+
+    # `from build123d import *` copied the functions into the generator
+    # modules (and build123d's own namespace): point those names at the
+    # wrappers too
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for key, value in list(namespace.items()):
+            if callable(value) and id(value) in _wrappers and not isinstance(value, type):
+                replacement = _wrappers[id(value)]
+                if getattr(replacement, "__wrapped__", None) is value:
+                    _patch(module, key, value, replacement)
+
+
+def _patch(owner, attribute, original, wrapper):
+    _wrappers[id(original)] = wrapper
+    _wrappers[id(wrapper)] = original
+    _patches.append((owner, attribute, original))
+    setattr(owner, attribute, wrapper)
+
+
+def _uninstall_tracing():
+    _release_bool_op()
+    while _patches:
+        owner, attribute, original = _patches.pop()
+        setattr(owner, attribute, original)
+
+    # Modules imported while tracing picked up wrappers; they are harmless
+    # once tracing stops, but put the originals back anyway
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for key, value in list(namespace.items()):
+            original = _wrappers.get(id(value))
+            if original is not None and getattr(value, "__wrapped__", None) is original:
+                setattr(module, key, original)
+    _wrappers.clear()
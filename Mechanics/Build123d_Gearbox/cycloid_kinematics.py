@@ -0,0 +1,319 @@
+"""
+Kinematic simulation of the cycloidal drive, in NumPy.
+
+Turns the eccentric input of the drive that cycloidal_disk() and
+gearbox_assembly() build through a full revolution and reports, at every
+step, where the output actually is compared with the ideal reduction:
+
+    run = simulate(num_lobes=10, num_pins=11, pin_clearance=0.02, steps=3600)
+    summary = summarize(run)
+    print(summary.transmission_error_arcmin, summary.backlash_max_arcmin, summary.min_pins_in_contact)
+
+Clearances and manufacturing errors are inputs, so tolerance stack-ups can
+be screened before printing:
+    - pin_clearance: radial gap between each pin and the disk outline in
+      the ideal pose (undersized pins plus an inward offset of the printed
+      outline), mm,
+    - eccentricity_error: actual minus nominal eccentricity of the input
+      cam, mm,
+    - pin_circle_error: actual minus nominal pin circle radius, mm,
+    - pin_position_errors: radial error of each pin, mm, shape (..., pins),
+    - roller_clearance: extra radial clearance of the output rollers in the
+      roller holes, which cycloidal_disk() sizes 5.3 + 2e for 5.3 mm
+      rollers (exactly no play), mm.
+Every design argument and error may be an array: all of them broadcast into
+one batch, simulated together. sample_tolerances() draws random stack-ups.
+
+The model is rigid: contact only happens where a gap closes. The disk
+centre follows the cam exactly, and for each input angle the disk and the
+output carrier are free to turn until a pin (or roller) touches:
+    - the gap of each pin is measured exactly, as the signed distance from
+      the pin centre to the pin centre path of the outline (found with a
+      few Newton steps), plus pin_clearance,
+    - turning the disk by d psi closes a pin's gap by d psi times its lever,
+      (contact point x contact normal), so the play in each direction is
+      the smallest gap / lever over the pins on that side,
+    - the roller play is solved exactly from |roller - hole| <= clearance.
+Under load the play is taken up in the direction the load pushes: the
+transmission error is how far the output lags the ideal angle, backlash is
+the total play, and the pins in contact are those whose gap is closed (to
+within contact_tolerance) on the loaded side. Where `interference` is set
+the parts overlap and the drive would bind or run preloaded; the play then
+comes out negative and the other figures only say how badly.
+
+The outline of cycloidal_disk() is the one of a drive with k - 1 lobes and
+k pins on the pitch radius (see cycloid_profile.py); for num_pins =
+num_lobes + 1, the usual case, that is exactly num_lobes and num_pins on the
+pin circle. That is the drive simulated here.
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from cycloid_profile import center_line, cycloid_geometry
+
+STEPS = 3600               # input angles per revolution
+CONTACT_TOLERANCE = 0.001  # mm, a gap this small counts as contact
+NEWTON_STEPS = 4           # closest point iterations, from the ideal contact
+CHUNK = 2_000_000          # pin evaluations per vectorized block, bounds memory
+
+# The drive gearbox_assembly() builds
+GEARBOX_DISK = dict(pin_circle_diameter=50.0, pin_diameter=5.3, num_lobes=10, num_pins=11, eccentricity_factor=0.3)
+
+
+class DriveKinematics(NamedTuple):
+    """Simulated motion; `...` is the batch shape of the inputs."""
+    input_angle: np.ndarray                # (steps,) eccentric cam angle, rad
+    output_angle: np.ndarray               # (..., steps) ideal output angle, rad
+    transmission_error: np.ndarray         # (..., steps) output lag behind the ideal angle, driving forward, rad
+    transmission_error_reverse: np.ndarray # (..., steps) the same, driving in reverse, rad
+    backlash: np.ndarray                   # (..., steps) total play of the output with the input held, rad
+    pins_in_contact: np.ndarray            # (..., steps) loaded pins, driving forward
+    pins_in_contact_reverse: np.ndarray    # (..., steps) loaded pins, driving in reverse
+    interference: np.ndarray               # (...) pins or rollers overlap somewhere: the drive binds
+    pin_gap: np.ndarray                    # (..., steps, pins) gap of each pin in the ideal pose, mm (NaN if no pin)
+    pin_lever: np.ndarray                  # (..., steps, pins) d gap / d disk angle, mm/rad (> 0: resists forward drive)
+
+
+class KinematicsSummary(NamedTuple):
+    transmission_error_arcmin: float # peak to peak over the revolution, driving forward
+    lost_motion_arcmin: float        # mean lag of the output, driving forward
+    backlash_max_arcmin: float
+    backlash_mean_arcmin: float
+    min_pins_in_contact: int
+    mean_pins_in_contact: float
+    interference: bool
+
+
+def simulate(
+    pin_circle_diameter=50.0,  # D
+    pin_diameter=5.3,          # dp
+    num_lobes=8,               # n
+    num_pins=9,                # N
+    eccentricity_factor=0.3,   # eFactor
+    roller_pin_diameter=5.3,   # dr, output roller diameter (holes are 5.3 + 2e)
+    roller_pitch_diameter=34.0,# dd
+    pin_clearance=0.0,
+    eccentricity_error=0.0,
+    pin_circle_error=0.0,
+    pin_position_errors=None,
+    roller_clearance=0.0,
+    steps=STEPS,
+    contact_tolerance=CONTACT_TOLERANCE
+):
+    """
+    Simulates the drive over one input revolution at `steps` angles.
+
+    Design arguments are those of cycloidal_disk(); all arguments may be
+    arrays, broadcast together into a batch of designs / stack-ups.
+    """
+    design = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (
+        pin_circle_diameter, pin_diameter, num_lobes, num_pins, eccentricity_factor, roller_pin_diameter,
+        roller_pitch_diameter, pin_clearance, eccentricity_error, pin_circle_error, roller_clearance)))
+    batch_shape = design[0].shape
+    (D, dp, n, N, eps, dr, dd, clearance, e_error, circle_error, roller_extra) = (
+        value.reshape(-1) for value in design)
+
+    geometry = cycloid_geometry(pin_circle_diameter=D, num_lobes=n, num_pins=N, eccentricity_factor=eps)
+    lobes = np.rint(geometry.lobe_factor - 1).astype(int)
+    pins = lobes + 1
+    holes = np.rint(n).astype(int)
+    batch, max_pins, max_holes = len(D), int(pins.max()), int(holes.max())
+
+    # Pins: nominal angles 2 pi j / pins on the pitch radius, padded to the
+    # largest pin count of the batch (padding is masked out)
+    j = np.arange(max_pins)
+    has_pin = j < pins[:, None]
+    beta = 2 * math.pi * j / pins[:, None]
+    radial = np.zeros((batch, max_pins))
+    if pin_position_errors is not None:
+        errors = np.broadcast_to(np.asarray(pin_position_errors, dtype=float), batch_shape + (max_pins,))
+        radial = errors.reshape(batch, max_pins)
+    pin_radius = geometry.pitch_radius[:, None] + circle_error[:, None] + radial
+    pin_centers = pin_radius[..., None] * np.stack((np.cos(beta), np.sin(beta)), axis=-1)
+
+    theta = np.arange(steps) * (2 * math.pi / steps)
+    # Ideal disk (and output) rotation: the cam puts the disk centre at e u(theta)
+    ideal = (math.pi - theta[None, :]) / lobes[:, None]
+    e_actual = geometry.eccentricity + e_error
+    # Holes are 5.3 + 2e for design e: room for the roller to orbit, plus any extra
+    roller_room = (5.3 + 2 * geometry.eccentricity - dr) / 2 + roller_extra
+
+    shape = (batch, steps, max_pins)
+    gap, lever = np.empty(shape), np.empty(shape)
+    chunk = max(1, CHUNK // max(1, batch * max_pins))
+    for start in range(0, steps, chunk):
+        window = slice(start, start + chunk)
+        gap[:, window], lever[:, window] = _pin_contacts(
+            geometry, pin_centers, beta, ideal[:, window], theta[window], e_actual)
+    gap += clearance[:, None, None]
+    gap = np.where(has_pin[:, None, :], gap, np.nan)
+    lever = np.where(has_pin[:, None, :], lever, 0.0)
+
+    # Disk play each way: smallest gap / lever over the pins on that side
+    significant = 1e-9 * pin_radius.max(axis=-1)[:, None, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        forward = np.where(lever > significant, gap / lever, np.inf).min(axis=-1)
+        reverse = np.where(lever < -significant, gap / -lever, np.inf).min(axis=-1)
+
+    low, high, roller_bind = _roller_play(theta, ideal, e_actual, roller_room, dd / 2, holes, max_holes)
+
+    transmission_error = forward + high
+    transmission_error_reverse = -(reverse - low)
+    with np.errstate(invalid="ignore"):
+        loaded = gap - forward[..., None] * lever
+        loaded_reverse = gap + reverse[..., None] * lever
+        in_contact = ((lever > significant) & (loaded <= contact_tolerance)).sum(axis=-1)
+        in_contact_reverse = ((lever < -significant) & (loaded_reverse <= contact_tolerance)).sum(axis=-1)
+    interference = (np.nanmin(gap, axis=(1, 2)) < -contact_tolerance) | roller_bind
+
+    reshape = lambda value: value.reshape(batch_shape + value.shape[1:])
+    return DriveKinematics(
+        input_angle=theta,
+        output_angle=reshape(ideal),
+        transmission_error=reshape(transmission_error),
+        transmission_error_reverse=reshape(transmission_error_reverse),
+        backlash=reshape(transmission_error - transmission_error_reverse),
+        pins_in_contact=reshape(in_contact),
+        pins_in_contact_reverse=reshape(in_contact_reverse),
+        interference=reshape(interference),
+        pin_gap=reshape(gap),
+        pin_lever=reshape(lever),
+    )
+
+
+def _pin_contacts(geometry, pin_centers, beta, ideal, theta, e_actual):
+    """
+    Gap (before pin_clearance) and lever of every pin with the disk in its
+    ideal pose, shape (batch, steps, pins).
+
+    In the disk frame the pins must lie on the pin centre path c(t) of the
+    outline. The gap is the signed distance from the pin centre to c,
+    positive outside the disk; the lever is c x n at the closest point, n
+    the outward normal, i.e. how fast turning the disk (counter-clockwise)
+    closes the gap.
+    """
+    # Pin centres in the disk frame: translate by the disk centre, undo its rotation
+    cam = e_actual[:, None, None] * np.stack((np.cos(theta), np.sin(theta)), axis=-1)[None]
+    relative = pin_centers[:, None, :, :] - cam[:, :, None, :]
+    cos_psi, sin_psi = np.cos(ideal)[..., None], np.sin(ideal)[..., None]
+    px = cos_psi * relative[..., 0] + sin_psi * relative[..., 1]
+    py = -sin_psi * relative[..., 0] + cos_psi * relative[..., 1]
+
+    # Closest point on c, starting from where the pin sits in the ideal mesh.
+    # Flattened to (batch, steps x pins): center_line() broadcasts the
+    # (batch,) geometry fields over the last axis
+    t = beta[:, None, :] - ideal[..., None]
+    shape = t.shape
+    t = t.reshape(shape[0], -1)
+    px, py = px.reshape(t.shape), py.reshape(t.shape)
+    for _ in range(NEWTON_STEPS):
+        c, first, second = center_line(geometry, t, order=2)
+        dx, dy = c[..., 0] - px, c[..., 1] - py
+        slope = first[..., 0]**2 + first[..., 1]**2 + dx * second[..., 0] + dy * second[..., 1]
+        t = t - (dx * first[..., 0] + dy * first[..., 1]) / slope
+    c, first = center_line(geometry, t, order=1)
+
+    speed = np.hypot(first[..., 0], first[..., 1])
+    nx, ny = first[..., 1] / speed, -first[..., 0] / speed # outward: right of the counter-clockwise path
+    gap = (px - c[..., 0]) * nx + (py - c[..., 1]) * ny
+    lever = c[..., 0] * ny - c[..., 1] * nx
+    return gap.reshape(shape), lever.reshape(shape)
+
+
+def _roller_play(theta, ideal, e_actual, room, pitch, holes, max_holes):
+    """
+    Range [low, high] the output carrier can turn relative to the disk,
+    shape (batch, steps) each, and whether a roller binds somewhere.
+
+    Roller j sits at pitch u(phi + a_j) on the carrier, its hole at
+    O + pitch u(psi + a_j) on the disk (O the disk centre), and must stay
+    within `room` of the hole centre. To first order in d = phi - psi the
+    offset is -O + d w_j, w_j = pitch u'(psi + a_j), which bounds d to the
+    roots of a quadratic.
+    """
+    j = np.arange(max_holes)
+    has_hole = j < holes[:, None]
+    alpha = 2 * math.pi * j / holes[:, None]
+    angle = ideal[..., None] + alpha[:, None, :]
+    wx, wy = -pitch[:, None, None] * np.sin(angle), pitch[:, None, None] * np.cos(angle)
+    ox = e_actual[:, None, None] * np.cos(theta)[None, :, None]
+    oy = e_actual[:, None, None] * np.sin(theta)[None, :, None]
+
+    # Room left around the roller with the carrier at the disk angle; with
+    # holes sized exactly (no clearance) that is zero, so snap rounding
+    # noise to it or the near-tangent rollers give spurious ranges
+    offset = np.hypot(ox, oy)
+    slack = room[:, None, None] - offset
+    slack = np.where(np.abs(slack) < 1e-12 * pitch[:, None, None], 0.0, slack)
+
+    a = wx**2 + wy**2
+    b = ox * wx + oy * wy
+    c = -slack * (room[:, None, None] + offset)
+    discriminant = b**2 - a * c
+    root = np.sqrt(np.maximum(discriminant, 0))
+    lower = np.where(has_hole[:, None, :], (b - root) / a, -np.inf)
+    upper = np.where(has_hole[:, None, :], (b + root) / a, np.inf)
+    low, high = lower.max(axis=-1), upper.min(axis=-1)
+
+    bind = ((discriminant < 0) & has_hole[:, None, :]).any(axis=(1, 2))
+    bind |= (low > high + 1e-12).any(axis=1)
+    return low, np.maximum(high, low), bind
+
+
+def summarize(kinematics):
+    """Figures of merit of a simulate() run, per design (arcminutes)."""
+    arcmin = 60 * 180 / math.pi
+    error = kinematics.transmission_error
+    summary = KinematicsSummary(
+        transmission_error_arcmin=(error.max(axis=-1) - error.min(axis=-1)) * arcmin,
+        lost_motion_arcmin=error.mean(axis=-1) * arcmin,
+        backlash_max_arcmin=kinematics.backlash.max(axis=-1) * arcmin,
+        backlash_mean_arcmin=kinematics.backlash.mean(axis=-1) * arcmin,
+        min_pins_in_contact=kinematics.pins_in_contact.min(axis=-1),
+        mean_pins_in_contact=kinematics.pins_in_contact.mean(axis=-1),
+        interference=kinematics.interference,
+    )
+    if np.ndim(summary.interference) == 0:
+        summary = KinematicsSummary(*(np.asarray(value).item() for value in summary))
+    return summary
+
+
+def sample_tolerances(count, seed=None, **spreads):
+    """
+    Random stack-ups for simulate(): each keyword is an error argument and
+    its standard deviation, or a (mean, standard deviation) pair, e.g.
+
+        errors = sample_tolerances(1000, pin_clearance=(0.02, 0.01), eccentricity_error=0.01)
+        summary = summarize(simulate(**GEARBOX_DISK, **errors))
+
+    Returns arrays of `count` normal samples per argument.
+    """
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, spread in spreads.items():
+        mean, deviation = spread if isinstance(spread, tuple) else (0.0, spread)
+        samples[name] = rng.normal(mean, deviation, count)
+    return samples
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    nominal = summarize(simulate(**GEARBOX_DISK))
+    print(f"Gearbox drive, nominal: TE {nominal.transmission_error_arcmin:.4f} arcmin, "
+          f"{nominal.min_pins_in_contact} pins in contact")
+    for clearance in (0.01, 0.05, 0.1):
+        result = summarize(simulate(**GEARBOX_DISK, pin_clearance=clearance, eccentricity_error=-clearance / 2))
+        print(f"  pin clearance {clearance} mm, e error {-clearance / 2} mm: backlash "
+              f"{result.backlash_max_arcmin:.1f} arcmin, TE {result.transmission_error_arcmin:.2f} arcmin, "
+              f"{result.min_pins_in_contact}-{result.mean_pins_in_contact:.1f} pins in contact")
+
+    errors = sample_tolerances(500, seed=1, pin_clearance=(0.03, 0.01), eccentricity_error=0.01,
+                               pin_circle_error=0.01, roller_clearance=(0.02, 0.005))
+    batch = summarize(simulate(**GEARBOX_DISK, **errors, steps=720))
+    print(f"500 random stack-ups: backlash {np.percentile(batch.backlash_max_arcmin, 50):.1f} arcmin median, "
+          f"{np.percentile(batch.backlash_max_arcmin, 95):.1f} 95th percentile, "
+          f"{batch.interference.mean():.0%} bind ({time.perf_counter() - start:.2f} s in all)")
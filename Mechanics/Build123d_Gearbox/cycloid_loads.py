@@ -0,0 +1,275 @@
+"""
+Pin load sharing, Hertz contact stress and fatigue life of cycloid designs.
+
+For an output torque, works out how the pins of cycloidal_disk()'s pin
+ring share the load at every input angle over a revolution, the Hertzian
+contact stress between pins and disk, and what that means for the life of
+a printed or a metal disk:
+
+    loads = pin_loads(output_torque=85e3, num_lobes=10, num_pins=11, disk_material="PETG")
+    print(loads.max_contact_stress, loads.life_hours)
+
+    for row in size_gearbox("NEMA34"):   # gearbox_assembly()'s drive, several disk materials
+        print(row)
+
+Every argument may be an array (designs, torques, thicknesses, materials by
+name, tolerance stack-ups), all broadcast into one batch.
+
+Load sharing builds on cycloid_kinematics.py, which gives each pin's gap and
+lever (d gap / d disk angle) in the ideal pose. Under torque the disk turns
+by a small angle a past its ideal position; each pin on the loaded side
+is then squeezed by a * lever - gap, carries the Hertz line contact force
+for that deflection (Palmgren's relation, scaled by the contact modulus),
+and the disk settles where the pin forces times their levers add up to the
+disk torque. a is found by bisection, for all designs and angles at once.
+The pin forces' moment about the disk centre equals the output torque
+(the roller forces all point along the eccentricity), so each of the
+`disks` disks carries output_torque / disks.
+
+Contact stress is the Hertz line contact peak, p = sqrt(F E* / (pi L R)),
+with L the disk thickness and R from the pin radius and the outline's
+curvature at the contact. Fatigue life uses a Basquin line through the
+material's contact endurance strength: every flank of the disk and every
+pin is loaded once per input revolution, so life in cycles is life in input
+revolutions. The material data are rough handbook figures for a first
+sizing; use the data sheet of the actual filament or steel when it matters.
+
+Units: N, mm, MPa, N*mm (so 85 N*m is 85e3).
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from cycloid_kinematics import GEARBOX_DISK, simulate
+from cycloid_profile import cycloid_geometry, profile_curvature
+
+STEPS = 720           # input angles per revolution
+BISECTION_STEPS = 60  # halvings of the disk wind-up bracket
+PALMGREN = 3.84e-5 * (210e3 / (2 * (1 - 0.3**2)))**0.9 # line contact compliance constant, from steel on steel
+
+
+class Material(NamedTuple):
+    modulus: float            # E, MPa
+    poisson: float
+    contact_endurance: float  # contact stress survived for `endurance_cycles`, MPa
+    endurance_cycles: float
+    exponent: float           # Basquin exponent of life against contact stress
+    static_limit: float       # contact stress that crushes or yields the surface at once, MPa
+
+
+MATERIALS = {
+    "PLA": Material(3500, 0.36, 25, 1e6, 8, 70),
+    "PETG": Material(2100, 0.38, 20, 1e6, 8, 60),
+    "PA12": Material(1700, 0.40, 30, 1e6, 10, 60),
+    "PA-CF": Material(6000, 0.38, 45, 1e6, 10, 110),
+    "POM": Material(2900, 0.35, 40, 1e6, 10, 100),
+    "aluminium": Material(69e3, 0.33, 300, 1e7, 8, 500),
+    "steel": Material(210e3, 0.30, 1500, 1e7, 12, 2500), # through-hardened, e.g. dowel pins
+}
+
+
+class Motor(NamedTuple):
+    torque: float # usable torque at the motor shaft, N*mm
+    speed: float  # typical running speed, rpm
+
+
+# The motor_type options of gearbox_assembly(); rough catalogue figures
+MOTORS = {
+    "NEMA23": Motor(1.9e3, 300),
+    "NEMA34": Motor(8.5e3, 200),
+    "WIPER": Motor(30e3, 50), # the wiper gearmotor's own output
+}
+SHREDDING_FACTOR = 1.75 # service factor for the shock loads of shredding
+GEARBOX_RATIO = 10      # the 10-lobe / 11-pin disk of gearbox_assembly()
+GEARBOX_THICKNESS = 3.0 # cycloidal_disk() default, as used by gearbox_assembly()
+
+
+class PinLoads(NamedTuple):
+    """Loads over one input revolution; `...` is the batch shape."""
+    input_angle: np.ndarray          # (steps,) rad
+    pin_force: np.ndarray            # (..., steps, pins) contact force on each pin, N
+    contact_stress: np.ndarray       # (..., steps, pins) Hertz peak pressure, MPa
+    loaded_pins: np.ndarray          # (..., steps) pins carrying load
+    max_pin_force: np.ndarray        # (...) N
+    max_contact_stress: np.ndarray   # (...) MPa
+    windup: np.ndarray               # (..., steps) disk rotation under load past the ideal angle, rad
+    static_safety: np.ndarray        # (...) static limit of the weaker material / max contact stress
+    life_cycles: np.ndarray          # (...) input revolutions to contact fatigue (inf: below endurance)
+    life_hours: np.ndarray           # (...) at `input_speed`
+
+
+def pin_loads(
+    output_torque,             # N*mm, total over all disks
+    pin_circle_diameter=50.0,  # D
+    pin_diameter=5.3,          # dp
+    num_lobes=8,               # n
+    num_pins=9,                # N
+    eccentricity_factor=0.3,   # eFactor
+    thickness=3.0,             # disk thickness = contact length, mm
+    disks=1,
+    disk_material="PETG",
+    pin_material="steel",
+    input_speed=200.0,         # rpm, for life_hours
+    steps=STEPS,
+    **errors                   # pin_clearance, eccentricity_error, ... as in cycloid_kinematics.simulate()
+):
+    """Load sharing, contact stress and life of a design under `output_torque`."""
+    values = [np.asarray(value, dtype=float) for value in (
+        output_torque, pin_circle_diameter, pin_diameter, num_lobes, num_pins, eccentricity_factor, thickness,
+        disks, input_speed, *_material_table(disk_material), *_material_table(pin_material))]
+    shape = np.broadcast_shapes(*(value.shape for value in values))
+
+    # Gaps and levers of the pins in the ideal pose; simulate() broadcasts the
+    # tolerance stack-ups in too, which fixes the final batch shape
+    design = (np.broadcast_to(value, shape) for value in values[1:6])
+    kinematics = simulate(*design, steps=steps, **errors)
+    steps, pins = kinematics.pin_gap.shape[-2:]
+    gap = kinematics.pin_gap.reshape(-1, steps, pins)
+    lever = kinematics.pin_lever.reshape(gap.shape)
+    batch_shape = kinematics.pin_gap.shape[:-2]
+    values = [np.broadcast_to(value, batch_shape).reshape(-1) for value in values]
+    torque, D, dp, n, N, eps, length, count, speed = values[:9]
+    disk, pin = Material(*values[9:15]), Material(*values[15:21])
+
+    contact_modulus = 1 / ((1 - disk.poisson**2) / disk.modulus + (1 - pin.poisson**2) / pin.modulus)
+    E, L = contact_modulus[:, None, None], length[:, None, None]
+    disk_torque = (torque / count)[:, None]
+
+    def forces(windup):
+        deflection = np.where(lever > 0, windup[..., None] * lever - gap, 0.0)
+        deflection = np.nan_to_num(np.maximum(deflection, 0.0))
+        # Palmgren: deflection = C (F / (E* L))^0.9 L^0.1
+        return E * L * (deflection / (PALMGREN * L**0.1))**(10 / 9)
+
+    # Bracket the wind-up: from first contact to the angle at which the pin
+    # with the longest lever would carry the whole torque on its own
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low = np.where(lever > 0, gap / lever, np.inf).min(axis=-1)
+        best = np.nanargmax(np.where(lever > 0, lever, -np.inf), axis=-1)[..., None]
+        best_lever = np.take_along_axis(lever, best, axis=-1)[..., 0]
+        best_gap = np.take_along_axis(gap, best, axis=-1)[..., 0]
+        alone = PALMGREN * (disk_torque / best_lever / (E[..., 0] * L[..., 0]))**0.9 * L[..., 0]**0.1
+        high = (best_gap + alone) / best_lever
+    low = np.minimum(low, high)
+    for _ in range(BISECTION_STEPS):
+        middle = (low + high) / 2
+        carried = (forces(middle) * lever).sum(axis=-1)
+        too_far = carried > disk_torque
+        high = np.where(too_far, middle, high)
+        low = np.where(too_far, low, middle)
+    windup = (low + high) / 2
+    force = forces(windup)
+
+    # Hertz line contact with the outline's curvature where each pin touches
+    geometry = cycloid_geometry(pin_circle_diameter=D, num_lobes=n, num_pins=N, eccentricity_factor=eps)
+    lobes = np.rint(geometry.lobe_factor - 1)
+    beta = 2 * math.pi * np.arange(pins) / (lobes + 1)[:, None]
+    contact = beta[:, None, :] - kinematics.output_angle.reshape(len(D), steps)[..., None]
+    curvature, _ = profile_curvature(geometry, dp, contact.reshape(len(D), -1))
+    curvature = curvature.reshape(contact.shape)
+    relative = np.maximum(2 / dp[:, None, None] + curvature, 1e-9) # 1/R, pin and outline
+    stress = np.sqrt(force * E * relative / (math.pi * L))
+
+    max_stress = stress.max(axis=(1, 2))
+    weaker = np.minimum(disk.static_limit, pin.static_limit)
+    life = np.minimum(fatigue_cycles(max_stress, disk), fatigue_cycles(max_stress, pin))
+
+    reshape = lambda value: value.reshape(batch_shape + value.shape[1:])
+    return PinLoads(
+        input_angle=kinematics.input_angle,
+        pin_force=reshape(force),
+        contact_stress=reshape(stress),
+        loaded_pins=reshape((force > 0).sum(axis=-1)),
+        max_pin_force=reshape(force.max(axis=(1, 2))),
+        max_contact_stress=reshape(max_stress),
+        windup=reshape(windup),
+        static_safety=reshape(weaker / max_stress),
+        life_cycles=reshape(life),
+        life_hours=reshape(life / (speed * 60)),
+    )
+
+
+def _material_table(materials):
+    """Material fields for a material name, a Material, or an array of names."""
+    if isinstance(materials, (str, Material)):
+        materials = [materials]
+        single = True
+    else:
+        single = False
+    names = np.asarray(materials, dtype=object)
+    table = [MATERIALS[item] if isinstance(item, str) else Material(*item) for item in names.reshape(-1)]
+    fields = np.array(table, dtype=float).T.reshape((len(Material._fields),) + names.shape)
+    return [field[0] if single else field for field in fields]
+
+
+def fatigue_cycles(stress, material):
+    """
+    Contact fatigue life in load cycles at peak contact stress `stress`:
+    N = N_ref (endurance / stress)^m, unlimited below the endurance strength
+    for metals. Polymers have no endurance limit, the line is continued.
+    """
+    stress = np.asarray(stress, dtype=float)
+    endurance = np.asarray(material.contact_endurance, dtype=float)
+    with np.errstate(divide="ignore"):
+        cycles = material.endurance_cycles * (endurance / stress)**material.exponent
+    metal = np.asarray(material.modulus) > 20e3
+    return np.where(metal & (stress <= endurance), np.inf, cycles)
+
+
+def shredding_torque(motor_type="NEMA34", ratio=GEARBOX_RATIO, service_factor=SHREDDING_FACTOR):
+    """Output torque to size for (N*mm): motor torque x ratio x service factor."""
+    return MOTORS[motor_type].torque * ratio * service_factor
+
+
+class Sizing(NamedTuple):
+    motor_type: str
+    disk_material: str
+    thickness: float          # mm
+    output_torque: float      # N*m
+    max_pin_force: float      # N
+    min_loaded_pins: int
+    max_contact_stress: float # MPa
+    static_safety: float
+    life_hours: float
+
+
+def size_gearbox(motor_type="NEMA34", disk_materials=("PLA", "PETG", "PA-CF", "aluminium", "steel"),
+                 thicknesses=(GEARBOX_THICKNESS, 10.0, 20.0), service_factor=SHREDDING_FACTOR, **errors):
+    """
+    gearbox_assembly()'s drive under shredding torque for `motor_type`,
+    for each disk material and thickness, in one batch. Returns a list of
+    Sizing rows, materials by thickness.
+    """
+    motor = MOTORS[motor_type]
+    materials = np.array(disk_materials, dtype=object)[:, None]
+    thickness = np.asarray(thicknesses, dtype=float)[None, :]
+    torque = shredding_torque(motor_type, GEARBOX_RATIO, service_factor)
+    loads = pin_loads(torque, **GEARBOX_DISK, thickness=thickness, disk_material=materials,
+                      input_speed=motor.speed, **errors)
+    rows = []
+    for i, material in enumerate(disk_materials):
+        for j, value in enumerate(thicknesses):
+            rows.append(Sizing(motor_type, material, float(value), torque / 1e3, float(loads.max_pin_force[i, j]),
+                               int(loads.loaded_pins[i, j].min()), float(loads.max_contact_stress[i, j]),
+                               float(loads.static_safety[i, j]), float(loads.life_hours[i, j])))
+    return rows
+
+
+if __name__ == "__main__":
+    import time
+
+    for motor_type in ("NEMA34", "WIPER"):
+        start = time.perf_counter()
+        rows = size_gearbox(motor_type, pin_clearance=0.02)
+        print(f"{motor_type}: {rows[0].output_torque:.0f} N*m at the output "
+              f"({MOTORS[motor_type].torque / 1e3:g} N*m x {GEARBOX_RATIO} x {SHREDDING_FACTOR}), "
+              f"0.02 mm pin clearance ({time.perf_counter() - start:.2f} s)")
+        for row in rows:
+            if row.static_safety < 1:
+                life = "crushed at first load"
+            else:
+                life = "unlimited" if math.isinf(row.life_hours) else f"{row.life_hours:.3g} h"
+            print(f"  {row.disk_material:<10} {row.thickness:4g} mm: {row.max_pin_force:8.0f} N on "
+                  f">= {row.min_loaded_pins} pins, {row.max_contact_stress:6.0f} MPa, "
+                  f"static safety {row.static_safety:5.2f}, life {life}")
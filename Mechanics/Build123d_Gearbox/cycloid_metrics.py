@@ -0,0 +1,275 @@
+"""
+CAD-free analysis of a cycloidal disk design.
+
+Reports the figures of merit of the disk that cycloidal_disk() would build,
+using only numpy, so designs can be checked or rejected without starting a
+CAD kernel:
+
+    metrics = disk_metrics(num_lobes=10, num_pins=11)
+    if metrics.undercut or metrics.roller_hole_clearance <= 0:
+        ...
+
+Every input may be a numpy array, in which case each metric is an array
+over the broadcast batch.
+
+Everything here follows from the centre path c(t) = R u(t) + e u(k t) of the
+pins (see cycloid_profile.py), written in the frame that turns with u(t):
+
+    c  = (R + e cos phi, e sin phi)
+    c' = (-e k sin phi, R + e k cos phi),    phi = (k - 1) t
+
+so the local shape of the outline only depends on the phase phi within a
+lobe. The curvature of c is
+
+    kappa(phi) = (A + B cos phi) / (C + 2 R e k cos phi)^(3/2)
+    A = R^2 + e^2 k^3,   B = R e k (k + 1),   C = R^2 + e^2 k^2
+
+which has a single turning point in cos phi, so the extremes of the
+outline's curvature are found in closed form rather than by sampling.
+"""
+import functools
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from cycloid_profile import cycloid_geometry
+
+PRESSURE_SAMPLES = 64 # phases per half lobe for the pressure angle distribution
+REFINE_SAMPLES = 65   # phases between the neighbours of the outline point nearest a roller hole
+
+
+class DiskMetrics(NamedTuple):
+    """Analytic metrics of a cycloidal disk (scalars or arrays over a batch)."""
+    ratio: float                   # transmission ratio i = n / (N - n)
+    eccentricity: float            # e (mm)
+    outer_radius: float            # outline radius at the lobe tips (mm)
+    inner_radius: float            # outline radius at the lobe roots (mm)
+    min_radius_of_curvature: float # tightest bend of the outline, 0 if undercut (mm)
+    undercut: bool                 # the pin radius exceeds the centre path's radius of curvature, so the outline has cusps or loops
+    pressure_angle_min: float      # best (smallest) pressure angle on the flanks (degrees)
+    pressure_angle_mean: float     # pressure angle averaged along the outline (degrees)
+    pressure_angles: np.ndarray    # pressure angle at PRESSURE_SAMPLES phases from lobe tip to root (degrees)
+    roller_hole_clearance: float   # thinnest web around the roller holes, negative if they break through (mm)
+
+
+def disk_metrics(
+    pin_circle_diameter=50.0,  # D
+    pin_diameter=5.3,          # dp
+    num_lobes=8,               # n
+    num_pins=9,                # N
+    eccentricity_factor=0.3,   # eFactor (must be < 0.5)
+    center_hole_diameter=24.1, # dc
+    roller_pin_diameter=5.3,   # dr, inner roller pin diameter
+    roller_pitch_diameter=34.0,# dd, roller hole pitch diameter
+    pressure_samples=PRESSURE_SAMPLES
+):
+    """
+    Metrics of the disk built by cycloidal_disk() with the same arguments.
+
+    The roller holes are sized like in cycloidal_disk(): num_lobes holes of
+    diameter dr + 2e on the dd pitch circle, the first one on a lobe tip.
+    """
+    geometry = cycloid_geometry(
+        pin_circle_diameter=pin_circle_diameter,
+        num_lobes=num_lobes,
+        num_pins=num_pins,
+        eccentricity_factor=eccentricity_factor
+    )
+    R = np.asarray(geometry.pitch_radius)
+    e = np.asarray(geometry.eccentricity)
+    k = np.asarray(geometry.lobe_factor)
+    r = np.asarray(pin_diameter, dtype=float) / 2
+
+    radius_of_curvature, undercut = _outline_curvature(R, e, k, r)
+    phi, (ox, oy), normal, angles = _lobe_outline(R, e, k, r, pressure_samples)
+    distance = np.hypot(ox, oy)
+    tip_to_root = angles[..., pressure_samples - 1:]
+
+    hole_diameter = roller_pin_diameter + 2 * e
+    clearance = np.minimum(
+        _hole_to_outline(phi, (ox, oy), normal, (R, e, k, r), num_lobes, roller_pitch_diameter / 2)
+        - hole_diameter / 2,
+        _hole_webs(hole_diameter, num_lobes, center_hole_diameter, roller_pitch_diameter)
+    )
+
+    metrics = DiskMetrics(
+        ratio=geometry.ratio,
+        eccentricity=geometry.eccentricity,
+        outer_radius=distance[..., pressure_samples - 1],
+        inner_radius=distance[..., 0],
+        min_radius_of_curvature=radius_of_curvature,
+        undercut=undercut,
+        pressure_angle_min=tip_to_root.min(axis=-1),
+        # Phases are evenly spaced in t as well, so this is the mean along the outline
+        pressure_angle_mean=(tip_to_root[..., 1:] + tip_to_root[..., :-1]).mean(axis=-1) / 2,
+        pressure_angles=tip_to_root,
+        roller_hole_clearance=clearance,
+    )
+    if np.ndim(metrics.ratio) == 0 and np.ndim(metrics.undercut) == 0:
+        # Single design: plain Python scalars, like cycloid_geometry()
+        metrics = DiskMetrics(*(
+            value if name == "pressure_angles" else np.asarray(value).item()
+            for name, value in zip(metrics._fields, metrics)
+        ))
+    return metrics
+
+
+def _outline_curvature(R, e, k, r):
+    """
+    Minimum radius of curvature of the outline and whether it is undercut.
+
+    The outline is the centre path offset inwards by r, so where the path
+    bends with radius rho the outline bends with radius rho - r (convex
+    parts, kappa > 0) or |rho| + r (concave parts). It is undercut once r
+    reaches the smallest convex rho, or if the centre path itself loops
+    (R <= e k, where its speed drops to zero at the lobe roots).
+    """
+    A = R**2 + e**2 * k**3
+    B = R * e * k * (k + 1)
+    C = R**2 + e**2 * k**2
+    D = 2 * R * e * k
+
+    # kappa at both ends of u = cos(phi) and at its single stationary point
+    with np.errstate(divide="ignore", invalid="ignore"):
+        turning = np.clip(2 * (B * C - 1.5 * D * A) / (B * D), -1, 1)
+        u = np.stack(np.broadcast_arrays(-1.0, 1.0, np.where(B * D != 0, turning, 1.0)))
+        kappa = (A + B * u) / np.maximum(C + D * u, 0)**1.5
+    kappa_max = np.nanmax(kappa, axis=0)
+    kappa_min = np.nanmin(kappa, axis=0)
+
+    undercut = (R <= e * k) | (r * kappa_max >= 1)
+    with np.errstate(divide="ignore"):
+        convex = np.where(kappa_max > 0, 1 / kappa_max - r, np.inf)
+        concave = np.where(kappa_min < 0, -1 / kappa_min + r, np.inf)
+    radius = np.where(undercut, 0.0, np.minimum(convex, concave))
+    return radius, undercut
+
+
+def _lobe_outline(R, e, k, r, samples):
+    """
+    One lobe of the outline, root (phi = -pi) to tip (phi = 0) to root, in
+    the frame turning with u(t): phases, outline points, inward unit
+    normals and pressure angles.
+    2 * samples - 1 points, so the tip-to-root half has `samples` of them.
+
+    The pressure angle is the angle between the contact normal (the line
+    through the pin centre and the contact point) and the direction the
+    contact point moves as the disk turns about its centre: 0 degrees
+    transmits all of the pin force as torque, 90 degrees none of it.
+    """
+    phi, cos_phi, sin_phi = _phases(samples)
+    R, e, k, r = (np.asarray(value)[..., None] for value in (R, e, k, r))
+    (ox, oy), (nx, ny) = _outline_at(cos_phi, sin_phi, R, e, k, r)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lever = np.abs(ox * ny - oy * nx) / np.hypot(ox, oy) # |o x n| / |o|, as o - c is along n
+    angles = np.degrees(np.arccos(np.clip(lever, 0, 1)))
+    return phi, (ox, oy), (nx, ny), angles
+
+
+def _outline_at(cos_phi, sin_phi, R, e, k, r):
+    """Outline points and inward unit normals at phases phi, in the frame turning with u(t)."""
+    # Centre path, its tangent and the left (inward) unit normal
+    cx, cy = R + e * cos_phi, e * sin_phi
+    tx, ty = -e * k * sin_phi, R + e * k * cos_phi
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = 1 / np.hypot(tx, ty)
+    nx, ny = -ty * scale, tx * scale
+    return (cx + r * nx, cy + r * ny), (nx, ny)
+
+
+@functools.lru_cache(maxsize=8)
+def _phases(samples):
+    phi = np.linspace(-math.pi, math.pi, 2 * samples - 1)
+    return phi, np.cos(phi), np.sin(phi)
+
+
+def _hole_to_outline(phi, points, normals, shape, num_holes, pitch, refine=REFINE_SAMPLES):
+    """
+    Signed distance from the critical roller hole centre to the outline
+    sampled at phases phi, negative if the centre lies outside the disk.
+    `shape` is (R, e, k, r).
+
+    The outline repeats every lobe, so a hole only sees its phase within
+    the lobe: with L lobes and h holes starting on a tip, the phases are
+    multiples of 2 pi / m, m = h / gcd(L, h). The hole nearest a root is
+    the critical one; it is measured against the lobe centred on it.
+    The nearest of the phases `phi` is then refined between its neighbours
+    (the samples can be over half a millimetre apart near the roots).
+    """
+    R, e, k, r = (np.asarray(value)[..., None] for value in shape)
+    lobes = np.rint(k - 1).astype(int)
+    holes = np.asarray(num_holes).astype(int)[..., None]
+    m = holes // np.gcd(lobes, holes)
+    hole_phase = np.where(m % 2 == 0, math.pi, math.pi - math.pi / m)
+
+    distance, side = _to_hole(phi, points, normals, hole_phase, lobes, pitch)
+    nearest = distance.argmin(axis=-1)[..., None]
+    step = phi[1] - phi[0]
+    fine = np.take_along_axis(np.broadcast_to(phi, distance.shape), nearest, axis=-1) + np.linspace(-step, step, refine)
+    distance, side = _to_hole(fine, *_outline_at(np.cos(fine), np.sin(fine), R, e, k, r), hole_phase, lobes, pitch)
+    nearest = distance.argmin(axis=-1)[..., None]
+    closest = np.take_along_axis(distance, nearest, axis=-1)[..., 0]
+    inside = np.take_along_axis(side, nearest, axis=-1)[..., 0] > 0
+    return np.where(inside, closest, -closest)
+
+
+def _to_hole(phi, points, normals, hole_phase, lobes, pitch):
+    """Distance from the outline points at phases phi to the hole centre, and which side of them it lies on."""
+    (ox, oy), (nx, ny) = points, normals
+    # Each sample stands for the outline point one lobe period away if that is
+    # nearer the hole; rotate it into a frame with the hole centre at (pitch, 0)
+    offset = (phi - hole_phase + math.pi) % (2 * math.pi) - math.pi
+    turn = offset / lobes
+    cos_turn, sin_turn = np.cos(turn), np.sin(turn)
+    dx = ox * cos_turn - oy * sin_turn - pitch
+    dy = ox * sin_turn + oy * cos_turn
+    # Positive if the hole centre lies on the inward-normal side of the point
+    side = -(dx * (nx * cos_turn - ny * sin_turn) + dy * (nx * sin_turn + ny * cos_turn))
+    return np.hypot(dx, dy), side
+
+
+def _hole_webs(hole_diameter, num_holes, center_hole_diameter, roller_pitch_diameter):
+    """Material left between a roller hole and the centre hole or its neighbour."""
+    pitch = roller_pitch_diameter / 2
+    to_center = pitch - hole_diameter / 2 - center_hole_diameter / 2
+    to_neighbour = 2 * pitch * np.sin(math.pi / np.asarray(num_holes, dtype=float)) - hole_diameter
+    return np.minimum(to_center, to_neighbour)
+
+
+def check_design(
+    pin_circle_diameter=50.0,
+    pin_diameter=5.3,
+    num_lobes=8,
+    num_pins=9,
+    eccentricity_factor=0.3,
+    center_hole_diameter=24.1,
+    roller_pin_diameter=5.3,
+    roller_pitch_diameter=34.0,
+    allow_undercut=False, # the caller trims the outline's loops (self_intersection="trim")
+    **ignored # other cycloidal_disk() arguments (thickness, resolution, ...)
+):
+    """
+    Checks whether cycloidal_disk() with these arguments gives a working
+    disk. Returns (problems, metrics): a list of messages, empty if the
+    design is fine, and its DiskMetrics (None if the parameters are too far
+    off to analyse).
+    """
+    problems = []
+    if num_pins <= num_lobes:
+        return [f"num_pins ({num_pins}) must be greater than num_lobes ({num_lobes})"], None
+    if num_lobes % (num_pins - num_lobes):
+        problems.append(f"num_pins - num_lobes ({num_pins - num_lobes}) must divide num_lobes ({num_lobes}) "
+                        "for the outline to close")
+    if not 0 < eccentricity_factor < 0.5:
+        problems.append(f"eccentricity_factor ({eccentricity_factor}) must be between 0 and 0.5")
+    if problems:
+        return problems, None
+
+    metrics = disk_metrics(pin_circle_diameter, pin_diameter, num_lobes, num_pins, eccentricity_factor,
+                           center_hole_diameter, roller_pin_diameter, roller_pitch_diameter)
+    if metrics.undercut and not allow_undercut:
+        problems.append(f"the outline is undercut: pin_diameter ({pin_diameter}) is too large for the lobe tips")
+    if metrics.roller_hole_clearance <= 0:
+        problems.append(f"the roller holes break through (clearance {metrics.roller_hole_clearance:.2f} mm)")
+    return problems, metrics
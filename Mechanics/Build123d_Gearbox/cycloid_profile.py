@@ -0,0 +1,233 @@
+"""
+NumPy kernel for the contracted cycloid profile used by cycloidal_disk().
+
+This module only needs numpy (no build123d / OCC import), so the curve can be
+generated, sampled and analysed without starting a CAD kernel.
+
+Notation follows the RepRap Ltd generator (contracted-cycloid.py):
+    D  - pin circle centres diameter
+    dp - pin diameter
+    n  - number of lobes
+    N  - number of pins
+    i  - transmission ratio, n / (N - n)
+    delta - rolling circle diameter, D / N
+    d  - base circle diameter, i * D / N
+    e  - eccentricity, delta * eFactor
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+MIN_CHORD_TOLERANCE = 1e-6 # mm, finer than any machine can cut; adaptive_angles() refuses less
+MAX_SPLIT_ROUNDS = 30      # chord splitting passes in adaptive_angles() before giving up
+
+
+class CycloidGeometry(NamedTuple):
+    """Derived parameters of a cycloidal disk (scalars or broadcastable arrays)."""
+    ratio: float            # i
+    rolling_diameter: float # delta
+    base_diameter: float    # d
+    eccentricity: float     # e
+    pitch_radius: float     # (d + delta) / 2, radius of the epicycloid centre path
+    lobe_factor: float      # (d + delta) / delta, angular speed of the eccentric term
+
+
+def cycloid_geometry(
+    pin_circle_diameter=50.0, # D
+    num_lobes=8,              # n
+    num_pins=9,               # N
+    eccentricity_factor=0.3   # eFactor (must be < 0.5)
+):
+    """
+    Derives the cycloid parameters from the disk design inputs.
+
+    Any input may be a numpy array, in which case every field of the result
+    is an array of the broadcast shape.
+    """
+    D = np.asarray(pin_circle_diameter, dtype=float)
+    n = np.asarray(num_lobes, dtype=float)
+    N = np.asarray(num_pins, dtype=float)
+
+    ratio = n / (N - n)
+    delta = D / N
+    d = ratio * D / N
+    e = delta * np.asarray(eccentricity_factor, dtype=float)
+
+    geometry = CycloidGeometry(
+        ratio=ratio,
+        rolling_diameter=delta,
+        base_diameter=d,
+        eccentricity=e,
+        pitch_radius=(d + delta) / 2,
+        lobe_factor=(d + delta) / delta,
+    )
+    if all(np.ndim(value) == 0 for value in geometry):
+        geometry = CycloidGeometry(*(float(value) for value in geometry))
+    return geometry
+
+
+def profile_angles(resolution):
+    """Evenly spaced curve parameters for one closed loop (no repeated end point)."""
+    return np.arange(resolution) * (2 * math.pi / resolution)
+
+
+def center_line(geometry, angles, order=1):
+    """
+    Evaluates the epicycloid centre path and its exact derivatives.
+
+        x = R cos(t) + e cos(k t)
+        y = R sin(t) + e sin(k t)
+
+    with R = (d + delta)/2 and k = (d + delta)/delta.
+
+    Returns a list [c, c', c'', ...] up to `order`, each of shape (..., 2).
+    Geometry fields and `angles` broadcast against each other.
+    """
+    t = np.asarray(angles, dtype=float)
+    R = _column(geometry.pitch_radius)
+    e = _column(geometry.eccentricity)
+    k = _column(geometry.lobe_factor)
+
+    kt = k * t
+    cos_t, sin_t = np.cos(t), np.sin(t)
+    cos_kt, sin_kt = np.cos(kt), np.sin(kt)
+
+    # d^m/dt^m of (cos, sin)(a t) is a^m times the pair rotated by m * 90 degrees
+    result = []
+    for m in range(order + 1):
+        base = _rotate_quarter(cos_t, sin_t, m)
+        lobe = _rotate_quarter(cos_kt, sin_kt, m)
+        scale = e * k**m
+        result.append(np.stack((R * base[0] + scale * lobe[0],
+                                R * base[1] + scale * lobe[1]), axis=-1))
+    return result
+
+
+def _column(value):
+    """Adds a trailing axis to array parameters so they broadcast over angles."""
+    return np.asarray(value)[..., None] if np.ndim(value) else value
+
+
+def _rotate_quarter(c, s, m):
+    """(cos, sin) rotated by m quarter turns."""
+    return [(c, s), (-s, c), (-c, -s), (s, -c)][m % 4]
+
+
+def contracted_profile(geometry, pin_diameter, angles):
+    """
+    Offsets the centre path inwards by the pin radius to give the disk outline.
+
+    The offset direction is the exact left-hand normal of the curve, i.e. the
+    analytic version of the chord normal NormalVector() used in the original
+    macro. Returns points of shape (..., 2).
+    """
+    points, tangent = center_line(geometry, angles, order=1)
+    radius = _column(np.asarray(pin_diameter, dtype=float) / 2)
+
+    speed = np.hypot(tangent[..., 0], tangent[..., 1])
+    scale = radius / speed
+    normal = np.stack((-tangent[..., 1] * scale, tangent[..., 0] * scale), axis=-1)
+    return points + normal
+
+
+def profile_curvature(geometry, pin_diameter, angles):
+    """
+    Signed curvature and parametric speed |do/dt| of the contracted outline.
+
+    For the inward offset o = c + r*n of the centre path c (curvature k),
+    do/dt = (1 - r*k) dc/dt, so the offset curvature is k / (1 - r*k).
+    """
+    curvature, speed = center_curvature(geometry, angles)
+    radius = _column(np.asarray(pin_diameter, dtype=float) / 2)
+
+    factor = 1 - radius * curvature
+    return curvature / factor, np.abs(factor) * speed
+
+
+def center_curvature(geometry, angles):
+    """Signed curvature and parametric speed |dc/dt| of the centre path."""
+    _, first, second = center_line(geometry, angles, order=2)
+    speed = np.hypot(first[..., 0], first[..., 1])
+    curvature = (first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0]) / speed**3
+    return curvature, speed
+
+
+def adaptive_angles(geometry, pin_diameter, chord_tolerance, min_points=None):
+    """
+    Curve parameters placed by local curvature so that no chord of the
+    contracted outline deviates from the true curve by more than
+    `chord_tolerance` (mm).
+
+    A chord of length L on an arc of curvature k has a sagitta of about
+    L^2 k / 8, so the ideal point density along the curve is sqrt(k / 8 tol).
+    The points are equidistributed against that density, then any chord whose
+    midpoint still misses the tolerance is split until all of them pass.
+    Raises ValueError below MIN_CHORD_TOLERANCE, where the point count
+    explodes and rounding noise would keep chords splitting forever.
+    """
+    if not chord_tolerance >= MIN_CHORD_TOLERANCE:
+        raise ValueError(f"chord_tolerance must be at least {MIN_CHORD_TOLERANCE:g} mm")
+
+    # Dense parameter grid, fine enough to resolve the lobe tips
+    lobes = int(math.ceil(abs(geometry.lobe_factor)))
+    dense = profile_angles(max(4096, 256 * lobes))
+    curvature, speed = profile_curvature(geometry, pin_diameter, dense)
+    density = np.sqrt(np.abs(curvature) / (8 * chord_tolerance)) * speed
+
+    # Cumulative point count over one closed loop (trapezoidal rule)
+    step = 2 * math.pi / len(dense)
+    density = np.append(density, density[0])
+    cumulative = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) * step / 2)))
+    dense = np.append(dense, 2 * math.pi)
+
+    if min_points is None:
+        min_points = 2 * lobes
+    count = max(int(math.ceil(cumulative[-1])), min_points)
+    angles = np.interp(np.arange(count) * (cumulative[-1] / count), cumulative, dense)
+
+    # Split the chords that are still too far from the curve. Each pass
+    # halves them, so the first pass nearly always settles it
+    for _ in range(MAX_SPLIT_ROUNDS):
+        closed = np.append(angles, 2 * math.pi)
+        deviation = _chord_deviation(geometry, pin_diameter, closed)
+        too_far = deviation > chord_tolerance
+        if not too_far.any():
+            return angles
+        middle = (closed[:-1] + closed[1:]) / 2
+        angles = np.sort(np.concatenate((angles, middle[too_far])))
+    raise ValueError(f"no chords within {chord_tolerance:g} mm after {MAX_SPLIT_ROUNDS} rounds of splitting")
+
+
+def _chord_deviation(geometry, pin_diameter, closed):
+    """
+    Largest distance between each chord closed[j] -> closed[j + 1] and the
+    outline it replaces. The deviation is probed along the chord and the peak
+    is refined with a parabola through the three samples around it, since the
+    worst point is rarely at a probe.
+    """
+    ends = contracted_profile(geometry, pin_diameter, closed)
+    fractions = np.linspace(0, 1, 17)[1:-1]
+    probes = contracted_profile(geometry, pin_diameter,
+                                closed[:-1] + fractions[:, None] * np.diff(closed))
+    samples = _point_chord_distance(probes, ends[:-1], ends[1:])
+
+    peak = np.clip(samples.argmax(axis=0), 1, len(fractions) - 2)
+    columns = np.arange(samples.shape[1])
+    before, at, after = samples[peak - 1, columns], samples[peak, columns], samples[peak + 1, columns]
+    bend = 2 * at - before - after
+    refined = at + np.where(bend > 0, (before - after)**2 / (8 * np.where(bend > 0, bend, 1)), 0)
+    return np.maximum(refined, samples.max(axis=0))
+
+
+def _point_chord_distance(points, starts, ends):
+    """
+    Distance from each point to the matching chord segment. Not to the line
+    through it: near the cusps of an undercut outline the curve runs past
+    the chord's end and back, which a line would not notice.
+    """
+    chord = ends - starts
+    offset = points - starts
+    t = np.clip((offset * chord).sum(axis=-1) / np.maximum((chord * chord).sum(axis=-1), 1e-300), 0, 1)
+    return np.hypot(*np.moveaxis(offset - t[..., None] * chord, -1, 0))
+
@@ -0,0 +1,270 @@
+"""
+Design-space sweep for the cycloidal disk.
+
+Evaluates thousands of (pin_circle_diameter, pin_diameter, num_lobes,
+num_pins, eccentricity_factor) candidates with cycloid_metrics.py,
+in a process pool and without building any solids, then builds CAD only
+for the best few:
+
+    space = {
+        "pin_circle_diameter": span(40, 70, 5),
+        "pin_diameter": [4.0, 5.3, 6.0],
+        "num_lobes": range(6, 16),
+        "num_pins": range(7, 17),
+        "eccentricity_factor": span(0.2, 0.45, 0.05),
+    }
+    sweep(space, "cycloid_sweep.csv")
+    for row in top_candidates("cycloid_sweep.csv", count=5):
+        print(row)
+    build_top("cycloid_sweep.csv", count=3)
+
+Results are appended to a CSV file (one column per parameter and metric)
+as each batch finishes. Every row carries a `candidate` key derived from
+its parameters, so re-running an interrupted or extended sweep against the
+same file only evaluates the candidates that are not in it yet.
+"""
+import contextlib
+import csv
+import hashlib
+import itertools
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from cycloid_metrics import DiskMetrics, disk_metrics
+
+# Swept inputs, in the order they appear in the results file
+PARAMETERS = ("pin_circle_diameter", "pin_diameter", "num_lobes", "num_pins", "eccentricity_factor")
+INTEGER_PARAMETERS = ("num_lobes", "num_pins")
+
+# Defaults for parameters missing from a sweep space (same as cycloidal_disk())
+DEFAULTS = {
+    "pin_circle_diameter": 50.0,
+    "pin_diameter": 5.3,
+    "num_lobes": 8,
+    "num_pins": 9,
+    "eccentricity_factor": 0.3,
+}
+
+# Every scalar metric of cycloid_metrics.DiskMetrics
+METRICS = tuple(name for name in DiskMetrics._fields if name != "pressure_angles")
+COLUMNS = ("candidate",) + PARAMETERS + METRICS
+
+CHUNK_SIZE = 256 # candidates per worker task
+
+
+def span(start, stop, step):
+    """Inclusive range of floats, e.g. span(0.2, 0.45, 0.05) -> 0.2, 0.25, ... 0.45."""
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    return [round(start + i * step, 9) for i in range(count)]
+
+
+def expand(space):
+    """
+    Every candidate in the cartesian product of a sweep space.
+
+    `space` maps parameter names to a value or an iterable of values;
+    parameters left out take their DEFAULTS. Combinations with no closed
+    profile are dropped: there must be more pins than lobes, and
+    num_pins - num_lobes must divide num_lobes.
+    """
+    unknown = set(space) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+
+    axes = []
+    for name in PARAMETERS:
+        values = space.get(name, DEFAULTS[name])
+        if isinstance(values, (str, bytes)) or not hasattr(values, "__iter__"):
+            values = [values]
+        cast = int if name in INTEGER_PARAMETERS else float
+        axes.append([cast(v) for v in values])
+
+    for values in itertools.product(*axes):
+        candidate = dict(zip(PARAMETERS, values))
+        lobes, pins = candidate["num_lobes"], candidate["num_pins"]
+        if pins > lobes and lobes % (pins - lobes) == 0:
+            yield candidate
+
+
+def candidate_key(candidate):
+    """Short stable id of a candidate's parameters."""
+    text = json.dumps([candidate[name] for name in PARAMETERS])
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def evaluate(candidates):
+    """
+    Computes the metrics of a batch of candidates in one vectorized pass.
+    Returns one result row (dict with COLUMNS) per candidate.
+    """
+    if not candidates:
+        return []
+    inputs = {name: np.array([c[name] for c in candidates]) for name in PARAMETERS}
+    metrics = disk_metrics(**inputs)._asdict()
+
+    rows = []
+    for i, candidate in enumerate(candidates):
+        row = {"candidate": candidate_key(candidate)}
+        row.update(candidate)
+        row.update({name: metrics[name][i].item() for name in METRICS})
+        rows.append(row)
+    return rows
+
+
+def sweep(space, output="cycloid_sweep.csv", max_workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Evaluates every candidate of `space` that `output` does not hold yet and
+    appends the results to it as they come in.
+
+    Batches run in a process pool (`max_workers` processes, default one per
+    CPU; 1 evaluates in this process). Returns (evaluated, skipped) counts.
+    """
+    done = evaluated_keys(output)
+    pending, skipped = [], 0
+    for candidate in expand(space):
+        key = candidate_key(candidate)
+        if key in done:
+            skipped += 1
+            continue
+        done.add(key) # also drops duplicates within the space
+        pending.append(candidate)
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    with _open_results(output) as (f, writer):
+        if max_workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                _write_rows(f, writer, evaluate(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(evaluate, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    _write_rows(f, writer, future.result())
+
+    return len(pending), skipped
+
+
+@contextlib.contextmanager
+def _open_results(path):
+    """Opens a results file for appending, writing the header if it is new."""
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if is_new:
+            writer.writeheader()
+            f.flush()
+        yield f, writer
+
+
+def _write_rows(f, writer, rows):
+    writer.writerows(rows)
+    f.flush() # an interrupted sweep keeps every finished batch
+
+
+def evaluated_keys(path):
+    """
+    Candidate keys already present in a results file.
+
+    A row cut short by an interruption is removed from the file, so that
+    candidate is evaluated again on the next run.
+    """
+    if not os.path.exists(path):
+        return set()
+    _drop_partial_row(path)
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return set()
+        if tuple(header) != COLUMNS:
+            raise ValueError(f"{path} is not a cycloid sweep results file (columns {header})")
+        return {row[0] for row in reader if len(row) == len(COLUMNS)}
+
+
+def _drop_partial_row(path):
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def read_results(path):
+    """Rows of a results file as dicts with numeric values."""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        return [_parse_row(row) for row in reader if None not in row.values()]
+
+
+def _parse_row(row):
+    parsed = {"candidate": row["candidate"]}
+    for name in PARAMETERS + METRICS:
+        if name in INTEGER_PARAMETERS:
+            parsed[name] = int(row[name])
+        elif name == "undercut":
+            parsed[name] = row[name] == "True"
+        else:
+            parsed[name] = float(row[name])
+    return parsed
+
+
+def top_candidates(path, count=5, rank_by="min_radius_of_curvature", descending=True, where=None):
+    """
+    Best `count` rows of a results file by `rank_by`.
+
+    Undercut profiles and disks whose roller holes break through are never
+    ranked. `where` is an optional extra filter taking a row dict, e.g.
+    lambda row: 8 <= row["ratio"] <= 12.
+    """
+    rows = [row for row in read_results(path) if not row["undercut"] and row["roller_hole_clearance"] > 0]
+    if where is not None:
+        rows = [row for row in rows if where(row)]
+    rows.sort(key=lambda row: row[rank_by], reverse=descending)
+    return rows[:count]
+
+
+def build_top(path, count=3, output_dir=".", rank_by="min_radius_of_curvature", descending=True,
+              where=None, **disk_options):
+    """
+    Builds and exports STEP files of the best candidates in a results file.
+
+    Extra keyword arguments go to cycloidal_disk() (e.g. thickness,
+    spline_tolerance). Returns the written file paths.
+    """
+    # Only the final candidates need the CAD kernel
+    from build123d import export_step
+    from cycloidal_gear import cycloidal_disk
+
+    paths = []
+    for row in top_candidates(path, count, rank_by, descending, where):
+        disk = cycloidal_disk(**{name: row[name] for name in PARAMETERS}, **disk_options)
+        filename = os.path.join(output_dir, f"cycloidal_disk_{row['candidate']}.step")
+        export_step(disk, filename)
+        paths.append(filename)
+    return paths
+
+
+if __name__ == "__main__":
+    space = {
+        "pin_circle_diameter": span(40, 70, 5),
+        "pin_diameter": [4.0, 5.3, 6.0],
+        "num_lobes": range(6, 16),
+        "num_pins": range(7, 17),
+        "eccentricity_factor": span(0.2, 0.45, 0.05),
+    }
+    print("Sweeping cycloidal disk designs...")
+    evaluated, skipped = sweep(space, "cycloid_sweep.csv")
+    print(f"Evaluated {evaluated} candidates ({skipped} already in cycloid_sweep.csv)")
+
+    for row in top_candidates("cycloid_sweep.csv", count=5):
+        print(f"  {row['candidate']}: ratio {row['ratio']:.2f}, min radius of curvature "
+              f"{row['min_radius_of_curvature']:.2f} mm, D={row['pin_circle_diameter']} "
+              f"dp={row['pin_diameter']} n={row['num_lobes']} N={row['num_pins']} "
+              f"eFactor={row['eccentricity_factor']}")
+
+    print("Building top candidates...")
+    for filename in build_top("cycloid_sweep.csv", count=3, spline_tolerance=0.01):
+        print(f"Saved to {filename}")
@@ -1,6 +1,11 @@
 import math
+import numpy as np
 from build123d import *
+from part_cache import cached_part, shared_shape, shared_copy
+from cycloid_profile import cycloid_geometry, contracted_profile, profile_angles, adaptive_angles
+from outline_check import first_crossing, trim_loops
 
+@cached_part
 def cycloidal_disk(
     pin_circle_diameter=50.0, # D
     pin_diameter=5.3,         # dp
@@ -9,187 +14,134 @@ def cycloidal_disk(
     eccentricity_factor=0.3,  # eFactor (must be < 0.5)
     center_hole_diameter=24.1,# dc
     thickness=3.0,            # bearingLength
-    resolution=360            # circle
+    resolution=360,           # circle
+    chord_tolerance=None,     # mm, max outline deviation; overrides resolution
+    spline_tolerance=None,    # mm, fit B-spline lobes instead of a Polyline
+    self_intersection="error" # "error", "trim" (cut swallowtail loops off) or "ignore"
 ):
     """
     Generates a cycloidal disk Part using the contracted cycloid logic.
+
+    By default the outline is sampled at `resolution` evenly spaced angles.
+    If `chord_tolerance` is given, points are placed by local curvature
+    instead, using the fewest vertices that keep every polyline segment
+    within that distance of the true curve (e.g. 0.005 for 5 um).
+
+    If `spline_tolerance` is given, the outline is built from one B-spline
+    edge per lobe (see spline_outline()), so the disk gets one smooth side
+    face per lobe instead of one planar face per polyline segment.
+
+    Too large a pin_diameter or eccentricity_factor makes the offset outline
+    cross itself at the lobe tips, which OCC turns into a slow failure or a
+    broken solid. The outline points are checked first (outline_check.py):
+    by default such a design raises ValueError straight away; "trim" cuts
+    the loops off and builds the envelope that remains (polyline only).
     """
 
-    # Derived Parameters
-    transmission_ratio = num_lobes / (num_pins - num_lobes)
-    delta = pin_circle_diameter / num_pins # Rolling circle diameter
-    d = transmission_ratio * pin_circle_diameter / num_pins # Base circle diameter (This formula seems to be d = i * delta = i * D / N)
-    # Wait, in the original script: d = i * D / N.
-    # i = n / (N-n).
-    # So d = (n / (N-n)) * (D / N).
-
-    e = delta * eccentricity_factor # Eccentricity
-
-    # Generate points for the cycloid curve
-    points = []
-
-    # We loop to generate the full closed curve
-    # The original script does `range(circle+3)` for normal calculation lookahead
-    # Here we can calculate normals or just generate enough points and let build123d handle the spline/polyline
-
-    # Let's replicate the math exactly
-    circle_pi = resolution * 0.5
-
-    # The original script generates an "offset" cycloid by calculating the normal.
-    # We will do the same manually to ensure the "contracted" shape is correct.
-
-    raw_points = []
-
-    # Generate raw center-line points first
-    # We need a bit of wrap-around for normal calculation at the start/end if we do it manually
-    for theta_step in range(resolution + 3):
-        theta = theta_step # Just an index in the loop
-
-        # Original:
-        # xNew = ((d + delta)/2)*maths.cos(theta*maths.pi/circlePi)
-        # yNew = ((d + delta)/2)*maths.sin(theta*maths.pi/circlePi)
-        # phi =  d*theta/delta
-        # xNew += e*maths.cos((theta+phi)*maths.pi/circlePi)
-        # yNew += e*maths.sin((theta+phi)*maths.pi/circlePi)
-
-        # Interpreting theta scaling:
-        # The loop goes 0 to resolution.
-        # angle = theta * pi / circlePi = theta * pi / (resolution/2) = theta * 2pi / resolution
-        # So angle goes 0 to 2pi (plus a bit). Correct.
-
-        angle = theta * math.pi / circle_pi
-
-        # Parametric Equations for Epicycloid (center path)
-        # R = d/2, r = delta/2 ?
-        # The original script uses: ((d + delta)/2)
-
-        r_base = d/2
-        r_rolling = delta/2
-
-        # Epicycloid center:
-        # x = (R + r) * cos(t) + e * cos((R+r)/r * t)
-        # Check original:
-        # term1 = ((d+delta)/2) => (d/2 + delta/2) => (R+r). Correct.
-        # term2_angle: (theta + phi) * ...
-        # phi = d * theta / delta.
-        # total_angle_term2 = (theta + d*theta/delta) * (pi/circlePi)
-        # = theta * (1 + d/delta) * ...
-        # = t * (1 + d/delta) = t * ( (delta + d) / delta ) = t * (R+r)/r. Correct.
-
-        # So the math matches a standard epicycloid with eccentricity e.
-
-        x = (d + delta)/2 * math.cos(angle) + e * math.cos(angle * (d+delta)/delta)
-        y = (d + delta)/2 * math.sin(angle) + e * math.sin(angle * (d+delta)/delta)
-
-        raw_points.append((x, y))
-
-    # Now calculate offsets (contraction)
-    offset_points = []
-    radius_offset = pin_diameter / 2.0
-
-    for i in range(2, resolution + 2):
-        x_curr, y_curr = raw_points[i]
-        x_prev, y_prev = raw_points[i-1]
-
-        # Calculate tangent/normal
-        dx = x_curr - x_prev
-        dy = y_curr - y_prev
-        dist = math.sqrt(dx*dx + dy*dy)
-
-        if dist == 0:
-            continue
-
-        # Normal vector (rotate -90 deg? or +90?)
-        # Original: s = r / dist
-        # normal = (dy * s, -dx * s) ?
-        # Original: NormalVector returns (dy*s, -dx*s) ?
-        # Wait, original:
-        # dy_diff = xNew - xOld (This is actually dx in standard notation? No, variables are named xNew, but function says dy=xNew-xOld)
-        # Let's check original function:
-        # def NormalVector(xOld, xNew, yOld, yNew, r):
-        #   dy = xNew - xOld  <-- This is dx_actual
-        #   dx = yOld - yNew  <-- This is -dy_actual
-        #   s = r/sqrt(...)
-        #   return (dx*s, dy*s)
-        #
-        # So it returns: (-dy_actual * s, dx_actual * s)
-        # This is a rotation. (x, y) -> (-y, x) is 90 deg rotation.
-        # So if tangent is (tx, ty), normal is (-ty, tx).
-
-        # Let's apply this logic
-        tx = dx
-        ty = dy
-
-        # Normal (per original script logic)
-        nx = -ty * (radius_offset / dist) # "dx" in original return = (yOld - yNew) = -dy
-        ny = tx * (radius_offset / dist)  # "dy" in original return = (xNew - xOld) = dx
-
-        # Point = Current + Normal
-        # But wait, original uses xOld/xNew to calculate normal, but adds to x?
-        # Original: offsetCycloid.append(App.Vector(x + dxy[0], y + dxy[1], 0))
-        # where x is xNew.
-
-        # Let's just trust the geometric intent: Contract inwards by radius_offset.
-        # We need to determine if "inwards" is +Normal or -Normal.
-        # The curve is CCW?
-        # If CCW, Left Normal is inwards?
-
-        # Let's try to simply use build123d's offset_2d capabilities if possible, but the original script does it manually
-        # likely because of self-intersection issues or specific handling.
-        # However, for a cycloid, manual offset is safer if we want exact replication.
-
-        off_x = x_curr - ny # Wait, original: return (dx*s, dy*s) where dx=yOld-yNew (-dy), dy=xNew-xOld (dx)
-        # So returned vector is (-dy*s, dx*s).
-        # x_final = x + (-dy*s)
-        # y_final = y + (dx*s)
-
-        # My tx=dx, ty=dy.
-        off_x = x_curr - ty * (radius_offset / dist)
-        off_y = y_curr + tx * (radius_offset / dist)
-
-        offset_points.append((off_x, off_y))
+    # Derived Parameters (see cycloid_profile.py for the notation)
+    geometry = cycloid_geometry(
+        pin_circle_diameter=pin_circle_diameter,
+        num_lobes=num_lobes,
+        num_pins=num_pins,
+        eccentricity_factor=eccentricity_factor
+    )
+    e = geometry.eccentricity # Eccentricity
+
+    # Contracted cycloid outline in one vectorized pass.
+    # The offset uses the analytic curve normal rather than the chord between
+    # neighbouring samples, so it has no lag error at any resolution.
+    if chord_tolerance:
+        angles = adaptive_angles(geometry, pin_diameter, chord_tolerance)
+    else:
+        angles = profile_angles(resolution)
+    offset_points = contracted_profile(geometry, pin_diameter, angles)
+
+    # A self-intersecting outline fails here in milliseconds rather than in the kernel
+    if self_intersection not in ("error", "trim", "ignore"):
+        raise ValueError(f"self_intersection must be 'error', 'trim' or 'ignore', not {self_intersection!r}")
+    crossing = first_crossing(offset_points) if self_intersection != "ignore" else None
+    if crossing and (self_intersection == "error" or spline_tolerance):
+        x, y = crossing.point
+        raise ValueError(
+            f"the cycloidal disk outline crosses itself near ({x:.3f}, {y:.3f}), between the points at "
+            f"t = {math.degrees(angles[crossing.first]):.2f} and {math.degrees(angles[crossing.second]):.2f} deg: "
+            f"pin_diameter ({pin_diameter}) is too large for the pin path's curvature at eccentricity_factor "
+            f"({eccentricity_factor}), so the lobes are undercut. Use a smaller pin_diameter or "
+            f"eccentricity_factor" + ("" if spline_tolerance else ", or self_intersection='trim'"))
+    if crossing:
+        offset_points, _ = trim_loops(offset_points)
+    offset_points = [tuple(p) for p in offset_points.tolist()]
+
+    # Roller Holes
+    # There are `rollerHoles` (usually = num_lobes) on pitch diameter `dd` (inner roller pin centers)
+    # The hole in the disk is bigger than the roller pin by 2*e to allow the wobbling:
+    # dh = dr + 2*e, with dr = 5.3 (inner roller pin dia) and dd = 34 as in the original.
+    roller_hole_dia = 5.3 + 2 * e
+    roller_pitch_dia = 34.0
+    roller_hole = roller_hole_cutter(roller_hole_dia, thickness)
+    center_hole = roller_hole_cutter(center_hole_diameter, thickness)
 
     # Create the wire
     with BuildPart() as p:
-        with BuildSketch() as s:
-            with BuildLine() as l:
-                Polyline(offset_points, close=True)
-            make_face()
-
-        extrude(amount=thickness)
-
-        # Center Hole
-        with Locations((0,0)):
-            Cylinder(radius=center_hole_diameter/2, height=thickness, mode=Mode.SUBTRACT)
-
-        # Roller Holes
-        # There are `rollerHoles` (usually = num_lobes) on pitch diameter `dd` (inner roller pin centers)
-        # Wait, the prompt script says `rollerHoles = 4 # Number of roller holes (must equal n or divide into n exactly)`
-        # Original: dd = 34
-
-        roller_circle_dia = 34.0 # dd
-        roller_pin_dia = 5.3 + 2 * e # dh = dr + 2*e (Dr is inner roller pin dia)
-        # But wait, the HOLE in the disk needs to be bigger by 2*e to allow the wobbling?
-        # Yes: dh = dr + 2*e
-
-        # Let's calculate dr from function args if needed, or assume the hole size is the parameter.
-        # The function signature doesn't take 'dr'. Let's add it or derive it.
-        # Let's assume we want the final Hole Diameter.
-        # In original: dr=5.3, e=... dh = dr + 2*e.
-        # Let's just parameterize `roller_hole_diameter`.
-
-        roller_hole_dia = 5.3 + 2 * e
-        roller_pitch_dia = 34.0
-
-        with Locations((0,0)):
-            with PolarLocations(radius=roller_pitch_dia/2, count=int(num_lobes)): # usually num_lobes holes
-                # Wait, original script has `rollerHoles = 4` which is n/2.
-                # Let's stick to n holes for symmetry unless specified.
-                # We will use num_lobes.
-                Cylinder(radius=roller_hole_dia/2, height=thickness, mode=Mode.SUBTRACT)
+        if spline_tolerance:
+            # Straight from the edges: BuildLine and BuildSketch clean() what
+            # they hold, which merges the tangent-continuous lobes into one
+            # edge that no longer follows them
+            extrude(Face(Wire(spline_outline(geometry, pin_diameter, spline_tolerance))), amount=thickness)
+        else:
+            with BuildSketch() as s:
+                with BuildLine() as l:
+                    Polyline(offset_points, close=True)
+                make_face()
+
+            extrude(amount=thickness)
+
+        # Center Hole and Roller Holes, cut together in a single boolean
+        # (usually num_lobes roller holes; the original script used n/2)
+        holes = [center_hole]
+        holes += [shared_copy(roller_hole, loc) for loc in PolarLocations(radius=roller_pitch_dia/2, count=int(num_lobes))]
+        add(holes, mode=Mode.SUBTRACT)
 
     return p.part
 
+@shared_shape
+def roller_hole_cutter(diameter, thickness):
+    """
+    Cylinder cutting one roller (or center) hole, shared by every hole of
+    every disk.
+    """
+    # The disk is extruded up from Z=0, so the cutter spans the full
+    # thickness from Z=0 too and the holes go right through
+    with BuildPart() as hole:
+        Cylinder(radius=diameter/2, height=thickness, align=(Align.CENTER, Align.CENTER, Align.MIN))
+    return hole.part
+
+def spline_outline(geometry, pin_diameter, tolerance):
+    """
+    Fits the contracted cycloid outline with one B-spline edge per lobe.
+
+    The outline repeats every 360/lobes degrees, so a single lobe is fitted
+    and rotated into place for the others. The lobe is interpolated
+    (OCC GeomAPI_Interpolate) through the points a polyline would need for
+    `tolerance` / 4; a cubic through them stays well within `tolerance` of
+    the curve. It starts and ends on lobe tips, square to the radius there
+    as the outline is symmetric about each tip, so the copies join without
+    a kink.
+    """
+    lobes = int(round(geometry.lobe_factor - 1))
+    span = 2 * math.pi / lobes
+
+    # Samples up to the next tip, without an angle a rounding error short of it (a repeated point)
+    angles = adaptive_angles(geometry, pin_diameter, tolerance / 4)
+    angles = np.append(angles[angles < span - 1e-9], span)
+    points = contracted_profile(geometry, pin_diameter, angles)
+
+    # An approximating fit (Edge.make_spline_approx) needs fewer poles but
+    # can't be held to the tip tangents, leaving a kink at every join
+    tip_tangents = [Vector(-y, x) for x, y in (points[0], points[-1])]
+    lobe = Edge.make_spline([(x, y, 0) for x, y in points.tolist()], tangents=tip_tangents)
+    return [lobe.rotate(Axis.Z, i * 360.0 / lobes) for i in range(lobes)]
+
 if __name__ == "__main__":
     print("Generating Cycloidal Disk...")
     disk = cycloidal_disk()
@@ -0,0 +1,266 @@
+"""
+Drum tooth phasing: drive torque over a revolution, and a phasing search.
+
+By default full_machine_assembly() turns every drum_disk() a fixed step past
+the previous one (360 / (num_disks * 2) degrees, a helix). This module works
+out what the drum asks of the gearbox for a given set of disk angles, and
+searches for angles with lower torque peaks:
+
+    torque = drum_torque(helix_angles())           # N*m, (feeds, steps)
+    best = optimize_phasing()
+    full_machine_assembly(disk_phases=best.angles) # or disk_phases="optimized"
+
+Cutting model, per tooth: the knife edge sits at +X (where
+full_machine_assembly() puts fixed_knife()) and the drum turns
+counter-clockwise, tooth first (the gullet is in front of it). A tooth
+starts to bite the material `engagement` degrees before its insert tip
+reaches the knife, the force builds up as the material is squeezed
+(power law, `exponent`) to a peak at the knife edge, where the chip shears,
+and falls to zero over `release` degrees. The peak is
+shear strength x disk thickness x bite depth at the drum radius. Disks add
+up, each weighted by how much material is in front of it.
+
+That last part is what the search is about. With the drum full across its
+width, every disk cuts and only the set of angles matters, not which disk
+gets which: any arrangement of evenly spaced angles gives the same torque.
+But a bottle or a lump only covers a few adjacent disks, and the helix
+puts adjacent disks next to each other in phase too, so their teeth bite
+almost together and the torque comes in spikes. The search therefore
+scores each arrangement by peak factors (peak / mean torque, i.e. the peak
+for the same material throughput): the full width one, plus shares of the
+full width ripple and of the worst peak factor for a lump of `lump_disks`
+disks at any position. Peak torque is what trips the motor's current limit
+and triggers a jam reversal, so that's what the score keeps low.
+
+Disk angles are chosen from `slots` evenly spaced positions over one tooth
+pitch (by default one per disk, i.e. evenly spaced). The search is a local
+search over swaps and moves between slots, run from `population` random
+starts at once: each round scores every neighbour of every start in one
+vectorized batch, from one disk's torque shifted along a grid that the
+slots fall on.
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+# Length 254mm. Disk thickness ~25.4mm => 10 disks. full_machine_assembly() builds the drum from these.
+NUM_DISKS = 10
+DISK_THICKNESS = 25.4
+STEPS = 720            # drum angles per revolution
+ENGAGEMENT = 50.0      # deg before the knife where a tooth starts to bite
+RELEASE = 6.0          # deg after the knife for the chip to break off
+EXPONENT = 2.0         # force build-up as the tooth closes on the knife
+SHEAR_STRENGTH = 25.0  # MPa, HDPE / PP (PET ~ 50)
+BITE = 8.0             # mm of material a tooth takes per pass
+LUMP_DISKS = 3         # a lump covering ~75 mm of drum, e.g. a bottle
+RIPPLE_WEIGHT = 0.25  # score = full width peak factor + these x ripple / worst lump peak factor
+LUMP_WEIGHT = 0.5
+
+
+def tooth_tip_angle(diameter=150.0):
+    """Angle of the insert tip of drum_disk()'s tooth at 0 (insert_pocket_cutter()), deg."""
+    return math.degrees(math.atan2(-5.0, diameter / 2 - 5))
+
+
+def tooth_torque(diameter=150.0, thickness=DISK_THICKNESS, shear_strength=SHEAR_STRENGTH, bite=BITE):
+    """Peak cutting torque of one tooth (N*m): shear force on a thickness x bite chip at the rim."""
+    return shear_strength * thickness * bite * (diameter / 2) / 1e3
+
+
+def helix_angles(num_disks=NUM_DISKS, num_teeth=2):
+    """full_machine_assembly()'s default helix: 360 / (num_disks * num_teeth) per disk, deg."""
+    return tuple(i * 360.0 / (num_disks * num_teeth) for i in range(num_disks))
+
+
+def disk_angles(disk_phases=None, num_disks=NUM_DISKS, num_teeth=2):
+    """
+    Disk angles (deg) for full_machine_assembly()'s `disk_phases`: None for
+    the helix, "optimized" for optimize_phasing(), or the angles themselves.
+    """
+    if disk_phases is None:
+        return helix_angles(num_disks, num_teeth)
+    if isinstance(disk_phases, str):
+        if disk_phases != "optimized":
+            raise ValueError(f"disk_phases must be None, 'optimized' or a list of angles, not {disk_phases!r}")
+        return optimize_phasing(num_disks, num_teeth).angles
+    angles = tuple(float(angle) for angle in disk_phases)
+    if len(angles) != num_disks:
+        raise ValueError(f"disk_phases needs {num_disks} angles, got {len(angles)}")
+    return angles
+
+
+def feed_scenarios(num_disks=NUM_DISKS, lump_disks=LUMP_DISKS):
+    """
+    Material in front of each disk, one row per feed: the full width first,
+    then a lump of `lump_disks` adjacent disks at every position.
+    """
+    feeds = [np.ones(num_disks)]
+    if 0 < lump_disks < num_disks:
+        for start in range(num_disks - lump_disks + 1):
+            lump = np.zeros(num_disks)
+            lump[start:start + lump_disks] = 1.0
+            feeds.append(lump)
+    return np.array(feeds)
+
+
+def drum_torque(
+    disk_angles,                 # deg, (..., disks)
+    num_teeth=2,
+    feeds=None,                  # (feeds, disks) material in front of each disk; default full width
+    diameter=150.0,
+    thickness=DISK_THICKNESS,
+    engagement=ENGAGEMENT,
+    release=RELEASE,
+    exponent=EXPONENT,
+    shear_strength=SHEAR_STRENGTH,
+    bite=BITE,
+    steps=STEPS
+):
+    """
+    Drive torque at the drum shaft (N*m) over one revolution, shape
+    (..., feeds, steps), at drum angles np.arange(steps) * 360 / steps.
+    """
+    disk_angles = np.asarray(disk_angles, dtype=float)
+    feeds = np.ones((1, disk_angles.shape[-1])) if feeds is None else np.atleast_2d(feeds)
+    drum = np.arange(steps) * (360.0 / steps)
+    per_disk = disk_torque(disk_angles[..., None] + drum, num_teeth, diameter, engagement, release, exponent)
+    peak = tooth_torque(diameter, thickness, shear_strength, bite)
+    return peak * np.einsum("fd,...ds->...fs", feeds, per_disk)
+
+
+def disk_torque(angles, num_teeth=2, diameter=150.0, engagement=ENGAGEMENT, release=RELEASE, exponent=EXPONENT):
+    """Cutting torque of one disk turned to `angles` (deg, any shape), in peak tooth torques."""
+    teeth = np.arange(num_teeth) * (360.0 / num_teeth)
+    # Angle of every tooth tip past the knife, wrapped to [-180, 180)
+    past = (np.asarray(angles, dtype=float)[..., None] + teeth + tooth_tip_angle(diameter) + 180.0) % 360.0 - 180.0
+    building = np.clip((past + engagement) / engagement, 0.0, 1.0)**exponent
+    breaking = np.clip(1.0 - past / release, 0.0, 1.0)
+    return np.where(past <= 0, building, breaking).sum(axis=-1)
+
+
+def phasing_score(torque, ripple_weight=RIPPLE_WEIGHT, lump_weight=LUMP_WEIGHT):
+    """
+    (score, peak factor, lump peak factor, ripple) of drum_torque() results
+    (..., feeds, steps), the first feed being the full width: its peak /
+    mean and (max - min) / mean, the worst peak / mean of the other feeds,
+    and the score the search minimizes.
+    """
+    mean = torque.mean(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = torque.max(axis=-1) / mean
+        ripple = (torque[..., 0, :].max(axis=-1) - torque[..., 0, :].min(axis=-1)) / mean[..., 0]
+    peak_factor = factors[..., 0]
+    lump_factor = np.nanmax(factors[..., 1:], axis=-1) if factors.shape[-1] > 1 else peak_factor
+    return peak_factor + ripple_weight * ripple + lump_weight * lump_factor, peak_factor, lump_factor, ripple
+
+
+class DrumPhasing(NamedTuple):
+    angles: tuple            # disk angles for full_machine_assembly(disk_phases=...), deg
+    score: float
+    peak_factor: float       # full width peak / mean torque
+    lump_peak_factor: float  # worst lump peak / mean torque
+    ripple: float            # full width (max - min) / mean
+    peak_torque: float       # full width, N*m
+    lump_peak_torque: float  # worst lump, N*m
+    torque: np.ndarray       # (steps,) full width torque over a revolution, N*m
+
+
+def evaluate(angles, num_teeth=2, lump_disks=LUMP_DISKS, ripple_weight=RIPPLE_WEIGHT, lump_weight=LUMP_WEIGHT,
+             **model):
+    """DrumPhasing for a given set of disk angles (deg)."""
+    angles = tuple(float(angle) for angle in angles)
+    torque = drum_torque(angles, num_teeth, feed_scenarios(len(angles), lump_disks), **model)
+    score, peak_factor, lump_factor, ripple = phasing_score(torque, ripple_weight, lump_weight)
+    lumps = torque[1:] if len(torque) > 1 else torque
+    return DrumPhasing(angles, float(score), float(peak_factor), float(lump_factor), float(ripple),
+                       float(torque[0].max()), float(lumps.max()), torque[0])
+
+
+def optimize_phasing(
+    num_disks=NUM_DISKS,
+    num_teeth=2,
+    slots=None,              # angle positions over one tooth pitch; default num_disks (evenly spaced)
+    lump_disks=LUMP_DISKS,
+    ripple_weight=RIPPLE_WEIGHT,
+    lump_weight=LUMP_WEIGHT,
+    population=32,           # random starts searched together
+    rounds=100,
+    seed=0,
+    steps=360,               # per revolution while searching (rounded to fit the slots); the result uses STEPS
+    diameter=150.0,
+    engagement=ENGAGEMENT,
+    release=RELEASE,
+    exponent=EXPONENT,
+    **model                  # the rest of drum_torque()'s cutting model (scales the torque only)
+):
+    """
+    Searches disk angles that keep the drive torque's peaks low (see the
+    module docstring). Returns the best DrumPhasing, with the first disk at 0.
+    """
+    slots = num_disks if slots is None else slots
+    if slots < num_disks:
+        raise ValueError(f"slots ({slots}) must be at least num_disks ({num_disks})")
+    pitch = 360.0 / num_teeth / slots
+    feeds = feed_scenarios(num_disks, lump_disks)
+
+    # Torque of a disk at slot s is the one at slot 0 shifted by s * per_slot
+    # grid steps, so one profile and index arithmetic score any arrangement
+    per_slot = max(1, round(steps / (num_teeth * slots)))
+    grid = per_slot * num_teeth * slots
+    profile = disk_torque(np.arange(grid) * (360.0 / grid), num_teeth, diameter, engagement, release, exponent)
+    steps_on_grid = np.arange(grid)
+
+    def score(assignments):
+        shifted = profile[(assignments[..., None] * per_slot + steps_on_grid) % grid]
+        return phasing_score(np.einsum("fd,...ds->...fs", feeds, shifted), ripple_weight, lump_weight)[0]
+
+    # Each start: a random choice of distinct slots, one per disk. The first
+    # is the helix, or on a finer grid the best evenly spaced arrangement
+    # (a much smaller search), so the result is never worse than either
+    random = np.random.default_rng(seed)
+    current = np.array([random.permutation(slots)[:num_disks] for _ in range(population)])
+    current[0] = np.arange(num_disks) * slots // num_disks
+    if slots > num_disks:
+        even = optimize_phasing(num_disks, num_teeth, None, lump_disks, ripple_weight, lump_weight, population,
+                                rounds, seed, steps, diameter, engagement, release, exponent)
+        current[0] = np.rint(np.asarray(even.angles) / pitch).astype(int) % slots
+    current_score = score(current)
+
+    disks, positions = np.arange(num_disks), np.arange(slots)
+    for _ in range(rounds):
+        # Every neighbour: disk a moves to slot v, swapping with the disk already there (P, disks * slots, disks)
+        neighbours = np.broadcast_to(current[:, None, None, :], (population, num_disks, slots, num_disks)).copy()
+        occupant = current[:, None, None, :] == positions[None, None, :, None]
+        neighbours = np.where(occupant, current[:, :, None, None], neighbours)
+        neighbours[:, disks, :, disks] = positions
+        neighbours = neighbours.reshape(population, num_disks * slots, num_disks)
+
+        scores = score(neighbours)
+        best = scores.argmin(axis=1)
+        best_score = scores[np.arange(population), best]
+        improved = best_score < current_score - 1e-9
+        if not improved.any():
+            break
+        current[improved] = neighbours[improved, best[improved]]
+        current_score[improved] = best_score[improved]
+
+    winner = current[current_score.argmin()]
+    angles = (winner - winner[0]) % slots * pitch
+    return evaluate(np.round(angles, 6), num_teeth, lump_disks, ripple_weight, lump_weight, diameter=diameter,
+                    engagement=engagement, release=release, exponent=exponent, **model)
+
+
+if __name__ == "__main__":
+    import time
+
+    helix = evaluate(helix_angles())
+    print(f"Helix     {', '.join(f'{a:g}' for a in helix.angles)}")
+    print(f"  peak {helix.peak_torque:.0f} N*m full width, {helix.lump_peak_torque:.0f} N*m worst lump; "
+          f"peak factor {helix.peak_factor:.2f} / {helix.lump_peak_factor:.2f} lump, ripple {helix.ripple:.2f}")
+    for slots in (NUM_DISKS, 2 * NUM_DISKS):
+        start = time.perf_counter()
+        best = optimize_phasing(slots=slots)
+        print(f"Optimized ({slots} slots, {time.perf_counter() - start:.2f} s) {', '.join(f'{a:g}' for a in best.angles)}")
+        print(f"  peak {best.peak_torque:.0f} N*m full width, {best.lump_peak_torque:.0f} N*m worst lump; "
+              f"peak factor {best.peak_factor:.2f} / {best.lump_peak_factor:.2f} lump, ripple {best.ripple:.2f}")
@@ -1,18 +1,64 @@
 from build123d import *
 import math
+from concurrent.futures import ProcessPoolExecutor
 from gearbox_assembly import gearbox_assembly
 from shredder_components import drum_disk, fixed_knife
 from pusher_mechanism import pusher_mechanism
+from part_cache import pack_shape, unpack_shape, shared_copy
+import drum_phasing
+from drum_phasing import NUM_DISKS, DISK_THICKNESS
+from knife_clearance import KNIFE_X
 
-def full_machine_assembly():
+# The independent subassemblies: name -> (generator, arguments)
+SUBASSEMBLIES = {
+    # Using NEMA 34 Stepper Motor for high torque and home use
+    "gearbox": (gearbox_assembly, dict(ratio=10.0, motor_type="NEMA34", use_impact_drive=True)),
+    "drum_disk": (drum_disk, dict(thickness=DISK_THICKNESS, hex_shaft_size=25.0, num_teeth=2)),
+    "knife": (fixed_knife, dict(length=254.0, drum_diameter=150.0)),
+    "pusher": (pusher_mechanism, dict(width=250.0, depth=140.0)),
+}
+
+def _build_subassembly(generator, arguments):
+    """
+    Process pool worker: builds one subassembly and returns it as BREP.
+    """
+    return pack_shape(generator(**arguments))
+
+def build_subassemblies(parallel=False, max_workers=None):
+    """
+    Builds every entry of SUBASSEMBLIES, returning {name: shape}.
+
+    With parallel=True each subassembly is built in its own worker process
+    and shipped back as serialized BREP; they don't depend on each other,
+    so the slowest one sets the total time.
+    """
+    if not parallel:
+        return {name: generator(**arguments) for name, (generator, arguments) in SUBASSEMBLIES.items()}
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(SUBASSEMBLIES)) as pool:
+        futures = {
+            name: pool.submit(_build_subassembly, generator, arguments)
+            for name, (generator, arguments) in SUBASSEMBLIES.items()
+        }
+        return {name: unpack_shape(future.result()) for name, future in futures.items()}
+
+def full_machine_assembly(parallel=False, max_workers=None, disk_phases=None):
     """
     Assembles the Gearbox, Shredder Drum, Fixed Knife, and Pusher.
+
+    With parallel=True the subassemblies are built in a process pool of
+    `max_workers` processes (see build_subassemblies()); this process only
+    places them and builds the Compound.
+
+    `disk_phases` turns the drum disks: None for the plain helix, a list of
+    angles (degrees, one per disk), or "optimized" for the phasing with the
+    lowest torque peaks from drum_phasing.optimize_phasing().
     """
+    parts = build_subassemblies(parallel=parallel, max_workers=max_workers)
 
     # 1. Gearbox
     # (Includes Housing, Input Shaft, Output Hex Shaft, Impact Drive)
-    # Using NEMA 34 Stepper Motor for high torque and home use
-    gearbox = gearbox_assembly(ratio=10.0, motor_type="NEMA34", use_impact_drive=True)
+    gearbox = parts["gearbox"]
 
     # Extract the output shaft location relative to the gearbox?
     # The gearbox output shaft was generated at (0,0,10) in the sub-assembly.
@@ -20,9 +66,8 @@ def full_machine_assembly():
 
     # 2. Shredder Drum
     # Stack of disks.
-    # Length 254mm. Disk thickness ~25.4mm => 10 disks.
-    num_disks = 10
-    disk_thickness = 25.4
+    num_disks = NUM_DISKS
+    disk_thickness = DISK_THICKNESS
 
     drum_parts = []
 
@@ -32,10 +77,15 @@ def full_machine_assembly():
     # Let's offset each disk by 360 / (num_disks * num_teeth) ?
     # 360 / 20 = 18 degrees per step.
 
-    angle_step = 360.0 / (num_disks * 2)
+    # The helix spreads the teeth evenly, but adjacent disks bite almost
+    # together on a lump spanning them; drum_phasing.py finds arrangements
+    # with lower torque peaks.
+    # (knife_clearance.py checks the knife gap for the same angles)
+    num_teeth = SUBASSEMBLIES["drum_disk"][1]["num_teeth"]
+    disk_angles = drum_phasing.disk_angles(disk_phases, num_disks, num_teeth)
 
     # Create one master disk to copy?
-    master_disk_shape = drum_disk(thickness=disk_thickness, hex_shaft_size=25.0, num_teeth=2)
+    master_disk_shape = parts["drum_disk"]
 
     # We need to position the drum ON the shaft.
     # Gearbox is at origin?
@@ -46,33 +96,39 @@ def full_machine_assembly():
 
     drum_start_z = 60.0 # Clear the gearbox housing
 
+    # Every disk is an instance of the master disk: a shared reference to
+    # its geometry plus a location, so memory and STEP size grow with the
+    # number of unique parts rather than the number of disks. The STEP
+    # export writes one disk product and one placement per instance.
+    master_disk_shape.label = "drum_disk"
     for i in range(num_disks):
         z_pos = drum_start_z + (i * disk_thickness)
-        angle = i * angle_step
+        angle = disk_angles[i]
 
-        # Copy and move
-        d = master_disk_shape.rotate(Axis.Z, angle).move(Location((0,0, z_pos)))
+        d = shared_copy(master_disk_shape, Location((0,0, z_pos)) * Rotation(0,0, angle))
         drum_parts.append(d)
 
+    drum = Compound(children=drum_parts, label="drum")
+
     # 3. Fixed Knife
     # Positioned next to the drum.
     # Drum Radius = 75mm.
     # Knife should be at X = 75 + clearance?
     # Or usually, the knife interlocks.
-    knife_shape = fixed_knife(length=254.0, drum_diameter=150.0)
+    knife_shape = parts["knife"]
 
     # Center the knife along the drum length
     drum_center_z = drum_start_z + (254.0 / 2)
-    knife_loc = Location((80, 0, drum_center_z)) # X=80 (just outside 75 radius), Centered Z
+    knife_loc = Location((KNIFE_X, 0, drum_center_z)) # X=80 (just outside 75 radius), Centered Z
 
-    knife_part = knife_shape.move(knife_loc) # Knife was created centered?
+    # Knife was created centered?
     # fixed_knife() -> Box(length, width, thickness). Box is centered at 0,0,0.
     # Length is X dimension? No, Box(length, width, thickness). usually X, Y, Z.
     # Let's check fixed_knife implementation: Box(length, width, thickness).
     # So X=254. We want Length along Z axis.
     # So we need to rotate the knife.
 
-    knife_part = knife_shape.rotate(Axis.Y, 90).move(knife_loc)
+    knife_part = shared_copy(knife_shape, knife_loc * Rotation(0, 90, 0))
 
     # 4. Pusher
     # Above the drum?
@@ -95,17 +151,17 @@ def full_machine_assembly():
     # Let's keep Z-axis for generating, but the "Pusher" is actually a "Ram" on the side.
     # If Knife is at X=80, Pusher might be at X=-80?
     # Or Y axis?
-    pusher_shape = pusher_mechanism(width=250.0, depth=140.0)
+    pusher_shape = parts["pusher"]
     # Pusher is Box(width, depth, thickness).
     # We want it to push towards the drum.
     # Let's place it at Y = -100.
     pusher_loc = Location((0, -120, drum_center_z))
-    pusher_part = pusher_shape.rotate(Axis.X, 90).move(pusher_loc) # Rotate to face drum
+    pusher_part = shared_copy(pusher_shape, pusher_loc * Rotation(90, 0, 0)) # Rotate to face drum
 
     # Combine Everything
     full_assembly = Compound(children=[
         gearbox,
-        *drum_parts,
+        drum,
         knife_part,
         pusher_part
     ])
@@ -114,6 +170,6 @@ def full_machine_assembly():
 
 if __name__ == "__main__":
     print("Generating Full Machine Assembly...")
-    asm = full_machine_assembly()
+    asm = full_machine_assembly(parallel=True)
     export_step(asm, "open_shredder_full_assembly.step")
     print("Saved open_shredder_full_assembly.step")
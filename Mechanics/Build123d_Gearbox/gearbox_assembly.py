@@ -1,8 +1,10 @@
 import math
 from build123d import *
+from part_cache import cached_part
 from cycloidal_gear import cycloidal_disk
 from impact_drive import impact_drive_mechanism
 
+@cached_part
 def gearbox_assembly(
     ratio=10.0,
     motor_type="NEMA23",
@@ -0,0 +1,519 @@
+"""
+Long-running local generation service.
+
+Keeps a pool of worker processes that have already imported build123d and
+every generator, and builds parts for HTTP requests:
+
+    python3 generation_service.py --port 8123 --workers 2
+
+    curl -o gearbox.step "http://127.0.0.1:8123/build/gearbox?motor_type=NEMA34"
+    curl -o disk.stl -X POST -d '{"num_lobes": 10, "num_pins": 11}' \\
+        "http://127.0.0.1:8123/build/cycloidal-disk?format=stl"
+    curl http://127.0.0.1:8123/stats
+
+Endpoints:
+    GET  /generators             generator names and outputs
+    GET  /generators/<name>      parameters and defaults
+    GET  /build/<name>?...       build with query-string parameters
+    POST /build/<name>?format=   build with a JSON object of parameters
+    GET  /stats                  queue depth, in-flight jobs and latencies
+
+`format` is step (default), stl, 3mf or brep; generators with several outputs
+(impact-drive) also take `output=<index>`. Identical requests share one
+build while it is running, and recent results are served from a spool
+directory. Cycloidal disk parameters are checked with cycloid_metrics
+before any geometry is built.
+
+Workers are restarted whenever a source file in this directory changes,
+so requests always see the current generators. With --watch DIR the
+service also keeps the script outputs in DIR up to date (see
+build_graph.py), rebuilding them as generators are saved.
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import generators
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+FORMATS = {"step": "model/step", "stl": "model/stl", "3mf": "model/3mf", "brep": "application/octet-stream"}
+CHUNK_SIZE = 64 * 1024 # bytes per write when streaming a result
+SPOOL_ENTRIES = 64     # finished results kept for repeat requests
+LATENCY_WINDOW = 1000  # jobs the latency statistics are computed over
+POLL_INTERVAL = 1.0    # seconds between source checks
+CRASH_RETRIES = 2      # reruns of a job whose worker died before it fails
+
+
+# =============================================================================
+# Workers
+# =============================================================================
+def _warm_worker():
+    """Pool initializer: pay the CAD kernel and generator imports up front."""
+    import build123d # noqa: F401
+    for name in generators.GENERATORS:
+        generators.load(name)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_job(name, arguments, output, path):
+    """Builds generator `name` and writes shape number `output` to `path`."""
+    start = time.perf_counter()
+    result = generators.load(name)(**arguments)
+    shapes = result if isinstance(result, tuple) else (result,)
+    tmp = f"{path}.{os.getpid()}.tmp{os.path.splitext(path)[1]}"
+    generators.export_shape(shapes[output], tmp, max_workers=1) # the pool already uses every CPU
+    os.replace(tmp, path)
+    return time.perf_counter() - start
+
+
+class _Job:
+    def __init__(self, key, name, arguments, output, fmt):
+        self.key, self.name, self.arguments = key, name, arguments
+        self.output, self.format = output, fmt
+        self.path = None # set per attempt by the dispatcher
+        self.future = Future()
+        self.crashes = 0 # times a worker died building it
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.build_time = None
+
+
+# =============================================================================
+# Service
+# =============================================================================
+class GenerationService:
+    """
+    Job queue in front of a pool of warm worker processes.
+
+    submit() returns a Future for the result file; identical jobs (same
+    generator, arguments, output and format) share one Future while in
+    flight, and finished results are reused from the spool.
+    """
+
+    def __init__(self, workers=None, spool_dir=None, watch_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.spool_dir = spool_dir or tempfile.mkdtemp(prefix="openshredder-service-")
+        self._own_spool = spool_dir is None
+        self.watch_dir = watch_dir
+
+        self._lock = threading.Lock()
+        self._pool_ready = threading.Condition(self._lock) # notified when a restart swaps in workers
+        self._restarting = threading.Lock() # one restart at a time
+        self._queue = queue.Queue()
+        self._in_flight = {}           # key -> _Job
+        self._spool = OrderedDict()    # key -> path of a finished result
+        self._leases = {}              # path -> responses still streaming it
+        self._doomed = set()           # evicted paths to remove once their leases end
+        self._running = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW) # (wait, build, total) per job
+        self._counts = {"submitted": 0, "deduplicated": 0, "spooled": 0, "completed": 0, "failed": 0,
+                        "restarts": 0, "crashes": 0}
+        self._stopping = threading.Event()
+        self._pool = None
+        self._generation = 0           # bumped by every pool restart
+        self._sources = self._source_stamps()
+
+    # Lifecycle ----------------------------------------------------------------
+    def start(self):
+        self._pool = self._start_pool()
+        self._threads = [threading.Thread(target=self._dispatch, daemon=True) for _ in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._watch_sources, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        if self.watch_dir:
+            self._rebuild_outputs()
+
+    def stop(self):
+        self._stopping.set()
+        for _ in range(self.workers):
+            self._queue.put(None)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        if self._own_spool:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _start_pool(self):
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        # Start every worker now rather than on the first requests
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    # Jobs ---------------------------------------------------------------------
+    def submit(self, name, values=None, fmt="step", output=0):
+        """
+        Queues a build of generator `name` with parameter `values` and returns
+        (future, deduplicated). The future resolves to the result file path.
+        Raises KeyError/ValueError for unknown generators or bad parameters.
+        """
+        generator = generators.get(name)
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}' (use {', '.join(FORMATS)})")
+        if not 0 <= output < len(generator.outputs):
+            raise ValueError(f"{name} has {len(generator.outputs)} output(s), got output={output}")
+        arguments = generators.bind(name, values, use_options=False)
+        self._check(generator, arguments)
+
+        key = _job_key(name, arguments, output, fmt)
+        with self._lock:
+            self._counts["submitted"] += 1
+            job = self._in_flight.get(key)
+            if job is not None:
+                self._counts["deduplicated"] += 1
+                return job.future, True
+            path = self._spool.get(key)
+            if path is not None and os.path.exists(path):
+                self._spool.move_to_end(key)
+                self._counts["spooled"] += 1
+                future = Future()
+                future.set_result(path)
+                return future, True
+
+            job = _Job(key, name, arguments, output, fmt)
+            self._in_flight[key] = job
+        self._queue.put(job)
+        return job.future, False
+
+    def _check(self, generator, arguments):
+        if generator.function == "cycloidal_disk":
+            from cycloid_metrics import check_design
+
+            problems, _ = check_design(**arguments, allow_undercut=arguments.get("self_intersection") == "trim")
+            if problems:
+                raise ValueError("; ".join(problems))
+
+    def _dispatch(self):
+        """Dispatcher thread: feeds queued jobs to the pool, one at a time."""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running += 1
+            job.started = time.perf_counter()
+            finished = False
+            while not finished:
+                with self._pool_ready:
+                    self._pool_ready.wait_for(lambda: self._pool is not None)
+                    pool, generation = self._pool, self._generation
+                # One file per pool generation, so an old worker finishing late
+                # cannot overwrite a result built from the new sources
+                job.path = os.path.join(self.spool_dir, f"{job.key}-{generation}.{job.format}")
+                # A restart can shut `pool` down under us: submit() then raises
+                # RuntimeError or result() is cancelled, and _finish() sends the
+                # job round again on the new workers
+                try:
+                    job.build_time = pool.submit(_run_job, job.name, job.arguments, job.output, job.path).result()
+                except BrokenProcessPool as error:
+                    # A worker died (e.g. the CAD kernel crashed) and took the
+                    # pool with it: every job on it fails the same way until
+                    # it is replaced. Retry this one a few times, as it may
+                    # have been another job's crash
+                    job.crashes += 1
+                    if job.crashes > CRASH_RETRIES:
+                        finished = self._finish(job, generation, error)
+                    self._restart_pool(generation, "a worker crashed")
+                except Exception as error:
+                    finished = self._finish(job, generation, error)
+                else:
+                    finished = self._finish(job, generation, None)
+
+    def _finish(self, job, generation, error):
+        """
+        Records the outcome of `job` as built by pool `generation`. Returns
+        False, changing nothing, when the pool was restarted since: the result
+        came from the old sources (or never came) and the job must run again.
+        """
+        done = time.perf_counter()
+        with self._lock:
+            if generation != self._generation:
+                if error is None:
+                    _remove(job.path)
+                return False
+            self._running -= 1
+            del self._in_flight[job.key]
+            if error is None:
+                self._counts["completed"] += 1
+                self._latencies.append((job.started - job.submitted, job.build_time, done - job.submitted))
+                self._spool[job.key] = job.path
+                self._doomed.discard(job.path) # rebuilt over an evicted result still being sent
+                while len(self._spool) > SPOOL_ENTRIES:
+                    _, old = self._spool.popitem(last=False)
+                    self._discard(old)
+            else:
+                self._counts["failed"] += 1
+        if error is None:
+            job.future.set_result(job.path)
+        else:
+            job.future.set_exception(error)
+        return True
+
+    # Spool --------------------------------------------------------------------
+    @contextmanager
+    def open_result(self, path):
+        """
+        Opens a finished result for reading. The file is leased until the
+        block exits, so eviction or a restart cannot delete it mid-response.
+        Raises FileNotFoundError if it has already been removed.
+        """
+        with self._lock:
+            if path in self._doomed:
+                raise FileNotFoundError(path)
+            f = open(path, "rb")
+            self._leases[path] = self._leases.get(path, 0) + 1
+        try:
+            with f:
+                yield f
+        finally:
+            with self._lock:
+                self._leases[path] -= 1
+                if not self._leases[path]:
+                    del self._leases[path]
+                    if path in self._doomed:
+                        self._doomed.discard(path)
+                        _remove(path)
+
+    def _discard(self, path):
+        """Removes a spooled result now, or when its last lease ends. Needs the lock."""
+        if path in self._leases:
+            self._doomed.add(path)
+        else:
+            _remove(path)
+
+    # Statistics ---------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            result = {
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "running": self._running,
+                "in_flight": len(self._in_flight),
+                "spooled_results": len(self._spool),
+                **self._counts,
+            }
+        for index, name in enumerate(("wait", "build", "total")):
+            result[f"{name}_seconds"] = _summary([entry[index] for entry in latencies])
+        return result
+
+    # Source watching ----------------------------------------------------------
+    def _source_stamps(self):
+        stamps = {}
+        for name in os.listdir(_HERE):
+            if name.endswith(".py"):
+                stat = os.stat(os.path.join(_HERE, name))
+                stamps[name] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _watch_sources(self):
+        while not self._stopping.wait(POLL_INTERVAL):
+            stamps = self._source_stamps()
+            if stamps == self._sources:
+                continue
+            self._sources = stamps
+            self._restart_pool()
+            if self.watch_dir:
+                self._rebuild_outputs()
+
+    def _restart_pool(self, generation=None, reason="sources changed"):
+        """
+        Swaps in fresh workers that import the edited sources. Jobs queued on
+        the old workers are cancelled and those already running are discarded
+        when they finish; both are rebuilt on the new workers (see _finish), so
+        no result built from the old sources is returned.
+
+        With `generation`, only restarts if that pool is still the current
+        one: every dispatcher on a crashed pool asks, the first one restarts.
+        """
+        with self._restarting:
+            with self._lock:
+                if generation is not None and generation != self._generation:
+                    return
+                old, self._pool = self._pool, None # dispatchers wait for the new workers
+                self._generation += 1
+                if generation is None:
+                    self._counts["restarts"] += 1
+                    # Spooled results may come from the old sources
+                    for path in self._spool.values():
+                        self._discard(path)
+                    self._spool.clear()
+                else:
+                    self._counts["crashes"] += 1
+            old.shutdown(wait=False, cancel_futures=True)
+            new = self._start_pool()
+            with self._pool_ready:
+                self._pool = new
+                self._pool_ready.notify_all()
+        print(f"Workers restarted: {reason}", file=sys.stderr)
+
+    def _rebuild_outputs(self):
+        import build_graph
+
+        try:
+            build_graph.make(output_dir=self.watch_dir, max_workers=self.workers,
+                             log=lambda message: print(message, file=sys.stderr))
+        except RuntimeError as error:
+            print(error, file=sys.stderr)
+
+
+def _job_key(name, arguments, output, fmt):
+    from part_cache import canonical
+
+    text = json.dumps([name, canonical(arguments), output, fmt], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+def _summary(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# =============================================================================
+# HTTP front end
+# =============================================================================
+class _Handler(BaseHTTPRequestHandler):
+    service = None # set by serve()
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["stats"]:
+            return self._json(200, self.service.stats())
+        if parts == ["generators"]:
+            return self._json(200, {name: {"description": g.description, "outputs": list(g.outputs)}
+                                    for name, g in generators.GENERATORS.items()})
+        if len(parts) == 2 and parts[0] == "generators":
+            try:
+                return self._json(200, {p.name: p.default for p in generators.parameters(parts[1])})
+            except KeyError as error:
+                return self._json(404, {"error": error.args[0]})
+        if len(parts) == 2 and parts[0] == "build":
+            return self._build(parts[1], dict(parse_qsl(url.query)))
+        return self._json(404, {"error": f"No such endpoint: {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if len(parts) != 2 or parts[0] != "build":
+            return self._json(404, {"error": f"No such endpoint: {url.path}"})
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            values = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(values, dict):
+                raise ValueError("expected a JSON object of parameters")
+        except ValueError as error:
+            return self._json(400, {"error": f"Bad request body: {error}"})
+        values.update(parse_qsl(url.query))
+        return self._build(parts[1], values)
+
+    def _build(self, name, values):
+        fmt = values.pop("format", "step")
+        start = time.perf_counter()
+        try:
+            output = int(values.pop("output", 0))
+            future, deduplicated = self.service.submit(name, values, fmt, output)
+        except KeyError as error:
+            return self._json(404, {"error": error.args[0]})
+        except ValueError as error:
+            return self._json(400, {"error": str(error)})
+        try:
+            path = future.result()
+        except Exception as error:
+            return self._json(500, {"error": f"{type(error).__name__}: {error}"})
+
+        try:
+            with self.service.open_result(path) as f:
+                size = os.fstat(f.fileno()).st_size
+                self.send_response(200)
+                self.send_header("Content-Type", FORMATS[fmt])
+                self.send_header("Content-Length", str(size))
+                self.send_header("Content-Disposition", f'attachment; filename="{name}.{fmt}"')
+                self.send_header("X-Deduplicated", "true" if deduplicated else "false")
+                self.send_header("X-Elapsed-Seconds", f"{time.perf_counter() - start:.3f}")
+                self.end_headers()
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+        except FileNotFoundError:
+            # Evicted between the build finishing and this response starting
+            return self._json(500, {"error": "Result was removed before it could be sent; try again"})
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, indent=1).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}", file=sys.stderr)
+
+
+def serve(host="127.0.0.1", port=8123, workers=None, watch_dir=None):
+    """Runs the service until interrupted."""
+    service = GenerationService(workers=workers, watch_dir=watch_dir)
+    print(f"Starting {service.workers} worker(s)...", file=sys.stderr)
+    service.start()
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"Serving on http://{host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenShredder generation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--watch", metavar="DIR", nargs="?", const=".",
+                        help="keep the script outputs in DIR (default .) rebuilt as sources change")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.watch)
+
+
+if __name__ == "__main__":
+    main()
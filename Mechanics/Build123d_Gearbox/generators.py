@@ -0,0 +1,159 @@
+"""
+Registry of the geometry generators in this directory.
+
+Lists each generator with its module, function and default output files,
+and reads their parameters straight from the source with `ast`, so tools
+can list, validate and bind parameters without importing build123d. The
+generator module (and with it the CAD kernel) is only imported by load().
+"""
+import ast
+import functools
+import importlib
+import os
+from typing import NamedTuple
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Generator(NamedTuple):
+    module: str          # module name in this directory
+    function: str        # generator function in that module
+    outputs: tuple       # default output file(s), one per returned shape
+    description: str
+    options: dict = {}   # argument overrides used when run as a tool (like the scripts' __main__)
+
+
+GENERATORS = {
+    "cycloidal-disk": Generator("cycloidal_gear", "cycloidal_disk", ("cycloidal_disk.step",),
+                                "Cycloidal disk"),
+    "impact-drive": Generator("impact_drive", "impact_drive_mechanism", ("slip_disk.step", "impact_hammer.step"),
+                              "Slip disk and impact hammer"),
+    "carbide-insert": Generator("shredder_components", "carbide_insert_ccmt060204", ("carbide_insert.step",),
+                                "CCMT060204 carbide insert"),
+    "drum-disk": Generator("shredder_components", "drum_disk", ("shredder_drum_disk.step",),
+                           "Shredder drum disk"),
+    "fixed-knife": Generator("shredder_components", "fixed_knife", ("fixed_knife.step",),
+                             "Fixed knife (counter blade)"),
+    "pusher": Generator("pusher_mechanism", "pusher_mechanism", ("pusher_plate.step",),
+                        "Pusher plate"),
+    "gearbox": Generator("gearbox_assembly", "gearbox_assembly", ("shredder_gearbox_assembly.step",),
+                         "Gearbox assembly"),
+    "full-machine": Generator("full_machine_assembly", "full_machine_assembly", ("open_shredder_full_assembly.step",),
+                              "Complete machine assembly", {"parallel": True}),
+}
+
+
+class Parameter(NamedTuple):
+    name: str
+    default: object
+    comment: str # trailing comment on the parameter's line, if any
+
+
+def get(name):
+    """The registered Generator called `name`; raises KeyError with the known names."""
+    try:
+        return GENERATORS[name]
+    except KeyError:
+        raise KeyError(f"Unknown generator '{name}' (known: {', '.join(GENERATORS)})") from None
+
+
+def load(name):
+    """Imports the generator's module and returns the generator function."""
+    generator = get(name)
+    return getattr(importlib.import_module(generator.module), generator.function)
+
+
+def parameters(name):
+    """Parameters of a generator, read from its source without importing it."""
+    generator = get(name)
+    return _source_parameters(generator.module, generator.function)
+
+
+@functools.lru_cache(maxsize=None)
+def _source_parameters(module, function):
+    path = os.path.join(_HERE, f"{module}.py")
+    with open(path) as f:
+        source = f.read()
+    lines = source.splitlines()
+
+    for node in ast.parse(source, path).body:
+        if isinstance(node, ast.FunctionDef) and node.name == function:
+            break
+    else:
+        raise LookupError(f"{function}() not found in {path}")
+
+    args = node.args.args
+    defaults = [None] * (len(args) - len(node.args.defaults)) + node.args.defaults
+    found = []
+    for arg, default in zip(args, defaults):
+        line = lines[arg.lineno - 1]
+        comment = line.split("#", 1)[1].strip() if "#" in line else ""
+        value = ast.literal_eval(default) if default is not None else None
+        found.append(Parameter(arg.arg, value, comment))
+    return tuple(found)
+
+
+def bind(name, values=None, use_options=True):
+    """
+    Complete argument dict for a call of generator `name`: its defaults,
+    then its tool options, then `values`.
+
+    Values given as strings (e.g. from the command line) are converted to
+    the type of the parameter's default. Raises ValueError for unknown
+    parameters or values that don't convert.
+    """
+    arguments = {p.name: p.default for p in parameters(name)}
+    if use_options:
+        arguments.update(get(name).options)
+    for key, value in (values or {}).items():
+        if key not in arguments:
+            raise ValueError(f"{name} has no parameter '{key}' (parameters: {', '.join(arguments)})")
+        if isinstance(value, str):
+            try:
+                value = convert(value, arguments[key])
+            except ValueError as error:
+                raise ValueError(f"{key}: {error}") from None
+        arguments[key] = value
+    return arguments
+
+
+def convert(text, default):
+    """Parses a command-line value to match the type of `default`."""
+    if isinstance(default, str):
+        return text
+    if text.lower() in ("none", "null"):
+        return None
+    if isinstance(default, bool):
+        if text.lower() in ("1", "true", "yes", "on"):
+            return True
+        if text.lower() in ("0", "false", "no", "off"):
+            return False
+        raise ValueError(f"Expected true/false, got '{text}'")
+    if isinstance(default, int):
+        return int(text)
+    if isinstance(default, float):
+        return float(text)
+    # No usable default (e.g. None): take Python literals, else the text itself
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def export_shape(shape, path, max_workers=None):
+    """
+    Writes `shape` in the format given by the file extension. Meshes (STL,
+    3MF) are tessellated in up to `max_workers` processes, see mesh_export.py.
+    """
+    import build123d
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".step", ".stp"):
+        build123d.export_step(shape, path)
+    elif extension in (".stl", ".3mf"):
+        from mesh_export import export_mesh
+        export_mesh(shape, path, max_workers=max_workers)
+    elif extension == ".brep":
+        build123d.export_brep(shape, path)
+    else:
+        raise ValueError(f"Unsupported output format '{extension}' (use .step, .stl, .3mf or .brep)")
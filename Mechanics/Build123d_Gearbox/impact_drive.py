@@ -1,5 +1,7 @@
 from build123d import *
+from part_cache import cached_part
 
+@cached_part
 def impact_drive_mechanism(
     shaft_diameter=8.0,
     disk_diameter=60.0,
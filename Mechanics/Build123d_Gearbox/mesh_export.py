@@ -0,0 +1,357 @@
+"""
+Parallel, instance-aware mesh export (binary STL and 3MF).
+
+An assembly is flattened into its leaf shapes and their placements. Leaves
+that share geometry (the drum disks are shared_copy() instances of one
+disk, see full_machine_assembly.py) are tessellated once per tolerance,
+in a process pool when there are several unique shapes, and every mesh is
+written out as soon as it is ready:
+
+    - STL: the mesh is transformed to each of its placements and appended
+      to the file; the triangle count in the header is patched at the end.
+    - 3MF: the mesh is written once as an object and each placement
+      becomes a build item with a transform, so instancing survives.
+    - export_parts(): one STL/3MF per unique part, in its own coordinates,
+      plus a manifest with the number of copies (for print batches).
+
+Only the meshes currently being written are held in memory.
+
+    export_mesh(full_machine_assembly(), "open_shredder.3mf")
+    export_parts(gearbox_assembly(), "print_batch/")
+"""
+import io
+import json
+import os
+import re
+import struct
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+import numpy as np
+
+from part_cache import brep_bytes, shape_from_brep
+
+# Same meshing settings as build123d's export_stl: the linear deflection is
+# relative to the size of each edge
+TOLERANCE = 1e-3        # relative linear deflection
+ANGULAR_TOLERANCE = 0.1 # angular deflection (radians)
+
+_STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+
+
+class Leaf(NamedTuple):
+    key: int            # identifies the shared geometry (TShape and orientation)
+    shape: object       # the leaf TopoDS_Shape without its placement
+    transform: np.ndarray # 3x4 placement [A | t] in assembly coordinates
+    label: str          # label of the nearest labelled ancestor, or ""
+
+
+class Mesh(NamedTuple):
+    vertices: np.ndarray  # (n, 3) float64
+    triangles: np.ndarray # (m, 3) int32, counter-clockwise seen from outside
+
+
+# =============================================================================
+# Assembly flattening
+# =============================================================================
+def leaves(shape):
+    """
+    Leaf shapes (solids, shells, ...) of `shape` with their placements,
+    following nested compounds and accumulating their locations.
+    """
+    from OCP.TopAbs import TopAbs_COMPOUND
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS_Iterator
+
+    labels = _labels(shape)
+    found = []
+
+    def walk(topods, label):
+        label = labels.get(_key(topods), label)
+        if topods.ShapeType() != TopAbs_COMPOUND:
+            bare = topods.Located(TopLoc_Location())
+            found.append(Leaf(hash(bare), bare, _matrix(topods.Location()), label))
+            return
+        iterator = TopoDS_Iterator(topods) # children come with the compound's location applied
+        while iterator.More():
+            walk(iterator.Value(), label)
+            iterator.Next()
+
+    walk(shape.wrapped, getattr(shape, "label", "") or "")
+    return found
+
+
+def _labels(shape):
+    """Labels of the build123d children, keyed like the TopoDS leaves."""
+    found = {}
+    stack = [shape]
+    while stack:
+        node = stack.pop()
+        if getattr(node, "label", "") and node.wrapped is not None:
+            found[_key(node.wrapped)] = node.label
+        stack.extend(getattr(node, "children", ()) or ())
+    return found
+
+
+def _key(topods):
+    from OCP.TopLoc import TopLoc_Location
+
+    return hash(topods.Located(TopLoc_Location()))
+
+
+def _matrix(location):
+    trsf = location.Transformation()
+    return np.array([[trsf.Value(row, column) for column in range(1, 5)] for row in range(1, 4)])
+
+
+def unique_leaves(shape):
+    """{key: [Leaf, ...]}: the leaves of `shape` grouped by shared geometry."""
+    groups = {}
+    for leaf in leaves(shape):
+        groups.setdefault(leaf.key, []).append(leaf)
+    return groups
+
+
+# =============================================================================
+# Tessellation
+# =============================================================================
+def triangulate(topods, tolerance=TOLERANCE, angular_tolerance=ANGULAR_TOLERANCE):
+    """Mesh of a TopoDS shape in its own coordinates."""
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.TopAbs import TopAbs_FACE, TopAbs_REVERSED
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from build123d.topology.shape_core import downcast
+
+    BRepMesh_IncrementalMesh(topods, tolerance, True, angular_tolerance, True)
+
+    vertices, triangles, offset = [], [], 0
+    explorer = TopExp_Explorer(topods, TopAbs_FACE)
+    while explorer.More():
+        face = downcast(explorer.Current())
+        explorer.Next()
+        location = TopLoc_Location()
+        poly = BRep_Tool.Triangulation_s(face, location)
+        if poly is None:
+            continue
+        trsf = location.Transformation()
+        points = (poly.Node(i).Transformed(trsf) for i in range(1, poly.NbNodes() + 1))
+        vertices.append(np.array([(p.X(), p.Y(), p.Z()) for p in points]))
+        faces = np.array([t.Get() for t in poly.Triangles()], dtype=np.int32) - 1 + offset
+        if face.Orientation() == TopAbs_REVERSED:
+            faces = faces[:, ::-1]
+        triangles.append(faces)
+        offset += poly.NbNodes()
+
+    if not triangles:
+        return Mesh(np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int32))
+    return Mesh(np.concatenate(vertices), np.concatenate(triangles))
+
+
+def _triangulate_brep(data, tolerance, angular_tolerance):
+    """Process pool worker: meshes one shape sent as BREP bytes."""
+    mesh = triangulate(shape_from_brep(data).wrapped, tolerance, angular_tolerance)
+    return mesh.vertices, mesh.triangles
+
+
+def meshes(groups, tolerance=TOLERANCE, angular_tolerance=ANGULAR_TOLERANCE, max_workers=None):
+    """
+    Yields (key, Mesh) for every group of unique_leaves(), each shape meshed
+    once, in the order they finish. Several shapes are meshed in a process
+    pool of `max_workers` processes; a single one (or max_workers=1) in this
+    process.
+    """
+    if max_workers == 1 or len(groups) <= 1:
+        for key, members in groups.items():
+            yield key, triangulate(members[0].shape, tolerance, angular_tolerance)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_triangulate_brep, _bare_brep(members[0].shape), tolerance, angular_tolerance): key
+            for key, members in groups.items()
+        }
+        for future in as_completed(futures):
+            yield futures[future], Mesh(*future.result())
+
+
+def _bare_brep(topods):
+    from build123d import Compound
+
+    return brep_bytes(Compound(topods))
+
+
+def place(mesh, transform):
+    """Vertices of `mesh` moved by a 3x4 placement."""
+    return mesh.vertices @ transform[:, :3].T + transform[:, 3]
+
+
+# =============================================================================
+# Writers
+# =============================================================================
+def export_mesh(shape, path, tolerance=TOLERANCE, angular_tolerance=ANGULAR_TOLERANCE, max_workers=None):
+    """
+    Writes the whole of `shape` to `path` as binary STL or 3MF (by extension).
+    Returns the number of triangles written.
+    """
+    writer = _writer(path)
+    groups = unique_leaves(shape)
+    with writer(path) as output:
+        for key, mesh in meshes(groups, tolerance, angular_tolerance, max_workers):
+            output.add(mesh, [leaf.transform for leaf in groups[key]], groups[key][0].label)
+    return output.triangles
+
+
+def export_parts(shape, directory, extension=".stl", tolerance=TOLERANCE, angular_tolerance=ANGULAR_TOLERANCE,
+                 max_workers=None, name="part"):
+    """
+    Writes every unique part of `shape` to its own file in `directory`, in
+    the part's own coordinates, plus manifest.json listing the files and
+    how many copies of each the assembly contains. Files are named after the
+    part labels, or `name` for unlabelled parts. Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    groups = unique_leaves(shape)
+    names = _file_names(groups, name)
+    manifest = {}
+    for key, mesh in meshes(groups, tolerance, angular_tolerance, max_workers):
+        file_name = names[key] + extension
+        count = write_mesh(mesh, os.path.join(directory, file_name), names[key])
+        manifest[file_name] = {"copies": len(groups[key]), "triangles": count}
+
+    manifest = dict(sorted(manifest.items()))
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def write_mesh(mesh, path, label=""):
+    """Writes a single Mesh, in its own coordinates, as STL or 3MF. Returns the triangle count."""
+    with _writer(path)(path) as output:
+        output.add(mesh, [np.eye(3, 4)], label)
+    return output.triangles
+
+
+def _writer(path):
+    extension = os.path.splitext(path)[1].lower()
+    writer = {".stl": _StlWriter, ".3mf": _ThreeMfWriter}.get(extension)
+    if writer is None:
+        raise ValueError(f"Unsupported mesh format '{extension}' (use .stl or .3mf)")
+    return writer
+
+
+def _file_names(groups, default):
+    """File name stem per group: the label (or `default`), numbered if not unique."""
+    stems = [re.sub(r"[^\w.-]+", "_", members[0].label or default) for members in groups.values()]
+    names, used = {}, {}
+    for key, stem in zip(groups, stems):
+        count = used[stem] = used.get(stem, 0) + 1
+        names[key] = stem if stems.count(stem) == 1 else f"{stem}_{count:02d}"
+    return names
+
+
+class _StlWriter:
+    """Binary STL, written record by record; the count is patched on close."""
+
+    def __init__(self, path):
+        self.path = path
+        self.triangles = 0
+
+    def __enter__(self):
+        self.file = open(self.path, "wb")
+        self.file.write(b"OpenShredder mesh_export".ljust(80, b" "))
+        self.file.write(struct.pack("<I", 0))
+        return self
+
+    def add(self, mesh, transforms, label=""):
+        for transform in transforms:
+            corners = place(mesh, transform)[mesh.triangles]
+            normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            records = np.zeros(len(corners), _STL_RECORD)
+            records["normal"] = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+            records["vertices"] = corners
+            records.tofile(self.file)
+            self.triangles += len(corners)
+
+    def __exit__(self, *exc):
+        self.file.seek(80)
+        self.file.write(struct.pack("<I", self.triangles))
+        self.file.close()
+
+
+class _ThreeMfWriter:
+    """
+    3MF package with one mesh object per unique shape and one build item per
+    placement. Objects are streamed into the zip as they arrive; the build
+    section (transforms only) follows at the end.
+    """
+    CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+        '</Types>\n'
+    )
+    RELATIONSHIPS = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+        'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+        '</Relationships>\n'
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.triangles = 0
+        self.items = [] # (object id, transform)
+
+    def __enter__(self):
+        self.zip = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+        self.zip.writestr("[Content_Types].xml", self.CONTENT_TYPES)
+        self.zip.writestr("_rels/.rels", self.RELATIONSHIPS)
+        self.model = io.TextIOWrapper(self.zip.open("3D/3dmodel.model", "w", force_zip64=True), "utf-8")
+        self.model.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<model unit="millimeter" xml:lang="en-US" '
+            'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n<resources>\n'
+        )
+        return self
+
+    def add(self, mesh, transforms, label=""):
+        object_id = len({item[0] for item in self.items}) + 1
+        name = f' name="{_xml_escape(label)}"' if label else ""
+        self.model.write(f'<object id="{object_id}" type="model"{name}><mesh>\n<vertices>\n')
+        np.savetxt(self.model, mesh.vertices, fmt='<vertex x="%.6f" y="%.6f" z="%.6f"/>')
+        self.model.write("</vertices>\n<triangles>\n")
+        np.savetxt(self.model, mesh.triangles, fmt='<triangle v1="%d" v2="%d" v3="%d"/>')
+        self.model.write("</triangles>\n</mesh></object>\n")
+        self.items.extend((object_id, transform) for transform in transforms)
+        self.triangles += len(mesh.triangles) * len(transforms)
+
+    def __exit__(self, *exc):
+        self.model.write("</resources>\n<build>\n")
+        for object_id, transform in self.items:
+            # 3MF uses row vectors: columns of A, then the translation
+            values = " ".join(f"{value:.9g}" for value in (*transform[:, :3].T.ravel(), *transform[:, 3]))
+            self.model.write(f'<item objectid="{object_id}" transform="{values}"/>\n')
+        self.model.write("</build>\n</model>\n")
+        self.model.close()
+        self.zip.close()
+
+
+def _xml_escape(text):
+    return text.replace("&", "&amp;").replace('"', "&quot;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+if __name__ == "__main__":
+    import time
+    from full_machine_assembly import full_machine_assembly
+
+    assembly = full_machine_assembly(parallel=True)
+    for path in ("open_shredder_full_assembly.3mf", "open_shredder_full_assembly.stl"):
+        start = time.perf_counter()
+        count = export_mesh(assembly, path)
+        print(f"Saved {path} ({count} triangles, {time.perf_counter() - start:.1f} s)")
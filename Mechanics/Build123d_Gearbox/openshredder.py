@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for the OpenShredder generators.
+
+    ./openshredder.py list
+    ./openshredder.py params gearbox
+    ./openshredder.py build gearbox motor_type=NEMA34 -o gearbox.step
+    ./openshredder.py build full-machine parallel=false --no-cache --trace machine.trace.json
+    ./openshredder.py make -j 4
+    ./openshredder.py mesh full-machine --parts print_batch/
+    ./openshredder.py profile drum-disk num_teeth=3 -o drum_disk.dxf
+    ./openshredder.py nest cut_job.json --sheet-width 1200 -o sheet.svg
+    ./openshredder.py ratio 10 11
+    ./openshredder.py validate cycloidal-disk num_lobes=10 num_pins=11
+    ./openshredder.py validate full-machine
+    ./openshredder.py cache list
+    ./openshredder.py serve --port 8123 --watch
+    ./openshredder.py bench --quick --compare benchmarks_baseline.json
+
+Only `build`, `make`, `mesh`, `serve` and `bench` import build123d (through the generators they run).
+Everything else works from the generator sources, the NumPy cycloid
+modules and the cache metadata, so it starts in a fraction of a second.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from fractions import Fraction
+
+import generators
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="openshredder", description="OpenShredder geometry generators")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("list", help="list the generators")
+    command.set_defaults(run=cmd_list)
+
+    command = commands.add_parser("params", help="show a generator's parameters and defaults")
+    command.add_argument("generator")
+    command.set_defaults(run=cmd_params)
+
+    command = commands.add_parser("build", help="build a generator and export its output")
+    command.add_argument("generator")
+    command.add_argument("parameters", nargs="*", metavar="name=value")
+    command.add_argument("-o", "--output", action="append",
+                         help="output file (.step, .stl, .3mf or .brep); repeat for generators with several outputs")
+    command.add_argument("--no-cache", action="store_true", help="rebuild instead of using the part cache")
+    command.add_argument("--trace", metavar="JSON",
+                         help="record every build123d operation to a Chrome/Perfetto trace and print the hot spots")
+    command.set_defaults(run=cmd_build)
+
+    command = commands.add_parser("make", help="rebuild the outputs that are out of date")
+    command.add_argument("targets", nargs="*", help="artifacts to check (default: all the script outputs)")
+    command.add_argument("-j", "--jobs", type=int, help="parallel builds (default: one per CPU)")
+    command.add_argument("-C", "--output-dir", default=".", help="where the outputs live (default: .)")
+    command.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    command.add_argument("-n", "--dry-run", action="store_true", help="only list what would be rebuilt")
+    command.set_defaults(run=cmd_make)
+
+    command = commands.add_parser("mesh", help="build a generator and mesh it to STL/3MF")
+    command.add_argument("generator")
+    command.add_argument("parameters", nargs="*", metavar="name=value")
+    command.add_argument("-o", "--output", help="output file, .stl or .3mf (default: <generator>.3mf)")
+    command.add_argument("--parts", metavar="DIR", help="write one file per unique part to DIR instead")
+    command.add_argument("--format", choices=("stl", "3mf"), default="stl", help="file format for --parts")
+    command.add_argument("--tolerance", type=float,
+                         help="relative linear deflection (default 0.001), or mm deviation with --profile (default 0.01)")
+    command.add_argument("--angular-tolerance", type=float, help="angular deflection in radians (default 0.1)")
+    command.add_argument("-j", "--jobs", type=int, help="meshing processes (default: one per CPU)")
+    command.add_argument("--profile", action="store_true",
+                         help="mesh the extruded 2D profile directly, without the CAD kernel "
+                              "(cycloidal-disk, drum-disk, fixed-knife; see profile_mesh.py)")
+    command.set_defaults(run=cmd_mesh)
+
+    command = commands.add_parser("profile", help="write a plate part's 2D cutting profile (DXF/SVG)")
+    command.add_argument("generator", help="cycloidal-disk, drum-disk or fixed-knife")
+    command.add_argument("parameters", nargs="*", metavar="name=value")
+    command.add_argument("-o", "--output", help="output file, .dxf or .svg (default: <generator>.dxf)")
+    command.add_argument("--tolerance", type=float, help="max arc fitting deviation in mm (default 0.01)")
+    command.set_defaults(run=cmd_profile)
+
+    command = commands.add_parser("nest", help="lay out many plate parts on one sheet (DXF/SVG)")
+    command.add_argument("job", help='JSON job: {"parts": [{"generator": ..., "count": ..., "parameters": {...}}]}')
+    command.add_argument("-o", "--output", default="sheet.dxf", help="output file, .dxf or .svg (default: sheet.dxf)")
+    command.add_argument("--sheet-width", type=float, help="sheet width in mm (default: the job's, else 1000)")
+    command.add_argument("--spacing", type=float, help="gap between parts in mm (default: the job's, else 5)")
+    command.set_defaults(run=cmd_nest)
+
+    # Options after `bench` are benchmarks.py's own; main() hands them over before parsing
+    commands.add_parser("bench", help="benchmark the generators (see benchmarks.py --help)")
+
+    command = commands.add_parser("ratio", help="cycloidal reduction ratio math")
+    command.add_argument("num_lobes", type=int, nargs="?")
+    command.add_argument("num_pins", type=int, nargs="?")
+    command.add_argument("--target", type=float, help="list lobe/pin counts giving this ratio")
+    command.add_argument("--max-pins", type=int, default=40, help="largest pin count for --target (default 40)")
+    command.set_defaults(run=cmd_ratio)
+
+    command = commands.add_parser("validate", help="check generator parameters without building")
+    command.add_argument("generator")
+    command.add_argument("parameters", nargs="*", metavar="name=value")
+    command.add_argument("--json", action="store_true", help="print the result as JSON")
+    command.set_defaults(run=cmd_validate)
+
+    command = commands.add_parser("cache", help="inspect or clean the part cache")
+    command.add_argument("action", choices=("info", "list", "lookup", "evict", "clear"))
+    command.add_argument("generator", nargs="?", help="generator to look up (lookup only)")
+    command.add_argument("parameters", nargs="*", metavar="name=value")
+    command.add_argument("--max-mb", type=float, help="size to evict down to (evict only)")
+    command.set_defaults(run=cmd_cache)
+
+    command = commands.add_parser("serve", help="run the local generation service (see generation_service.py)")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8123)
+    command.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    command.add_argument("--watch", metavar="DIR", nargs="?", const=".",
+                         help="keep the script outputs in DIR (default .) rebuilt as sources change")
+    command.set_defaults(run=cmd_serve)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["bench"]:
+        import benchmarks
+        return benchmarks.main(argv[1:])
+
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args) or 0
+    except (KeyError, ValueError, LookupError) as error:
+        message = error.args[0] if error.args else error
+        print(f"openshredder {args.command}: {message}", file=sys.stderr)
+        return 2
+
+
+def parse_assignments(items):
+    """["num_lobes=10", ...] -> {"num_lobes": "10", ...}"""
+    values = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep or not name:
+            raise ValueError(f"Expected name=value, got '{item}'")
+        values[name.strip()] = value.strip()
+    return values
+
+
+# =============================================================================
+# Generators
+# =============================================================================
+def cmd_list(args):
+    width = max(len(name) for name in generators.GENERATORS)
+    for name, generator in generators.GENERATORS.items():
+        print(f"{name:<{width}}  {generator.description} -> {', '.join(generator.outputs)}")
+
+
+def cmd_params(args):
+    generator = generators.get(args.generator)
+    print(f"{args.generator}: {generator.module}.{generator.function}()")
+    for parameter in generators.parameters(args.generator):
+        line = f"  {parameter.name} = {parameter.default!r}"
+        if parameter.name in generator.options:
+            line += f" (tool default {generator.options[parameter.name]!r})"
+        if parameter.comment:
+            line += f"  # {parameter.comment}"
+        print(line)
+
+
+def cmd_build(args):
+    generator = generators.get(args.generator)
+    arguments = generators.bind(args.generator, parse_assignments(args.parameters))
+    outputs = args.output or list(generator.outputs)
+    if len(outputs) != len(generator.outputs):
+        raise ValueError(f"{args.generator} writes {len(generator.outputs)} file(s), got {len(outputs)} --output")
+    if args.no_cache:
+        os.environ["OPENSHREDDER_CACHE"] = "0" # read when part_cache is first imported
+
+    tracing = contextlib.nullcontext()
+    if args.trace:
+        import build_stats
+        tracing = build_stats.trace()
+
+    start = time.perf_counter()
+    with tracing as tracer:
+        result = generators.load(args.generator)(**arguments)
+        shapes = result if isinstance(result, tuple) else (result,)
+        for shape, path in zip(shapes, outputs):
+            generators.export_shape(shape, path)
+            print(f"Saved to {path}")
+    print(f"Done in {time.perf_counter() - start:.2f} s")
+    if tracer is not None:
+        tracer.write_chrome_trace(args.trace)
+        print(tracer.summary(limit=15))
+        print(f"Trace saved to {args.trace} (open in ui.perfetto.dev or chrome://tracing)")
+
+
+def cmd_mesh(args):
+    import mesh_export
+
+    generator = generators.get(args.generator)
+    arguments = generators.bind(args.generator, parse_assignments(args.parameters))
+    if args.profile:
+        return _profile_mesh(args, generator, arguments)
+    options = dict(max_workers=args.jobs,
+                   tolerance=args.tolerance or mesh_export.TOLERANCE,
+                   angular_tolerance=args.angular_tolerance or mesh_export.ANGULAR_TOLERANCE)
+    start = time.perf_counter()
+    result = generators.load(args.generator)(**arguments)
+    shapes = result if isinstance(result, tuple) else (result,)
+    built = time.perf_counter()
+
+    if args.parts:
+        for index, shape in enumerate(shapes):
+            stem = os.path.splitext(generator.outputs[index])[0]
+            directory = args.parts if len(shapes) == 1 else os.path.join(args.parts, stem)
+            manifest = mesh_export.export_parts(shape, directory, f".{args.format}", name=stem, **options)
+            for name, entry in manifest.items():
+                print(f"{os.path.join(directory, name)}: {entry['copies']} x {entry['triangles']} triangles")
+    else:
+        if len(shapes) != 1:
+            raise ValueError(f"{args.generator} returns {len(shapes)} shapes, use --parts")
+        path = args.output or f"{args.generator}.3mf"
+        count = mesh_export.export_mesh(shapes[0], path, **options)
+        print(f"Saved to {path} ({count} triangles)")
+    print(f"Built in {built - start:.2f} s, meshed in {time.perf_counter() - built:.2f} s")
+
+
+def _profile_mesh(args, generator, arguments):
+    import profile_mesh
+    from mesh_export import write_mesh
+
+    if args.generator not in profile_mesh.PROFILE_MESHES:
+        raise ValueError(f"--profile works for {', '.join(profile_mesh.PROFILE_MESHES)}, not {args.generator}")
+    if args.tolerance:
+        arguments["tolerance"] = args.tolerance
+    start = time.perf_counter()
+    mesh = profile_mesh.PROFILE_MESHES[args.generator](**arguments)
+    stem = os.path.splitext(generator.outputs[0])[0]
+    if args.parts:
+        os.makedirs(args.parts, exist_ok=True)
+        path = os.path.join(args.parts, f"{stem}.{args.format}")
+    else:
+        path = args.output or f"{args.generator}.stl"
+    count = write_mesh(mesh, path, stem)
+    print(f"Saved to {path} ({count} triangles) in {1e3 * (time.perf_counter() - start):.0f} ms")
+
+
+def cmd_profile(args):
+    import profile_export
+
+    arguments = generators.bind(args.generator, parse_assignments(args.parameters))
+    start = time.perf_counter()
+    plate = profile_export.make_plate(args.generator, arguments, args.tolerance)
+    path = args.output or f"{args.generator}.dxf"
+    profile_export.write_profile(plate, path)
+    count = len(plate.outline) + sum(len(hole) for hole in plate.holes)
+    print(f"Saved to {path} ({count} entities) in {1e3 * (time.perf_counter() - start):.0f} ms")
+
+
+def cmd_nest(args):
+    import profile_export
+
+    with open(args.job) as f:
+        job = json.load(f)
+    items = []
+    for part in job["parts"]:
+        arguments = generators.bind(part["generator"], part.get("parameters", {}))
+        plate = profile_export.make_plate(part["generator"], arguments, part.get("tolerance"))
+        items.append((plate, part.get("count", 1)))
+        print(f"{part['generator']}: {part.get('count', 1)} x {len(plate.outline)} outline segments")
+    sheet_width = args.sheet_width or job.get("sheet_width", 1000.0)
+    spacing = args.spacing if args.spacing is not None else job.get("spacing", profile_export.SPACING)
+    height = profile_export.export_batch(items, args.output, sheet_width, spacing)
+    print(f"Saved to {args.output} ({sheet_width:g} x {height:.0f} mm)")
+
+
+def cmd_make(args):
+    import build_graph
+
+    if args.dry_run:
+        stale = build_graph.plan(args.targets, args.output_dir, args.force)
+        for artifact, reason in stale:
+            print(f"{artifact.name}: {reason}")
+        if not stale:
+            print("Everything is up to date")
+        return 0
+    try:
+        build_graph.make(args.targets, args.output_dir, args.jobs, args.force)
+    except RuntimeError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+
+def cmd_serve(args):
+    import generation_service
+
+    generation_service.serve(args.host, args.port, args.workers, args.watch)
+
+
+# =============================================================================
+# Calculations
+# =============================================================================
+def cmd_ratio(args):
+    if args.target is not None:
+        # i = n / (N - n)  =>  n = i * (N - n)
+        found = False
+        for pins in range(2, args.max_pins + 1):
+            for lobes in range(1, pins):
+                ratio = Fraction(lobes, pins - lobes)
+                if abs(ratio - args.target) < 1e-9 and lobes % (pins - lobes) == 0:
+                    print(f"num_lobes={lobes} num_pins={pins}  ratio {float(ratio):g}")
+                    found = True
+        if not found:
+            print(f"No lobe/pin counts up to {args.max_pins} pins give ratio {args.target:g}")
+            return 1
+        return 0
+
+    if args.num_lobes is None or args.num_pins is None:
+        raise ValueError("give num_lobes and num_pins, or --target")
+    if args.num_pins <= args.num_lobes:
+        raise ValueError("num_pins must be greater than num_lobes")
+    ratio = Fraction(args.num_lobes, args.num_pins - args.num_lobes)
+    print(f"ratio {float(ratio):g} ({ratio.numerator}:{ratio.denominator}), "
+          f"{args.num_lobes} lobes on {args.num_pins} pins")
+    if args.num_lobes % (args.num_pins - args.num_lobes):
+        print("warning: num_pins - num_lobes does not divide num_lobes, the outline will not close")
+
+
+def cmd_validate(args):
+    arguments = generators.bind(args.generator, parse_assignments(args.parameters))
+    problems, metrics = [], None
+    if generators.get(args.generator).function == "cycloidal_disk":
+        from cycloid_metrics import check_design
+
+        # Trimmed outlines may be undercut, as cycloidal_disk() cuts the loops off
+        problems, metrics = check_design(**arguments, allow_undercut=arguments.get("self_intersection") == "trim")
+        if metrics is not None:
+            metrics = metrics._asdict()
+            metrics.pop("pressure_angles")
+    elif generators.get(args.generator).function == "full_machine_assembly":
+        from knife_clearance import check_machine
+
+        problems, metrics = check_machine(**arguments)
+    else:
+        # Nothing to check it against: say so rather than passing it
+        message = f"no checks available for {args.generator}"
+        if args.json:
+            print(json.dumps({"valid": None, "problems": [], "arguments": arguments, "metrics": None,
+                              "error": message}, indent=1))
+        else:
+            print(message)
+        return 2
+
+    if args.json:
+        print(json.dumps({"valid": not problems, "problems": problems, "arguments": arguments,
+                          "metrics": metrics}, indent=1))
+    else:
+        for name, value in (metrics or {}).items():
+            print(f"  {name}: {value:.4g}" if isinstance(value, float) else f"  {name}: {value}")
+        for problem in problems:
+            print(f"problem: {problem}")
+        print("valid" if not problems else "invalid")
+    return 1 if problems else 0
+
+
+# =============================================================================
+# Part cache
+# =============================================================================
+def cmd_cache(args):
+    import part_cache
+
+    if args.action == "info":
+        found = part_cache.entries()
+        total = sum(entry["size"] for entry in found)
+        print(f"{part_cache.CACHE_DIR}: {len(found)} entries, {total / 1e6:.1f} MB "
+              f"(limit {part_cache.MAX_CACHE_BYTES / 1e6:.0f} MB, {'enabled' if part_cache.ENABLED else 'disabled'})")
+    elif args.action == "list":
+        for entry in part_cache.entries():
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["used"]))
+            print(f"{entry['key'][:12]}  {used}  {entry['size'] / 1e3:8.0f} kB  {entry.get('function')}"
+                  f"  {_short_arguments(entry.get('arguments', {}))}")
+    elif args.action == "lookup":
+        if not args.generator:
+            raise ValueError("lookup needs a generator")
+        return _lookup(part_cache, args.generator, parse_assignments(args.parameters))
+    elif args.action == "evict":
+        limit = None if args.max_mb is None else int(args.max_mb * 1024 * 1024)
+        before = len(part_cache.entries())
+        part_cache.evict(limit)
+        print(f"Evicted {before - len(part_cache.entries())} entries")
+    elif args.action == "clear":
+        count = len(part_cache.entries())
+        part_cache.clear()
+        print(f"Removed {count} entries")
+
+
+def _lookup(part_cache, name, values):
+    """
+    Finds stored entries for a generator call by their recorded arguments.
+
+    This does not import the generator, so it can't tell whether an entry
+    predates an edit to its source; such entries are simply rebuilt on the
+    next real call.
+    """
+    generator = generators.get(name)
+    arguments = part_cache.canonical(generators.bind(name, values, use_options=False))
+    module_name = f"{generator.module}.{generator.function}"
+
+    matches = [entry for entry in part_cache.entries()
+               if entry.get("function") == module_name and entry.get("arguments") == arguments]
+    if not matches:
+        print("miss")
+        return 1
+    for entry in matches:
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.get("created", entry["used"])))
+        print(f"hit {entry['key'][:12]} ({entry['size'] / 1e3:.0f} kB, created {created})")
+    return 0
+
+
+def _short_arguments(arguments, limit=80):
+    text = " ".join(f"{name}={value}" for name, value in arguments.items())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+if __name__ == "__main__":
+    sys.exit(main())
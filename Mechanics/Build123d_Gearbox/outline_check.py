@@ -0,0 +1,165 @@
+"""
+Self-intersection check for closed polyline outlines, before any CAD call.
+
+An offset curve crosses itself where the offset distance exceeds the curve's
+radius of curvature: the cycloidal disk's outline (the pin centre path offset
+inwards by the pin radius) grows a small swallowtail loop at every lobe tip
+once pin_diameter or eccentricity_factor is too large. OCC doesn't reject
+such a wire: make_face() and extrude() either grind away or return a broken
+solid. Checking the points first costs milliseconds:
+
+    crossing = first_crossing(points)       # None for a simple outline
+    points, loops = trim_loops(points)      # cut the swallowtails off
+
+first_crossing() is the Shamos-Hoey sweep: segments enter and leave a
+status list ordered by height as a vertical line sweeps left to right, and
+only segments that become neighbours in that list are tested against each
+other. Some crossing is always found before the sweep passes the leftmost
+one, so the whole check is O(n log n) rather than testing all n^2 / 2 pairs.
+
+trim_loops() repeats it, each time cutting the loop closed by the crossing
+(the shorter side of the outline) and joining the two segments at the
+crossing point, which leaves the outer envelope that a pin would actually
+generate - with a sharp edge where each swallowtail was.
+"""
+import math
+from bisect import bisect_left
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Crossing(NamedTuple):
+    first: int   # segment index: from points[first] to points[first + 1]
+    second: int  # later segment index, not adjacent to `first`
+    point: tuple # (x, y) where they cross
+
+
+class Loop(NamedTuple):
+    crossing: tuple # (x, y) where the outline now has a corner
+    removed: int    # points cut away with the loop
+
+
+def first_crossing(points, closed=True):
+    """
+    A place where the polyline through `points` (n x 2) crosses or touches
+    itself, as a Crossing, or None if it is simple. Segments that share a
+    vertex only count if they overlap. The crossing is the first the sweep
+    finds, which is not always the leftmost one: any of them does to tell a
+    simple outline from one that isn't, or to cut a loop off.
+    """
+    points = np.asarray(points, dtype=float)
+    count = len(points) if closed else len(points) - 1
+    if count < 3:
+        return None
+    start = points[:count]
+    end = np.roll(points, -1, axis=0)[:count] if closed else points[1:]
+
+    # Orient every segment left to right; events are (x, y, leaving, segment)
+    swap = (end[:, 0] < start[:, 0]) | ((end[:, 0] == start[:, 0]) & (end[:, 1] < start[:, 1]))
+    left = np.where(swap[:, None], end, start)
+    right = np.where(swap[:, None], start, end)
+    run = right[:, 0] - left[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(run > 0, (right[:, 1] - left[:, 1]) / run, math.inf)
+    left, right, slope = left.tolist(), right.tolist(), slope.tolist()
+    events = sorted([(x, y, 0, i) for i, (x, y) in enumerate(left)] +
+                    [(x, y, 1, i) for i, (x, y) in enumerate(right)])
+
+    def adjacent(a, b):
+        gap = abs(a - b)
+        return gap == 1 or (closed and gap == count - 1)
+
+    def check(a, b):
+        if adjacent(a, b):
+            # Neighbours along the outline share a vertex; only folding back onto each other counts
+            point = _overlap(left[a], right[a], left[b], right[b])
+        else:
+            point = _intersection(left[a], right[a], left[b], right[b])
+        return None if point is None else Crossing(min(a, b), max(a, b), point)
+
+    status = [] # segments crossing the sweep line, bottom to top
+    for x, y, leaving, segment in events:
+        if leaving:
+            position = status.index(segment)
+            del status[position]
+            if 0 < position < len(status):
+                crossing = check(status[position - 1], status[position])
+                if crossing:
+                    return crossing
+            continue
+
+        def height(other):
+            # Height at the sweep line, steeper segments above on a tie (they
+            # are above just right of x)
+            (x0, y0), s = left[other], slope[other]
+            at = y0 if math.isinf(s) else y0 + s * (x - x0)
+            return (at, s)
+
+        position = bisect_left(status, height(segment), key=height)
+        status.insert(position, segment)
+        for neighbour in (position - 1, position + 1):
+            if 0 <= neighbour < len(status):
+                crossing = check(segment, status[neighbour])
+                if crossing:
+                    return crossing
+    return None
+
+
+def _orientation(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def _intersection(p1, p2, q1, q2):
+    """Where segments p1-p2 and q1-q2 meet, or None."""
+    d1, d2 = _orientation(q1, q2, p1), _orientation(q1, q2, p2)
+    d3, d4 = _orientation(p1, p2, q1), _orientation(p1, p2, q2)
+    if ((d1 > 0 and d2 > 0) or (d1 < 0 and d2 < 0) or (d3 > 0 and d4 > 0) or (d3 < 0 and d4 < 0)):
+        return None
+    if d1 == d2 == 0:
+        return _overlap(p1, p2, q1, q2) or _shared_end(p1, p2, q1, q2)
+    fraction = d1 / (d1 - d2)
+    return (p1[0] + fraction * (p2[0] - p1[0]), p1[1] + fraction * (p2[1] - p1[1]))
+
+
+def _overlap(p1, p2, q1, q2):
+    """A point shared by more than one vertex of collinear segments (they fold back), or None."""
+    if _orientation(p1, p2, q1) != 0 or _orientation(p1, p2, q2) != 0:
+        return None
+    low = max(min(p1, p2), min(q1, q2))  # lexicographic along the common line
+    high = min(max(p1, p2), max(q1, q2))
+    return tuple(low) if low < high else None
+
+
+def _shared_end(p1, p2, q1, q2):
+    for point in (p1, p2):
+        if point in (q1, q2):
+            return tuple(point)
+    return None
+
+
+def trim_loops(points, max_loops=None):
+    """
+    Cuts every loop off the closed outline through `points` (n x 2), keeping
+    the longer side at each crossing. Returns (points, loops): the trimmed
+    outline as an array and a Loop per cut, empty if it was simple.
+    Raises ValueError if more than `max_loops` (default n / 3) are needed.
+    """
+    points = np.asarray(points, dtype=float)
+    limit = len(points) // 3 if max_loops is None else max_loops
+    loops = []
+    while True:
+        crossing = first_crossing(points)
+        if crossing is None:
+            return points, loops
+        if len(loops) >= limit or len(points) < 6:
+            raise ValueError(f"the outline still crosses itself at ({crossing.point[0]:.3f}, "
+                             f"{crossing.point[1]:.3f}) after trimming {len(loops)} loops")
+        i, j = crossing.first, crossing.second
+        corner = np.array([crossing.point])
+        inside, outside = j - i, len(points) - (j - i) # points i + 1 .. j lie between the two segments
+        if inside <= outside:
+            points = np.concatenate((points[:i + 1], corner, points[j + 1:]))
+        else:
+            points = np.concatenate((corner, points[i + 1:j + 1]))
+        loops.append(Loop(tuple(crossing.point), min(inside, outside)))
@@ -0,0 +1,510 @@
+"""
+Persistent, content-addressed cache for generated parts.
+
+Decorating a generator with @cached_part stores its result as native BREP
+under a key made from:
+    - the generator's module and name,
+    - its bound arguments (defaults included),
+    - the source of its module and of every sibling module it pulls
+      generators from (so editing cycloid_profile.py invalidates
+      gearbox_assembly() too),
+    - the build123d version.
+
+Repeat calls with the same inputs load the BREP instead of rebuilding.
+Sub-shapes that generators use over and over within one run (inserts,
+bores, hole cutters) are memoized in memory with @shared_shape instead.
+The cache is size-bounded: least recently used entries are evicted once
+the total exceeds the limit.
+
+Environment variables:
+    OPENSHREDDER_CACHE=0            disable the cache
+    OPENSHREDDER_CACHE_DIR=<path>   cache location (default ~/.cache/openshredder)
+    OPENSHREDDER_CACHE_MAX_MB=<n>   size limit in MB (default 512)
+
+This module does not import build123d until a part is actually stored or
+loaded, so cache lookups stay cheap.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import time
+from enum import Enum
+
+CACHE_FORMAT = 3
+CACHE_DIR = os.environ.get(
+    "OPENSHREDDER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "openshredder")
+)
+MAX_CACHE_BYTES = int(float(os.environ.get("OPENSHREDDER_CACHE_MAX_MB", "512")) * 1024 * 1024)
+ENABLED = os.environ.get("OPENSHREDDER_CACHE", "1") != "0"
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_source_digests = {}
+_cache_bytes = None # running total of the cache's size once known, see store()
+
+
+def cached_part(func):
+    """
+    Decorator that serves a generator's result from the on-disk cache.
+
+    The generator must be deterministic in its arguments and return a
+    build123d Shape or a tuple of Shapes. The undecorated function is
+    available as `func.uncached`.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            with _span(function_name(func), "generator", cache="off"):
+                return func(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        try:
+            key = part_key(func, bound.arguments)
+        except TypeError:
+            # An argument with no stable form (see canonical()): build it every time
+            with _span(function_name(func), "generator", cache="uncacheable"):
+                return func(*args, **kwargs)
+
+        with _span(function_name(func), "generator") as trace_args:
+            result = load(key)
+            trace_args["cache"] = "miss" if result is None else "hit"
+            if result is None:
+                result = func(*args, **kwargs)
+                store(key, result, func, bound.arguments)
+        return result
+
+    wrapper.uncached = func
+    return wrapper
+
+
+def _span(name, category, **args):
+    """build_stats.span(), a no-op unless a build_stats.trace() block is active."""
+    # Imported here rather than at the top so that build_stats.py is not
+    # counted as a source dependency of every cached part
+    from build_stats import span
+
+    return span(name, category, **args)
+
+
+def part_key(func, arguments):
+    """Hex digest identifying one generator call."""
+    payload = {
+        "format": CACHE_FORMAT,
+        "function": function_name(func),
+        "arguments": canonical(arguments),
+        "source": module_digest(sys.modules[func.__module__]),
+        "build123d": _library_version(),
+    }
+    text = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def function_name(func):
+    """
+    "module.function" name of a generator, using the file name for the module
+    so that running a script directly shares entries with importing it.
+    """
+    module = sys.modules[func.__module__]
+    path = getattr(module, "__file__", None)
+    name = os.path.splitext(os.path.basename(path))[0] if path else func.__module__
+    return f"{name}.{func.__qualname__}"
+
+
+def module_digest(module):
+    """
+    Hash of a module's source plus that of every sibling module it uses.
+
+    Siblings are found through the module's globals: any function, class or
+    module defined in a file next to this one counts as a dependency, and
+    is followed recursively. Results are memoized on file mtime and size.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(_local_dependencies(module)):
+        digest.update(os.path.basename(path).encode())
+        digest.update(_file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def _local_dependencies(module, seen=None):
+    """Paths of the local source files `module` depends on, itself included."""
+    if seen is None:
+        seen = set()
+    path = _local_path(module)
+    if path is None or path in seen:
+        return seen
+    seen.add(path)
+
+    for value in list(vars(module).values()):
+        owner = value if inspect.ismodule(value) else sys.modules.get(getattr(value, "__module__", None) or "")
+        if owner is not None and owner is not module:
+            _local_dependencies(owner, seen)
+    return seen
+
+
+def _local_path(module):
+    """Source path of `module` if it lives in this directory, else None."""
+    path = getattr(module, "__file__", None)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    if os.path.dirname(path) != _HERE or not path.endswith(".py"):
+        return None
+    return path
+
+
+def _file_digest(path):
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _source_digests.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, "rb") as f:
+            cached = (stamp, hashlib.sha256(f.read()).hexdigest())
+        _source_digests[path] = cached
+    return cached[1]
+
+
+def canonical(value):
+    """
+    JSON-friendly, order-stable form of generator arguments. Raises
+    TypeError for values it can't represent exactly (repr() isn't: numpy
+    abbreviates large arrays, objects show their address).
+    """
+    if isinstance(value, dict):
+        return {str(k): canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    if isinstance(value, float):
+        return {"float": repr(value)} # exact, and unlike repr() alone not the same as a string argument
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, Enum):
+        return f"{type(value).__qualname__}.{value.name}"
+    if hasattr(value, "dtype") and hasattr(value, "tobytes"):
+        # numpy arrays and scalars, by content
+        if value.shape == ():
+            return canonical(value.item())
+        digest = hashlib.sha256(value.tobytes()).hexdigest()
+        return {"array": digest, "dtype": value.dtype.str, "shape": list(value.shape)}
+    raise TypeError(f"can't make a cache key from {type(value).__name__} arguments")
+
+
+@functools.lru_cache(maxsize=None)
+def _library_version():
+    from importlib import metadata # slow to import, and only needed once a key is made
+
+    try:
+        return metadata.version("build123d")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+# =============================================================================
+# In-process sharing of immutable sub-shapes
+# =============================================================================
+def shared_shape(func):
+    """
+    Decorator memoizing a sub-shape builder for the life of the process.
+
+    Meant for immutable helpers such as inserts and hole cutters: the shape
+    is built once per distinct set of arguments and every call returns a
+    shared_copy() of it, so callers may move the result freely without
+    rebuilding it or disturbing other users.
+    """
+    signature = inspect.signature(func)
+    shapes = {}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        try:
+            key = json.dumps(canonical(bound.arguments), sort_keys=True)
+        except TypeError:
+            return func(*args, **kwargs)
+        if key not in shapes:
+            with _span(function_name(func), "shared"):
+                shapes[key] = func(*args, **kwargs)
+        return shared_copy(shapes[key])
+
+    wrapper.cache_clear = shapes.clear
+    return wrapper
+
+
+def shared_copy(shape, location=None):
+    """
+    Copy of `shape` that shares its underlying geometry (TShape) with the
+    original, optionally moved by `location` relative to where it is.
+
+    Unlike Shape.moved() this does not duplicate the geometry first, so it
+    costs the same for a filleted insert as for a box. The label and colour
+    come along (the STEP product name and the export file name use them).
+    """
+    from build123d.topology.shape_core import downcast
+
+    # Located() even when staying put: a new TopoDS_Shape on the same TShape,
+    # so moving the copy in place (Shape.move()) leaves the original alone
+    if location is None:
+        wrapped = shape.wrapped.Located(shape.wrapped.Location())
+    else:
+        wrapped = shape.wrapped.Moved(location.wrapped)
+    copy = type(shape)(downcast(wrapped))
+    copy.label = shape.label
+    copy.color = shape.color
+    return copy
+
+
+# =============================================================================
+# Storage
+# =============================================================================
+def _entry_path(key, suffix):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}{suffix}")
+
+
+def load(key):
+    """Returns the cached result for `key`, or None on a miss."""
+    meta_path = _entry_path(key, ".json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        shapes = [read_brep(_entry_path(key, f".{i}.brep")) for i in range(meta["count"])]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    # Touch the entry so eviction sees it as recently used
+    try:
+        os.utime(meta_path)
+    except OSError:
+        pass
+
+    try:
+        shapes = [restore_shape(shape, tree) for shape, tree in zip(shapes, meta["trees"])]
+    except (ValueError, KeyError):
+        return None
+    return tuple(shapes) if meta["tuple"] else shapes[0]
+
+
+def store(key, result, func=None, arguments=None):
+    """Writes `result` (a Shape or tuple of Shapes) to the cache under `key`."""
+    is_tuple = isinstance(result, tuple)
+    shapes = list(result) if is_tuple else [result]
+
+    os.makedirs(os.path.dirname(_entry_path(key, "")), exist_ok=True)
+    written = 0
+    for i, shape in enumerate(shapes):
+        data = brep_bytes(shape)
+        _atomic_write(_entry_path(key, f".{i}.brep"), data)
+        written += len(data)
+
+    meta = {
+        "function": function_name(func) if func else None,
+        "arguments": canonical(arguments or {}),
+        "count": len(shapes),
+        "trees": [shape_tree(shape) for shape in shapes],
+        "tuple": is_tuple,
+        "created": time.time(),
+    }
+    # The metadata goes last: an entry only exists once all its shapes do
+    data = json.dumps(meta, indent=1).encode()
+    _atomic_write(_entry_path(key, ".json"), data)
+
+    # Walking the whole cache is only worth it once it's over budget. The
+    # total is counted once per process and then kept up to date here (other
+    # processes' writes show up at the next eviction's walk)
+    global _cache_bytes
+    _cache_bytes = (_directory_size() if _cache_bytes is None else _cache_bytes + written + len(data))
+    if _cache_bytes > MAX_CACHE_BYTES:
+        evict()
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def shape_kind(shape):
+    """How to rebuild the shape's build123d wrapper after loading."""
+    from build123d import Compound, Part
+
+    if isinstance(shape, Compound) and shape.children:
+        return "assembly"
+    if isinstance(shape, Part):
+        return "part"
+    return "shape"
+
+
+def shape_tree(shape):
+    """
+    What BREP doesn't keep: the wrapper kind (shape_kind()), label and colour
+    of `shape` and, for an assembly, of each child in order.
+    """
+    kind = shape_kind(shape)
+    tree = {"kind": kind, "label": shape.label or "",
+            "color": None if shape.color is None else list(tuple(shape.color))}
+    if kind == "assembly":
+        tree["children"] = [shape_tree(child) for child in shape.children]
+    return tree
+
+
+def restore_shape(shape, tree):
+    """
+    Rewraps a loaded BREP shape as recorded by shape_tree(), rebuilding an
+    assembly's children in their original order with their labels. Raises
+    ValueError if the shape doesn't have the recorded structure.
+    """
+    from OCP.TopoDS import TopoDS_Iterator
+    from build123d import Color, Compound, Part
+
+    kind = tree["kind"]
+    if kind == "assembly":
+        # The compound's direct sub-shapes are the children, in order
+        # (get_top_level_shapes() would flatten nested assemblies)
+        parts = []
+        iterator = TopoDS_Iterator(shape.wrapped)
+        while iterator.More():
+            parts.append(Compound.cast(iterator.Value()))
+            iterator.Next()
+        if len(parts) != len(tree["children"]):
+            raise ValueError(f"expected {len(tree['children'])} children, the BREP has {len(parts)}")
+        restored = Compound(children=[restore_shape(part, child) for part, child in zip(parts, tree["children"])])
+    elif kind == "part":
+        restored = Part(shape.wrapped)
+    else:
+        restored = shape
+    restored.label = tree["label"]
+    if tree["color"] is not None:
+        restored.color = Color(*tree["color"])
+    return restored
+
+
+def brep_bytes(shape):
+    """Serializes a build123d Shape to native BREP bytes."""
+    from io import BytesIO
+    from build123d import export_brep
+
+    buffer = BytesIO()
+    export_brep(shape, buffer)
+    return buffer.getvalue()
+
+
+def shape_from_brep(data):
+    """Inverse of brep_bytes()."""
+    from io import BytesIO
+    from OCP.BRep import BRep_Builder
+    from OCP.BRepTools import BRepTools
+    from OCP.TopoDS import TopoDS_Shape
+    from build123d import Compound
+
+    shape = TopoDS_Shape()
+    BRepTools.Read_s(shape, BytesIO(data), BRep_Builder())
+    if shape.IsNull():
+        raise ValueError("Could not read BREP data")
+    return Compound.cast(shape)
+
+
+def pack_shape(shape):
+    """
+    Picklable (shape_tree(), BREP bytes) form of a shape, e.g. for sending
+    results between processes. unpack_shape() rebuilds it.
+    """
+    return shape_tree(shape), brep_bytes(shape)
+
+
+def unpack_shape(packed):
+    tree, data = packed
+    return restore_shape(shape_from_brep(data), tree)
+
+
+def read_brep(path):
+    with open(path, "rb") as f:
+        return shape_from_brep(f.read())
+
+
+# =============================================================================
+# Maintenance
+# =============================================================================
+def entries():
+    """
+    Lists cache entries, most recently used first.
+
+    Each entry is a dict with the stored metadata plus `key`, `size`
+    (bytes on disk) and `used` (last access time).
+    """
+    found = []
+    if not os.path.isdir(CACHE_DIR):
+        return found
+    for bucket in os.listdir(CACHE_DIR):
+        folder = os.path.join(CACHE_DIR, bucket)
+        if not os.path.isdir(folder):
+            continue
+        for name in os.listdir(folder):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            meta_path = os.path.join(folder, name)
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                used = os.stat(meta_path).st_mtime
+            except (OSError, ValueError):
+                continue
+            files = [meta_path] + [_entry_path(key, f".{i}.brep") for i in range(meta.get("count", 0))]
+            size = sum(os.path.getsize(p) for p in files if os.path.exists(p))
+            meta.update(key=key, size=size, used=used, files=files)
+            found.append(meta)
+    found.sort(key=lambda entry: entry["used"], reverse=True)
+    return found
+
+
+def evict(max_bytes=None):
+    """Removes least recently used entries until the cache fits `max_bytes`."""
+    global _cache_bytes
+    limit = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    found = entries()
+    total = sum(entry["size"] for entry in found)
+    while found and total > limit:
+        entry = found.pop()
+        _remove(entry)
+        total -= entry["size"]
+    _cache_bytes = total
+
+
+def _directory_size():
+    """Bytes in the cache directory (a stat per file; cheaper than entries())."""
+    total = 0
+    if not os.path.isdir(CACHE_DIR):
+        return total
+    for bucket in os.scandir(CACHE_DIR):
+        if bucket.is_dir():
+            total += sum(item.stat().st_size for item in os.scandir(bucket.path) if item.is_file())
+    return total
+
+
+def clear():
+    """Removes every cache entry."""
+    global _cache_bytes
+    for entry in entries():
+        _remove(entry)
+    _cache_bytes = None
+
+
+def _remove(entry):
+    # Metadata first, so a half-removed entry is never seen as valid
+    for path in entry["files"]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
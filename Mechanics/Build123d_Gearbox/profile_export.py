@@ -0,0 +1,534 @@
+"""
+2D cutting profiles (DXF / SVG) for the plate parts.
+
+cycloidal_disk(), drum_disk() and fixed_knife() are cut from sheet, so
+instead of exporting a STEP file and flattening it by hand, their outlines
+are written here directly as 2D vector files for laser / waterjet cutting:
+
+    write_profile(cycloidal_disk_plate(num_lobes=10, num_pins=11), "disk.dxf")
+
+Curves are written as lines, arcs and circles rather than polylines, so the
+files stay small and cutting controllers get a few hundred smooth moves
+instead of thousands of micro-segments:
+    - circles, the drum rim and its gullets are exact arcs,
+    - the cycloid outline, which has no closed form in arcs, is sampled
+      densely and fitted with tangent-continuous (G1) arcs, each within
+      `tolerance` mm of the true curve. Only half a lobe is fitted; the rest
+      of the outline is that half mirrored and rotated, like the part.
+
+export_batch() lays many profiles out on one sheet (simple shelf nesting,
+no rotation) so a whole job can be sent to the cutter as one file:
+
+    export_batch([(drum_disk_plate(), 12), (cycloidal_disk_plate(), 2)], "sheet.dxf", sheet_width=1200)
+
+DXF files are R12 with the holes on layer INNER (written first, so they are
+cut before the part drops free) and the outline on layer OUTER. Units are
+mm in both formats. No build123d or OCC is needed.
+"""
+import inspect
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+import profile_mesh
+from cycloid_metrics import check_design
+from cycloid_profile import adaptive_angles, center_line, contracted_profile, cycloid_geometry
+
+TOLERANCE = 0.01 # mm, max deviation of fitted arcs from the true curve
+SPACING = 5.0    # mm, gap between nested parts and to the sheet edge
+
+
+class Line(NamedTuple):
+    start: tuple
+    end: tuple
+
+
+class Arc(NamedTuple):
+    start: tuple
+    end: tuple
+    center: tuple
+    ccw: bool # direction of travel from start to end
+
+
+class Circle(NamedTuple):
+    center: tuple
+    radius: float
+
+
+class Plate(NamedTuple):
+    name: str
+    outline: list # segments of the outer contour, counter-clockwise
+    holes: list   # one list of segments per hole (a Circle is a contour on its own)
+
+
+# =============================================================================
+# Plates
+# =============================================================================
+def cycloidal_disk_plate(
+    pin_circle_diameter=50.0, # D
+    pin_diameter=5.3,         # dp
+    num_lobes=8,              # n
+    num_pins=9,               # N
+    eccentricity_factor=0.3,  # eFactor (must be < 0.5)
+    center_hole_diameter=24.1,# dc
+    tolerance=TOLERANCE
+):
+    """Cutting profile of cycloidal_disk(): the arc-fitted outline, and its holes as circles."""
+    # Same check as the mesh path: holes breaking through or an undercut outline can't be cut either
+    problems, _ = check_design(pin_circle_diameter, pin_diameter, num_lobes, num_pins, eccentricity_factor,
+                               center_hole_diameter)
+    if problems:
+        raise ValueError("; ".join(problems))
+    geometry = cycloid_geometry(
+        pin_circle_diameter=pin_circle_diameter,
+        num_lobes=num_lobes,
+        num_pins=num_pins,
+        eccentricity_factor=eccentricity_factor
+    )
+
+    # Dense samples well inside the tolerance, so fitting to them is fitting to the curve
+    angles = adaptive_angles(geometry, pin_diameter, tolerance / 10)
+    _, tangent = center_line(geometry, 0.0, order=1)
+    start_tangent = np.asarray(tangent, dtype=float).reshape(2)
+
+    lobes = geometry.lobe_factor - 1
+    if abs(lobes - round(lobes)) > 1e-9:
+        # The outline is not a whole number of lobes: fit it all the way round
+        points = contracted_profile(geometry, pin_diameter, np.append(angles, 2 * math.pi))
+        outline = fit_arcs(points, tolerance, start_tangent)
+    else:
+        # Lobes are symmetric about their tip (at t = 0, on the X axis), so
+        # fit tip to root and mirror that into a whole lobe
+        lobes = int(round(lobes))
+        half = math.pi / lobes
+        angles = np.concatenate((angles[angles < half], [half]))
+        points = contracted_profile(geometry, pin_diameter, angles)
+        # The root is on the mirror line too, so the fit must cross it square
+        # to the radius or every root would be a small kink
+        root = points[-1] / np.hypot(*points[-1])
+        half_lobe = fit_arcs(points, tolerance, start_tangent, end_tangent=(-root[1], root[0]))
+        lobe = [_mirrored(segment) for segment in reversed(half_lobe)] + half_lobe
+        outline = []
+        for i in range(lobes):
+            outline += [_rotated(segment, 2 * math.pi * i / lobes) for segment in lobe]
+
+    holes = [[Circle(center, radius)] for center, radius in profile_mesh.disk_holes(geometry, num_lobes,
+                                                                                     center_hole_diameter)]
+    return Plate("cycloidal_disk", outline, holes)
+
+
+def drum_disk_plate(diameter=150.0, hex_shaft_size=25.0, num_teeth=2):
+    """Cutting profile of drum_disk() (the blank: rim, gullets and hex bore), all exact arcs and lines."""
+    outline = []
+    for center, radius, start, sweep in profile_mesh.rim_arcs(diameter / 2, profile_mesh.drum_gullets(diameter,
+                                                                                                    num_teeth)):
+        outline.append(Arc(_polar(center, radius, start), _polar(center, radius, start + sweep), center, sweep > 0))
+    corners = [tuple(corner) for corner in profile_mesh.hex_bore(hex_shaft_size)]
+    bore = [Line(corners[i], corners[(i + 1) % 6]) for i in range(6)]
+    return Plate("drum_disk", outline, [bore])
+
+
+def fixed_knife_plate(length=254.0, width=50.0):
+    """Cutting profile of fixed_knife(): a length x width rectangle centred on the origin."""
+    corners = [tuple(corner) for corner in profile_mesh.fixed_knife_profile(length, width).outer]
+    return Plate("fixed_knife", [Line(corners[i], corners[(i + 1) % 4]) for i in range(4)], [])
+
+
+PLATE_PROFILES = {
+    "cycloidal-disk": cycloidal_disk_plate,
+    "drum-disk": drum_disk_plate,
+    "fixed-knife": fixed_knife_plate,
+}
+
+
+def make_plate(generator, arguments=None, tolerance=None):
+    """
+    Plate for generator `generator` ("drum-disk", ...) called with the
+    generator's `arguments`; the ones that only matter in 3D (thickness,
+    resolution, ...) are ignored.
+    """
+    if generator not in PLATE_PROFILES:
+        raise ValueError(f"2D profiles exist for {', '.join(PLATE_PROFILES)}, not {generator}")
+    function = PLATE_PROFILES[generator]
+    accepted = inspect.signature(function).parameters
+    arguments = {name: value for name, value in (arguments or {}).items() if name in accepted}
+    if tolerance and "tolerance" in accepted:
+        arguments["tolerance"] = tolerance
+    return function(**arguments)
+
+
+def _polar(center, radius, angle):
+    return (center[0] + radius * math.cos(angle), center[1] + radius * math.sin(angle))
+
+
+# =============================================================================
+# Arc fitting
+# =============================================================================
+def fit_arcs(points, tolerance=TOLERANCE, start_tangent=None, end_tangent=None):
+    """
+    Fits an open polyline with a chain of tangent-continuous arcs (and lines
+    where the curve is straight), none further than `tolerance` from the
+    points it replaces.
+
+    Each arc starts tangent to the previous one, so it is fixed by its end
+    point alone: from start P with unit tangent T, the arc through Q has
+    curvature 2 (T x d) / |d|^2 with d = Q - P, and leaves Q with T mirrored
+    about the chord. Arcs are grown greedily, as far along the points as the
+    tolerance allows (doubling, then bisecting the reach). With an
+    `end_tangent`, the chain finishes with a biarc that leaves points[-1]
+    along it, as soon as one fits. Returns a list of Line and Arc segments
+    running from points[0] to points[-1].
+    """
+    points = np.asarray(points, dtype=float)
+    if start_tangent is None:
+        start_tangent = points[1] - points[0]
+    tangent = np.asarray(start_tangent, dtype=float)
+    tangent = tangent / np.hypot(*tangent)
+    if end_tangent is not None:
+        end_tangent = np.asarray(end_tangent, dtype=float)
+        end_tangent = end_tangent / np.hypot(*end_tangent)
+
+    segments = []
+    i, last = 0, len(points) - 1
+    while i < last:
+        if end_tangent is not None:
+            biarc = _biarc(points[i], tangent, points[last], end_tangent)
+            # One sample spacing from the end, the biarc is taken anyway (its
+            # bulge is of the order of the sampling, well inside the tolerance)
+            if i == last - 1 or _biarc_fits(points, i, last, biarc, tolerance):
+                segments += [_tangent_arc(start, end, leaving)[0] for start, end, leaving in biarc]
+                break
+        if not _arc_fits(points, i, i + 1, tangent, tolerance):
+            # The inherited tangent has drifted too far to even reach the next
+            # point: restart from the local direction of the curve (a kink
+            # well inside the tolerance)
+            before, after = points[max(i - 1, 0)], points[i + 1]
+            tangent = (after - before) / np.hypot(*(after - before))
+
+        # Double the reach while the arc fits, then bisect between fit and miss
+        # (short of the last point when a biarc has to finish the chain)
+        reach = last if end_tangent is None else last - 1
+        good, step = i + 1, 1
+        while good < reach:
+            probe = min(good + step, reach)
+            if not _arc_fits(points, i, probe, tangent, tolerance):
+                break
+            good, step = probe, step * 2
+        else:
+            probe = reach + 1
+        low, high = good, probe
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _arc_fits(points, i, middle, tangent, tolerance):
+                low = middle
+            else:
+                high = middle
+
+        segment, tangent = _tangent_arc(points[i], points[low], tangent)
+        segments.append(segment)
+        i = low
+    return segments
+
+
+def _tangent_arc(start, end, tangent):
+    """Arc (or Line) from `start` leaving along `tangent` through `end`, and its end tangent."""
+    chord = end - start
+    length_squared = chord @ chord
+    curvature = 2 * (tangent[0] * chord[1] - tangent[1] * chord[0]) / length_squared
+    direction = chord / math.sqrt(length_squared)
+    end_tangent = 2 * (tangent @ direction) * direction - tangent
+
+    start_point, end_point = (float(start[0]), float(start[1])), (float(end[0]), float(end[1]))
+    if abs(curvature) * math.sqrt(length_squared) < 1e-9:
+        return Line(start_point, end_point), end_tangent
+    center = start + np.array((-tangent[1], tangent[0])) / curvature
+    return Arc(start_point, end_point, (float(center[0]), float(center[1])), bool(curvature > 0)), end_tangent
+
+
+def _arc_fits(points, i, j, tangent, tolerance):
+    """
+    Whether the tangent arc from points[i] through points[j] stays within
+    tolerance of the points in between and of the midpoints of the chords
+    joining them (the arc can't bulge away between two samples).
+    """
+    return _deviation(points[i:j + 1], points[i], points[j], tangent) <= tolerance
+
+
+def _deviation(run, start, end, tangent):
+    """Furthest the tangent arc from `start` through `end` strays from `run` (samples and chord midpoints)."""
+    chord = end - start
+    length_squared = chord @ chord
+    if tangent @ chord <= 0: # would sweep more than half a turn
+        return math.inf
+    between = np.concatenate((run[1:-1], (run[1:] + run[:-1]) / 2))
+    if len(between) == 0:
+        return 0.0
+    curvature = 2 * (tangent[0] * chord[1] - tangent[1] * chord[0]) / length_squared
+    if abs(curvature) * math.sqrt(length_squared) < 1e-9:
+        offset = between - start
+        distance = np.abs(offset[:, 0] * chord[1] - offset[:, 1] * chord[0]) / math.sqrt(length_squared)
+    else:
+        center = start + np.array((-tangent[1], tangent[0])) / curvature
+        distance = np.abs(np.hypot(*(between - center).T) - 1 / abs(curvature))
+    return distance.max()
+
+
+def _biarc(start, start_tangent, end, end_tangent):
+    """
+    The two tangent arcs (as (start, end, tangent) triples) from `start`
+    leaving along `start_tangent` to `end` arriving along `end_tangent`:
+    the equal-reach biarc, whose joint is the midpoint of start + d T0 and
+    end - d T1, with d the root of |chord - d (T0 + T1)| = 2 d.
+    """
+    chord = end - start
+    both = start_tangent + end_tangent
+    a = 2 * (1 - start_tangent @ end_tangent)
+    b = chord @ both
+    if a < 1e-12: # tangents parallel
+        reach = (chord @ chord) / (4 * (chord @ end_tangent))
+    else:
+        reach = (-b + math.sqrt(b * b + a * (chord @ chord))) / a
+    joint = (start + reach * start_tangent + end - reach * end_tangent) / 2
+    _, joint_tangent = _tangent_arc(start, joint, start_tangent)
+    return (start, joint, start_tangent), (joint, end, joint_tangent)
+
+
+def _biarc_fits(points, i, j, biarc, tolerance):
+    """Whether both arcs of a biarc from points[i] to points[j] stay within tolerance of the points between."""
+    (start, joint, start_tangent), (_, end, joint_tangent) = biarc
+    run = points[i:j + 1]
+    # Samples up to the one nearest the joint belong to the first arc
+    k = int(np.argmin(np.hypot(*(run - joint).T)))
+    first = np.concatenate((run[:k + 1], [joint]))
+    second = np.concatenate(([joint], run[k + 1:]))
+    return (_deviation(first, start, joint, start_tangent) <= tolerance
+            and _deviation(second, joint, end, joint_tangent) <= tolerance)
+
+
+def _mirrored(segment):
+    """Segment mirrored about the X axis, reversed so the contour keeps its direction."""
+    flip = lambda point: (point[0], -point[1])
+    if isinstance(segment, Arc):
+        return Arc(flip(segment.end), flip(segment.start), flip(segment.center), segment.ccw)
+    return Line(flip(segment.end), flip(segment.start))
+
+
+def _rotated(segment, angle):
+    c, s = math.cos(angle), math.sin(angle)
+    turn = lambda point: (c * point[0] - s * point[1], s * point[0] + c * point[1])
+    if isinstance(segment, Arc):
+        return Arc(turn(segment.start), turn(segment.end), turn(segment.center), segment.ccw)
+    if isinstance(segment, Circle):
+        return Circle(turn(segment.center), segment.radius)
+    return Line(turn(segment.start), turn(segment.end))
+
+
+def _moved(segment, dx, dy):
+    move = lambda point: (point[0] + dx, point[1] + dy)
+    if isinstance(segment, Arc):
+        return Arc(move(segment.start), move(segment.end), move(segment.center), segment.ccw)
+    if isinstance(segment, Circle):
+        return Circle(move(segment.center), segment.radius)
+    return Line(move(segment.start), move(segment.end))
+
+
+def arc_angles(arc):
+    """(radius, start angle, sweep) of an Arc, the sweep signed by direction."""
+    radius = math.hypot(arc.start[0] - arc.center[0], arc.start[1] - arc.center[1])
+    start = math.atan2(arc.start[1] - arc.center[1], arc.start[0] - arc.center[0])
+    end = math.atan2(arc.end[1] - arc.center[1], arc.end[0] - arc.center[0])
+    sweep = (end - start) % (2 * math.pi) if arc.ccw else -((start - end) % (2 * math.pi))
+    if sweep == 0: # a full turn
+        sweep = 2 * math.pi if arc.ccw else -2 * math.pi
+    return radius, start, sweep
+
+
+def sample_segments(segments, tolerance=TOLERANCE / 10):
+    """Points along a contour, e.g. to check it against the curve it was fitted to."""
+    points = []
+    for segment in segments:
+        if isinstance(segment, Circle):
+            points.append(profile_mesh.circle(segment.center, segment.radius, tolerance))
+        elif isinstance(segment, Arc):
+            radius, start, sweep = arc_angles(segment)
+            points.append(profile_mesh._arc(segment.center, radius, start, sweep, tolerance))
+        else:
+            points.append(np.array([segment.start]))
+    return np.concatenate(points)
+
+
+def bounds(plate):
+    """(x_min, y_min, x_max, y_max) of a plate's outline (or of its holes, if it has none)."""
+    contours = [plate.outline] if plate.outline else plate.holes
+    x, y = [], []
+    for segment in (segment for contour in contours for segment in contour):
+        if isinstance(segment, Circle):
+            (cx, cy), r = segment
+            x += [cx - r, cx + r]
+            y += [cy - r, cy + r]
+            continue
+        x += [segment.start[0], segment.end[0]]
+        y += [segment.start[1], segment.end[1]]
+        if isinstance(segment, Arc):
+            # Quadrant points inside the sweep are extremes too
+            radius, start, sweep = arc_angles(segment)
+            low = min(start, start + sweep)
+            for quadrant in range(math.ceil(low / (math.pi / 2)), math.floor((low + abs(sweep)) / (math.pi / 2)) + 1):
+                px, py = _polar(segment.center, radius, quadrant * math.pi / 2)
+                x.append(px)
+                y.append(py)
+    return min(x), min(y), max(x), max(y)
+
+
+# =============================================================================
+# Nesting
+# =============================================================================
+def nest(items, sheet_width, spacing=SPACING):
+    """
+    Lays out `items` = [(plate, count), ...] on a sheet `sheet_width` mm wide
+    with shelf packing: parts sorted tallest first, placed left to right in
+    rows, a new row when one is full. Returns a list of (plate, dx, dy)
+    placements (translations from the part's own coordinates) and the
+    sheet height used.
+    """
+    parts = []
+    for plate, count in items:
+        parts += [(plate, bounds(plate))] * int(count)
+    parts.sort(key=lambda part: part[1][3] - part[1][1], reverse=True)
+
+    placements = []
+    x, y, row_height = spacing, spacing, 0.0
+    for plate, (x_min, y_min, x_max, y_max) in parts:
+        width, height = x_max - x_min, y_max - y_min
+        if width + 2 * spacing > sheet_width:
+            raise ValueError(f"{plate.name} is {width:.1f} mm wide, too wide for a {sheet_width:g} mm sheet")
+        if x + width + spacing > sheet_width: # row full
+            x, y, row_height = spacing, y + row_height + spacing, 0.0
+        placements.append((plate, x - x_min, y - y_min))
+        x += width + spacing
+        row_height = max(row_height, height)
+    return placements, y + row_height + spacing
+
+
+def export_batch(items, path, sheet_width=1000.0, spacing=SPACING):
+    """
+    Nests `items` = [(plate, count), ...] on one sheet and writes them to
+    `path` (.dxf or .svg). Returns the sheet height in mm.
+    """
+    placements, height = nest(items, sheet_width, spacing)
+    plates = []
+    for plate, dx, dy in placements:
+        plates.append(Plate(plate.name, [_moved(s, dx, dy) for s in plate.outline],
+                            [[_moved(s, dx, dy) for s in hole] for hole in plate.holes]))
+    _write(plates, path, (0.0, 0.0, sheet_width, height))
+    return height
+
+
+def write_profile(plate, path):
+    """Writes one plate to `path` (.dxf or .svg) in its own coordinates."""
+    _write([plate], path, bounds(plate))
+
+
+def _write(plates, path, box):
+    extension = path.lower().rsplit(".", 1)[-1]
+    if extension == "dxf":
+        text = dxf_text(plates)
+    elif extension == "svg":
+        text = svg_text(plates, box)
+    else:
+        raise ValueError(f"Unsupported 2D format for '{path}' (use .dxf or .svg)")
+    with open(path, "w") as f:
+        f.write(text)
+
+
+# =============================================================================
+# Writers
+# =============================================================================
+def dxf_text(plates):
+    """DXF R12 drawing of the plates: holes on layer INNER, outlines on layer OUTER."""
+    lines = ["0", "SECTION", "2", "HEADER", "9", "$ACADVER", "1", "AC1009", "9", "$INSUNITS", "70", "4",
+             "0", "ENDSEC",
+             "0", "SECTION", "2", "TABLES", "0", "TABLE", "2", "LAYER", "70", "2"]
+    for layer, color in (("INNER", 1), ("OUTER", 7)):
+        lines += ["0", "LAYER", "2", layer, "70", "0", "62", str(color), "6", "CONTINUOUS"]
+    lines += ["0", "ENDTAB", "0", "ENDSEC", "0", "SECTION", "2", "ENTITIES"]
+
+    for plate in plates:
+        for layer, contours in (("INNER", plate.holes), ("OUTER", [plate.outline])):
+            for segment in (segment for contour in contours for segment in contour):
+                lines += _dxf_entity(segment, layer)
+    lines += ["0", "ENDSEC", "0", "EOF"]
+    return "\n".join(lines) + "\n"
+
+
+def _dxf_entity(segment, layer):
+    if isinstance(segment, Circle):
+        (x, y), r = segment
+        return ["0", "CIRCLE", "8", layer, "10", _number(x), "20", _number(y), "30", "0", "40", _number(r)]
+    if isinstance(segment, Arc):
+        # DXF arcs always run counter-clockwise from start to end angle
+        radius, start, sweep = arc_angles(segment)
+        first, second = (start, start + sweep) if sweep > 0 else (start + sweep, start)
+        return ["0", "ARC", "8", layer, "10", _number(segment.center[0]), "20", _number(segment.center[1]),
+                "30", "0", "40", _number(radius),
+                "50", _number(math.degrees(first) % 360), "51", _number(math.degrees(second) % 360)]
+    return ["0", "LINE", "8", layer, "10", _number(segment.start[0]), "20", _number(segment.start[1]), "30", "0",
+            "11", _number(segment.end[0]), "21", _number(segment.end[1]), "31", "0"]
+
+
+def svg_text(plates, box):
+    """SVG drawing of the plates in mm, one path per contour (Y flipped so the part reads as in CAD)."""
+    x_min, y_min, x_max, y_max = box
+    width, height = x_max - x_min, y_max - y_min
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_number(width)}mm" height="{_number(height)}mm" '
+        f'viewBox="{_number(x_min)} {_number(-y_max)} {_number(width)} {_number(height)}">',
+        '<g fill="none" stroke="black" stroke-width="0.1">',
+    ]
+    for plate in plates:
+        lines.append(f'<g id="{plate.name}">' if plate.name else "<g>")
+        for contour in plate.holes + [plate.outline]:
+            if len(contour) == 1 and isinstance(contour[0], Circle):
+                (x, y), r = contour[0]
+                lines.append(f'<circle cx="{_number(x)}" cy="{_number(-y)}" r="{_number(r)}"/>')
+            elif contour:
+                lines.append(f'<path d="{_svg_path(contour)}"/>')
+        lines.append("</g>")
+    lines += ["</g>", "</svg>"]
+    return "\n".join(lines) + "\n"
+
+
+def _svg_path(contour):
+    x, y = contour[0].start
+    commands = [f"M{_number(x)},{_number(-y)}"]
+    for segment in contour:
+        x, y = segment.end
+        if isinstance(segment, Arc):
+            radius, _, sweep = arc_angles(segment)
+            # With Y flipped, counter-clockwise in the model is sweep-flag 0
+            large = int(abs(sweep) > math.pi)
+            commands.append(f"A{_number(radius)},{_number(radius)} 0 {large} {int(not segment.ccw)} "
+                            f"{_number(x)},{_number(-y)}")
+        else:
+            commands.append(f"L{_number(x)},{_number(-y)}")
+    return " ".join(commands) + " Z"
+
+
+def _number(value):
+    """Coordinates to the micron, without trailing zeros."""
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+if __name__ == "__main__":
+    import time
+
+    for name, function in PLATE_PROFILES.items():
+        start = time.perf_counter()
+        plate = function()
+        path = f"{name.replace('-', '_')}_profile.dxf"
+        write_profile(plate, path)
+        count = len(plate.outline) + sum(len(hole) for hole in plate.holes)
+        print(f"Saved {path} ({count} entities, {1e3 * (time.perf_counter() - start):.1f} ms)")
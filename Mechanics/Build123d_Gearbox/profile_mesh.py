@@ -0,0 +1,588 @@
+"""
+Mesh-only fast path for the parts that are extruded 2D profiles.
+
+cycloidal_disk(), drum_disk() and fixed_knife() are a planar outline with
+holes, extruded along Z. Here the outline is built directly as polygons,
+triangulated with NumPy (arcs fanned, then ear clipping of the coarse
+polygon left, with the holes bridged into the outline) and extruded into
+a closed, watertight triangle mesh, without build123d or OCC:
+
+    write_mesh(cycloidal_disk_mesh(num_lobes=10, num_pins=11), "disk.stl") # mesh_export.write_mesh
+
+Curves are sampled so that no segment deviates from the true curve by more
+than `tolerance` mm; the cycloid outline uses the same points as the
+B-rep (resolution or chord_tolerance). The parts come out in the same
+position as from their generators.
+
+The drum disk's carbide insert pockets are not prismatic and are left out,
+so drum_disk_mesh() is the disk blank (rim, gullets and hex bore). As
+placed in drum_disk() the pockets only nick the hook tips (about 0.3 mm^3),
+so the blank stays within a few tenths of a millimetre of the B-rep part.
+"""
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from cycloid_metrics import check_design
+from cycloid_profile import adaptive_angles, contracted_profile, cycloid_geometry, profile_angles
+from outline_check import trim_loops
+
+TOLERANCE = 0.01 # mm, max deviation of sampled circles and arcs
+ARC_TURN = math.pi / 8 # radians, max turning of an arc fanned in one piece
+
+
+class Profile(NamedTuple):
+    outer: np.ndarray # (n, 2) outline, counter-clockwise
+    holes: list       # (m, 2) hole outlines, clockwise
+
+
+# =============================================================================
+# Profiles
+# =============================================================================
+def cycloidal_disk_profile(
+    pin_circle_diameter=50.0, # D
+    pin_diameter=5.3,         # dp
+    num_lobes=8,              # n
+    num_pins=9,               # N
+    eccentricity_factor=0.3,  # eFactor (must be < 0.5)
+    center_hole_diameter=24.1,# dc
+    resolution=360,           # circle
+    chord_tolerance=None,     # mm, max outline deviation; overrides resolution
+    tolerance=TOLERANCE,
+    self_intersection="error" # "trim" cuts the loops off an undercut outline
+):
+    """
+    Outline and holes of cycloidal_disk() with the same arguments. Raises
+    ValueError for designs check_design() rejects: a mesh can't represent
+    holes breaking through the outline or an undercut outline, unless its
+    loops are trimmed off as cycloidal_disk() does.
+    """
+    trim = self_intersection == "trim"
+    problems, _ = check_design(pin_circle_diameter, pin_diameter, num_lobes, num_pins, eccentricity_factor,
+                               center_hole_diameter, allow_undercut=trim)
+    if problems:
+        raise ValueError("; ".join(problems))
+    geometry = cycloid_geometry(
+        pin_circle_diameter=pin_circle_diameter,
+        num_lobes=num_lobes,
+        num_pins=num_pins,
+        eccentricity_factor=eccentricity_factor
+    )
+    if chord_tolerance:
+        angles = adaptive_angles(geometry, pin_diameter, chord_tolerance)
+    else:
+        angles = profile_angles(resolution)
+    outer = contracted_profile(geometry, pin_diameter, angles)
+    if trim:
+        outer, _ = trim_loops(outer)
+
+    holes = [circle(center, radius, tolerance) for center, radius in disk_holes(geometry, num_lobes, center_hole_diameter)]
+    return _oriented(outer, holes)
+
+
+def disk_holes(geometry, num_lobes, center_hole_diameter):
+    """
+    (center, radius) of cycloidal_disk()'s holes: the center hole, and
+    num_lobes roller holes of diameter 5.3 + 2e on the 34 mm pitch circle,
+    the first on the X axis.
+    """
+    roller_radius = (5.3 + 2 * geometry.eccentricity) / 2
+    holes = [((0.0, 0.0), center_hole_diameter / 2)]
+    for i in range(int(num_lobes)):
+        angle = 2 * math.pi * i / int(num_lobes)
+        holes.append(((17.0 * math.cos(angle), 17.0 * math.sin(angle)), roller_radius))
+    return holes
+
+
+def drum_disk_profile(
+    diameter=150.0,
+    hex_shaft_size=25.0, # Flat-to-Flat
+    num_teeth=2,
+    tolerance=TOLERANCE
+):
+    """Outline of drum_disk() without the insert pockets: rim, gullets and hex bore."""
+    arcs = rim_arcs(diameter / 2, drum_gullets(diameter, num_teeth))
+    outer = np.concatenate([_arc(center, r, start, sweep, tolerance) for center, r, start, sweep in arcs])
+    return _oriented(outer, [hex_bore(hex_shaft_size)])
+
+
+def fixed_knife_profile(length=254.0, width=50.0):
+    """Outline of fixed_knife(): a length x width rectangle centred on the origin."""
+    x, y = length / 2, width / 2
+    return Profile(np.array([(-x, -y), (x, -y), (x, y), (-x, y)], dtype=float), [])
+
+
+def circle(center, radius, tolerance=TOLERANCE):
+    """Counter-clockwise polygon within `tolerance` of a circle."""
+    count = _arc_segments(radius, 2 * math.pi, tolerance)
+    angles = np.arange(count) * (2 * math.pi / count)
+    return np.column_stack([center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)])
+
+
+def _arc_segments(radius, sweep, tolerance, minimum=8):
+    # A chord spanning angle a has sagitta r (1 - cos(a/2))
+    step = 2 * math.acos(max(-1.0, 1 - tolerance / radius))
+    return max(minimum, math.ceil(abs(sweep) / step))
+
+
+def _arc(center, radius, start, sweep, tolerance):
+    """Points on an arc from angle `start` through `sweep`, excluding the end point."""
+    count = _arc_segments(radius, sweep, tolerance, minimum=2)
+    angles = start + np.arange(count) * (sweep / count)
+    return np.column_stack([center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)])
+
+
+def rim_arcs(radius, cutters):
+    """
+    Counter-clockwise outline of a disk with circular bites (center, r) taken
+    out of its rim, as arcs (center, radius, start angle, sweep): the rim and
+    the cutter arcs, alternating. Each bite must cross the rim and not
+    overlap the others.
+    """
+    bites = []
+    for (cx, cy), r in cutters:
+        distance = math.hypot(cx, cy)
+        cos_half = (radius**2 + distance**2 - r**2) / (2 * radius * distance)
+        if not -1 < cos_half < 1:
+            raise ValueError(f"Cutter at ({cx:.1f}, {cy:.1f}) r={r} does not cross the rim")
+        half = math.acos(cos_half)
+        middle = math.atan2(cy, cx)
+        bites.append((middle - half, middle + half, (cx, cy), r))
+    bites.sort(key=lambda bite: bite[0] % (2 * math.pi))
+
+    arcs = []
+    for i, (start, end, center, r) in enumerate(bites):
+        # Cutter arc inside the rim, from where the bite starts to where it ends
+        a = math.atan2(radius * math.sin(start) - center[1], radius * math.cos(start) - center[0])
+        b = math.atan2(radius * math.sin(end) - center[1], radius * math.cos(end) - center[0])
+        inward = math.atan2(-center[1], -center[0])
+        sweep = (b - a) % (2 * math.pi)
+        if (inward - a) % (2 * math.pi) > sweep: # the short way round goes outside the rim
+            sweep -= 2 * math.pi
+        arcs.append((center, r, a, sweep))
+
+        # Rim up to the next bite
+        next_start = bites[(i + 1) % len(bites)][0]
+        rim_sweep = (next_start - end) % (2 * math.pi)
+        if len(bites) > 1 and rim_sweep > 2 * math.pi - (end - start):
+            raise ValueError("Rim cutters overlap")
+        arcs.append(((0.0, 0.0), radius, end, rim_sweep))
+    return arcs
+
+
+def drum_gullets(diameter=150.0, num_teeth=2):
+    """(center, radius) of the gullet cylinders of drum_disk(): radius 25 at (radius, 15), one per tooth."""
+    radius = diameter / 2
+    gullets = []
+    for i in range(num_teeth):
+        turn = 2 * math.pi * i / num_teeth
+        gullets.append(((radius * math.cos(turn) - 15 * math.sin(turn),
+                         radius * math.sin(turn) + 15 * math.cos(turn)), 25.0))
+    return gullets
+
+
+def hex_bore(hex_shaft_size=25.0):
+    """Corners of drum_disk()'s hex bore: RegularPolygon with circumradius s / sqrt(3), first on the X axis."""
+    angles = np.arange(6) * (math.pi / 3)
+    return hex_shaft_size / math.sqrt(3) * np.column_stack([np.cos(angles), np.sin(angles)])
+
+
+def _signed_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def _oriented(outer, holes):
+    """Profile with the outline counter-clockwise and the holes clockwise."""
+    outer = np.asarray(outer, dtype=float)
+    if _signed_area(outer) < 0:
+        outer = outer[::-1]
+    holes = [hole[::-1] if _signed_area(hole) > 0 else hole for hole in map(np.asarray, holes)]
+    return Profile(outer, holes)
+
+
+# =============================================================================
+# Triangulation
+# =============================================================================
+def triangulate_profile(profile, arc_turn=ARC_TURN):
+    """
+    Triangulates a profile. Returns (points, triangles): the outline points,
+    the hole points and any interior points added for the arc fans (see
+    arc_fans()), and counter-clockwise index triples. Every outline and hole
+    edge is an edge of exactly one triangle, so walls built on the rings
+    close the mesh.
+    """
+    points = np.concatenate([profile.outer] + list(profile.holes))
+    rings = _ring_slices(profile)
+    # Arcs fanned, the rest ear clipped: a few hundred vertices whatever the
+    # resolution. Arc fans can reach across a thin web, so a failed check
+    # retries with shorter arcs and then ear clips every vertex
+    for turn in (arc_turn, arc_turn / 4):
+        extended, coarse, fans = arc_fans(points, rings, turn)
+        try:
+            triangles = triangulate_polygon(extended, bridge_holes(extended, coarse))
+        except ValueError:
+            continue
+        # Each fan's edges cancel except its arc and its coarse edges, so the
+        # fans and the coarse triangles sum to the rings; only the fans'
+        # orientation is left to check
+        if covers_rings(extended, coarse, triangles) and not _clockwise(extended, fans).any():
+            return extended, np.concatenate([triangles, fans])
+    triangles = triangulate_polygon(points, bridge_holes(points, rings))
+    if not covers_rings(points, rings, triangles):
+        raise ValueError("Could not triangulate the profile (self-intersecting outline?)")
+    return points, triangles
+
+
+def _ring_slices(profile):
+    """Index ranges of the outline and each hole in the stacked points."""
+    slices, start = [], 0
+    for ring in [profile.outer] + list(profile.holes):
+        slices.append(np.arange(start, start + len(ring)))
+        start += len(ring)
+    return slices
+
+
+def arc_fans(points, rings, max_turn=ARC_TURN):
+    """
+    Splits each ring (material on its left) into arcs that turn one way by
+    at most `max_turn` radians and fans them: a convex arc from its first
+    point, closed by its chord; a reflex arc from an added point on the
+    material side that sees all of it. Returns (points with the added ones
+    appended, the coarse rings of chords and fan points, fan triangles).
+    """
+    points = [points]
+    count = len(points[0])
+    coarse, fans = [], []
+    for ring in rings:
+        ring = np.asarray(ring)
+        p = points[0][ring]
+        k = len(ring)
+        edge = np.roll(p, -1, axis=0) - p # edge i runs from point i to point i + 1
+        before = np.roll(edge, 1, axis=0)
+        turn = np.arctan2(_cross(before, edge), np.einsum("ij,ij->i", before, edge))
+        reflex = turn < 0
+        band = np.floor(np.cumsum(np.abs(turn)) / max_turn)
+        # Arc ends: before the turn changes sign, and every max_turn of turning
+        cuts = np.flatnonzero((reflex != np.roll(reflex, -1)) | (band != np.roll(band, 1)))
+        if len(cuts) < 3:
+            cuts = np.unique(np.concatenate([cuts, np.arange(3) * k // 3]))
+        starts = cuts
+        ends = np.append(cuts[1:], cuts[0] + k)
+        inner = ends - starts - 1
+        bent = reflex[(starts + 1) % k] & (inner >= 2) # a single reflex point stays in the coarse ring
+
+        # Convex arcs: triangles (start, i, i + 1) over the inner points
+        convex = ~reflex[(starts + 1) % k] & (inner >= 1)
+        position = _runs(starts[convex] + 1, inner[convex])
+        fans.append(np.column_stack([np.repeat(ring[starts[convex]], inner[convex]),
+                                     ring[position % k], ring[(position + 1) % k]]))
+
+        # Reflex arcs: triangles (i, i + 1, apex) over every edge. The apex sits
+        # on the chord's left normal, twice as far out as the farthest edge line
+        a, b = p[starts[bent]], p[ends[bent] % k]
+        chord = b - a
+        normal = np.column_stack([-chord[:, 1], chord[:, 0]]) / np.hypot(*chord.T)[:, None]
+        middle = (a + b) / 2
+        lengths = inner[bent] + 1
+        position = _runs(starts[bent], lengths)
+        arc = np.repeat(np.arange(len(lengths)), lengths)
+        edge_normal = np.column_stack([-edge[position % k, 1], edge[position % k, 0]])
+        needed = (-np.einsum("ij,ij->i", middle[arc] - p[position % k], edge_normal)
+                  / np.einsum("ij,ij->i", normal[arc], edge_normal))
+        height = np.zeros(len(lengths))
+        np.maximum.at(height, arc, needed)
+        apex = count + np.arange(len(lengths))
+        points.append(middle + 2 * height[:, None] * normal)
+        count += len(lengths)
+        fans.append(np.column_stack([ring[position % k], ring[(position + 1) % k], apex[arc]]))
+
+        # Coarse ring: every arc start, then the apex of a reflex arc or the
+        # single inner point of a short one
+        single = reflex[(starts + 1) % k] & (inner == 1)
+        extra = np.full(len(starts), -1)
+        extra[bent] = apex
+        extra[single] = ring[(starts[single] + 1) % k]
+        pairs = np.column_stack([ring[starts], extra]).ravel()
+        coarse.append(pairs[pairs >= 0])
+    return np.concatenate(points), coarse, np.concatenate(fans).astype(np.int32)
+
+
+def _runs(starts, lengths):
+    """Concatenated np.arange(start, start + length) for each pair."""
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def covers_rings(points, rings, triangles):
+    """
+    Whether `triangles` triangulate the polygon bounded by `rings`: none is
+    clockwise, and their edges cancel in pairs except for the ring edges,
+    each left once in ring direction. Then every point inside the rings is
+    covered exactly once (the triangles sum to the rings' winding number).
+    """
+    t = np.asarray(triangles)
+    if not len(t) or _clockwise(points, t).any():
+        return False
+    n = len(points)
+    edges = np.concatenate([t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]] + [_edges(ring) for ring in rings])
+    edges = edges.astype(np.int64)
+    weight = np.ones(len(edges), dtype=np.int64)
+    weight[3 * len(t):] = -1
+    # Edge u -> v counts +weight at key (u, v) and -weight at key (v, u)
+    keys = np.concatenate([edges[:, 0] * n + edges[:, 1], edges[:, 1] * n + edges[:, 0]])
+    weight = np.concatenate([weight, -weight])
+    order = np.argsort(keys, kind="stable")
+    keys, weight = keys[order], weight[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return not np.add.reduceat(weight, starts).any()
+
+
+def _clockwise(points, triangles):
+    """Which triangles turn clockwise (flat ones, within rounding, don't)."""
+    scale = np.ptp(points, axis=0).max() or 1.0
+    a, b, c = (points[triangles[:, i]] for i in range(3))
+    return _cross(b - a, c - a) < -1e-12 * scale**2
+
+
+def bridge_holes(points, rings):
+    """
+    Joins the holes (rings[1:], clockwise) into the outline (rings[0],
+    counter-clockwise) with zero-width bridges, giving one weakly simple
+    polygon as a list of point indices. Holes are taken rightmost first;
+    each is joined from one of its vertices to the nearest outline vertex
+    it can see.
+    """
+    ring = rings[0]
+    holes = sorted(rings[1:], key=lambda hole: -points[hole, 0].max())
+    for number, hole in enumerate(holes):
+        others = holes[number + 1:]
+        edges = np.concatenate([_edges(ring)] + [_edges(h) for h in [hole] + others])
+        a, b = points[edges[:, 0]], points[edges[:, 1]]
+        for start in hole[np.argsort(-points[hole, 0])]:
+            target = _visible_vertex(points, ring, hole, start, a, b)
+            if target is not None:
+                break
+        else:
+            raise ValueError("Could not bridge a hole to the outline (holes overlapping?)")
+        h = int(np.flatnonzero(hole == start)[0])
+        loop = np.concatenate([hole[h:], hole[:h + 1]])
+        ring = np.concatenate([ring[:target + 1], loop, ring[target:]])
+    return ring
+
+
+def _edges(ring):
+    return np.column_stack([ring, np.roll(ring, -1)])
+
+
+def _visible_vertex(points, ring, hole, start, a, b):
+    """Position in `ring` of the nearest vertex joined to `start` by a clear segment, or None."""
+    m = points[start]
+    h = int(np.flatnonzero(hole == start)[0])
+    before, after = points[hole[h - 1]], points[hole[(h + 1) % len(hole)]]
+    order = np.argsort(np.hypot(*(points[ring] - m).T))
+    # Nearest first, in growing batches: one of the first few nearly always works
+    first, size = 0, 16
+    while first < len(order):
+        chunk = order[first:first + size]
+        first, size = first + size, size * 4
+        p = points[ring[chunk]]
+        # Proper crossings of each segment m-p with every edge a-b
+        px, py = p[:, 0, None] - m[0], p[:, 1, None] - m[1]
+        ex, ey = b[:, 0] - a[:, 0], b[:, 1] - a[:, 1]
+        d1 = px * (a[:, 1] - m[1]) - py * (a[:, 0] - m[0])
+        d2 = px * (b[:, 1] - m[1]) - py * (b[:, 0] - m[0])
+        d3 = ex * (m[1] - a[:, 1]) - ey * (m[0] - a[:, 0])
+        d4 = ex * (p[:, 1, None] - a[:, 1]) - ey * (p[:, 0, None] - a[:, 0])
+        blocked = ((d1 * d2 < 0) & (d3 * d4 < 0)).any(axis=1)
+        for k in np.flatnonzero(~blocked):
+            position = chunk[k]
+            if (_in_wedge(points[ring[position - 1]], p[k], points[ring[(position + 1) % len(ring)]], m)
+                    and _in_wedge(before, m, after, p[k])):
+                return int(position)
+    return None
+
+
+def _in_wedge(before, vertex, after, toward):
+    """Whether the direction vertex -> toward points into the polygon (on the left of both edges)."""
+    d = np.subtract(toward, vertex)
+    left_in = _cross(np.subtract(vertex, before), d) > 0
+    left_out = _cross(np.subtract(after, vertex), d) > 0
+    convex = _cross(np.subtract(vertex, before), np.subtract(after, vertex)) > 0
+    return bool(left_in and left_out) if convex else bool(left_in or left_out)
+
+
+def _cross(u, v):
+    u, v = np.asarray(u), np.asarray(v)
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+
+def triangulate_polygon(points, ring):
+    """
+    Ear clipping of the counter-clockwise polygon `points[ring]` (which may
+    touch itself along hole bridges). Every round clips all ears that are not
+    next to each other at once, so convex runs go in O(log n) rounds of
+    O(n * reflex) NumPy work; a reflex run only goes a point or two per
+    round, which is why triangulate_profile() fans arcs first. Points in the
+    middle of a straight run are clipped as flat triangles, keeping every
+    point of the ring.
+    """
+    ring = np.asarray(ring)
+    scale = np.ptp(points, axis=0).max() or 1.0
+    eps = 1e-12 * scale**2
+    triangles = []
+    while len(ring) > 3:
+        p = points[ring]
+        prev, after = np.roll(p, 1, axis=0), np.roll(p, -1, axis=0)
+        turn = _cross(p - prev, after - p)
+
+        straight = (np.abs(turn) <= eps) & (np.einsum("ij,ij->i", p - prev, after - p) > 0)
+        convex = turn > eps
+        ears = convex.copy()
+        reflex = ring[~convex]
+        candidates = np.flatnonzero(convex)
+        if len(reflex) and len(candidates):
+            (ax, ay), (bx, by), (cx, cy) = (corner[candidates].T for corner in (prev, p, after))
+            # Only the reflex points within each triangle's x range can be inside it
+            reflex = reflex[np.argsort(points[reflex, 0])]
+            rx = points[reflex, 0]
+            low = np.searchsorted(rx, np.minimum(np.minimum(ax, bx), cx) - eps, "left")
+            high = np.searchsorted(rx, np.maximum(np.maximum(ax, bx), cx) + eps, "right")
+            columns = low[:, None] + np.arange(max(1, (high - low).max()))
+            in_range = columns < high[:, None]
+            q = reflex[np.minimum(columns, len(reflex) - 1)]
+            qx, qy = points[q, 0], points[q, 1]
+            (ax, ay), (bx, by), (cx, cy) = ((x[:, None], y[:, None]) for x, y in ((ax, ay), (bx, by), (cx, cy)))
+            inside = (in_range
+                      & ((bx - ax) * (qy - ay) - (by - ay) * (qx - ax) >= -eps)
+                      & ((cx - bx) * (qy - by) - (cy - by) * (qx - bx) >= -eps)
+                      & ((ax - cx) * (qy - cy) - (ay - cy) * (qx - cx) >= -eps))
+            # Bridges repeat points; the triangle's own corners don't count
+            corners = np.column_stack([np.roll(ring, 1), ring, np.roll(ring, -1)])[candidates]
+            inside &= (q != corners[:, :1]) & (q != corners[:, 1:2]) & (q != corners[:, 2:])
+            ears[candidates] = ~inside.any(axis=1)
+        ears |= straight # a flat triangle, always safe to clip
+        if not ears.any():
+            # Only reachable for degenerate input: clip the sharpest convex corner
+            ears = np.zeros_like(convex)
+            ears[np.argmax(np.where(convex, turn, -np.inf))] = True
+
+        # Ears that are not neighbours can be clipped together
+        index = np.arange(len(ring))
+        chosen = ears & (index % 2 == 0)
+        if len(ring) % 2 and chosen[0]:
+            chosen[-1] = False
+        chosen |= ears & ~np.roll(chosen, 1) & ~np.roll(chosen, -1) & (index % 2 == 1)
+        if chosen.sum() * 2 > len(ring) - 3: # leave at least a triangle
+            keep = np.flatnonzero(chosen)[:max(1, (len(ring) - 3) // 2)]
+            chosen = np.zeros_like(chosen)
+            chosen[keep] = True
+
+        picked = np.flatnonzero(chosen)
+        triangles.append(np.column_stack([ring[picked - 1], ring[picked], ring[(picked + 1) % len(ring)]]))
+        ring = ring[~chosen]
+    triangles.append(ring[None])
+    return np.concatenate(triangles).astype(np.int32)
+
+
+# =============================================================================
+# Extrusion
+# =============================================================================
+def extrude_profile(profile, z_min, z_max):
+    """Closed triangle mesh of `profile` extruded from z_min to z_max."""
+    points, caps = triangulate_profile(profile)
+    count = len(points)
+    vertices = np.concatenate([
+        np.column_stack([points, np.full(count, float(z_min))]),
+        np.column_stack([points, np.full(count, float(z_max))]),
+    ])
+    walls = []
+    for ring in _ring_slices(profile):
+        # The outline runs counter-clockwise and holes clockwise, so the
+        # material is always on the left and the walls face right
+        a, b = ring, np.roll(ring, -1)
+        walls.append(np.column_stack([a, b, b + count]))
+        walls.append(np.column_stack([a, b + count, a + count]))
+    triangles = np.concatenate([caps[:, ::-1], caps + count] + walls).astype(np.int32)
+    # Imported here: mesh_export pulls in the process pool and zip machinery,
+    # which knife_clearance (through drum_disk_profile()) doesn't need
+    from mesh_export import Mesh
+
+    return Mesh(vertices, triangles)
+
+
+# =============================================================================
+# Parts
+# =============================================================================
+def cycloidal_disk_mesh(
+    pin_circle_diameter=50.0, # D
+    pin_diameter=5.3,         # dp
+    num_lobes=8,              # n
+    num_pins=9,               # N
+    eccentricity_factor=0.3,  # eFactor (must be < 0.5)
+    center_hole_diameter=24.1,# dc
+    thickness=3.0,            # bearingLength
+    resolution=360,           # circle
+    chord_tolerance=None,     # mm, max outline deviation; overrides resolution
+    spline_tolerance=None,    # mm, used like chord_tolerance (a mesh has no splines)
+    self_intersection="error",# "trim" cuts the loops off an undercut outline
+    tolerance=TOLERANCE
+):
+    """Mesh of cycloidal_disk() with the same arguments (Z from 0 to thickness)."""
+    profile = cycloidal_disk_profile(
+        pin_circle_diameter, pin_diameter, num_lobes, num_pins, eccentricity_factor,
+        center_hole_diameter, resolution, chord_tolerance or spline_tolerance, tolerance, self_intersection
+    )
+    return extrude_profile(profile, 0.0, thickness)
+
+
+def drum_disk_mesh(diameter=150.0, thickness=25.0, hex_shaft_size=25.0, num_teeth=2, tolerance=TOLERANCE):
+    """Mesh of the drum_disk() blank, without insert pockets (Z centred on 0)."""
+    return extrude_profile(drum_disk_profile(diameter, hex_shaft_size, num_teeth, tolerance),
+                           -thickness / 2, thickness / 2)
+
+
+def fixed_knife_mesh(length=254.0, drum_diameter=150.0, width=50.0, thickness=20.0):
+    """Mesh of fixed_knife() (centred on the origin)."""
+    return extrude_profile(fixed_knife_profile(length, width), -thickness / 2, thickness / 2)
+
+
+# Generator name (see generators.py) -> mesh function taking the same arguments
+PROFILE_MESHES = {
+    "cycloidal-disk": cycloidal_disk_mesh,
+    "drum-disk": drum_disk_mesh,
+    "fixed-knife": fixed_knife_mesh,
+}
+
+
+def mesh_volume(mesh):
+    """Enclosed volume of a closed, outward-facing mesh."""
+    a, b, c = (mesh.vertices[mesh.triangles[:, i]] for i in range(3))
+    return np.einsum("ij,ij->i", a, np.cross(b, c)).sum() / 6
+
+
+def open_edges(mesh):
+    """
+    Number of edges not shared by exactly two triangles running them in
+    opposite directions (0 for a watertight, consistently oriented mesh).
+    """
+    t = mesh.triangles.astype(np.int64)
+    edges = np.concatenate([t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]])
+    keys = edges.min(axis=1) * len(mesh.vertices) + edges.max(axis=1)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    rising = np.bincount(inverse, weights=edges[:, 0] < edges[:, 1], minlength=len(counts))
+    return int(((counts != 2) | (rising != 1)).sum())
+
+
+if __name__ == "__main__":
+    import time
+
+    from mesh_export import write_mesh
+
+    for name, function in PROFILE_MESHES.items():
+        start = time.perf_counter()
+        mesh = function()
+        path = f"{name.replace('-', '_')}_profile.stl"
+        write_mesh(mesh, path)
+        print(f"Saved {path} ({len(mesh.triangles)} triangles, {1e3 * (time.perf_counter() - start):.1f} ms)")
@@ -1,5 +1,7 @@
 from build123d import *
+from part_cache import cached_part
 
+@cached_part
 def pusher_mechanism(
     width=250.0,  # Slightly less than drum length (254mm)
     depth=140.0,  # Matches drum diameter approx (150mm)
@@ -1,9 +1,11 @@
 import math
 from build123d import *
+from part_cache import cached_part, shared_shape, shared_copy
 
 # =============================================================================
 # 1. Carbide Insert Model
 # =============================================================================
+@cached_part
 def carbide_insert_ccmt060204():
     """
     Generates a CCMT060204 Carbide Insert.
@@ -130,6 +132,7 @@ def carbide_insert_ccmt060204():
 # =============================================================================
 # 2. Shredder Drum Disk
 # =============================================================================
+@cached_part
 def drum_disk(
     diameter=150.0,
     thickness=25.0, # 254mm / 10 disks ~ 25.4mm
@@ -139,23 +142,15 @@ def drum_disk(
     """
     Generates a single slice of the shredder drum.
     """
+    # Cutters are shared across calls (see the helpers below), so the insert
+    # and the bore are only modelled once per process.
+    hex_bore = hex_bore_cutter(hex_shaft_size, thickness)
+    gullet = gullet_cutter(diameter, thickness)
+    pocket = insert_pocket_cutter(diameter, thickness)
+
     with BuildPart() as disk:
         Cylinder(radius=diameter/2, height=thickness)
 
-        # Hex Bore
-        # Hexagon with flat-to-flat = hex_shaft_size
-        # Radius (Center to Corner) = size / sqrt(3) * 2 ?
-        # Flat-to-Flat (s) = 2 * r_inscribed
-        # r_inscribed = s/2 = 12.5
-        # r_circumscribed (Radius for RegularPolygon) = r_inscribed / cos(30) = (s/2) / (sqrt(3)/2) = s / sqrt(3)
-        # 25 / 1.732 = 14.43
-
-        hex_radius = hex_shaft_size / math.sqrt(3)
-        with Locations((0,0)):
-            with BuildSketch():
-                RegularPolygon(radius=hex_radius, side_count=6)
-            extrude(amount=thickness, mode=Mode.SUBTRACT)
-
         # Tooth Pockets
         # We cut out a recess for the Insert + backing.
         # For a shredder, we usually have a "Tooth" protruding, or the drum is the tooth?
@@ -164,37 +159,62 @@ def drum_disk(
 
         # Let's model a "Hook" profile.
         # We start with a Cylinder, but we carve out "Gullets" to form teeth.
-
-        # Hook depth
-        tooth_depth = 20.0
-
-        insert = carbide_insert_ccmt060204()
-
-        for i in range(num_teeth):
-            angle = i * (360.0 / num_teeth)
-
-            # 1. Cut the Gullet (The space in front of the tooth)
-            # A simple cylinder cut or box cut
-            with Locations(Rotation(0,0, angle)):
-                with Locations((diameter/2, 15, 0)): # Offset position
-                    Cylinder(radius=25, height=thickness, mode=Mode.SUBTRACT)
-
-            # 2. Mount the Insert
-            # On the "Face" created by the gullet.
-            # Position is approximate for this demo.
-            with Locations(Rotation(0,0, angle)):
-                 with Locations((diameter/2 - 5, -5, thickness/2)): # Position on the hook tip
-                     with Locations(Rotation(90, -90, 0)): # Orient correctly (facing forward)
-                         # We subtract the insert shape (pocket)
-                         add(insert, mode=Mode.SUBTRACT)
-
-                         # Add screw hole clearance if needed (simplified)
+        # Each tooth gets a Gullet (the space in front of the tooth) and a
+        # pocket for the Insert on the "Face" created by the gullet.
+        # Each pattern is cut with one boolean. The pockets overlap the
+        # gullets, and OCC is much slower when the tools of one boolean
+        # intersect each other, so they are cut separately; the bore never
+        # touches a gullet and goes in with them.
+        teeth = [Location(Rotation(0,0, i * (360.0 / num_teeth))) for i in range(num_teeth)]
+        add([hex_bore] + [shared_copy(gullet, tooth) for tooth in teeth], mode=Mode.SUBTRACT)
+        add([shared_copy(pocket, tooth) for tooth in teeth], mode=Mode.SUBTRACT)
 
     return disk.part
 
+@shared_shape
+def hex_bore_cutter(hex_shaft_size, thickness):
+    """
+    Hex prism cutting the drum bore.
+    """
+    # Hexagon with flat-to-flat = hex_shaft_size
+    # Flat-to-Flat (s) = 2 * r_inscribed
+    # r_circumscribed (Radius for RegularPolygon) = r_inscribed / cos(30) = (s/2) / (sqrt(3)/2) = s / sqrt(3)
+    # 25 / 1.732 = 14.43
+    hex_radius = hex_shaft_size / math.sqrt(3)
+    # The disk cylinder is centred on Z=0, so the prism is extruded both
+    # ways to span its full thickness and the bore goes right through
+    with BuildPart() as bore:
+        with BuildSketch():
+            RegularPolygon(radius=hex_radius, side_count=6)
+        extrude(amount=thickness/2, both=True)
+    return bore.part
+
+@shared_shape
+def gullet_cutter(diameter, thickness):
+    """
+    Cylinder cutting the gullet in front of the tooth at angle 0.
+    """
+    # A simple cylinder cut, offset from the rim
+    with BuildPart() as gullet:
+        with Locations((diameter/2, 15, 0)):
+            Cylinder(radius=25, height=thickness)
+    return gullet.part
+
+@shared_shape
+def insert_pocket_cutter(diameter, thickness):
+    """
+    Carbide insert placed on the hook tip of the tooth at angle 0, used to
+    cut its pocket.
+    """
+    # Position is approximate for this demo.
+    # Position on the hook tip, oriented correctly (facing forward)
+    placement = Location((diameter/2 - 5, -5, thickness/2)) * Location(Rotation(90, -90, 0))
+    return carbide_insert_ccmt060204().moved(placement)
+
 # =============================================================================
 # 3. Fixed Knife (Counter Blade)
 # =============================================================================
+@cached_part
 def fixed_knife(
     length=254.0,
     drum_diameter=150.0,
@@ -0,0 +1,98 @@
+"""
+Tests for benchmarks.py: saving and loading baselines and what compare()
+flags, on made-up results. run() is replaced, so no CAD is involved.
+
+    python3 -m pytest -q test_benchmarks.py
+"""
+import json
+
+import pytest
+
+import benchmarks
+from benchmarks import MIN_SECONDS, THRESHOLD, Finding, compare, load, save
+
+
+def result(best_s=1.0, **changes):
+    values = dict(first_s=2.0, best_s=best_s, builds=1, peak_rss_mb=400.0, build_rss_mb=50.0, booleans=12,
+                  faces=300, edges=900, solids=1, step_s=0.2, step_bytes=100000)
+    values.update(changes)
+    return values
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    save({"a": result()}, path)
+    baseline = load(path)
+    assert baseline["format"] == benchmarks.BASELINE_FORMAT and baseline["machine"] == benchmarks.machine()
+    assert baseline["results"] == {"a": result()}
+    # Saving again merges: new cases are added, the ones measured again replaced
+    save({"a": result(3.0), "b": result(0.5)}, path)
+    assert load(path)["results"] == {"a": result(3.0), "b": result(0.5)}
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.json"
+    path.write_text(json.dumps({"results": {}}))
+    with pytest.raises(ValueError, match="not a benchmark baseline"):
+        load(str(path))
+
+
+@pytest.mark.parametrize("metric, base", [("best_s", 1.0), ("first_s", 2.0), ("peak_rss_mb", 400.0),
+                                          ("step_bytes", 100000)])
+def test_growth_beyond_the_threshold_is_a_regression(metric, base):
+    baseline = {"a": result()}
+    assert compare({"a": result(**{metric: base * (1 + THRESHOLD) * 0.99})}, baseline) == []
+    assert compare({"a": result(**{metric: base * 0.5})}, baseline) == []
+    grown = base * (1 + THRESHOLD) * 1.01
+    assert compare({"a": result(**{metric: grown})}, baseline) == [Finding("a", metric, base, grown, True)]
+    # A looser threshold lets it through
+    assert compare({"a": result(**{metric: grown})}, baseline, threshold=0.5) == []
+
+
+def test_small_time_differences_are_noise():
+    baseline = {"fast": result(0.01, first_s=0.01)}
+    assert compare({"fast": result(0.01 + MIN_SECONDS * 0.9, first_s=0.01)}, baseline) == []
+    slower = 0.01 + MIN_SECONDS * 1.1
+    assert compare({"fast": result(slower, first_s=0.01)}, baseline) == [Finding("fast", "best_s", 0.01, slower, True)]
+
+
+def test_changed_counts():
+    baseline = {"a": result()}
+    findings = compare({"a": result(booleans=13, faces=290)}, baseline)
+    assert findings == [Finding("a", "booleans", 12, 13, True), Finding("a", "faces", 300, 290, False)]
+    # Fewer booleans is only a change
+    assert [finding.regression for finding in compare({"a": result(booleans=11)}, baseline)] == [False]
+    assert str(findings[0]) == "REGRESSION a booleans: 12 -> 13 (+8%)"
+    assert str(findings[1]) == "changed a faces: 300 -> 290 (-3%)"
+
+
+def test_new_cases_and_missing_metrics_are_skipped():
+    without_step = result()
+    del without_step["step_bytes"], without_step["step_s"]
+    assert compare({"new": result(), "a": result(step_bytes=10**9)}, {"a": without_step}) == []
+
+
+def test_main_saves_and_compares(tmp_path, monkeypatch, capsys):
+    measured = {}
+
+    def fake_run(selected, repeat, step, progress):
+        results = {case.name: measured[case.name] for case in selected}
+        for case in selected:
+            progress(case, results[case.name])
+        return results
+
+    monkeypatch.setattr(benchmarks, "run", fake_run)
+    path = str(tmp_path / "baseline.json")
+    quick = list(benchmarks.QUICK)
+    measured.update({name: result() for name in quick})
+    assert benchmarks.main(["--quick", "--save", path]) == 0
+    assert set(load(path)["results"]) == set(quick)
+
+    measured[quick[1]] = result(1.2)
+    assert benchmarks.main(["--quick", "--compare", path]) == 0
+    measured[quick[1]] = result(1.3)
+    assert benchmarks.main(["--quick", "--compare", path]) == 1
+    out = capsys.readouterr().out
+    assert f"REGRESSION {quick[1]} best_s: 1 -> 1.3 (+30%)" in out and "1 regression(s)" in out
+    assert benchmarks.main(["--quick", "--compare", path, "--threshold", "0.5"]) == 0
+    assert benchmarks.main(["--filter", "no_such_case*"]) == 2
@@ -0,0 +1,158 @@
+"""
+Tests for build_graph.py: what an edit rebuilds, missing and modified
+outputs, the opt-in STL target and the stamp file. The sources are a
+temporary copy that the tests edit, and the build itself is replaced with
+one writing placeholder files, so no CAD is involved.
+
+    python3 -m pytest -q test_build_graph.py
+"""
+import json
+import os
+import shutil
+
+import pytest
+
+import build_graph
+from build_graph import STAMP_FILE, fingerprint, make, plan, symbol_closure
+
+DEFAULTS = {artifact.name for artifact in build_graph.ARTIFACTS if artifact.default}
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """A copy of the sources build_graph reads; returns a function editing one of them."""
+    copy = tmp_path / "sources"
+    copy.mkdir()
+    for name in os.listdir(build_graph._HERE):
+        if name.endswith(".py"):
+            shutil.copy(os.path.join(build_graph._HERE, name), copy / name) # new mtimes: no stale parses
+    monkeypatch.setattr(build_graph, "_HERE", str(copy))
+
+    def edit(module, old, new):
+        path = copy / f"{module}.py"
+        text = path.read_text()
+        assert text.count(old) == 1
+        path.write_text(text.replace(old, new))
+
+    return edit
+
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    """Names built, in order; the builds write a small file per output."""
+    names = []
+
+    def build(artifact, output_dir):
+        for path in build_graph._output_paths(artifact, output_dir):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(artifact.name)
+        names.append(artifact.name)
+        return 0.0
+
+    monkeypatch.setattr(build_graph, "_build_artifact", build)
+    return names
+
+
+def rebuild(output_dir, targets=None):
+    return set(make(targets, str(output_dir), max_workers=1, log=lambda message: None))
+
+
+def test_first_build_then_up_to_date(sources, built, tmp_path):
+    out = tmp_path / "out"
+    assert rebuild(out) == DEFAULTS
+    # Generators that use another's wait for it
+    assert built.index("cycloidal-disk") < built.index("gearbox") < built.index("full-machine")
+    assert built.index("fixed-knife") < built.index("full-machine")
+    assert rebuild(out) == set() and plan(output_dir=str(out)) == []
+
+    stamps = json.loads((out / STAMP_FILE).read_text())
+    assert set(stamps) == DEFAULTS
+    knife = build_graph.get("fixed-knife")
+    assert stamps["fixed-knife"]["fingerprint"] == fingerprint(knife)
+    assert list(stamps["fixed-knife"]["files"]) == [str(out / "fixed_knife.step")]
+
+
+def test_unrelated_edits_rebuild_nothing(sources, built, tmp_path):
+    out = tmp_path / "out"
+    rebuild(out)
+    before = {artifact.name: fingerprint(artifact) for artifact in build_graph.ARTIFACTS}
+    # A comment, a new function nothing calls and the script block are not part of any generator
+    sources("shredder_components", "# Let's assume a straight bar for the MVP.", "# A straight bar for now.")
+    sources("shredder_components", 'if __name__ == "__main__":',
+            'def unused_helper():\n    return 1\n\nif __name__ == "__main__":')
+    sources("shredder_components", 'print("Generating Shredder Components...")', 'print("Generating...")')
+    assert {artifact.name: fingerprint(artifact) for artifact in build_graph.ARTIFACTS} == before
+    assert rebuild(out) == set()
+
+
+@pytest.mark.parametrize("module, old, new, expected", [
+    ("shredder_components", "Box(length, width, thickness)", "Box(length, width, thickness + 0)",
+     {"fixed-knife", "full-machine"}),
+    # Helpers are followed through imports: the cycloid outline is in the disk, the gearbox and the machine
+    ("cycloid_profile", "Offsets the centre path inwards by the pin radius", "Offsets the centre path inwards",
+     {"cycloidal-disk", "gearbox", "full-machine"}),
+])
+def test_editing_a_dependency_rebuilds_its_dependents(sources, built, tmp_path, module, old, new, expected):
+    out = tmp_path / "out"
+    rebuild(out)
+    sources(module, old, new)
+    assert {artifact.name for artifact, _ in plan(output_dir=str(out))} == expected
+    assert rebuild(out) == expected
+    assert rebuild(out) == set()
+
+
+def test_dependents_follow_the_symbol_closure(sources):
+    knife = ("shredder_components", "fixed_knife")
+    users = {artifact.name for artifact in build_graph.ARTIFACTS
+             if knife in symbol_closure(*build_graph._generator_symbol(artifact))}
+    assert users == {"fixed-knife", "full-machine"}
+
+
+def test_missing_or_modified_outputs_are_rebuilt(sources, built, tmp_path):
+    out = tmp_path / "out"
+    rebuild(out)
+    os.remove(out / "fixed_knife.step")
+    with open(out / "pusher_plate.step", "a") as f:
+        f.write("edited by hand")
+    reasons = {artifact.name: reason for artifact, reason in plan(output_dir=str(out))}
+    assert reasons == {"fixed-knife": "missing fixed_knife.step", "pusher": "output modified"}
+    assert rebuild(out) == {"fixed-knife", "pusher"}
+    assert rebuild(out, ["fixed-knife"]) == set()
+    assert set(make(["fixed-knife"], str(out), max_workers=1, force=True, log=lambda message: None)) == \
+        {"fixed-knife"}
+
+
+def test_stl_target_is_opt_in(sources, built, tmp_path, monkeypatch):
+    artifact = build_graph.get("stl-gearbox-cycloid")
+    assert not artifact.default and os.path.isabs(artifact.outputs[0])
+    # Same generator and arguments as cycloidal-disk, another file format
+    assert fingerprint(artifact) != fingerprint(build_graph.get("cycloidal-disk"))
+    # Pointed somewhere harmless: only built when named, and then like any other target
+    stl = str(tmp_path / "STLs" / "gearbox-cycloid.stl")
+    artifacts = [a._replace(outputs=(stl,)) if a.name == artifact.name else a for a in build_graph.ARTIFACTS]
+    monkeypatch.setattr(build_graph, "ARTIFACTS", artifacts)
+    out = tmp_path / "out"
+    assert "stl-gearbox-cycloid" not in rebuild(out)
+    assert rebuild(out, ["stl-gearbox-cycloid"]) == {"stl-gearbox-cycloid"} and os.path.exists(stl)
+    assert rebuild(out, ["stl-gearbox-cycloid"]) == set()
+    sources("cycloid_profile", "Offsets the centre path inwards by the pin radius", "Offsets the centre path inwards")
+    assert "stl-gearbox-cycloid" not in rebuild(out)
+    assert rebuild(out, ["stl-gearbox-cycloid"]) == {"stl-gearbox-cycloid"}
+
+
+def test_failed_builds_are_retried(sources, built, tmp_path, monkeypatch):
+    build = build_graph._build_artifact
+
+    def failing(artifact, output_dir):
+        if artifact.name == "pusher":
+            raise ValueError("no")
+        return build(artifact, output_dir)
+
+    monkeypatch.setattr(build_graph, "_build_artifact", failing)
+    out = tmp_path / "out"
+    with pytest.raises(RuntimeError, match="pusher"):
+        rebuild(out)
+    assert set(built) == DEFAULTS - {"pusher"}
+    monkeypatch.setattr(build_graph, "_build_artifact", build)
+    assert rebuild(out) == {"pusher"}
@@ -0,0 +1,143 @@
+"""
+Tests for build_stats.py: trace() and count_booleans() leave build123d as
+they found it (after an exception too, and with blocks closing in any
+order), what they record, and the Chrome trace output.
+
+    python3 -m pytest -q test_build_stats.py
+"""
+import contextlib
+import json
+
+import pytest
+
+pytest.importorskip("build123d")
+
+import build123d
+from build123d import Box, Cylinder, Pos, Shape
+
+import build_stats
+import shredder_components
+from build_stats import count_booleans, span, trace
+
+
+def originals():
+    """Everything trace() patches, as found now: the targets, Shape._bool_op and `import *` copies."""
+    found = {(owner, attribute): vars(owner)[attribute] for owner, attribute, _ in build_stats._trace_targets()}
+    found[(Shape, "_bool_op")] = vars(Shape)["_bool_op"]
+    for module in (build123d, shredder_components):
+        for name in ("extrude", "fillet", "export_step"):
+            found[(module, name)] = vars(module)[name]
+    return found
+
+
+def assert_restored(before):
+    after = originals()
+    assert all(after[key] is value for key, value in before.items())
+    assert build_stats._bool_op_users == 0 and not build_stats._patches and not build_stats._wrappers
+
+
+def cut():
+    return Box(10, 10, 10) - Pos(0, 0, 5) * Cylinder(2, 10)
+
+
+def test_trace_patches_and_restores():
+    before = originals()
+    with trace() as tracer:
+        assert shredder_components.extrude is not before[(shredder_components, "extrude")]
+        assert shredder_components.extrude.__wrapped__ is before[(shredder_components, "extrude")]
+        cut()
+    assert_restored(before)
+    names = [event.name for event in tracer.events]
+    assert names.count("Box") == 1 and names.count("Cylinder") == 1 and names.count("cut") == 1
+    # Nothing recorded once the block is over
+    cut()
+    assert len(tracer.events) == len(names)
+
+
+def test_trace_restores_after_an_exception():
+    before = originals()
+    with pytest.raises(RuntimeError, match="in the block"):
+        with trace():
+            cut()
+            raise RuntimeError("in the block")
+    assert_restored(before)
+    with pytest.raises(RuntimeError):
+        with count_booleans():
+            with trace():
+                raise RuntimeError
+    assert_restored(before)
+
+
+@pytest.mark.parametrize("order", ["nested", "crossed"])
+def test_count_booleans_and_trace_share_the_hook(order):
+    before = originals()
+    with contextlib.ExitStack() as blocks:
+        counter = blocks.enter_context(count_booleans())
+        hook = vars(Shape)["_bool_op"]
+        tracer = trace()
+        tracer_events = tracer.__enter__()
+        assert vars(Shape)["_bool_op"] is hook # the one hook, not a wrapper of it
+        with count_booleans() as inner:
+            cut()
+        cut()
+        if order == "crossed":
+            # The counter's block ends first, then the tracer's
+            blocks.close()
+            assert vars(Shape)["_bool_op"] is hook
+            cut()
+            tracer.__exit__(None, None, None)
+        else:
+            tracer.__exit__(None, None, None)
+            assert vars(Shape)["_bool_op"] is hook
+            cut()
+    assert_restored(before)
+    assert inner.count == 1 and dict(inner.operations) == {"cut": 1}
+    assert counter.count == (2 if order == "crossed" else 3)
+    assert [event.name for event in tracer_events.events].count("cut") == (3 if order == "crossed" else 2)
+
+
+def test_shortcuts_that_skip_the_kernel_are_not_counted():
+    with count_booleans() as booleans:
+        Box(1, 1, 1) - []
+        Box(1, 1, 1) + Pos(2, 0, 0) * Box(1, 1, 1)
+        Box(1, 1, 1) & Box(2, 2, 2)
+    assert dict(booleans.operations) == {"fuse": 1, "intersect": 1}
+
+
+def test_chrome_trace_is_valid_trace_event_json(tmp_path):
+    with trace() as tracer:
+        with span("outer", "generator", size=3) as args:
+            cut()
+            args["note"] = "added"
+    path = tmp_path / "build.trace.json"
+    tracer.write_chrome_trace(str(path))
+    document = json.loads(path.read_text())
+    assert document == json.loads(json.dumps(tracer.chrome_trace()))
+    assert document["displayTimeUnit"] == "ms"
+
+    events = document["traceEvents"]
+    assert events[0]["ph"] == "M" and events[0]["name"] == "process_name"
+    spans = events[1:]
+    assert len(spans) == len(tracer.events)
+    for event in spans:
+        assert {"name", "cat", "ph", "pid", "tid", "ts", "dur", "args"} <= set(event)
+        assert event["ph"] == "X" and event["dur"] >= 0 and event["ts"] >= 0
+        assert isinstance(event["pid"], int) and isinstance(event["tid"], int)
+    assert [event["ts"] for event in spans] == sorted(event["ts"] for event in spans)
+
+    # The operations nest inside the span that ran them
+    outer = next(event for event in spans if event["name"] == "outer")
+    assert outer["cat"] == "generator" and outer["args"]["size"] == 3 and outer["args"]["note"] == "added"
+    inside = [event for event in spans if event is not outer]
+    assert {"Box", "Cylinder", "cut"} <= {event["name"] for event in inside}
+    for event in inside:
+        assert outer["ts"] <= event["ts"] and event["ts"] + event["dur"] <= outer["ts"] + outer["dur"] + 1e-3
+    cut_event = next(event for event in inside if event["name"] == "cut")
+    assert cut_event["cat"] == "boolean" and cut_event["args"]["faces_in"] == 6 + 3
+    assert cut_event["args"]["site"].startswith("test_build_stats.cut:")
+
+    # Self times add up to the traced time
+    recorded = {event.name: event for event in tracer.events}
+    nested = sum(event.duration for event in tracer.events if event.depth == 1)
+    assert recorded["outer"].self_time == pytest.approx(recorded["outer"].duration - nested)
+    assert "cut" in tracer.summary()
@@ -0,0 +1,112 @@
+"""
+Tests for cycloid_kinematics.py: the exact drive has no play and no
+transmission error, and the play with clearances matches turning the disk
+against a densely sampled outline.
+
+    python3 -m pytest -q test_cycloid_kinematics.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from cycloid_kinematics import GEARBOX_DISK, sample_tolerances, simulate, summarize
+from cycloid_profile import center_line, cycloid_geometry
+
+STEPS = 360
+
+
+def pin_distances(design, theta, psi, e_error=0.0, samples=200_000):
+    """Signed distance from every pin centre to the pin centre path of the disk at cam angle theta, turned to psi."""
+    geometry = cycloid_geometry(**{name: design[name] for name in
+                                   ("pin_circle_diameter", "num_lobes", "num_pins", "eccentricity_factor")})
+    path = center_line(geometry, np.linspace(0, 2 * math.pi, samples, endpoint=False), order=0)[0]
+    turn = np.array([[math.cos(psi), -math.sin(psi)], [math.sin(psi), math.cos(psi)]])
+    e = float(geometry.eccentricity) + e_error
+    path = path @ turn.T + e * np.array([math.cos(theta), math.sin(theta)])
+    pins = design["num_lobes"] + 1
+    beta = 2 * math.pi * np.arange(pins) / pins
+    centers = float(geometry.pitch_radius) * np.column_stack([np.cos(beta), np.sin(beta)])
+    distances = []
+    for center in centers:
+        # Nearest sample, then the segments either side of it
+        i = np.argmin(np.hypot(*(path - center).T))
+        a, b = path[[i - 1, i]], path[[i, (i + 1) % samples]]
+        t = np.clip(np.einsum("ij,ij->i", center - a, b - a) / np.einsum("ij,ij->i", b - a, b - a), 0, 1)
+        offset = center - a - t[:, None] * (b - a)
+        nearest = np.argmin(np.hypot(*offset.T))
+        # Positive outside the disk: to the right of the counter-clockwise path
+        side = np.sign(offset[nearest] @ [(b - a)[nearest, 1], -(b - a)[nearest, 0]])
+        distances.append(side * np.hypot(*offset[nearest]))
+    return np.array(distances)
+
+
+@pytest.mark.parametrize("design", [GEARBOX_DISK, dict(num_lobes=8, num_pins=9),
+                                    dict(num_lobes=12, num_pins=13, eccentricity_factor=0.45)])
+def test_exact_drive_has_no_play(design):
+    run = simulate(**design, steps=STEPS)
+    assert not run.interference
+    assert np.abs(run.pin_gap).max() < 1e-9
+    assert np.abs(run.backlash).max() < 1e-9
+    assert np.abs(run.transmission_error).max() < 1e-9
+    # With no clearance every pin is on the outline, about half of them on each side
+    summary = summarize(run)
+    assert summary.min_pins_in_contact >= 2 and summary.backlash_max_arcmin < 1e-6
+
+
+@pytest.mark.parametrize("step", [0, 17, 90, 211])
+def test_pin_play_matches_dense_outline(step):
+    design = dict(GEARBOX_DISK, num_lobes=10)
+    clearance = 0.05
+    run = simulate(**design, pin_clearance=clearance, steps=STEPS)
+    theta, ideal = run.input_angle[step], run.output_angle[step]
+    assert pin_distances(design, theta, ideal) == pytest.approx(np.zeros(11), abs=1e-6)
+    # Turned by the play either way, the undersized pins (clearance inside
+    # the exact outline) just touch: the deepest one is in by the clearance.
+    # The play is first order (gap / lever), so within a few percent of it
+    forward = run.transmission_error[step]
+    reverse = run.transmission_error_reverse[step]
+    assert forward > 0 > reverse
+    for play in (forward, reverse):
+        assert pin_distances(design, theta, ideal - play).min() == pytest.approx(-clearance, rel=0.05)
+
+
+def test_roller_play_matches_brute_force():
+    clearance = 0.05
+    run = simulate(**GEARBOX_DISK, roller_clearance=clearance, steps=STEPS)
+    assert not run.interference
+    # Pins exact, so all the play is the rollers'
+    e = float(cycloid_geometry(**{name: GEARBOX_DISK[name] for name in
+                                  ("pin_circle_diameter", "num_lobes", "num_pins", "eccentricity_factor")}
+                               ).eccentricity)
+    room = (5.3 + 2 * e - 5.3) / 2 + clearance
+    alpha = 2 * math.pi * np.arange(10) / 10
+    turns = np.linspace(-0.01, 0.01, 40001)
+    for step in (0, 45, 123):
+        theta, psi = run.input_angle[step], run.output_angle[step]
+        disk = e * np.array([math.cos(theta), math.sin(theta)])
+        holes = disk + 17.0 * np.column_stack([np.cos(psi + alpha), np.sin(psi + alpha)])
+        angle = psi + turns[:, None] + alpha
+        rollers = 17.0 * np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+        free = turns[(np.hypot(*(rollers - holes).transpose(2, 0, 1)) <= room).all(axis=1)]
+        assert run.backlash[step] == pytest.approx(free.max() - free.min(), rel=1e-3)
+
+
+def test_interference_when_pins_overlap():
+    assert summarize(simulate(**GEARBOX_DISK, pin_clearance=-0.01, steps=STEPS)).interference
+    run = simulate(**GEARBOX_DISK, eccentricity_error=0.02, steps=STEPS)
+    assert run.interference and run.backlash.min() < 0
+    # Clearances that take up the error: the rollers need some too, their holes are sized for the nominal e
+    assert not simulate(**GEARBOX_DISK, pin_clearance=0.05, roller_clearance=0.05, eccentricity_error=0.02,
+                        steps=STEPS).interference
+
+
+def test_batches_match_single_runs():
+    errors = sample_tolerances(4, seed=3, pin_clearance=(0.03, 0.01), eccentricity_error=0.01,
+                               roller_clearance=(0.02, 0.005))
+    batch = simulate(**GEARBOX_DISK, **errors, steps=STEPS)
+    for i in range(4):
+        single = simulate(**GEARBOX_DISK, **{name: value[i] for name, value in errors.items()}, steps=STEPS)
+        for name in single._fields:
+            value = getattr(batch, name)
+            assert np.allclose(value if name == "input_angle" else value[i], getattr(single, name), equal_nan=True)
@@ -0,0 +1,106 @@
+"""
+Tests for cycloid_loads.py: the load solver balances the torque with
+forces that follow Palmgren's relation, and stress and life scale as the
+Hertz and Basquin formulas say.
+
+    python3 -m pytest -q test_cycloid_loads.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from cycloid_kinematics import GEARBOX_DISK, simulate
+from cycloid_loads import MATERIALS, PALMGREN, fatigue_cycles, pin_loads, shredding_torque, size_gearbox
+
+STEPS = 180
+TORQUE = 85e3
+
+
+def contact_modulus(disk, pin):
+    return 1 / ((1 - disk.poisson**2) / disk.modulus + (1 - pin.poisson**2) / pin.modulus)
+
+
+@pytest.mark.parametrize("errors", [dict(), dict(pin_clearance=0.02),
+                                    dict(pin_clearance=0.03, eccentricity_error=-0.01)])
+@pytest.mark.parametrize("disks", [1, 2])
+def test_pin_forces_balance_the_torque(errors, disks):
+    loads = pin_loads(TORQUE, **GEARBOX_DISK, disks=disks, steps=STEPS, **errors)
+    kinematics = simulate(**GEARBOX_DISK, steps=STEPS, **errors)
+    lever = kinematics.pin_lever
+    moment = (loads.pin_force * lever).sum(axis=-1)
+    assert moment == pytest.approx(np.full(STEPS, TORQUE / disks), rel=1e-9)
+
+    # Every loaded pin is squeezed by exactly what its force needs...
+    E, L = contact_modulus(MATERIALS["PETG"], MATERIALS["steel"]), 3.0
+    squeeze = loads.windup[:, None] * lever - kinematics.pin_gap
+    loaded = loads.pin_force > 0
+    assert np.all(lever[loaded] > 0)
+    needed = PALMGREN * (loads.pin_force[loaded] / (E * L))**0.9 * L**0.1
+    assert squeeze[loaded] == pytest.approx(needed, rel=1e-9)
+    # ...and the others are not touching
+    assert np.all(np.nan_to_num(squeeze[~loaded & (lever > 0)], nan=0.0) <= 1e-12)
+    assert np.array_equal(loads.loaded_pins, loaded.sum(axis=-1))
+
+
+def test_clearance_loads_fewer_pins_harder():
+    exact = pin_loads(TORQUE, **GEARBOX_DISK, steps=STEPS)
+    loose = pin_loads(TORQUE, **GEARBOX_DISK, steps=STEPS, pin_clearance=0.05)
+    # With no clearance the whole loaded side shares: about half the pins
+    assert exact.loaded_pins.min() >= 4
+    assert loose.loaded_pins.mean() < exact.loaded_pins.mean()
+    assert loose.max_pin_force > exact.max_pin_force and loose.max_contact_stress > exact.max_contact_stress
+    assert np.all(loose.windup > exact.windup)
+
+
+def test_thicker_disks_share_the_same_forces_at_lower_stress():
+    loads = pin_loads(TORQUE, **GEARBOX_DISK, thickness=np.array([3.0, 6.0]), steps=STEPS)
+    # Compliance is the same power of force at any thickness, so the share
+    # between pins is too; the line contact stress goes as 1 / sqrt(L)
+    assert loads.pin_force[1] == pytest.approx(loads.pin_force[0], rel=1e-6)
+    assert loads.max_contact_stress[1] == pytest.approx(loads.max_contact_stress[0] / math.sqrt(2), rel=1e-6)
+    assert loads.life_cycles[1] > loads.life_cycles[0]
+
+
+def test_stress_follows_hertz_line_contact():
+    loads = pin_loads(TORQUE, **GEARBOX_DISK, steps=STEPS)
+    loaded = loads.pin_force > 0
+    E = contact_modulus(MATERIALS["PETG"], MATERIALS["steel"])
+    # p^2 pi L / (F E*) is 1 / R: the pin's curvature plus the outline's,
+    # which is concave (negative) at the roots but never tighter than the pin
+    relative = loads.contact_stress[loaded]**2 * math.pi * 3.0 / (loads.pin_force[loaded] * E)
+    pin = 2 / GEARBOX_DISK["pin_diameter"]
+    assert np.all(relative > 0) and np.all(relative < 2 * pin)
+    assert loads.static_safety == pytest.approx(min(MATERIALS["PETG"].static_limit, MATERIALS["steel"].static_limit)
+                                                / loads.max_contact_stress)
+
+
+def test_fatigue_life():
+    petg, steel = MATERIALS["PETG"], MATERIALS["steel"]
+    assert fatigue_cycles(petg.contact_endurance, petg) == pytest.approx(petg.endurance_cycles)
+    assert fatigue_cycles(2 * petg.contact_endurance, petg) == pytest.approx(petg.endurance_cycles / 2**petg.exponent)
+    # Polymers have no endurance limit, metals do
+    assert math.isfinite(fatigue_cycles(petg.contact_endurance / 2, petg))
+    assert math.isinf(fatigue_cycles(steel.contact_endurance, steel))
+    loads = pin_loads(TORQUE, **GEARBOX_DISK, input_speed=120.0, steps=STEPS)
+    assert loads.life_hours == pytest.approx(loads.life_cycles / (120.0 * 60))
+
+
+def test_material_batches_match_single_designs():
+    materials = np.array(["PLA", "PA-CF", "aluminium"], dtype=object)
+    batch = pin_loads(TORQUE, **GEARBOX_DISK, disk_material=materials, pin_clearance=0.02, steps=STEPS)
+    for i, material in enumerate(materials):
+        single = pin_loads(TORQUE, **GEARBOX_DISK, disk_material=material, pin_clearance=0.02, steps=STEPS)
+        for name in single._fields:
+            value = getattr(batch, name)
+            assert np.allclose(value if name == "input_angle" else value[i], getattr(single, name))
+    # Stiffer disks concentrate the load
+    assert batch.max_pin_force[2] > batch.max_pin_force[0]
+
+
+def test_size_gearbox_rows():
+    rows = size_gearbox("NEMA23", disk_materials=("PLA", "steel"), thicknesses=(3.0, 10.0), pin_clearance=0.02)
+    assert [(row.disk_material, row.thickness) for row in rows] == [("PLA", 3.0), ("PLA", 10.0),
+                                                                      ("steel", 3.0), ("steel", 10.0)]
+    assert all(row.output_torque == pytest.approx(shredding_torque("NEMA23") / 1e3) for row in rows)
+    assert rows[1].max_contact_stress < rows[0].max_contact_stress
@@ -0,0 +1,100 @@
+"""
+Tests for cycloid_metrics.py: the closed-form metrics against a densely
+sampled outline built with cycloid_profile.py.
+
+    python3 -m pytest -q test_cycloid_metrics.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from cycloid_metrics import check_design, disk_metrics
+from cycloid_profile import center_curvature, contracted_profile, cycloid_geometry, profile_angles, profile_curvature
+
+SAMPLES = 200_000
+
+DESIGNS = [
+    dict(),
+    dict(num_lobes=10, num_pins=11),
+    dict(num_lobes=6, num_pins=7, eccentricity_factor=0.2),
+    dict(num_lobes=12, num_pins=13, pin_circle_diameter=60.0, pin_diameter=4.0, eccentricity_factor=0.4),
+    dict(num_lobes=8, num_pins=9, eccentricity_factor=0.45, pin_diameter=9.0), # close to undercut
+]
+
+# Pin diameters too large for the lobe tips of these designs
+UNDERCUT = [
+    dict(num_lobes=8, num_pins=9, eccentricity_factor=0.45, pin_diameter=11.0),
+    dict(num_lobes=15, num_pins=16, eccentricity_factor=0.45, pin_diameter=8.0),
+]
+
+
+def dense_outline(design):
+    geometry = cycloid_geometry(**{name: design[name] for name in design if name != "pin_diameter"})
+    angles = profile_angles(SAMPLES)
+    pin_diameter = design.get("pin_diameter", 5.3)
+    outline = contracted_profile(geometry, pin_diameter, angles)
+    return geometry, outline, profile_curvature(geometry, pin_diameter, angles)
+
+
+@pytest.mark.parametrize("design", DESIGNS)
+def test_radii_and_curvature_match_dense_sampling(design):
+    metrics = disk_metrics(**design)
+    geometry, outline, (curvature, _) = dense_outline(design)
+    distance = np.hypot(*outline.T)
+    assert not metrics.undercut
+    assert metrics.outer_radius == pytest.approx(distance.max(), abs=1e-9)
+    assert metrics.inner_radius == pytest.approx(distance.min(), abs=1e-9)
+    assert metrics.min_radius_of_curvature == pytest.approx(1 / np.abs(curvature).max(), rel=1e-6)
+    assert metrics.eccentricity == geometry.eccentricity
+
+
+@pytest.mark.parametrize("design", DESIGNS)
+def test_roller_hole_clearance_matches_dense_sampling(design):
+    metrics = disk_metrics(**design)
+    _, outline, _ = dense_outline(design)
+    lobes = design.get("num_lobes", 8)
+    hole_radius = (5.3 + 2 * metrics.eccentricity) / 2
+    angles = 2 * math.pi * np.arange(lobes) / lobes
+    centres = 17.0 * np.column_stack([np.cos(angles), np.sin(angles)])
+    to_outline = np.hypot(*(outline[None] - centres[:, None]).transpose(2, 0, 1)).min() - hole_radius
+    to_center = 17.0 - hole_radius - 24.1 / 2
+    to_neighbour = np.hypot(*(centres[1] - centres[0])) - 2 * hole_radius
+    assert metrics.roller_hole_clearance == pytest.approx(min(to_outline, to_center, to_neighbour), abs=1e-5)
+
+
+@pytest.mark.parametrize("design", DESIGNS)
+def test_pressure_angles_match_dense_sampling(design):
+    metrics = disk_metrics(**design)
+    _, outline, _ = dense_outline(design)
+    # Contact normal from the sampled outline itself, not the analytic one
+    tangent = np.roll(outline, -1, axis=0) - np.roll(outline, 1, axis=0)
+    normal = np.column_stack([-tangent[:, 1], tangent[:, 0]]) / np.hypot(*tangent.T)[:, None]
+    lever = np.abs(outline[:, 0] * normal[:, 1] - outline[:, 1] * normal[:, 0]) / np.hypot(*outline.T)
+    angles = np.degrees(np.arccos(np.clip(lever, 0, 1)))
+    assert metrics.pressure_angle_min == pytest.approx(angles.min(), abs=0.05)
+    assert metrics.pressure_angle_mean == pytest.approx(angles.mean(), abs=0.05)
+
+
+@pytest.mark.parametrize("design", UNDERCUT)
+def test_undercut_where_the_offset_folds(design):
+    metrics = disk_metrics(**design)
+    geometry, _, _ = dense_outline(design)
+    # The offset folds where r * (centre path curvature) reaches 1
+    curvature, _ = center_curvature(geometry, profile_angles(SAMPLES))
+    assert (design["pin_diameter"] / 2 * curvature).max() >= 1
+    assert metrics.undercut and metrics.min_radius_of_curvature == 0
+    problems, _ = check_design(**design)
+    assert any("undercut" in problem for problem in problems)
+    assert not any("undercut" in problem for problem in check_design(**design, allow_undercut=True)[0])
+
+
+def test_batches_match_single_designs():
+    designs = DESIGNS + UNDERCUT
+    names = ("pin_circle_diameter", "pin_diameter", "num_lobes", "num_pins", "eccentricity_factor")
+    defaults = dict(pin_circle_diameter=50.0, pin_diameter=5.3, num_lobes=8, num_pins=9, eccentricity_factor=0.3)
+    batch = disk_metrics(**{name: np.array([{**defaults, **d}[name] for d in designs]) for name in names})
+    for i, design in enumerate(designs):
+        single = disk_metrics(**design)
+        for name in single._fields:
+            assert np.allclose(getattr(batch, name)[i], getattr(single, name))
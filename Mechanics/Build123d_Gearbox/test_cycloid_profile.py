@@ -0,0 +1,45 @@
+"""
+Tests for cycloid_profile.py: adaptive_angles() keeps every chord of the
+outline within its tolerance, checked against densely sampled arcs.
+
+    python3 -m pytest -q test_cycloid_profile.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from cycloid_profile import MIN_CHORD_TOLERANCE, adaptive_angles, contracted_profile, cycloid_geometry
+from test_cycloid_metrics import DESIGNS, UNDERCUT
+
+
+def chord_deviation(geometry, pin_diameter, angles, samples=64):
+    """Largest distance from the outline between each pair of angles to their chord, by sampling."""
+    closed = np.append(angles, 2 * math.pi)
+    start, end = (contracted_profile(geometry, pin_diameter, closed[k:len(closed) - 1 + k]) for k in (0, 1))
+    fractions = np.linspace(0, 1, samples)[:, None]
+    points = contracted_profile(geometry, pin_diameter, closed[:-1] + fractions * np.diff(closed))
+    chord, offset = end - start, points - start
+    t = np.clip((offset * chord).sum(axis=-1) / (chord * chord).sum(axis=-1), 0, 1)
+    return np.hypot(*(offset - t[..., None] * chord).transpose(2, 0, 1)).max(axis=0)
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 1e-3, 1e-5])
+@pytest.mark.parametrize("design", DESIGNS + UNDERCUT)
+def test_chords_stay_within_tolerance(design, tolerance):
+    geometry = cycloid_geometry(**{name: design[name] for name in design if name != "pin_diameter"})
+    pin_diameter = design.get("pin_diameter", 5.3)
+    angles = adaptive_angles(geometry, pin_diameter, tolerance)
+    assert angles[0] == 0 and np.all(np.diff(angles) > 0) and angles[-1] < 2 * math.pi
+    deviation = chord_deviation(geometry, pin_diameter, angles)
+    assert deviation.max() <= tolerance * (1 + 1e-6)
+    # Not wastefully fine either: on average the chords use a good part of it
+    assert deviation.mean() > tolerance / 10
+
+
+def test_tolerance_floor():
+    geometry = cycloid_geometry()
+    for tolerance in (0.0, -1.0, 1e-12, math.nan):
+        with pytest.raises(ValueError, match="chord_tolerance"):
+            adaptive_angles(geometry, 5.3, tolerance)
+    assert len(adaptive_angles(geometry, 5.3, MIN_CHORD_TOLERANCE)) > 0
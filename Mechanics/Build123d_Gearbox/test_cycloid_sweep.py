@@ -0,0 +1,80 @@
+"""
+Tests for cycloid_sweep.py: candidate expansion, sweeping into a results
+file and resuming an interrupted sweep.
+
+    python3 -m pytest -q test_cycloid_sweep.py
+"""
+import csv
+
+import pytest
+
+from cycloid_metrics import disk_metrics
+from cycloid_sweep import (COLUMNS, METRICS, candidate_key, evaluated_keys, expand, read_results, span, sweep,
+                           top_candidates)
+
+SPACE = {
+    "pin_circle_diameter": [45.0, 50.0],
+    "num_lobes": range(6, 11),
+    "num_pins": range(7, 12),
+    "eccentricity_factor": span(0.2, 0.4, 0.1),
+}
+
+
+def test_span_includes_the_stop():
+    assert span(0.2, 0.45, 0.05) == [0.2, 0.25, 0.3, 0.35, 0.4, 0.45]
+
+
+def test_expand_keeps_only_closed_profiles():
+    candidates = list(expand(SPACE))
+    assert candidates
+    for c in candidates:
+        assert c["num_pins"] > c["num_lobes"] and c["num_lobes"] % (c["num_pins"] - c["num_lobes"]) == 0
+        assert c["pin_diameter"] == 5.3 # default
+    with pytest.raises(ValueError):
+        list(expand({"lobes": 8}))
+
+
+def test_sweep_rows_match_single_evaluations(tmp_path):
+    path = tmp_path / "sweep.csv"
+    evaluated, skipped = sweep(SPACE, path, max_workers=1)
+    assert (evaluated, skipped) == (len(list(expand(SPACE))), 0)
+    for row in read_results(path):
+        metrics = disk_metrics(**{name: row[name] for name in
+                                  ("pin_circle_diameter", "pin_diameter", "num_lobes", "num_pins",
+                                   "eccentricity_factor")})
+        assert row["candidate"] == candidate_key(row)
+        for name in METRICS:
+            assert row[name] == pytest.approx(float(getattr(metrics, name)), rel=1e-9, abs=1e-12)
+
+
+def test_resume_skips_finished_and_redoes_a_cut_row(tmp_path):
+    path = tmp_path / "sweep.csv"
+    total = len(list(expand(SPACE)))
+    sweep({**SPACE, "eccentricity_factor": 0.2}, path, max_workers=1)
+    first = len(read_results(path))
+
+    # Interrupted halfway through writing the last row
+    data = path.read_bytes()
+    path.write_bytes(data[:-10])
+    assert len(evaluated_keys(path)) == first - 1
+
+    evaluated, skipped = sweep(SPACE, path, max_workers=2, chunk_size=4)
+    assert (evaluated, skipped) == (total - first + 1, first - 1)
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == COLUMNS
+    keys = [row[0] for row in rows[1:]]
+    assert len(keys) == len(set(keys)) == total
+
+    assert sweep(SPACE, path) == (0, total)
+
+
+def test_top_candidates_skip_undercut_and_breakthrough(tmp_path):
+    path = tmp_path / "sweep.csv"
+    sweep({**SPACE, "eccentricity_factor": span(0.2, 0.45, 0.05)}, path, max_workers=1)
+    rows = read_results(path)
+    assert any(row["undercut"] or row["roller_hole_clearance"] <= 0 for row in rows)
+    top = top_candidates(path, count=len(rows))
+    assert top and all(not row["undercut"] and row["roller_hole_clearance"] > 0 for row in top)
+    radii = [row["min_radius_of_curvature"] for row in top]
+    assert radii == sorted(radii, reverse=True)
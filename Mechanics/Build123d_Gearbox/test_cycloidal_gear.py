@@ -0,0 +1,84 @@
+"""
+Tests for cycloidal_gear.py: the B-spline lobes of spline_outline() stay
+within spline_tolerance of the contracted cycloid both ways and join up
+closed and tangent-continuous, and the disk built from them.
+
+    python3 -m pytest -q test_cycloidal_gear.py
+"""
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+pytest.importorskip("build123d")
+
+from build123d import GeomType
+from OCP.BRepAdaptor import BRepAdaptor_Curve
+
+from cycloid_profile import contracted_profile, cycloid_geometry, profile_angles
+from cycloidal_gear import cycloidal_disk, spline_outline
+from test_cycloid_metrics import DESIGNS, UNDERCUT
+from test_profile_export import window_distance
+
+SAMPLES = 100_000
+
+
+def design_geometry(design):
+    geometry = cycloid_geometry(**{name: design[name] for name in design if name != "pin_diameter"})
+    return geometry, design.get("pin_diameter", 5.3)
+
+
+def sample_edge(edge, count):
+    """`count` points evenly spaced in the edge's parameter (straight from OCC: Edge.positions() is slow)."""
+    curve = BRepAdaptor_Curve(edge.wrapped)
+    points = (curve.Value(u) for u in np.linspace(curve.FirstParameter(), curve.LastParameter(), count))
+    return np.array([(point.X(), point.Y()) for point in points])
+
+
+@pytest.mark.parametrize("tolerance", [0.1, 0.01, 0.001])
+@pytest.mark.parametrize("design", DESIGNS)
+def test_spline_lobes_within_tolerance(design, tolerance):
+    geometry, pin_diameter = design_geometry(design)
+    edges = spline_outline(geometry, pin_diameter, tolerance)
+    lobes = round(geometry.lobe_factor - 1)
+    assert len(edges) == lobes
+    curve = contracted_profile(geometry, pin_diameter, profile_angles(SAMPLES))
+
+    # The first lobe never strays from the curve...
+    lobe = sample_edge(edges[0], 5000)
+    assert window_distance(lobe, curve, 400).max() <= tolerance
+    # ...and the curve along it never strays from the lobe
+    angle = np.arctan2(curve[:, 1], curve[:, 0]) % (2 * math.pi)
+    assert window_distance(curve[angle <= 2 * math.pi / lobes], lobe, 8).max() <= tolerance
+    # The others are the same lobe turned into place
+    for k, edge in enumerate(edges[1:], 1):
+        turn = 2 * math.pi * k / lobes
+        rotation = np.array([[math.cos(turn), -math.sin(turn)], [math.sin(turn), math.cos(turn)]])
+        assert sample_edge(edge, 50) == pytest.approx(sample_edge(edges[0], 50) @ rotation.T, abs=1e-9)
+
+
+@pytest.mark.parametrize("design", DESIGNS)
+def test_lobes_join_closed_and_tangent(design):
+    geometry, pin_diameter = design_geometry(design)
+    edges = spline_outline(geometry, pin_diameter, 0.01)
+    for edge, following in zip(edges, edges[1:] + edges[:1]):
+        assert (edge.position_at(1) - following.position_at(0)).length <= 1e-9
+        kink = math.acos(np.clip(edge.tangent_at(1).dot(following.tangent_at(0)), -1, 1))
+        assert kink <= 1e-6
+
+
+def test_spline_disk():
+    disk = cycloidal_disk.uncached(spline_tolerance=0.01)
+    assert disk.is_valid and len(disk.solids()) == 1
+    # One smooth side face per lobe, kept apart (merged, they lose the outline)
+    assert Counter(face.geom_type for face in disk.faces()) == \
+        {GeomType.EXTRUSION: 8, GeomType.PLANE: 2, GeomType.CYLINDER: 1 + 8}
+    polyline = cycloidal_disk.uncached(chord_tolerance=0.001)
+    assert disk.volume == pytest.approx(polyline.volume, rel=1e-3)
+
+
+@pytest.mark.parametrize("design", UNDERCUT)
+def test_undercut_spline_disk_is_refused(design):
+    with pytest.raises(ValueError, match="crosses itself"):
+        cycloidal_disk.uncached(spline_tolerance=0.01, **design)
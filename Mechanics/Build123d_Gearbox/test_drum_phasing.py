@@ -0,0 +1,85 @@
+"""
+Tests for drum_phasing.py: the tooth torque model, what phasing can and
+can't change, and the phasing search against an exhaustive one.
+
+    python3 -m pytest -q test_drum_phasing.py
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from drum_phasing import (ENGAGEMENT, EXPONENT, RELEASE, disk_angles, disk_torque, drum_torque, evaluate,
+                          feed_scenarios, helix_angles, optimize_phasing, tooth_tip_angle, tooth_torque)
+
+
+def test_tooth_builds_up_to_the_knife_and_breaks_off():
+    at_knife = -tooth_tip_angle()
+    # Drum angle a puts the tooth tip a + tip angle past the knife
+    past = np.array([-ENGAGEMENT - 1, -ENGAGEMENT, -ENGAGEMENT / 2, 0, RELEASE / 2, RELEASE, RELEASE + 1])
+    torque = disk_torque(at_knife + past, num_teeth=1)
+    assert torque == pytest.approx([0, 0, 0.5**EXPONENT, 1, 0.5, 0, 0])
+    # The second tooth is half a turn behind
+    assert disk_torque(at_knife + 180.0, num_teeth=2) == pytest.approx(1.0)
+    assert tooth_torque() == pytest.approx(25.0 * 25.4 * 8.0 * 75.0 / 1e3)
+
+
+@pytest.mark.parametrize("angles", [helix_angles(), tuple(np.random.default_rng(1).uniform(0, 360, 10))])
+def test_mean_torque_does_not_depend_on_phasing(angles):
+    torque = drum_torque(angles)[0]
+    # Each tooth's torque integrates to engagement / (exponent + 1) + release / 2 degrees of peak torque
+    per_tooth = ENGAGEMENT / (EXPONENT + 1) + RELEASE / 2
+    assert torque.mean() == pytest.approx(tooth_torque() * 2 * len(angles) * per_tooth / 360, rel=1e-3)
+
+
+def test_full_width_torque_ignores_which_disk_gets_which_angle():
+    angles = np.array(helix_angles())
+    shuffled = np.random.default_rng(2).permutation(angles)
+    feeds = feed_scenarios()
+    helix, other = drum_torque(angles, feeds=feeds), drum_torque(shuffled, feeds=feeds)
+    assert other[0] == pytest.approx(helix[0])
+    # A lump sees the difference
+    assert not np.allclose(other[1:], helix[1:])
+
+
+def test_feed_scenarios():
+    feeds = feed_scenarios(10, 3)
+    assert feeds.shape == (9, 10)
+    assert np.all(feeds[0] == 1) and np.all(feeds[1:].sum(axis=1) == 3)
+    assert feed_scenarios(4, 4).shape == (1, 4)
+
+
+def test_search_beats_the_helix_on_the_slot_grid():
+    helix = evaluate(helix_angles())
+    best = optimize_phasing()
+    assert best.score <= helix.score
+    assert best.angles[0] == 0
+    slots = np.array(best.angles) / (360.0 / 2 / 10)
+    assert slots == pytest.approx(np.rint(slots)) and len(set(np.rint(slots))) == 10
+    # The result is scored at full resolution, like any other set of angles
+    again = evaluate(best.angles)
+    assert best[:-1] == again[:-1] and np.array_equal(best.torque, again.torque)
+    # Twice as many slots start from the best even arrangement, so can only do as well or better
+    small = dict(population=8, rounds=20)
+    assert optimize_phasing(slots=20, **small).score <= optimize_phasing(**small).score + 1e-9
+
+
+def test_search_finds_the_exhaustive_optimum():
+    disks, slots = 5, 5
+    pitch = 360.0 / 2 / slots
+    # With the first disk at 0 (a common shift changes nothing), try every arrangement
+    exhaustive = min(evaluate((0.0,) + tuple(np.array(rest) * pitch), lump_disks=2).score
+                     for rest in itertools.permutations(range(1, slots), disks - 1))
+    best = optimize_phasing(disks, slots=slots, lump_disks=2, steps=720)
+    assert best.score == pytest.approx(exhaustive, rel=1e-9)
+
+
+def test_disk_angles():
+    assert disk_angles() == helix_angles()
+    assert disk_angles([0, 1, 2], num_disks=3) == (0.0, 1.0, 2.0)
+    with pytest.raises(ValueError):
+        disk_angles([0, 1], num_disks=3)
+    with pytest.raises(ValueError):
+        disk_angles("random")
+    with pytest.raises(ValueError):
+        optimize_phasing(num_disks=10, slots=8)
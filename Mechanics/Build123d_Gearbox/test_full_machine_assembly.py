@@ -0,0 +1,66 @@
+"""
+Tests for full_machine_assembly.py: subassemblies built in worker processes
+(shipped back as BREP) match the ones built in this process, and so does
+the machine assembled from them. The part cache is off, so both really
+build.
+
+    python3 -m pytest -q test_full_machine_assembly.py
+"""
+import importlib
+
+import pytest
+
+pytest.importorskip("build123d")
+
+import part_cache
+from full_machine_assembly import SUBASSEMBLIES, build_subassemblies, full_machine_assembly
+
+
+@pytest.fixture(scope="module")
+def uncached():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("OPENSHREDDER_CACHE", "0")
+        importlib.reload(part_cache)
+        yield
+    importlib.reload(part_cache)
+
+
+def leaves(shape):
+    """(label, color, volume, centre, bounding box size) of every leaf, in order."""
+    children = list(shape.children)
+    if not children:
+        box = shape.bounding_box()
+        color = tuple(shape.color) if shape.color is not None else None
+        return [(shape.label, color, shape.volume, tuple(shape.center()), tuple(box.size))]
+    return [leaf for child in children for leaf in leaves(child)]
+
+
+def assert_same(serial, parallel):
+    assert type(parallel) is type(serial) and parallel.label == serial.label
+    assert len(parallel.solids()) == len(serial.solids())
+    assert parallel.volume == pytest.approx(serial.volume, rel=1e-9)
+    assert sorted(solid.volume for solid in parallel.solids()) == \
+        pytest.approx(sorted(solid.volume for solid in serial.solids()), rel=1e-9)
+    expected, found = leaves(serial), leaves(parallel)
+    assert [leaf[:2] for leaf in found] == [leaf[:2] for leaf in expected]
+    for (*_, volume, centre, size), (*_, expected_volume, expected_centre, expected_size) in zip(found, expected):
+        assert volume == pytest.approx(expected_volume, rel=1e-9)
+        assert centre == pytest.approx(expected_centre, abs=1e-6) and size == pytest.approx(expected_size, abs=1e-6)
+
+
+def test_parallel_subassemblies_match_serial(uncached):
+    serial = build_subassemblies()
+    parallel = build_subassemblies(parallel=True, max_workers=2)
+    assert list(serial) == list(parallel) == list(SUBASSEMBLIES)
+    for name in SUBASSEMBLIES:
+        assert_same(serial[name], parallel[name])
+
+
+def test_parallel_machine_matches_serial(uncached):
+    serial, parallel = full_machine_assembly(), full_machine_assembly(parallel=True)
+    assert [child.label for child in parallel.children] == [child.label for child in serial.children]
+    assert_same(serial, parallel)
+    # Placed the same way too
+    for expected, found in zip(serial.children, parallel.children):
+        assert tuple(found.location.position) == pytest.approx(tuple(expected.location.position), abs=1e-9)
+        assert tuple(found.location.orientation) == pytest.approx(tuple(expected.location.orientation), abs=1e-9)
@@ -0,0 +1,145 @@
+"""
+Tests for generation_service.py: deduplication, spool leases, jobs rerun
+after a restart and recovery from a worker crash. The workers run a stand-in
+for _run_job() that writes a small file instead of building any CAD; how it
+behaves is chosen by the drum-disk `diameter` requested.
+
+    python3 -m pytest -q test_generation_service.py
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import generation_service
+import generators
+from generation_service import GenerationService
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                                reason="the stand-in job reaches the workers by fork")
+
+GATED, CRASHES, CRASHES_ONCE = 151.0, 152.0, 153.0 # drum diameters with special behaviour
+PATHS = {} # log, gate and crash marker files, set before the workers fork
+
+
+def fake_warm_worker():
+    pass
+
+
+def fake_run_job(name, arguments, output, path):
+    diameter = arguments["diameter"]
+    with open(PATHS["log"], "a") as f:
+        f.write(f"{diameter}\n")
+    if diameter == GATED:
+        while not os.path.exists(PATHS["gate"]):
+            time.sleep(0.01)
+    if diameter == CRASHES or (diameter == CRASHES_ONCE and not os.path.exists(PATHS["crashed"])):
+        open(PATHS["crashed"], "w").close()
+        os._exit(1)
+    with open(path, "w") as f:
+        json.dump([name, arguments, output], f)
+    return 0.0
+
+
+def runs():
+    with open(PATHS["log"]) as f:
+        return [float(line) for line in f]
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(generation_service, "_run_job", fake_run_job)
+    monkeypatch.setattr(generation_service, "_warm_worker", fake_warm_worker)
+    PATHS.update(log=str(tmp_path / "log"), gate=str(tmp_path / "gate"), crashed=str(tmp_path / "crashed"))
+    open(PATHS["log"], "w").close()
+    service = GenerationService(workers=2, spool_dir=str(tmp_path / "spool"))
+    os.makedirs(service.spool_dir)
+    service.start()
+    yield service
+    open(PATHS["gate"], "w").close() # release anything still waiting
+    service.stop()
+
+
+def test_identical_requests_share_one_build(service):
+    first, deduplicated = service.submit("drum-disk", {"diameter": GATED})
+    second, again = service.submit("drum-disk", {"diameter": "151"}) # same value as text
+    other, _ = service.submit("drum-disk", {"diameter": GATED}, fmt="stl")
+    assert second is first and (deduplicated, again) == (False, True)
+    assert other is not first
+    open(PATHS["gate"], "w").close()
+    path = first.result(timeout=30)
+    assert other.result(timeout=30) != path
+    assert sorted(runs()) == [GATED, GATED] # step and stl, once each
+
+    # Finished results come from the spool
+    spooled, deduplicated = service.submit("drum-disk", {"diameter": GATED})
+    assert spooled.result() == path and deduplicated
+    stats = service.stats()
+    assert (stats["submitted"], stats["deduplicated"], stats["spooled"], stats["completed"]) == (4, 1, 1, 2)
+    assert stats["in_flight"] == 0 and stats["build_seconds"]["count"] == 2
+
+
+def test_leased_results_outlive_eviction(service, monkeypatch):
+    monkeypatch.setattr(generation_service, "SPOOL_ENTRIES", 1)
+    path = service.submit("drum-disk", {"diameter": 100.0})[0].result(timeout=30)
+    with service.open_result(path) as f:
+        # Evicted by the next result while being sent: kept until the lease ends
+        service.submit("drum-disk", {"diameter": 101.0})[0].result(timeout=30)
+        assert os.path.exists(path) and json.load(f)[1]["diameter"] == 100.0
+        with pytest.raises(FileNotFoundError):
+            with service.open_result(path):
+                pass
+    assert not os.path.exists(path)
+    # Not spooled any more: built again
+    future, deduplicated = service.submit("drum-disk", {"diameter": 100.0})
+    assert future.result(timeout=30) == path and not deduplicated and os.path.exists(path)
+    assert runs() == [100.0, 101.0, 100.0]
+
+
+def test_jobs_caught_by_a_restart_are_rerun(service):
+    future, _ = service.submit("drum-disk", {"diameter": GATED})
+    wait_for(lambda: runs() == [GATED])
+    restart = threading.Thread(target=service._restart_pool)
+    restart.start()
+    wait_for(lambda: service.stats()["restarts"] == 1)
+    open(PATHS["gate"], "w").close() # the old worker finishes, too late
+    restart.join()
+    path = future.result(timeout=30)
+    assert path.endswith("-1.step") and runs() == [GATED, GATED]
+    assert len(os.listdir(service.spool_dir)) == 1 # the stale result was removed
+    assert service.stats()["failed"] == 0
+
+
+def test_worker_crash_restarts_the_pool(service):
+    path = service.submit("drum-disk", {"diameter": CRASHES_ONCE})[0].result(timeout=30)
+    assert runs() == [CRASHES_ONCE, CRASHES_ONCE] and os.path.exists(path)
+    assert service.stats()["crashes"] == 1
+
+    # A job that always crashes fails after its retries...
+    with pytest.raises(BrokenProcessPool):
+        service.submit("drum-disk", {"diameter": CRASHES})[0].result(timeout=60)
+    assert runs().count(CRASHES) == 1 + generation_service.CRASH_RETRIES
+    # ...and leaves working workers behind
+    assert service.submit("drum-disk", {"diameter": 102.0})[0].result(timeout=30)
+    stats = service.stats()
+    assert (stats["failed"], stats["crashes"]) == (1, 2 + generation_service.CRASH_RETRIES)
+
+
+def test_trimmed_undercut_disks_pass_the_check(tmp_path):
+    service = GenerationService(spool_dir=str(tmp_path))
+    design = dict(eccentricity_factor=0.49, pin_diameter=6.0, center_hole_diameter=10.0)
+    with pytest.raises(ValueError, match="undercut"):
+        service._check(generators.get("cycloidal-disk"), generators.bind("cycloidal-disk", design))
+    design["self_intersection"] = "trim"
+    service._check(generators.get("cycloidal-disk"), generators.bind("cycloidal-disk", design))
@@ -0,0 +1,84 @@
+"""
+Tests for knife_clearance.py: the gaps of the machine as assembled, and the
+indexed search against measuring every outline point at every angle.
+
+    python3 -m pytest -q test_knife_clearance.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from drum_phasing import helix_angles
+from knife_clearance import (HORIZON, SPACING, _densify, check_machine, clearance, insert_footprints,
+                             knife_section)
+from profile_mesh import drum_disk_profile
+
+
+def inside(points, polygon):
+    """Even-odd test of points (n, 2) against a closed polygon."""
+    start, end = polygon, np.roll(polygon, -1, axis=0)
+    x, y = points[:, None, 0], points[:, None, 1]
+    straddles = (start[:, 1] > y) != (end[:, 1] > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        at = start[:, 0] + (y - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+    return (straddles & (x < at)).sum(axis=1) % 2 == 1
+
+
+def distance(points, polygon):
+    """Distance from points (n, 2) to the edges of a closed polygon."""
+    start, end = polygon, np.roll(polygon, -1, axis=0)
+    along = end - start
+    t = np.clip(np.einsum("nej,ej->ne", points[:, None] - start, along) / np.einsum("ej,ej->e", along, along), 0, 1)
+    return np.hypot(*(points[:, None] - start - t[..., None] * along).transpose(2, 0, 1)).min(axis=1)
+
+
+def brute_force_gap(polygons, knife, turn):
+    """Signed gap between the parts turned by `turn` (deg) and the knife, every point against every edge."""
+    c, s = math.cos(math.radians(turn)), math.sin(math.radians(turn))
+    gaps = []
+    for polygon in polygons:
+        points = _densify(polygon, SPACING) @ np.array([[c, s], [-s, c]])
+        from_points = np.where(inside(points, knife), -1, 1) * distance(points, knife)
+        from_corners = np.where(inside(knife, points), -1, 1) * distance(knife, points)
+        gaps.append(min(from_points.min(), from_corners.min()))
+    gap = min(gaps)
+    return gap if gap <= HORIZON else math.inf
+
+
+def test_machine_as_assembled():
+    # The 150 mm rim reaches X = 75, the knife starts at 80 - 10
+    result = clearance()
+    assert result.min_gap == pytest.approx(np.full(10, -5.0), abs=1e-6) # the rim is a polygon
+    assert result.interference.all()
+    assert result.insert_gap.min() == pytest.approx(-0.66, abs=0.01)
+    moved = clearance(knife_x=86.0)
+    assert moved.min_gap == pytest.approx(np.full(10, 1.0), abs=1e-6)
+    assert not moved.interference.any()
+    assert moved.insert_gap.min() == pytest.approx(5.34, abs=0.01)
+
+
+@pytest.mark.parametrize("knife_x", [60.0, 76.0, 80.0, 86.0, 92.0])
+def test_indexed_search_matches_brute_force(knife_x):
+    parts = [drum_disk_profile().outer] + list(insert_footprints())
+    knife = knife_section(knife_x)
+    result = clearance(disk_angles=[0.0], knife_x=knife_x, steps=72)
+    for step, turn in enumerate(result.drum_angle):
+        gap = brute_force_gap(parts, knife, turn)
+        insert_gap = brute_force_gap(parts[1:], knife, turn)
+        assert result.gap[0, step] == pytest.approx(gap, abs=1e-9)
+        assert result.insert_gap[0, step] == pytest.approx(insert_gap, abs=1e-9)
+
+
+def test_disks_repeat_the_first_one_shifted_by_their_phase():
+    result = clearance(knife_x=76.0)
+    steps_per_degree = len(result.drum_angle) / 360
+    for i, angle in enumerate(helix_angles()):
+        shift = round(angle * steps_per_degree)
+        assert np.array_equal(result.gap[i], np.roll(result.gap[0], -shift))
+
+
+def test_check_machine_reports_each_interfering_disk():
+    problems, metrics = check_machine()
+    assert len(problems) == 10 and "5.00 mm deep" in problems[0]
+    assert metrics["interfering_disks"] == 10 and metrics["min_gap"] == pytest.approx(-5.0)
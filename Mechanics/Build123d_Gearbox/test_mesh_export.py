@@ -0,0 +1,139 @@
+"""
+Tests for mesh_export.py: the binary STL layout, 3MF instancing of the
+drum (one mesh object, a build item per disk) and how leaves are grouped.
+The writers are checked on NumPy meshes; the drum needs build123d.
+
+    python3 -m pytest -q test_mesh_export.py
+"""
+import copy
+import math
+import struct
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+import numpy as np
+import pytest
+
+from mesh_export import Mesh, _StlWriter, export_mesh, unique_leaves, write_mesh
+
+CORE = "{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}"
+
+TETRAHEDRON = Mesh(np.array([[0.0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]]),
+                   np.array([[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]], dtype=np.int32))
+
+
+def read_stl(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    count = struct.unpack_from("<I", data, 80)[0]
+    records = np.frombuffer(data, dtype=np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)),
+                                                  ("attribute", "<u2")]), offset=84)
+    return count, len(data), records
+
+
+def read_3mf(path):
+    with zipfile.ZipFile(path) as package:
+        assert {"[Content_Types].xml", "_rels/.rels", "3D/3dmodel.model"} <= set(package.namelist())
+        model = ElementTree.fromstring(package.read("3D/3dmodel.model"))
+    objects = model.findall(f"{CORE}resources/{CORE}object")
+    items = model.findall(f"{CORE}build/{CORE}item")
+    return objects, items
+
+
+def vertices_of(element):
+    return np.array([[float(vertex.get(axis)) for axis in "xyz"]
+                     for vertex in element.iter(f"{CORE}vertex")])
+
+
+def transform_of(item):
+    """3x4 [A | t] from a 3MF item's row-vector transform."""
+    values = np.array(item.get("transform").split(), dtype=float)
+    return np.column_stack([values[:9].reshape(3, 3).T, values[9:]])
+
+
+def test_binary_stl_layout(tmp_path):
+    path = str(tmp_path / "tetrahedron.stl")
+    moved = np.column_stack([np.eye(3), [10.0, 0, 0]])
+    with _StlWriter(path) as output:
+        output.add(TETRAHEDRON, [np.eye(3, 4), moved])
+    count, size, records = read_stl(path)
+    assert count == output.triangles == 8 and size == 84 + 50 * 8 and len(records) == 8
+    assert np.allclose(records["vertices"][4:], records["vertices"][:4] + [10, 0, 0])
+    # Unit normals facing out of the tetrahedron
+    assert np.allclose(np.linalg.norm(records["normal"], axis=1), 1)
+    outward = (records["normal"] * (records["vertices"].mean(axis=1) - [0.25, 0.25, 0.25])).sum(axis=1)
+    assert np.all(outward[:4] > 0)
+
+
+def test_3mf_vertices_keep_micrometres(tmp_path):
+    # Fixed point: no exponents, and large coordinates keep six decimals
+    mesh = Mesh(TETRAHEDRON.vertices * 1234.567891 + [1e-7, -2500.0000004, 0], TETRAHEDRON.triangles)
+    path = str(tmp_path / "tetrahedron.3mf")
+    assert write_mesh(mesh, path, label='big & "sharp"') == 4
+    objects, items = read_3mf(path)
+    assert objects[0].get("name") == 'big & "sharp"'
+    assert vertices_of(objects[0]) == pytest.approx(mesh.vertices, abs=5e-7)
+    with zipfile.ZipFile(path) as package:
+        assert b"e-" not in package.read("3D/3dmodel.model").split(b"<vertices>")[1].split(b"</vertices>")[0]
+    assert len(items) == 1 and transform_of(items[0]) == pytest.approx(np.eye(3, 4))
+
+
+@pytest.fixture(scope="module")
+def drum():
+    """Ten disks instancing one, placed and turned like full_machine_assembly()'s drum."""
+    pytest.importorskip("build123d")
+    from build123d import Compound, Location, Rotation
+    from part_cache import shared_copy
+    from shredder_components import drum_disk
+
+    disk = drum_disk.uncached(thickness=25.4, hex_shaft_size=25.0, num_teeth=2)
+    disk.label = "drum_disk"
+    disks = [shared_copy(disk, Location((0, 0, 60 + i * 25.4)) * Rotation(0, 0, 18 * i)) for i in range(10)]
+    return Compound(children=disks, label="drum")
+
+
+def test_unique_leaves_groups_instances(drum):
+    from build123d import Compound
+    from part_cache import shared_copy
+
+    groups = unique_leaves(drum)
+    assert len(groups) == 1
+    (members,) = groups.values()
+    assert len(members) == 10 and {leaf.label for leaf in members} == {"drum_disk"}
+    # A deep copy duplicates the geometry: a group of its own
+    # (the children are shared_copy()'d as a Compound takes over the ones it is given)
+    loose = copy.deepcopy(drum.children[0])
+    assert len(unique_leaves(Compound(children=[*map(shared_copy, drum.children), loose]))) == 2
+    for i, leaf in enumerate(members):
+        turn = math.radians(18 * i)
+        assert leaf.transform[:, 3] == pytest.approx([0, 0, 60 + i * 25.4])
+        assert leaf.transform[:2, :2] == pytest.approx(np.array([[math.cos(turn), -math.sin(turn)],
+                                                                  [math.sin(turn), math.cos(turn)]]))
+
+
+def test_3mf_keeps_the_drum_instanced(drum, tmp_path):
+    path = str(tmp_path / "drum.3mf")
+    count = export_mesh(drum, path, max_workers=1)
+    objects, items = read_3mf(path)
+    assert len(objects) == 1 and objects[0].get("name") == "drum_disk"
+    triangles = len(list(objects[0].iter(f"{CORE}triangle")))
+    assert count == 10 * triangles and len(items) == 10
+    assert {item.get("objectid") for item in items} == {objects[0].get("id")}
+    leaves = next(iter(unique_leaves(drum).values()))
+    for item, leaf in zip(items, leaves):
+        assert transform_of(item) == pytest.approx(leaf.transform, abs=1e-9)
+
+
+def test_stl_writes_every_instance(drum, tmp_path):
+    path = str(tmp_path / "drum.stl")
+    count = export_mesh(drum, path, max_workers=1)
+    written, size, records = read_stl(path)
+    assert written == count and size == 84 + 50 * count and count % 10 == 0
+    # Each disk's triangles are the first disk's, moved by its placement
+    leaves = next(iter(unique_leaves(drum).values()))
+    first = records["vertices"][:count // 10].astype(float)
+    for k, leaf in enumerate(leaves):
+        base = first.reshape(-1, 3) - leaves[0].transform[:, 3]
+        expected = base @ leaves[0].transform[:, :3] @ leaf.transform[:, :3].T + leaf.transform[:, 3]
+        chunk = records["vertices"][k * count // 10:(k + 1) * count // 10].reshape(-1, 3)
+        assert chunk == pytest.approx(expected, abs=1e-3) # float32 in the file
@@ -0,0 +1,92 @@
+"""
+Tests for openshredder.py, run through main() as the command line would.
+
+    python3 -m pytest -q test_openshredder.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import generators
+from openshredder import main, parse_assignments
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+UNDERCUT_DISK = ["eccentricity_factor=0.49", "pin_diameter=6", "center_hole_diameter=10"]
+
+
+def validate(capsys, *argv):
+    code = main(["validate", *argv, "--json"])
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_validate_accepts_an_undercut_disk_only_when_trimmed(capsys):
+    code, result = validate(capsys, "cycloidal-disk", *UNDERCUT_DISK)
+    assert code == 1 and not result["valid"] and "undercut" in result["problems"][0]
+    code, result = validate(capsys, "cycloidal-disk", *UNDERCUT_DISK, "self_intersection=trim")
+    assert code == 0 and result["valid"] and result["metrics"]["undercut"]
+
+
+def test_list_names_every_generator(capsys):
+    assert main(["list"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines] == list(generators.GENERATORS)
+    assert "-> cycloidal_disk.step" in lines[0]
+
+
+def test_validate_exit_codes(capsys):
+    code, result = validate(capsys, "cycloidal-disk")
+    assert code == 0 and result["valid"] and result["problems"] == []
+    assert result["arguments"] == generators.bind("cycloidal-disk") and "pressure_angles" not in result["metrics"]
+    code, result = validate(capsys, "cycloidal-disk", "num_lobes=10", "num_pins=10")
+    assert code == 1 and not result["valid"] and result["problems"]
+    # The drum as modelled reaches into the knife
+    code, result = validate(capsys, "full-machine")
+    assert code == 1 and result["metrics"]["interfering_disks"] > 0
+
+
+@pytest.mark.parametrize("name", ["gearbox", "fixed-knife", "impact-drive"])
+def test_validate_without_checks_is_not_a_pass(capsys, name):
+    code, result = validate(capsys, name)
+    assert code == 2 and result["valid"] is None and result["error"] == f"no checks available for {name}"
+    assert main(["validate", name]) == 2 and capsys.readouterr().out.strip() == f"no checks available for {name}"
+
+
+def test_validate_text_output(capsys):
+    assert main(["validate", "cycloidal-disk", "num_lobes=10", "num_pins=11"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1] == "valid" and all(line.startswith("  ") for line in lines[:-1])
+    assert main(["validate", "cycloidal-disk", "num_pins=11"]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-2:] == ["problem: num_pins - num_lobes (3) must divide num_lobes (8) for the outline to close",
+                          "invalid"]
+
+
+@pytest.mark.parametrize("argv, message", [
+    (["validate", "cycloidal-disk", "num_lobes"], "Expected name=value, got 'num_lobes'"),
+    (["validate", "cycloidal-disk", "=10"], "Expected name=value, got '=10'"),
+    (["validate", "cycloidal-disk", "lobes=10"], "cycloidal-disk has no parameter 'lobes'"),
+    (["validate", "cycloidal-disk", "num_lobes=ten"], "num_lobes: "),
+    (["validate", "no-such-generator"], "no-such-generator"),
+])
+def test_bad_arguments_are_reported(capsys, argv, message):
+    assert main(argv) == 2
+    error = capsys.readouterr().err
+    assert error.startswith("openshredder validate: ") and message in error
+
+
+def test_parse_assignments():
+    assert parse_assignments([" num_lobes = 10", "name=a=b", "empty="]) == \
+        {"num_lobes": "10", "name": "a=b", "empty": ""}
+    assert parse_assignments([]) == {}
+
+
+def test_list_and_validate_do_not_import_build123d():
+    script = ("import sys, openshredder\n"
+              "codes = [openshredder.main(['list']), openshredder.main(['validate', 'cycloidal-disk'])]\n"
+              "assert codes == [0, 0], codes\n"
+              "assert 'build123d' not in sys.modules and 'OCP' not in sys.modules\n")
+    subprocess.run([sys.executable, "-c", script], cwd=HERE, check=True, capture_output=True)
@@ -0,0 +1,114 @@
+"""
+Tests for outline_check.py: the sweep agrees with testing every pair of
+segments, finds a crossing exactly where cycloid_metrics.py flags an
+undercut, and trimming leaves the envelope the pin would cut.
+
+    python3 -m pytest -q test_outline_check.py
+"""
+import numpy as np
+import pytest
+
+from cycloid_metrics import disk_metrics
+from cycloid_profile import center_line, contracted_profile, cycloid_geometry, profile_angles
+from outline_check import first_crossing, trim_loops
+from profile_mesh import cycloidal_disk_profile
+from test_cycloid_metrics import DESIGNS, UNDERCUT
+
+
+def crossing_pairs(points):
+    """Every pair of non-adjacent segments of the closed polyline that properly cross, by brute force."""
+    start, end = points, np.roll(points, -1, axis=0)
+    n = len(points)
+    orientation = lambda a, b, c: np.sign((b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0]))
+    pairs = set()
+    for i in range(n):
+        for j in range(i + 2, n - (i == 0)):
+            if (orientation(start[j], end[j], start[i]) * orientation(start[j], end[j], end[i]) < 0
+                    and orientation(start[i], end[i], start[j]) * orientation(start[i], end[i], end[j]) < 0):
+                pairs.add((i, j))
+    return pairs
+
+
+def geometry_of(design):
+    return cycloid_geometry(**{name: design[name] for name in design if name != "pin_diameter"})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_agrees_with_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(300):
+        count = rng.integers(4, 14)
+        # Half star-shaped (mostly simple), half scrambled (mostly crossing)
+        angles = rng.uniform(0, 2 * np.pi, count)
+        if rng.random() < 0.5:
+            angles.sort()
+        points = rng.uniform(0.3, 1.0, count)[:, None] * np.column_stack([np.cos(angles), np.sin(angles)])
+        crossing = first_crossing(points)
+        pairs = crossing_pairs(points)
+        assert (crossing is None) == (not pairs)
+        if crossing:
+            assert (crossing.first, crossing.second) in pairs
+            # The point is on both segments
+            for k in (crossing.first, crossing.second):
+                a, b = points[k], points[(k + 1) % count]
+                offset = np.subtract(crossing.point, a)
+                assert abs((b - a)[0] * offset[1] - (b - a)[1] * offset[0]) < 1e-9
+                assert min(a[0], b[0]) - 1e-12 <= crossing.point[0] <= max(a[0], b[0]) + 1e-12
+
+
+def test_touching_and_folding_back():
+    square = [(0, 0), (2, 0), (2, 2), (0, 2)]
+    assert first_crossing(square) is None
+    assert first_crossing([(0, 0), (2, 2), (2, 0), (0, 2)]).point == pytest.approx((1, 1))
+    # Two triangles meeting at a vertex
+    assert first_crossing([(0, 0), (1, 1), (2, 0), (2, 2), (1, 1), (0, 2)]).point == pytest.approx((1, 1))
+    # Doubling back along the previous segment
+    assert first_crossing([(0, 0), (2, 0), (1, 0), (1, 1)]) is not None
+    # Open polylines: the closing segment is not there to cross
+    hook = [(1, 1), (0, 0), (2, 0), (1, -1)]
+    assert first_crossing(hook).point == pytest.approx((1, 0))
+    assert first_crossing(hook, closed=False) is None
+
+
+@pytest.mark.parametrize("resolution", [2000, 20000])
+@pytest.mark.parametrize("design", DESIGNS + UNDERCUT)
+def test_outline_crosses_itself_exactly_when_undercut(design, resolution):
+    outline = contracted_profile(geometry_of(design), design.get("pin_diameter", 5.3), profile_angles(resolution))
+    assert (first_crossing(outline) is not None) == bool(disk_metrics(**design).undercut)
+
+
+@pytest.mark.parametrize("design", UNDERCUT)
+def test_trimming_leaves_the_pin_envelope(design):
+    geometry, radius = geometry_of(design), design["pin_diameter"] / 2
+    trimmed, loops = trim_loops(contracted_profile(geometry, 2 * radius, profile_angles(5000)))
+    assert first_crossing(trimmed) is None
+    # A swallowtail at every lobe tip, cut off in the same number of steps at each
+    assert loops and len(loops) % design["num_lobes"] == 0
+    # Every point left is a pin radius from the pin centre path, none closer:
+    # the loops were inside that, where the pin never reaches (to within the
+    # sagitta of the outline's chords at the sharp tips, where it was cut)
+    path = center_line(geometry, profile_angles(20000), order=0)[0]
+    distance = np.concatenate([np.hypot(*(chunk[:, None] - path[None]).transpose(2, 0, 1)).min(axis=1)
+                               for chunk in np.array_split(trimmed[::4], 10)])
+    assert distance == pytest.approx(np.full(len(distance), radius), abs=1e-4)
+
+    with pytest.raises(ValueError):
+        trim_loops(contracted_profile(geometry, 2 * radius, profile_angles(5000)), max_loops=1)
+
+
+def test_disk_profile_refuses_or_trims_an_undercut_outline():
+    # Undercut, but with room for the roller holes
+    design = dict(num_lobes=6, num_pins=7, eccentricity_factor=0.49, pin_diameter=6.0, center_hole_diameter=8.0,
+                  resolution=5000)
+    with pytest.raises(ValueError, match="undercut"):
+        cycloidal_disk_profile(**design)
+    outline = contracted_profile(geometry_of(dict(num_lobes=6, num_pins=7, eccentricity_factor=0.49)), 6.0,
+                                 profile_angles(5000))
+    assert first_crossing(outline) is not None
+    assert first_crossing(cycloidal_disk_profile(**design, self_intersection="trim").outer) is None
+
+
+def test_simple_outline_is_left_alone():
+    outline = contracted_profile(geometry_of({}), 5.3, profile_angles(1000))
+    trimmed, loops = trim_loops(outline)
+    assert not loops and np.array_equal(trimmed, outline)
@@ -0,0 +1,160 @@
+"""
+Tests for part_cache.py: what goes into a key, storing and loading parts,
+eviction and the environment switches. Each test gets its own cache in a
+temporary OPENSHREDDER_CACHE_DIR.
+
+    python3 -m pytest -q test_part_cache.py
+"""
+import importlib
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import part_cache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Returns a function that reloads part_cache with the given settings (it reads them at import)."""
+    def configure(**environment):
+        monkeypatch.setenv("OPENSHREDDER_CACHE_DIR", str(tmp_path / "cache"))
+        for name, value in environment.items():
+            monkeypatch.setenv(f"OPENSHREDDER_{name.upper()}", str(value))
+        return importlib.reload(part_cache)
+
+    configure()
+    yield configure
+    monkeypatch.undo()
+    importlib.reload(part_cache)
+
+
+@part_cache.cached_part
+def box_part(length=10.0, label="box"):
+    from build123d import Box, Color
+
+    BUILDS.append(length)
+    part = Box(length, 10, 10)
+    part.label, part.color = label, Color(0.25, 0.5, 0.75)
+    return part
+
+
+BUILDS = []
+
+
+def test_key_is_stable_across_runs(cache):
+    # Keyed on a numpy-only function so that the runs don't have to start the CAD kernel
+    import cycloid_profile
+
+    arguments = {"num_lobes": 10, "eccentricity_factor": 0.25, "spare": [1.5, None, "text"]}
+    script = ("import cycloid_profile, part_cache;"
+              f"print(part_cache.part_key(cycloid_profile.cycloid_geometry, {arguments!r}))")
+    keys = {subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, text=True, check=True,
+                           env=dict(os.environ, PYTHONHASHSEED=str(seed))).stdout.strip() for seed in (1, 2)}
+    assert keys == {part_cache.part_key(cycloid_profile.cycloid_geometry, arguments)}
+
+
+def test_key_changes_with_arguments(cache):
+    key = lambda arguments: part_cache.part_key(box_part.uncached, arguments)
+    assert key({"length": 10.0}) == key({"length": 10.0})
+    assert len({key({"length": 10.0}), key({"length": 10.5}), key({"length": 10}), key({"length": "10.0"}),
+                key({"length": 10.0, "label": "box"})}) == 5
+    with pytest.raises(TypeError):
+        key({"length": object()})
+
+
+def test_key_follows_sibling_sources(cache, tmp_path, monkeypatch):
+    # A generator importing a helper from a sibling module, next to an unrelated one
+    source = tmp_path / "sources"
+    source.mkdir()
+    (source / "cache_test_helper.py").write_text("def helper():\n    return 1\n")
+    (source / "cache_test_generator.py").write_text(
+        "from cache_test_helper import helper\n\ndef generator(size=1):\n    return helper()\n")
+    (source / "cache_test_unrelated.py").write_text("VALUE = 1\n")
+    monkeypatch.setattr(part_cache, "_HERE", str(source))
+    monkeypatch.syspath_prepend(str(source))
+    for name in ("cache_test_helper", "cache_test_generator"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    from cache_test_generator import generator
+
+    key = lambda: part_cache.part_key(generator, {"size": 1})
+    before = key()
+    (source / "cache_test_unrelated.py").write_text("VALUE = 2 # changed\n")
+    assert key() == before
+    (source / "cache_test_helper.py").write_text("def helper():\n    return 2 # changed\n")
+    assert key() != before
+
+
+def test_round_trip_keeps_labels_colours_and_structure(cache):
+    pytest.importorskip("build123d")
+    from build123d import Box, Color, Compound, Cylinder, Part, Pos
+
+    cylinder = Pos(30, 0, 0) * Cylinder(5, 10)
+    cylinder.label, cylinder.color = "cylinder", Color(1, 0, 0)
+    inner = Compound(label="inner", children=[cylinder])
+    plain = Box(5, 5, 5)
+    plain.label = "plain"
+    assembly = Compound(label="assembly", children=[box_part(), inner, plain])
+    part_cache.store("ab" + "0" * 62, (assembly, box_part()))
+
+    loaded, single = part_cache.load("ab" + "0" * 62)
+    tree = lambda shape: (shape.label, part_cache.shape_kind(shape), shape.color and tuple(shape.color),
+                          round(shape.volume, 6), [tree(child) for child in shape.children])
+    assert tree(loaded) == tree(assembly) and tree(single) == tree(box_part())
+    assert loaded.children[1].children[0].label == "cylinder"
+    assert isinstance(single, Part) and tuple(single.color) == pytest.approx(tuple(Color(0.25, 0.5, 0.75)))
+
+
+def test_cached_generator_builds_once(cache):
+    pytest.importorskip("build123d")
+    BUILDS.clear()
+    first = box_part(12.0)
+    again = box_part(length=12.0, label="box")
+    assert BUILDS == [12.0] and again is not first
+    assert again.volume == pytest.approx(first.volume) and again.label == "box"
+    assert [entry["function"] for entry in part_cache.entries()] == ["test_part_cache.box_part"]
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    pytest.importorskip("build123d")
+    part_cache.store("aa" * 32, box_part.uncached())
+    size = part_cache.entries()[0]["size"]
+    part_cache.clear()
+
+    # Room for two and a half entries
+    cache(cache_max_mb=2.5 * size / 2**20)
+    now = time.time()
+    keys = ["a1" * 32, "b2" * 32, "c3" * 32]
+    for age, key in zip((30, 20), keys):
+        part_cache.store(key, box_part.uncached())
+        os.utime(part_cache._entry_path(key, ".json"), (now - age, now - age))
+    assert part_cache.load(keys[0]) is not None # now the most recently used
+    part_cache.store(keys[2], box_part.uncached())
+    assert sorted(entry["key"] for entry in part_cache.entries()) == [keys[0], keys[2]]
+    assert not os.path.exists(part_cache._entry_path(keys[1], ".0.brep"))
+
+
+def test_cache_can_be_switched_off(cache):
+    pytest.importorskip("build123d")
+    cache(cache="0")
+    BUILDS.clear()
+    box_part(11.0), box_part(11.0)
+    assert BUILDS == [11.0, 11.0] and part_cache.entries() == []
+    assert not os.path.exists(part_cache.CACHE_DIR)
+
+
+def test_shared_copies_move_independently():
+    pytest.importorskip("build123d")
+    from build123d import Location, Solid
+
+    box = Solid.make_box(10, 10, 10)
+    box.label = "box"
+    copy, moved = part_cache.shared_copy(box), part_cache.shared_copy(box, Location((0, 0, 20)))
+    assert copy.wrapped.TShape() == moved.wrapped.TShape() == box.wrapped.TShape() and copy.label == "box"
+    copy.move(Location((5, 0, 0)))
+    assert tuple(box.center()) == pytest.approx((5, 5, 5)) and tuple(copy.center()) == pytest.approx((10, 5, 5))
+    assert tuple(moved.center()) == pytest.approx((5, 5, 25))
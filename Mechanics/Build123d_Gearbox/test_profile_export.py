@@ -0,0 +1,131 @@
+"""
+Tests for profile_export.py: the arc-fitted cycloid outline stays within
+tolerance of the true curve both ways, is closed and tangent-continuous,
+and the writers and nesting produce what the cutter expects.
+
+    python3 -m pytest -q test_profile_export.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+from cycloid_profile import contracted_profile, cycloid_geometry, profile_angles
+from profile_export import (TOLERANCE, Arc, Circle, Line, bounds, cycloidal_disk_plate, drum_disk_plate, dxf_text,
+                            export_batch, fit_arcs, fixed_knife_plate, nest, sample_segments, svg_text)
+
+SAMPLES = 100_000
+
+
+def window_distance(queries, curve, window):
+    """
+    Distance from each query point to the closed polyline `curve`, over the
+    2 * window + 1 segments nearest in polar angle (an upper bound; exact
+    for a curve round the origin sampled densely enough).
+    """
+    curve = curve[np.argsort(np.arctan2(curve[:, 1], curve[:, 0]))]
+    angle = np.arctan2(curve[:, 1], curve[:, 0])
+    result = []
+    for chunk in np.array_split(queries, max(1, len(queries) // 2000)):
+        index = np.searchsorted(angle, np.arctan2(chunk[:, 1], chunk[:, 0]))[:, None] + np.arange(-window, window + 1)
+        a, b = curve[index % len(curve)], curve[(index + 1) % len(curve)]
+        ab = b - a
+        t = np.clip(np.einsum("ijk,ijk->ij", chunk[:, None] - a, ab) / np.einsum("ijk,ijk->ij", ab, ab), 0, 1)
+        result.append(np.hypot(*(chunk[:, None] - a - t[..., None] * ab).transpose(2, 0, 1)).min(axis=1))
+    return np.concatenate(result)
+
+
+def tangents(segment):
+    """Unit direction of travel at the start and end of a Line or Arc."""
+    if isinstance(segment, Line):
+        d = np.subtract(segment.end, segment.start)
+        d = d / np.hypot(*d)
+        return d, d
+    sign = 1 if segment.ccw else -1
+    result = []
+    for point in (segment.start, segment.end):
+        radial = np.subtract(point, segment.center)
+        result.append(sign * np.array([-radial[1], radial[0]]) / np.hypot(*radial))
+    return result
+
+
+def assert_closed_g1(contour, max_kink=1e-6):
+    for segment, following in zip(contour, contour[1:] + contour[:1]):
+        assert np.allclose(segment.end, following.start, atol=1e-9)
+        _, out = tangents(segment)
+        into, _ = tangents(following)
+        assert math.acos(np.clip(out @ into, -1, 1)) <= max_kink
+
+
+@pytest.mark.parametrize("options", [dict(), dict(num_lobes=10, num_pins=11), dict(tolerance=0.002),
+                                     dict(num_lobes=12, num_pins=13, pin_circle_diameter=60.0, pin_diameter=4.0)])
+def test_cycloid_outline_within_tolerance(options):
+    tolerance = options.get("tolerance", TOLERANCE)
+    plate = cycloidal_disk_plate(**options)
+    geometry = cycloid_geometry(**{name: value for name, value in options.items()
+                                   if name not in ("tolerance", "pin_diameter")})
+    curve = contracted_profile(geometry, options.get("pin_diameter", 5.3), profile_angles(SAMPLES))
+
+    # The arcs never stray from the curve...
+    fitted = sample_segments(plate.outline, tolerance / 100)
+    assert window_distance(fitted, curve, 400).max() <= tolerance
+    # ...and the curve never strays from the arcs (sampled with a sagitta of tolerance / 100)
+    assert window_distance(curve[::5], fitted, 8).max() <= tolerance * 1.01
+    # A few hundred moves rather than thousands of points
+    assert len(plate.outline) < 50 * geometry.lobe_factor
+    assert_closed_g1(plate.outline)
+
+
+def test_holes_are_exact_circles():
+    plate = cycloidal_disk_plate(num_lobes=10, num_pins=11)
+    assert len(plate.holes) == 11
+    assert all(len(hole) == 1 and isinstance(hole[0], Circle) for hole in plate.holes)
+    assert plate.holes[0][0].radius == pytest.approx(24.1 / 2)
+
+
+def test_fit_arcs_on_a_circle_and_a_line():
+    angles = np.linspace(0, 3, 500)
+    arc = fit_arcs(np.column_stack([10 * np.cos(angles), 10 * np.sin(angles)]), start_tangent=(0, 1))
+    assert len(arc) == 1 and isinstance(arc[0], Arc)
+    assert np.allclose(arc[0].center, (0, 0), atol=1e-9) and arc[0].ccw
+    line = fit_arcs(np.column_stack([np.linspace(0, 5, 50), np.linspace(0, 2, 50)]))
+    assert len(line) == 1 and isinstance(line[0], Line)
+
+
+def test_drum_disk_and_knife_contours():
+    plate = drum_disk_plate()
+    assert all(isinstance(segment, Arc) for segment in plate.outline) and len(plate.outline) == 4
+    assert_closed_g1(plate.outline, max_kink=math.pi) # gullets meet the rim at a corner
+    radii = sorted(round(math.hypot(*np.subtract(s.start, s.center)), 9) for s in plate.outline)
+    assert radii == [25.0, 25.0, 75.0, 75.0]
+    assert len(plate.holes[0]) == 6
+    assert bounds(fixed_knife_plate()) == (-127.0, -25.0, 127.0, 25.0)
+
+
+def test_dxf_cuts_holes_first_and_svg_has_a_path_per_contour():
+    plate = cycloidal_disk_plate()
+    text = dxf_text([plate])
+    entities = text.split("ENTITIES")[1].split("\n")
+    layers = [entities[i + 1] for i, line in enumerate(entities) if line == "8"]
+    assert layers == ["INNER"] * len(plate.holes) + ["OUTER"] * len(plate.outline)
+    assert text.count("\nARC\n") + text.count("\nLINE\n") == len(plate.outline)
+    svg = svg_text([plate], bounds(plate))
+    assert svg.count("<circle") == len(plate.holes) and svg.count("<path") == 1
+
+
+def test_nesting_keeps_parts_apart_on_the_sheet(tmp_path):
+    items = [(drum_disk_plate(), 5), (cycloidal_disk_plate(), 4), (fixed_knife_plate(), 2)]
+    placements, height = nest(items, 600.0, spacing=5.0)
+    assert len(placements) == 11
+    boxes = []
+    for plate, dx, dy in placements:
+        x_min, y_min, x_max, y_max = bounds(plate)
+        box = (x_min + dx, y_min + dy, x_max + dx, y_max + dy)
+        assert box[0] >= 5 - 1e-9 and box[2] <= 595 + 1e-9 and box[1] >= 5 - 1e-9 and box[3] <= height - 5 + 1e-9
+        for other in boxes:
+            assert box[2] + 5 <= other[0] + 1e-9 or other[2] + 5 <= box[0] + 1e-9 \
+                or box[3] + 5 <= other[1] + 1e-9 or other[3] + 5 <= box[1] + 1e-9
+        boxes.append(box)
+    assert export_batch(items, str(tmp_path / "sheet.dxf"), 600.0) == pytest.approx(height)
+    with pytest.raises(ValueError):
+        nest(items, 200.0)
@@ -0,0 +1,100 @@
+"""
+Tests for profile_mesh.py: the meshes are closed and consistently
+oriented, keep every outline point, and match the B-rep parts' volumes
+(those comparisons need build123d).
+
+    python3 -m pytest -q test_profile_mesh.py
+"""
+import numpy as np
+import pytest
+
+from mesh_export import Mesh
+from profile_mesh import (TOLERANCE, _ring_slices, bridge_holes, covers_rings, cycloidal_disk_mesh,
+                          cycloidal_disk_profile, drum_disk_mesh, drum_disk_profile, extrude_profile, fixed_knife_mesh,
+                          mesh_volume, open_edges, triangulate_polygon, triangulate_profile)
+
+
+def profile_area(profile):
+    return sum(_signed_area(ring) for ring in [profile.outer] + list(profile.holes))
+
+
+def _signed_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * (np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def perimeter(profile):
+    return sum(np.hypot(*(np.roll(ring, -1, axis=0) - ring).T).sum() for ring in [profile.outer] + list(profile.holes))
+
+
+def assert_closed(mesh, profile, thickness):
+    assert open_edges(mesh) == 0
+    used = np.zeros(len(mesh.vertices), dtype=bool)
+    used[mesh.triangles.ravel()] = True
+    assert used.all()
+    # Prism: the volume is exactly the polygon area times the thickness
+    assert mesh_volume(mesh) == pytest.approx(profile_area(profile) * thickness, rel=1e-9)
+
+
+@pytest.mark.parametrize("resolution", [360, 10000, 20000, 40000])
+def test_cycloidal_disk_closed_at_any_resolution(resolution):
+    mesh = cycloidal_disk_mesh(resolution=resolution)
+    assert_closed(mesh, cycloidal_disk_profile(resolution=resolution), 3.0)
+
+
+@pytest.mark.parametrize("options", [
+    dict(num_lobes=10, num_pins=11, chord_tolerance=0.001),
+    dict(eccentricity_factor=0.2, pin_diameter=3.0, center_hole_diameter=20.0, resolution=5000),
+    dict(num_lobes=6, num_pins=7, eccentricity_factor=0.49, pin_diameter=6.0, center_hole_diameter=8.0,
+         resolution=5000, self_intersection="trim"), # undercut: the swallowtails are cut off first
+])
+def test_other_disks_closed(options):
+    profile = cycloidal_disk_profile(**options)
+    assert_closed(cycloidal_disk_mesh(**options), profile, 3.0)
+
+
+def test_drum_disk_and_knife_closed():
+    assert_closed(drum_disk_mesh(), drum_disk_profile(), 25.0)
+    options = dict(num_teeth=4, hex_shaft_size=30.0)
+    assert_closed(drum_disk_mesh(**options), drum_disk_profile(**options), 25.0)
+    mesh = fixed_knife_mesh()
+    assert open_edges(mesh) == 0 and mesh_volume(mesh) == pytest.approx(254 * 50 * 20)
+
+
+def test_fine_ear_clipping_keeps_every_point():
+    # The fallback when arc fans fail: straight runs are clipped, not dropped
+    profile = cycloidal_disk_profile(resolution=4000)
+    points = np.concatenate([profile.outer] + list(profile.holes))
+    rings = _ring_slices(profile)
+    triangles = triangulate_polygon(points, bridge_holes(points, rings))
+    assert covers_rings(points, rings, triangles)
+    square = np.array([(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (0, 2), (0, 1)], dtype=float)
+    assert covers_rings(square, [np.arange(7)], triangulate_polygon(square, np.arange(7)))
+
+
+def test_triangulation_check_rejects_bad_caps():
+    points, triangles = triangulate_profile(cycloidal_disk_profile())
+    rings = _ring_slices(cycloidal_disk_profile())
+    assert covers_rings(points, rings, triangles)
+    assert not covers_rings(points, rings, triangles[1:])      # a hole in the cap
+    assert not covers_rings(points, rings, triangles[:, ::-1]) # flipped
+    assert not covers_rings(points, rings, np.concatenate([triangles, triangles[:1]])) # an overlap
+    mesh = extrude_profile(cycloidal_disk_profile(), 0, 3)
+    assert open_edges(Mesh(mesh.vertices, mesh.triangles[1:])) == 3
+
+
+@pytest.mark.parametrize("name, mesh_function, profile, thickness", [
+    ("cycloidal_disk", cycloidal_disk_mesh, cycloidal_disk_profile(), 3.0),
+    ("drum_disk", drum_disk_mesh, drum_disk_profile(), 25.0),
+])
+def test_volume_matches_brep(name, mesh_function, profile, thickness):
+    pytest.importorskip("build123d")
+    if name == "cycloidal_disk":
+        from cycloidal_gear import cycloidal_disk as part
+    else:
+        from shredder_components import drum_disk as part
+    brep = part.uncached().volume
+    # Polygons within TOLERANCE of the curves, so the areas between them and
+    # the curves average 2/3 of that along the perimeter; the drum's insert
+    # pockets (about 0.3 mm^3) are not in the mesh
+    assert abs(mesh_volume(mesh_function()) - brep) <= 2 / 3 * TOLERANCE * perimeter(profile) * thickness + 0.5
@@ -0,0 +1,70 @@
+"""
+Tests for shredder_components.py: the @shared_shape cutters are built once
+per process and argument set, and a drum disk then costs two booleans
+whatever its tooth count.
+
+    python3 -m pytest -q test_shredder_components.py
+"""
+import pytest
+
+pytest.importorskip("build123d")
+
+from build123d import Location
+
+from build_stats import count_booleans
+from shredder_components import drum_disk, gullet_cutter, hex_bore_cutter, insert_pocket_cutter
+
+CUTTERS = (hex_bore_cutter, gullet_cutter, insert_pocket_cutter)
+
+
+@pytest.fixture
+def fresh_cutters():
+    for cutter in CUTTERS:
+        cutter.cache_clear()
+    yield
+    for cutter in CUTTERS:
+        cutter.cache_clear()
+
+
+def booleans(function, **arguments):
+    with count_booleans() as counter:
+        shape = function(**arguments)
+    return counter, shape
+
+
+def test_cutters_are_built_once(fresh_cutters):
+    first, disk = booleans(drum_disk.uncached, num_teeth=2)
+    # The first disk also models the cutters (the insert itself may come from the part cache)
+    assert first.count > 2
+    again, same = booleans(drum_disk.uncached, num_teeth=2)
+    assert dict(again.operations) == {"cut": 2} and same.volume == pytest.approx(disk.volume, rel=1e-12)
+
+
+@pytest.mark.parametrize("num_teeth", [1, 3, 4])
+def test_one_boolean_per_pattern(fresh_cutters, num_teeth):
+    drum_disk.uncached(num_teeth=2)
+    counter, disk = booleans(drum_disk.uncached, num_teeth=num_teeth)
+    assert dict(counter.operations) == {"cut": 2}
+    assert len(disk.solids()) == 1
+
+
+def test_other_arguments_build_other_cutters(fresh_cutters):
+    drum_disk.uncached(thickness=25.0)
+    counter, _ = booleans(drum_disk.uncached, thickness=20.0)
+    assert counter.count > 2
+    assert not hex_bore_cutter(25.0, 25.0).wrapped.IsPartner(hex_bore_cutter(25.0, 20.0).wrapped)
+
+
+@pytest.mark.parametrize("cutter, arguments", [(hex_bore_cutter, (25.0, 25.4)), (gullet_cutter, (150.0, 25.4)),
+                                               (insert_pocket_cutter, (150.0, 25.4))])
+def test_repeated_calls_share_the_geometry(fresh_cutters, cutter, arguments):
+    first, second = cutter(*arguments), cutter(*arguments)
+    # Separate shapes with the same TShape: moving one leaves the other where it was
+    assert first is not second and first.wrapped.TShape() == second.wrapped.TShape()
+    centre = tuple(second.center())
+    first.move(Location((10, 0, 0)))
+    assert tuple(second.center()) == pytest.approx(centre)
+    assert cutter(*arguments).wrapped.TShape() == second.wrapped.TShape()
+    # Keyword and positional calls are the same call
+    names = ("hex_shaft_size", "thickness") if cutter is hex_bore_cutter else ("diameter", "thickness")
+    assert cutter(**dict(zip(names, arguments))).wrapped.TShape() == first.wrapped.TShape()